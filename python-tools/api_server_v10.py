@@ -40,12 +40,33 @@ import httpx
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request, Depends, Header, status, UploadFile, File, Form
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field, field_validator
+from starlette.datastructures import MutableHeaders
 from dotenv import load_dotenv
 from pathlib import Path
 
+from circuit_breaker import CircuitBreakerRegistry, create_state_store
+from provider_prober import ProviderProber, build_model_list_probes
+import prometheus_metrics as metrics
+import tracing
+from loop_monitor import loop_monitor
+from batch_jobs import BatchJobEngine, NDJSONStream, create_job_store, format_sse
+from claim_analysis import ClaimAnalyzer
+from structured_output import FORMAT_INSTRUCTIONS, output_budget, read_reply, response_format
+from evidence_packing import EvidenceCollector
+from claim_decomposition import find_subclaims, summarize, verify_subclaims
+from domain_reputation import default_index, host_of
+from factcheck_kb import FactCheckKB
+from html_extract import fetch_text
+from reference_fetch import HostLimiter, ReferenceBatch
+from pdf_extract import PdfError, PdfPool, document_hash, fetch_pdf
+from article_extract import ArticlePool
+from image_forensics import ImageError, ImageForensics, ImageIndex, decode_image_input
+import provider_scheduler
+from provider_scheduler import ProviderRateLimiter, ProviderScheduler, concurrency_from_limits
+
 # Load .env from the script's directory
 _script_dir = Path(__file__).parent
 load_dotenv(_script_dir / ".env")
@@ -74,6 +95,18 @@ class Config:
     API_KEYS = set(filter(None, os.getenv("API_KEYS", "demo-key-12345,test-key-67890").split(",")))
     REQUIRE_API_KEY = os.getenv("REQUIRE_API_KEY", "false").lower() == "true"
     
+    # Batch routes (see batch_jobs.py)
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))        # claims in flight per job
+    
+    # decompose=true and documents (see claim_decomposition.py); each sub-claim is a full verification
+    MAX_SUBCLAIMS = int(os.getenv("MAX_SUBCLAIMS", 12))
+    MAX_DOCUMENT_CLAIMS = int(os.getenv("MAX_DOCUMENT_CLAIMS", 20))
+    SUBCLAIM_CONCURRENCY = int(os.getenv("SUBCLAIM_CONCURRENCY", 4))
+    
+    # Background provider probes (see provider_prober.py); /health/deep says when they are off
+    PROBE_ENABLED = os.getenv("PROBE_ENABLED", "false").lower() == "true"
+    PROBE_INTERVAL_SECONDS = float(os.getenv("PROBE_INTERVAL_SECONDS", 300))
+    
     # ==========================================================================
     # ALL AI PROVIDER API KEYS
     # ==========================================================================
@@ -277,62 +310,32 @@ class NuanceDetector:
             - nuanced_topic: str - Detected nuanced topic area
             - recommendation: str - Suggested verdict approach
         """
-        claim_lower = claim.lower()
+        # One memoized scan of the claim (see claim_analysis.py)
+        features = claim_analyzer.scan(claim)
         
-        # Detect absolute language
-        absolute_matches = []
-        for pattern in cls.ABSOLUTE_PATTERNS:
-            matches = re.findall(pattern, claim_lower, re.IGNORECASE)
-            absolute_matches.extend(matches)
-        
-        # Detect comparative language
-        comparative_matches = []
-        for pattern in cls.COMPARATIVE_PATTERNS:
-            matches = re.findall(pattern, claim_lower, re.IGNORECASE)
-            comparative_matches.extend(matches)
+        # Detect absolute / comparative language
+        absolute_matches = features.family("absolute").findall()
+        comparative_matches = features.family("comparative").findall()
         
         # Detect nuanced topics - check ALL topics, not just first match
-        detected_topics = []
-        topic_keywords = []
-        for topic, keywords in cls.NUANCED_TOPICS.items():
-            for kw in keywords:
-                if kw.lower() in claim_lower:
-                    if topic not in detected_topics:
-                        detected_topics.append(topic)
-                    topic_keywords.append(kw)
+        topic_hits = features.keywords("nuanced_topics")
+        detected_topics = list(topic_hits)
+        topic_keywords = [kw for kws in topic_hits.values() for kw in kws]
         
         detected_topic = detected_topics[0] if detected_topics else None
         
         # Detect inherently nuanced patterns
-        inherent_nuance = False
-        inherent_pattern_match = None
-        for pattern in cls.INHERENTLY_NUANCED_PATTERNS:
-            if re.search(pattern, claim_lower, re.IGNORECASE):
-                inherent_nuance = True
-                inherent_pattern_match = pattern
-                break
+        inherent_nuance = bool(features.family("inherent"))
         
         # NEW: Detect academic/scientific hedging language
-        has_academic_hedging = False
-        for pattern in cls.ACADEMIC_HEDGING_PATTERNS:
-            if re.search(pattern, claim_lower, re.IGNORECASE):
-                has_academic_hedging = True
-                break
+        has_academic_hedging = bool(features.family("hedging"))
         
         # NEW: Detect balanced claim patterns (presents multiple sides)
-        is_balanced_claim = False
-        balanced_indicators = 0
-        for pattern in cls.BALANCED_CLAIM_PATTERNS:
-            if re.search(pattern, claim_lower, re.IGNORECASE):
-                is_balanced_claim = True
-                balanced_indicators += 1
+        balanced_indicators = features.family("balanced").count()
+        is_balanced_claim = balanced_indicators > 0
         
         # Detect generalizations
-        has_generalization = False
-        for pattern in cls.GENERALIZATION_PATTERNS:
-            if re.search(pattern, claim_lower, re.IGNORECASE):
-                has_generalization = True
-                break
+        has_generalization = bool(features.family("generalization"))
         
         # Calculate nuance score - ENHANCED SCORING
         nuance_score = 0.0
@@ -433,20 +436,12 @@ class NuanceDetector:
     @classmethod
     def _is_factual_statement(cls, claim: str) -> bool:
         """Check if claim appears to be stating established facts rather than opinions."""
-        claim_lower = claim.lower()
-        for pattern in cls.FACTUAL_INDICATORS:
-            if re.search(pattern, claim_lower, re.IGNORECASE):
-                return True
-        return False
+        return bool(claim_analyzer.scan(claim).family("factual"))
     
     @classmethod
     def _is_known_false_claim(cls, claim: str) -> bool:
         """Check if claim matches known false/conspiracy patterns."""
-        claim_lower = claim.lower()
-        for pattern in cls.FALSE_INDICATORS:
-            if re.search(pattern, claim_lower, re.IGNORECASE):
-                return True
-        return False
+        return bool(claim_analyzer.scan(claim).family("known_false"))
     
     @classmethod
     def should_force_mixed(cls, claim: str, verdict: str, confidence: float) -> Tuple[bool, str]:
@@ -574,28 +569,15 @@ class TemporalVerifier:
             - freshness_requirement: 'high' | 'medium' | 'low'
             - detected_dates: list of dates/years found
         """
-        claim_lower = claim.lower()
-        
-        # Detect time-sensitive patterns
-        time_sensitive_matches = []
-        for pattern in cls.TIME_SENSITIVE_KEYWORDS:
-            matches = re.findall(pattern, claim_lower, re.IGNORECASE)
-            time_sensitive_matches.extend(matches)
-        
-        # Detect historical patterns
-        historical_matches = []
-        for pattern in cls.HISTORICAL_KEYWORDS:
-            matches = re.findall(pattern, claim_lower, re.IGNORECASE)
-            historical_matches.extend(matches)
+        features = claim_analyzer.scan(claim)
         
-        # Detect timeless patterns
-        timeless_matches = []
-        for pattern in cls.TIMELESS_KEYWORDS:
-            matches = re.findall(pattern, claim_lower, re.IGNORECASE)
-            timeless_matches.extend(matches)
+        # Detect time-sensitive / historical / timeless patterns
+        time_sensitive_matches = features.family("time_sensitive").findall()
+        historical_matches = features.family("historical").findall()
+        timeless_matches = features.family("timeless").findall()
         
         # Extract years
-        years = re.findall(r'\b(19|20)\d{2}\b', claim)
+        years = _YEAR_RE.findall(claim)
         current_year = datetime.now().year
         
         # Determine temporal type
@@ -651,96 +633,33 @@ class SourceAuthorityScorer:
     - Point 3.3: Source Bias Assessment
     """
     
-    # Domain authority tiers
-    AUTHORITY_TIERS = {
-        # Tier 1: Highest Authority (0.95-1.0)
-        "tier1": {
-            "domains": [
-                "nature.com", "science.org", "thelancet.com", "nejm.org", "cell.com",
-                "who.int", "cdc.gov", "nih.gov", "nasa.gov", "noaa.gov",
-                "arxiv.org", "pubmed.ncbi.nlm.nih.gov", "scholar.google.com",
-                "ieee.org", "acm.org", "springer.com", "wiley.com",
-            ],
-            "score": 0.95,
-            "bias_risk": "very_low"
-        },
-        # Tier 2: High Authority (0.85-0.94)
-        "tier2": {
-            "domains": [
-                "reuters.com", "apnews.com", "bbc.com", "bbc.co.uk", "npr.org",
-                "pbs.org", "c-span.org", "factcheck.org", "politifact.com",
-                "snopes.com", "fullfact.org", "gov.uk", "europa.eu",
-                "whitehouse.gov", "congress.gov", "supremecourt.gov",
-            ],
-            "score": 0.90,
-            "bias_risk": "low"
-        },
-        # Tier 3: Medium Authority (0.70-0.84)
-        "tier3": {
-            "domains": [
-                "nytimes.com", "washingtonpost.com", "wsj.com", "economist.com",
-                "theguardian.com", "bloomberg.com", "forbes.com", "ft.com",
-                "usatoday.com", "nbcnews.com", "cbsnews.com", "abcnews.go.com",
-                "cnn.com", "msnbc.com", "foxnews.com", "wikipedia.org",
-            ],
-            "score": 0.80,
-            "bias_risk": "medium"
-        },
-        # Tier 4: Lower Authority (0.50-0.69)
-        "tier4": {
-            "domains": [
-                "medium.com", "substack.com", "wordpress.com", "blogspot.com",
-                "reddit.com", "quora.com", "twitter.com", "x.com",
-                "facebook.com", "instagram.com", "tiktok.com", "youtube.com",
-            ],
-            "score": 0.55,
-            "bias_risk": "high"
-        }
-    }
-    
-    # Known bias indicators
-    BIAS_INDICATORS = {
-        "left_leaning": ["msnbc.com", "huffpost.com", "vox.com", "salon.com"],
-        "right_leaning": ["foxnews.com", "breitbart.com", "dailywire.com", "newsmax.com"],
-        "satire": ["theonion.com", "babylonbee.com", "clickhole.com"],
-        "questionable": ["naturalnews.com", "infowars.com", "zerohedge.com"]
-    }
+    # Authority tiers and known bias come from the domain reputation index
+    # (domain_reputation.tsv); unknown domains get the default below.
+    DEFAULT_AUTHORITY = 0.60
     
     @classmethod
     def score_source(cls, url: str) -> Dict[str, Any]:
         """Score a source's authority and bias."""
-        try:
-            domain = urlparse(url).netloc.lower().replace("www.", "")
-        except:
-            domain = url.lower()
-        
-        # Check each tier
-        for tier_name, tier_data in cls.AUTHORITY_TIERS.items():
-            for tier_domain in tier_data["domains"]:
-                if tier_domain in domain:
-                    bias = None
-                    for bias_type, bias_domains in cls.BIAS_INDICATORS.items():
-                        if domain in bias_domains:
-                            bias = bias_type
-                            break
-                    
-                    return {
-                        "domain": domain,
-                        "authority_tier": tier_name,
-                        "authority_score": tier_data["score"],
-                        "bias_risk": tier_data["bias_risk"],
-                        "detected_bias": bias,
-                        "is_primary_source": tier_name == "tier1"
-                    }
-        
-        # Unknown domain - default scoring
+        return cls._describe(host_of(url) or url.lower(), domain_index.lookup(url))
+    
+    @classmethod
+    def _describe(cls, domain: str, rating) -> Dict[str, Any]:
+        if rating is None or rating.tier is None:
+            return {
+                "domain": domain,
+                "authority_tier": "unknown",
+                "authority_score": cls.DEFAULT_AUTHORITY,
+                "bias_risk": "unknown",
+                "detected_bias": rating.bias if rating else None,
+                "is_primary_source": False
+            }
         return {
             "domain": domain,
-            "authority_tier": "unknown",
-            "authority_score": 0.60,
-            "bias_risk": "unknown",
-            "detected_bias": None,
-            "is_primary_source": False
+            "authority_tier": rating.tier,
+            "authority_score": rating.authority_score,
+            "bias_risk": rating.bias_risk,
+            "detected_bias": rating.bias,
+            "is_primary_source": rating.tier == "tier1"
         }
     
     @classmethod
@@ -755,7 +674,9 @@ class SourceAuthorityScorer:
                 "score": {"primary": 0.5, "authority": 0.5, "bias": 0.8}
             }
         
-        scored = [cls.score_source(s.get("url", "")) for s in sources if s.get("url")]
+        urls = [s["url"] for s in sources if s.get("url")]
+        scored = [cls._describe(host_of(url) or url.lower(), rating)
+                  for url, rating in zip(urls, domain_index.lookup_many(urls))]
         
         primary_count = sum(1 for s in scored if s["is_primary_source"])
         high_auth_count = sum(1 for s in scored if s["authority_score"] >= 0.85)
@@ -870,26 +791,26 @@ class VeriScoreCalculator:
     - Point 7.3: Actionable Summary Generation
     """
     
+    PILLAR_WEIGHTS = {
+        "claim_parsing": 0.10,    # Pillar 1
+        "temporal": 0.10,          # Pillar 2
+        "source_quality": 0.20,    # Pillar 3 - weighted higher
+        "evidence": 0.20,          # Pillar 4 - weighted higher
+        "ai_consensus": 0.20,      # Pillar 5 - weighted higher
+        "logical": 0.10,           # Pillar 6
+        "synthesis": 0.10          # Pillar 7
+    }
+    
     @classmethod
     def calculate_veriscore(cls, pillar_scores: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
         """
         Calculate the VeriScore from all 7 pillar scores.
         Each pillar has 3 checks with individual scores.
         """
-        pillar_weights = {
-            "claim_parsing": 0.10,    # Pillar 1
-            "temporal": 0.10,          # Pillar 2
-            "source_quality": 0.20,    # Pillar 3 - weighted higher
-            "evidence": 0.20,          # Pillar 4 - weighted higher
-            "ai_consensus": 0.20,      # Pillar 5 - weighted higher
-            "logical": 0.10,           # Pillar 6
-            "synthesis": 0.10          # Pillar 7
-        }
-        
         pillar_results = {}
         total_score = 0
         
-        for pillar, weight in pillar_weights.items():
+        for pillar, weight in cls.PILLAR_WEIGHTS.items():
             if pillar in pillar_scores:
                 checks = pillar_scores[pillar]
                 pillar_avg = sum(checks.values()) / len(checks) if checks else 0.5
@@ -1051,47 +972,62 @@ class ContentExtractor:
         self.http_client = http_client
     
     async def extract_url_content(self, url: str) -> Dict[str, Any]:
-        """Extract content from a URL using Jina Reader or fallback."""
-        try:
-            # Try Jina Reader first (best for article extraction)
-            if Config.JINA_API_KEY:
-                response = await self.http_client.get(
-                    f"https://r.jina.ai/{url}",
-                    headers={"Authorization": f"Bearer {Config.JINA_API_KEY}"},
-                    timeout=15.0
-                )
-                if response.status_code == 200:
-                    content = response.text[:10000]  # Limit to 10k chars
-                    return {
-                        "success": True,
-                        "content": content,
-                        "source": "jina_reader",
-                        "url": url
-                    }
-            
-            # Fallback: Direct fetch with basic parsing
-            response = await self.http_client.get(url, timeout=10.0, follow_redirects=True)
-            if response.status_code == 200:
-                # Basic HTML to text conversion
-                text = response.text
-                # Remove script and style tags
-                text = re.sub(r'<script[^>]*>.*?</script>', '', text, flags=re.DOTALL | re.IGNORECASE)
-                text = re.sub(r'<style[^>]*>.*?</style>', '', text, flags=re.DOTALL | re.IGNORECASE)
-                # Remove HTML tags
-                text = re.sub(r'<[^>]+>', ' ', text)
-                # Clean whitespace
-                text = re.sub(r'\s+', ' ', text).strip()
-                
+        """
+        Extract content from a URL using Jina Reader or a direct fetch. Both
+        are streamed under a byte cap and stop at 10k characters of text
+        (see html_extract.py); binary responses are skipped. Directly fetched
+        pages are read to 30k characters of page text for main-content
+        extraction in the article worker pool (article_extract.py), falling
+        back to the streamed text. PDF links are extracted in the PDF worker
+        pool.
+        """
+        if urlparse(url).path.lower().endswith(".pdf"):
+            return await self.extract_pdf_content(url)
+        
+        # Try Jina Reader first (best for article extraction)
+        if Config.JINA_API_KEY:
+            page = await fetch_text(
+                self.http_client, f"https://r.jina.ai/{url}",
+                headers={"Authorization": f"Bearer {Config.JINA_API_KEY}"},
+                timeout=15.0, parse_html=False
+            )
+            if page["success"]:
+                return {"success": True, "content": page["content"], "source": "jina_reader", "url": url}
+        
+        # Fallback: direct fetch; the article body if one is found, else the streamed page text
+        page = await fetch_text(self.http_client, url, timeout=10.0, max_bytes=ARTICLE_MAX_BYTES, keep_html=True)
+        if page["success"]:
+            article = await article_pool.extract(page["html"]) if page.get("html") else None
+            if article:
                 return {
                     "success": True,
-                    "content": text[:10000],
-                    "source": "direct_fetch",
+                    "content": self._article_content(article),
+                    "title": article["title"],
+                    "byline": article["byline"],
+                    "published": article["published"],
+                    "source": "article",
                     "url": url
                 }
-        except Exception as e:
-            logger.error(f"URL extraction failed for {url}: {e}")
+            return {"success": True, "content": page["content"], "source": "direct_fetch", "url": url}
         
-        return {"success": False, "content": "", "url": url, "error": str(e) if 'e' in dir() else "Unknown error"}
+        logger.error(f"URL extraction failed for {url}: {page['error']}")
+        return {"success": False, "content": "", "url": url, "error": page["error"]}
+    
+    @staticmethod
+    def _article_content(article: Dict[str, Any]) -> str:
+        """Article text headed by its title, byline and date (providers use the date for temporal checks)."""
+        details = ", ".join(d for d in (article["byline"] and f"by {article['byline']}", article["published"]) if d)
+        heading = f"{article['title']} ({details})" if details else article["title"]
+        return f"{heading}\n\n{article['text']}"[:10000] if heading else article["text"]
+    
+    async def extract_pdf_content(self, url: str) -> Dict[str, Any]:
+        """Download a PDF and extract its text in the worker pool (first 10k characters)."""
+        try:
+            document = await pdf_pool.extract(await fetch_pdf(self.http_client, url))
+        except PdfError as e:
+            logger.error(f"PDF extraction failed for {url}: {e}")
+            return {"success": False, "content": "", "url": url, "error": str(e)}
+        return {"success": True, "content": document["text"][:10000], "source": "pdf", "url": url}
     
     async def extract_research_paper(self, identifier: str, id_type: str) -> Dict[str, Any]:
         """Extract research paper content from DOI, arXiv, or PubMed."""
@@ -1167,113 +1103,58 @@ class ContentExtractor:
 # CIRCUIT BREAKER WITH AGGRESSIVE TIMEOUTS
 # =============================================================================
 
-class CircuitBreaker:
-    """
-    Circuit breaker pattern with aggressive timeouts to prevent slow providers
-    from blocking the verification process.
-    """
-    
-    # Reduced timeouts for faster failover
-    PROVIDER_TIMEOUTS = {
-        # Tier 1: Fast providers (5-10s)
-        "groq": 8,
-        "cerebras": 8,
-        "sambanova": 10,
-        "fireworks": 10,
-        
-        # Tier 2: Standard providers (10-15s)
-        "perplexity": 12,
-        "mistral": 12,
-        "openrouter": 12,
-        "together": 12,
-        "deepseek": 12,
-        
-        # Tier 3: Slower providers (15-20s)
-        "google": 15,
-        "openai": 15,
-        "anthropic": 15,
-        "xai": 15,
-        
-        # Search APIs (5-10s)
-        "tavily": 8,
-        "brave": 8,
-        "serper": 8,
-        "exa": 10,
-        "jina": 10,
-    }
-    
-    # Default timeout for unknown providers
-    DEFAULT_TIMEOUT = 12
-    
-    def __init__(self):
-        self.failures: Dict[str, int] = defaultdict(int)
-        self.last_failure: Dict[str, float] = {}
-        self.circuit_open: Dict[str, float] = {}  # When circuit opened
-        self.half_open_attempts: Dict[str, int] = defaultdict(int)
-        
-        # Configuration
-        self.failure_threshold = 2  # Reduced from 3 - fail fast
-        self.reset_timeout = 30  # Reduced from 60 - recover faster
-        self.half_open_max_attempts = 1
-    
-    def get_timeout(self, provider: str) -> float:
-        """Get timeout for a specific provider."""
-        return self.PROVIDER_TIMEOUTS.get(provider, self.DEFAULT_TIMEOUT)
-    
-    def is_open(self, provider: str) -> bool:
-        """Check if circuit is open (provider should be skipped)."""
-        if provider not in self.circuit_open:
-            return False
-        
-        # Check if we should try half-open
-        time_since_open = time.time() - self.circuit_open[provider]
-        if time_since_open >= self.reset_timeout:
-            # Move to half-open state
-            return False
-        
-        return True
-    
-    def record_success(self, provider: str):
-        """Record successful call - close circuit."""
-        self.failures[provider] = 0
-        if provider in self.circuit_open:
-            del self.circuit_open[provider]
-        self.half_open_attempts[provider] = 0
-        logger.debug(f"[CIRCUIT] {provider} success - circuit closed")
-    
-    def record_failure(self, provider: str, error_type: str = "unknown"):
-        """Record failed call - may open circuit."""
-        self.failures[provider] += 1
-        self.last_failure[provider] = time.time()
-        
-        if self.failures[provider] >= self.failure_threshold:
-            self.circuit_open[provider] = time.time()
-            logger.warning(f"[CIRCUIT] {provider} OPEN after {self.failures[provider]} failures ({error_type})")
-    
-    def get_status(self) -> Dict[str, Any]:
-        """Get circuit breaker status for all providers."""
-        now = time.time()
-        status = {}
-        
-        for provider in set(list(self.failures.keys()) + list(self.circuit_open.keys())):
-            if provider in self.circuit_open:
-                time_remaining = max(0, self.reset_timeout - (now - self.circuit_open[provider]))
-                status[provider] = {
-                    "state": "open" if time_remaining > 0 else "half-open",
-                    "failures": self.failures[provider],
-                    "reset_in_seconds": round(time_remaining, 1)
-                }
-            else:
-                status[provider] = {
-                    "state": "closed",
-                    "failures": self.failures[provider]
-                }
-        
-        return status
+# Reduced timeouts for faster failover
+PROVIDER_TIMEOUTS = {
+    # Tier 1: Fast providers (5-10s)
+    "groq": 8,
+    "cerebras": 8,
+    "sambanova": 10,
+    "fireworks": 10,
+    
+    # Tier 2: Standard providers (10-15s)
+    "perplexity": 12,
+    "mistral": 12,
+    "openrouter": 12,
+    "together": 12,
+    "deepseek": 12,
+    
+    # Tier 3: Slower providers (15-20s)
+    "google": 15,
+    "openai": 15,
+    "anthropic": 15,
+    "xai": 15,
+    
+    # Search APIs (5-10s)
+    "tavily": 8,
+    "brave": 8,
+    "serper": 8,
+    "exa": 10,
+    "jina": 10,
+}
+
+# Default timeout for unknown providers
+DEFAULT_TIMEOUT = 12
+
+
+# Global circuit breaker: fail fast (trips at 50% errors over >= 2 calls in 60s),
+# recover fast (30s open, one half-open probe). See circuit_breaker.py.
+circuit_breaker = CircuitBreakerRegistry(
+    window_seconds=60,
+    error_rate_threshold=0.5,
+    min_requests=2,
+    recovery_timeout=30,
+    half_open_max_calls=1,
+    timeouts=PROVIDER_TIMEOUTS,
+    default_timeout=DEFAULT_TIMEOUT,
+    state_store=create_state_store(os.getenv("BREAKER_SHARED_STATE", "false").lower() == "true")
+)
 
+# Provider calls against each provider's known quota; probes only spend what calls leave
+provider_rate_limiter = ProviderRateLimiter()
 
-# Global circuit breaker
-circuit_breaker = CircuitBreaker()
+# Background prober - keeps a ready health snapshot and reports failures to circuit_breaker
+provider_prober = ProviderProber(circuit_breaker, interval=Config.PROBE_INTERVAL_SECONDS,
+                                 rate_limiter=provider_rate_limiter)
 
 
 # =============================================================================
@@ -1331,10 +1212,12 @@ class ClaimCache:
             entry, timestamp = self.cache[key]
             if time.time() - timestamp < self.ttl:
                 self.hits += 1
+                metrics.record_cache("claim", True)
                 return entry
             else:
                 del self.cache[key]
         self.misses += 1
+        metrics.record_cache("claim", False)
         return None
     
     def set(self, claim: str, tier: str, result: Dict):
@@ -1359,56 +1242,58 @@ class ClaimCache:
 
 claim_cache = ClaimCache()
 
+# Scrape-time metrics from live state
+metrics.registry.add_collector(metrics.collect_breakers(circuit_breaker), owner=__name__)
+metrics.registry.add_collector(metrics.collect_claim_cache(claim_cache), owner=__name__)
+
+# Outbound provider call scheduler (per-provider slots, interactive before batch, fair share by tenant)
+call_scheduler = ProviderScheduler(
+    default_concurrency=int(os.getenv("PROVIDER_CONCURRENCY", 4)),
+    concurrency=concurrency_from_limits(ProviderRateLimiter.LIMITS)
+)
+metrics.registry.add_collector(call_scheduler.collector(), owner=__name__)
+
+# Settled claims (our confident results + published fact-checks), checked before any provider call
+factcheck_kb = FactCheckKB(os.getenv("FACTCHECK_KB_PATH", ":memory:"))
+# PDF text extraction runs in worker processes; verified documents are cached by hash
+pdf_pool = PdfPool(workers=int(os.getenv("PDF_WORKERS", 2)))
+document_cache = ClaimCache(max_size=200, ttl=86400)
+
+# Main-content extraction of fetched pages runs in worker processes (bounded queue, timeout)
+article_pool = ArticlePool(workers=int(os.getenv("ARTICLE_WORKERS", 2)))
+ARTICLE_MAX_BYTES = 1024 * 1024
+
+# Images submitted as claims are analyzed in worker processes; repeats come from the hash index
+image_forensics = ImageForensics(workers=int(os.getenv("IMAGE_WORKERS", 2)),
+                                 index=ImageIndex(int(os.getenv("IMAGE_INDEX_SIZE", 20000))))
+
+# Cited references (URLs, DOIs, arXiv IDs) are fetched concurrently, at most
+# REFERENCE_HOST_LIMIT at a time per host; verification waits REFERENCE_DEADLINE
+# seconds for them and picks up late ones before the second pass
+reference_limiter = HostLimiter(int(os.getenv("REFERENCE_HOST_LIMIT", 2)))
+REFERENCE_DEADLINE = float(os.getenv("REFERENCE_DEADLINE", 4.0))
+
+KB_HINT_LOOPS = 4  # provider loops when the knowledge base has a close but not decisive match
+
 
 # =============================================================================
 # SOURCE CREDIBILITY DATABASE - ENHANCED
 # =============================================================================
 
-SOURCE_CREDIBILITY = {
-    # Tier 1: Gold Standard (0.95-1.0) - Primary sources, peer-reviewed
-    "reuters.com": 0.98, "apnews.com": 0.98, "bbc.com": 0.96, "bbc.co.uk": 0.96,
-    "nature.com": 0.99, "science.org": 0.99, "nejm.org": 0.99, "thelancet.com": 0.98,
-    "who.int": 0.97, "cdc.gov": 0.97, "nih.gov": 0.97, "fda.gov": 0.96,
-    "nasa.gov": 0.98, "noaa.gov": 0.97,
-    
-    # Tier 2: Highly Credible (0.85-0.94) - Major news, quality journalism
-    "nytimes.com": 0.91, "washingtonpost.com": 0.89, "theguardian.com": 0.88,
-    "npr.org": 0.93, "pbs.org": 0.93, "economist.com": 0.92,
-    "wsj.com": 0.90, "ft.com": 0.91, "bloomberg.com": 0.89,
-    
-    # Tier 3: Fact-Check Sites (0.92-0.96)
-    "snopes.com": 0.95, "factcheck.org": 0.96, "politifact.com": 0.94,
-    "fullfact.org": 0.94, "leadstories.com": 0.91, "apnews.com/APFactCheck": 0.96,
-    
-    # Tier 4: Academic & Reference (0.85-0.95)
-    "arxiv.org": 0.88, "scholar.google.com": 0.85, "pubmed.ncbi.nlm.nih.gov": 0.96,
-    "semanticscholar.org": 0.88, "jstor.org": 0.93, "britannica.com": 0.91,
-    "wikipedia.org": 0.78,  # Good for references, verify sources
-    
-    # Tier 5: Generally Credible with Bias (0.65-0.80)
-    "cnn.com": 0.76, "foxnews.com": 0.68, "msnbc.com": 0.72,
-    "usatoday.com": 0.78, "time.com": 0.82, "newsweek.com": 0.75,
-    
-    # Tier 6: Questionable (0.10-0.40) - Known for misinformation
-    "infowars.com": 0.08, "naturalnews.com": 0.12, "beforeitsnews.com": 0.10,
-    "zerohedge.com": 0.28, "rt.com": 0.32, "sputniknews.com": 0.30,
-    "thegatewaypundit.com": 0.15, "breitbart.com": 0.35,
-}
+# Credibility, authority tiers and bias by domain: bundled ratings plus any
+# lists named in DOMAIN_REPUTATION_FILES (see domain_reputation.py)
+domain_index = default_index()
+
 
 def score_source_credibility(url: str) -> float:
     """Score a source's credibility based on domain."""
-    if not url:
-        return 0.5
-    try:
-        domain = urlparse(url).netloc.replace("www.", "").lower()
-        if domain in SOURCE_CREDIBILITY:
-            return SOURCE_CREDIBILITY[domain]
-        for known_domain, score in SOURCE_CREDIBILITY.items():
-            if domain.endswith(known_domain):
-                return score
-    except Exception:
-        pass
-    return 0.5
+    return domain_index.credibility(url)
+
+
+def rate_sources(results: List[Dict], url_key: str = "url") -> List[Dict]:
+    """Source entries for search results, with every URL's credibility scored in one batch."""
+    credibilities = domain_index.credibilities([r.get(url_key) or "" for r in results])
+    return [{"url": r.get(url_key), "title": r.get("title"), "credibility": c} for r, c in zip(results, credibilities)]
 
 
 # =============================================================================
@@ -1423,8 +1308,31 @@ INJECTION_PATTERNS = [
 ]
 
 def detect_injection(claim: str) -> bool:
-    claim_lower = claim.lower()
-    return any(pattern in claim_lower for pattern in INJECTION_PATTERNS)
+    return bool(claim_analyzer.scan(claim).keywords("injection"))
+
+
+_YEAR_RE = re.compile(r'\b(19|20)\d{2}\b')
+
+# Every claim-text feature above, compiled once and extracted in one memoized scan
+claim_analyzer = ClaimAnalyzer(
+    families={
+        "absolute": NuanceDetector.ABSOLUTE_PATTERNS,
+        "comparative": NuanceDetector.COMPARATIVE_PATTERNS,
+        "inherent": NuanceDetector.INHERENTLY_NUANCED_PATTERNS,
+        "hedging": NuanceDetector.ACADEMIC_HEDGING_PATTERNS,
+        "balanced": NuanceDetector.BALANCED_CLAIM_PATTERNS,
+        "generalization": NuanceDetector.GENERALIZATION_PATTERNS,
+        "factual": NuanceDetector.FACTUAL_INDICATORS,
+        "known_false": NuanceDetector.FALSE_INDICATORS,
+        "time_sensitive": TemporalVerifier.TIME_SENSITIVE_KEYWORDS,
+        "historical": TemporalVerifier.HISTORICAL_KEYWORDS,
+        "timeless": TemporalVerifier.TIMELESS_KEYWORDS,
+    },
+    keyword_groups={
+        "nuanced_topics": NuanceDetector.NUANCED_TOPICS,
+        "injection": {"injection": INJECTION_PATTERNS},
+    }
+)
 
 def sanitize_claim(claim: str) -> str:
     claim = re.sub(r'\s+', ' ', claim.strip())
@@ -1485,6 +1393,25 @@ class AIProviders:
     - Fast failover with circuit breakers
     """
     
+    # Provider reliability weights (ConsensusCore™)
+    RELIABILITY_WEIGHTS = {
+        "perplexity": 1.4,  # Best for real-time verification
+        "google": 1.3,
+        "anthropic": 1.3,
+        "openai": 1.2,
+        "groq": 1.1,
+        "mistral": 1.1,
+        "deepseek": 1.0,
+        "fireworks": 1.0,
+        "openrouter": 1.0,
+        "together": 1.0,
+        "cerebras": 0.95,
+        "sambanova": 0.95,
+        "xai": 1.0,
+        "nvidia": 0.95,
+        "cloudflare": 0.9,
+    }
+    
     def __init__(self):
         self.http_client = None
         self.available_providers = []
@@ -1502,24 +1429,33 @@ class AIProviders:
             await self.http_client.aclose()
     
     async def _call_provider_with_timeout(self, provider: str, coro) -> Optional[Dict]:
-        """Call a provider with circuit breaker timeout."""
-        if circuit_breaker.is_open(provider):
+        """
+        Call a provider with circuit breaker admission and timeout. The timeout
+        covers the wait for a scheduler slot too, since a half-open probe
+        holds the breaker's only slot while it queues.
+        """
+        if not await circuit_breaker.acquire(provider):
+            coro.close()
+            metrics.record_provider_skipped(provider)
             logger.debug(f"[SKIP] {provider} circuit open")
             return None
         
+        provider_rate_limiter.record(provider)
         timeout = circuit_breaker.get_timeout(provider)
         try:
-            result = await asyncio.wait_for(coro, timeout=timeout)
-            if result and result.get("success"):
+            result = await asyncio.wait_for(call_scheduler.call(provider, coro), timeout=timeout)
+            if result is None:
+                circuit_breaker.release(provider)  # not configured: the call had no outcome
+            elif result.get("success"):
                 circuit_breaker.record_success(provider)
                 return result
-            elif result and result.get("status_code"):
-                circuit_breaker.record_failure(provider, f"status_{result['status_code']}")
+            else:
+                circuit_breaker.record_failure(provider, status_code=result.get("status_code", 0))
         except asyncio.TimeoutError:
-            circuit_breaker.record_failure(provider, "timeout")
+            circuit_breaker.record_failure(provider, error_type="timeout")
             logger.warning(f"[TIMEOUT] {provider} exceeded {timeout}s")
         except Exception as e:
-            circuit_breaker.record_failure(provider, str(type(e).__name__))
+            circuit_breaker.record_failure(provider, error_type=type(e).__name__)
             logger.error(f"[ERROR] {provider}: {e}")
         
         return None
@@ -1545,7 +1481,8 @@ class AIProviders:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget(),
+                    **response_format("groq")
                 },
                 timeout=circuit_breaker.get_timeout("groq")
             )
@@ -1574,7 +1511,8 @@ class AIProviders:
                     "messages": [
                         {"role": "system", "content": self._get_system_prompt()},
                         {"role": "user", "content": prompt}
-                    ]
+                    ],
+                    "max_tokens": self._output_budget()
                 },
                 timeout=circuit_breaker.get_timeout("perplexity")
             )
@@ -1599,7 +1537,8 @@ class AIProviders:
                 f"https://generativelanguage.googleapis.com/v1beta/models/{LATEST_MODELS['google']}:generateContent?key={Config.GOOGLE_AI_API_KEY}",
                 json={
                     "contents": [{"parts": [{"text": f"{self._get_system_prompt()}\n\n{prompt}"}]}],
-                    "generationConfig": {"temperature": 0.1, "maxOutputTokens": 600}
+                    "generationConfig": {"temperature": 0.1, "maxOutputTokens": self._output_budget(),
+                                         "responseMimeType": "application/json"}
                 },
                 timeout=circuit_breaker.get_timeout("google")
             )
@@ -1634,7 +1573,8 @@ class AIProviders:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget(),
+                    **response_format("openai")
                 },
                 timeout=circuit_breaker.get_timeout("openai")
             )
@@ -1664,7 +1604,7 @@ class AIProviders:
                 },
                 json={
                     "model": LATEST_MODELS["anthropic"],
-                    "max_tokens": 600,
+                    "max_tokens": self._output_budget(),
                     "messages": [{"role": "user", "content": f"{self._get_system_prompt()}\n\n{prompt}"}]
                 },
                 timeout=circuit_breaker.get_timeout("anthropic")
@@ -1696,7 +1636,8 @@ class AIProviders:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget(),
+                    **response_format("mistral")
                 },
                 timeout=circuit_breaker.get_timeout("mistral")
             )
@@ -1731,7 +1672,8 @@ class AIProviders:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget(),
+                    **response_format("cerebras")
                 },
                 timeout=circuit_breaker.get_timeout("cerebras")
             )
@@ -1761,7 +1703,8 @@ class AIProviders:
                         {"role": "system", "content": self._get_system_prompt()},
                         {"role": "user", "content": prompt}
                     ],
-                    "temperature": 0.1
+                    "temperature": 0.1,
+                    "max_tokens": self._output_budget()
                 },
                 timeout=circuit_breaker.get_timeout("sambanova")
             )
@@ -1792,7 +1735,8 @@ class AIProviders:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget(),
+                    **response_format("fireworks")
                 },
                 timeout=circuit_breaker.get_timeout("fireworks")
             )
@@ -1823,7 +1767,8 @@ class AIProviders:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget(),
+                    **response_format("deepseek")
                 },
                 timeout=circuit_breaker.get_timeout("deepseek")
             )
@@ -1861,7 +1806,8 @@ class AIProviders:
                         {"role": "system", "content": self._get_system_prompt()},
                         {"role": "user", "content": prompt}
                     ],
-                    "temperature": 0.1
+                    "temperature": 0.1,
+                    "max_tokens": self._output_budget()
                 },
                 timeout=circuit_breaker.get_timeout("openrouter")
             )
@@ -1892,7 +1838,8 @@ class AIProviders:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget(),
+                    **response_format("together")
                 },
                 timeout=circuit_breaker.get_timeout("together")
             )
@@ -1927,7 +1874,8 @@ class AIProviders:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget(),
+                    **response_format("xai")
                 },
                 timeout=circuit_breaker.get_timeout("xai")
             )
@@ -1958,7 +1906,7 @@ class AIProviders:
                         {"role": "user", "content": prompt}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget()
                 },
                 timeout=circuit_breaker.get_timeout("nvidia")
             )
@@ -1987,7 +1935,7 @@ class AIProviders:
                         {"role": "system", "content": self._get_system_prompt()},
                         {"role": "user", "content": prompt}
                     ],
-                    "max_tokens": 600
+                    "max_tokens": self._output_budget()
                 },
                 timeout=circuit_breaker.get_timeout("cloudflare")
             )
@@ -2027,7 +1975,7 @@ class AIProviders:
                 data = response.json()
                 answer = data.get("answer", "")
                 results = data.get("results", [])
-                sources = [{"url": r.get("url"), "title": r.get("title"), "credibility": score_source_credibility(r.get("url", ""))} for r in results[:5]]
+                sources = rate_sources(results[:5])
                 return {"provider": "tavily", "response": answer, "sources": sources, "success": True}
             return {"success": False, "status_code": response.status_code}
         except Exception as e:
@@ -2050,7 +1998,7 @@ class AIProviders:
                 data = response.json()
                 results = data.get("web", {}).get("results", [])
                 snippets = [r.get("description", "") for r in results[:3]]
-                sources = [{"url": r.get("url"), "title": r.get("title"), "credibility": score_source_credibility(r.get("url", ""))} for r in results[:5]]
+                sources = rate_sources(results[:5])
                 return {"provider": "brave", "response": " ".join(snippets), "sources": sources, "success": True}
             return {"success": False, "status_code": response.status_code}
         except Exception as e:
@@ -2073,7 +2021,7 @@ class AIProviders:
                 data = response.json()
                 results = data.get("organic", [])
                 snippets = [r.get("snippet", "") for r in results[:3]]
-                sources = [{"url": r.get("link"), "title": r.get("title"), "credibility": score_source_credibility(r.get("link", ""))} for r in results[:5]]
+                sources = rate_sources(results[:5], url_key="link")
                 return {"provider": "serper", "response": " ".join(snippets), "sources": sources, "success": True}
             return {"success": False, "status_code": response.status_code}
         except Exception as e:
@@ -2096,7 +2044,7 @@ class AIProviders:
                 data = response.json()
                 results = data.get("results", [])
                 snippets = [r.get("text", "")[:200] for r in results[:3]]
-                sources = [{"url": r.get("url"), "title": r.get("title"), "credibility": score_source_credibility(r.get("url", ""))} for r in results[:5]]
+                sources = rate_sources(results[:5])
                 return {"provider": "exa", "response": " ".join(snippets), "sources": sources, "success": True}
             return {"success": False, "status_code": response.status_code}
         except Exception as e:
@@ -2134,6 +2082,7 @@ class AIProviders:
                             "response": f"Existing fact-check found: {rating} (by {publisher})",
                             "sources": [{"url": url, "title": f"{publisher} Fact Check", "credibility": 0.95}],
                             "rating": rating,
+                            "claim_reviews": claims[:5],
                             "success": True
                         }
                 
@@ -2147,20 +2096,15 @@ class AIProviders:
         if not Config.JINA_API_KEY:
             return None
         
-        try:
-            response = await self.http_client.get(
-                f"https://s.jina.ai/{claim}",
-                headers={"Authorization": f"Bearer {Config.JINA_API_KEY}"},
-                timeout=circuit_breaker.get_timeout("jina")
-            )
-            
-            if response.status_code == 200:
-                content = response.text[:3000]
-                return {"provider": "jina", "response": content, "sources": [], "success": True}
-            return {"success": False, "status_code": response.status_code}
-        except Exception as e:
-            logger.error(f"Jina exception: {e}")
-            return {"success": False, "status_code": 0}
+        page = await fetch_text(
+            self.http_client, f"https://s.jina.ai/{claim}",
+            headers={"Authorization": f"Bearer {Config.JINA_API_KEY}"},
+            timeout=circuit_breaker.get_timeout("jina"), max_chars=3000, parse_html=False
+        )
+        if page["success"]:
+            return {"provider": "jina", "response": page["content"], "sources": [], "success": True}
+        logger.error(f"Jina search failed: {page['error']}")
+        return {"success": False, "status_code": page.get("status_code", 0)}
     
     # =========================================================================
     # PROMPT HELPERS
@@ -2184,11 +2128,11 @@ CRITICAL: Use "mixed" verdict when:
 3. Evidence supports BOTH the claim AND counter-evidence
 4. The topic inherently has multiple valid perspectives (health, economics, etc.)
 
-Format your response as:
-VERDICT: [verdict]
-CONFIDENCE: [0.0-1.0]
-EXPLANATION: [brief analysis]
-KEY EVIDENCE: [main supporting/refuting points]"""
+""" + FORMAT_INSTRUCTIONS
+    
+    def _output_budget(self) -> int:
+        """Output token budget for the current request's tier (see structured_output.OUTPUT_BUDGETS)."""
+        return output_budget(provider_scheduler.current_work().get("tier"))
     
     def _build_verification_prompt(self, claim: str, context: str = "") -> str:
         """Build verification prompt with optional context."""
@@ -2201,7 +2145,90 @@ KEY EVIDENCE: [main supporting/refuting points]"""
     # MAIN VERIFICATION WITH 12-15 LOOP MULTI-PASS VALIDATION
     # =========================================================================
     
+    def get_provider_functions(self) -> Dict[str, Any]:
+        """Map provider names to verification functions ``f(claim, context)``."""
+        return {
+            "groq": self.verify_with_groq,
+            "perplexity": self.verify_with_perplexity,
+            "google": self.verify_with_google,
+            "openai": self.verify_with_openai,
+            "anthropic": self.verify_with_anthropic,
+            "mistral": self.verify_with_mistral,
+            "cerebras": self.verify_with_cerebras,
+            "sambanova": self.verify_with_sambanova,
+            "fireworks": self.verify_with_fireworks,
+            "deepseek": self.verify_with_deepseek,
+            "openrouter": self.verify_with_openrouter,
+            "together": self.verify_with_together,
+            "xai": self.verify_with_xai,
+            "nvidia": self.verify_with_nvidia,
+            "cloudflare": self.verify_with_cloudflare,
+        }
+    
     async def verify_claim(self, claim: str, tier: str = "free") -> Dict:
+        """
+        Verify a claim (see _run_verification), tracking in-flight verifications.
+        A close, confident match in the fact-check knowledge base is returned
+        without calling providers; a weaker match runs a reduced provider plan.
+        Time-sensitive claims bypass the knowledge base. Images (data URLs or
+        base64) go to image forensics instead of the providers.
+        """
+        if ContentTypeDetector.detect_content_type(claim)["content_type"] == "image":
+            image = decode_image_input(claim)
+            if image:
+                return await self._image_result(image)
+        settled = not TemporalVerifier.analyze_temporal_context(claim)["is_time_sensitive"]
+        known = await factcheck_kb.lookup(claim) if settled else None
+        if known and known["answer"]:
+            logger.info(f"[KB] Answered from knowledge base ({known['origin']}, similarity {known['similarity']})")
+            return self._knowledge_base_result(known)
+        max_loops = KB_HINT_LOOPS if known else None
+        metrics.VERIFICATIONS_IN_FLIGHT.inc()
+        try:
+            result = await self._run_verification(claim, tier, max_loops=max_loops)
+        finally:
+            metrics.VERIFICATIONS_IN_FLIGHT.dec()
+        if settled:
+            await factcheck_kb.add_verification(claim, result)
+        return result
+    
+    @staticmethod
+    def _knowledge_base_result(known: Dict) -> Dict:
+        if known["origin"] == "claimreview":
+            explanation = f"Existing fact-check found: {known['rating']} (by {known['publisher']})."
+        else:
+            explanation = known["explanation"] or "Previously verified claim."
+        return {
+            "verdict": known["verdict"],
+            "confidence": round(known["confidence"] * known["similarity"], 3),
+            "explanation": explanation,
+            "providers_used": [],
+            "models_used": [],
+            "verification_loops": 0,
+            "knowledge_base": {k: known[k] for k in ("claim", "origin", "similarity", "publisher", "url", "rating")},
+            "sources": [{"url": known["url"], "title": f"{known['publisher']} Fact Check", "credibility": 0.95}]
+                       if known["url"] else [],
+        }
+    
+    @staticmethod
+    async def _image_result(image: bytes) -> Dict:
+        try:
+            report = await image_forensics.analyze(image)
+        except ImageError as e:
+            report = {"verdict": "not_analyzed", "score": None, "summary": str(e), "findings": []}
+        manipulated = report["verdict"] == "likely_manipulated"
+        return {
+            "verdict": "misleading" if manipulated else "unverifiable",
+            "confidence": round(1 - report["score"] / 100, 3) if manipulated else 0.5,
+            "explanation": "; ".join([report["summary"]] + [f["detail"] for f in report["findings"]]),
+            "providers_used": [],
+            "models_used": [],
+            "verification_loops": 0,
+            "image_forensics": report,
+            "sources": [],
+        }
+    
+    async def _run_verification(self, claim: str, tier: str = "free", max_loops: Optional[int] = None) -> Dict:
         """
         21-Point Verification System™ - Enhanced fact-checking.
         
@@ -2219,7 +2246,7 @@ KEY EVIDENCE: [main supporting/refuting points]"""
         
         # Tier-based loop configuration (increased from 4-7 to 12-15)
         tier_loops = {"free": 12, "pro": 14, "enterprise": 15}
-        max_loops = tier_loops.get(tier, 12)
+        max_loops = min(max_loops or tier_loops.get(tier, 12), tier_loops.get(tier, 12))
         
         logger.info(f"[VERIFY] 21-Point System - {tier} tier with {max_loops} loops")
         
@@ -2245,172 +2272,167 @@ KEY EVIDENCE: [main supporting/refuting points]"""
         # Point 1.2: Claim Classification (handled by content type)
         pillar_scores["claim_parsing"]["classification"] = 0.90
         
-        extracted_context = ""
+        evidence = EvidenceCollector(claim)
+        references = ReferenceBatch(reference_limiter)
         
-        if content_analysis["has_external_references"]:
-            logger.info(f"[CONTENT] Detected type: {content_analysis['content_type']}")
+        try:
+            if content_analysis["has_external_references"]:
+                logger.info(f"[CONTENT] Detected type: {content_analysis['content_type']}")
+                
+                # Fetch URL and research paper content concurrently
+                extractor = self.content_extractor
+                for url in content_analysis["urls"][:3]:
+                    references.add("url", url, urlparse(url).netloc,
+                                   lambda url=url: extractor.extract_url_content(url))
+                for doi in content_analysis["dois"][:2]:
+                    references.add("doi", doi, "api.semanticscholar.org",
+                                   lambda doi=doi: extractor.extract_research_paper(doi, "doi"))
+                for arxiv_id in content_analysis["arxiv_ids"][:2]:
+                    references.add("arxiv", arxiv_id, "export.arxiv.org",
+                                   lambda arxiv_id=arxiv_id: extractor.extract_research_paper(arxiv_id, "arxiv"))
+                
+                with metrics.phase_timer("extraction"):
+                    arrived = await references.wait(REFERENCE_DEADLINE)
+                self._add_reference_evidence(evidence, arrived)
+                if len(arrived) < len(references):
+                    logger.info(f"[CONTENT] {len(arrived)}/{len(references)} references by the deadline, rest continue")
             
-            # Extract URL content
-            for url in content_analysis["urls"][:3]:
-                url_content = await self.content_extractor.extract_url_content(url)
-                if url_content["success"]:
-                    extracted_context += f"\n\n[Content from {url}]:\n{url_content['content'][:2000]}"
+            # =====================================================================
+            # Point 1.3: NUANCE ANALYSIS (NuanceNet™)
+            # =====================================================================
+            nuance_analysis = NuanceDetector.analyze_claim(claim)
+            pillar_scores["claim_parsing"]["nuance"] = min(1.0, 0.7 + nuance_analysis['nuance_score'] * 0.3)
+            logger.info(f"[NUANCE] Score: {nuance_analysis['nuance_score']}, Topic: {nuance_analysis.get('nuanced_topic', 'general')}")
             
-            # Extract research paper content
-            for doi in content_analysis["dois"][:2]:
-                paper = await self.content_extractor.extract_research_paper(doi, "doi")
-                if paper.get("success"):
-                    extracted_context += f"\n\n[Research Paper]:\nTitle: {paper.get('title', '')}\nAbstract: {paper.get('abstract', '')}"
+            # =====================================================================
+            # PILLAR 2: TEMPORAL VERIFICATION (TemporalTruth™) - 3 Points
+            # =====================================================================
+            temporal_analysis = TemporalVerifier.analyze_temporal_context(claim)
+            pillar_scores["temporal"]["currency"] = temporal_analysis["score"]["currency"]
+            pillar_scores["temporal"]["freshness"] = temporal_analysis["score"]["freshness"]
+            pillar_scores["temporal"]["context"] = temporal_analysis["score"]["context"]
             
-            for arxiv_id in content_analysis["arxiv_ids"][:2]:
-                paper = await self.content_extractor.extract_research_paper(arxiv_id, "arxiv")
-                if paper.get("success"):
-                    extracted_context += f"\n\n[arXiv Paper]:\nTitle: {paper.get('title', '')}\nAbstract: {paper.get('abstract', '')}"
-        
-        # =====================================================================
-        # Point 1.3: NUANCE ANALYSIS (NuanceNet™)
-        # =====================================================================
-        nuance_analysis = NuanceDetector.analyze_claim(claim)
-        pillar_scores["claim_parsing"]["nuance"] = min(1.0, 0.7 + nuance_analysis['nuance_score'] * 0.3)
-        logger.info(f"[NUANCE] Score: {nuance_analysis['nuance_score']}, Topic: {nuance_analysis.get('nuanced_topic', 'general')}")
-        
-        # =====================================================================
-        # PILLAR 2: TEMPORAL VERIFICATION (TemporalTruth™) - 3 Points
-        # =====================================================================
-        temporal_analysis = TemporalVerifier.analyze_temporal_context(claim)
-        pillar_scores["temporal"]["currency"] = temporal_analysis["score"]["currency"]
-        pillar_scores["temporal"]["freshness"] = temporal_analysis["score"]["freshness"]
-        pillar_scores["temporal"]["context"] = temporal_analysis["score"]["context"]
-        
-        if temporal_analysis["is_time_sensitive"]:
-            logger.info(f"[TEMPORAL] Time-sensitive claim detected: {temporal_analysis['temporal_type']}")
-        
-        # =====================================================================
-        # PILLAR 4: EVIDENCE AGGREGATION - Point 4.1 & 4.2
-        # =====================================================================
-        search_results = []
-        search_tasks = []
-        search_providers = []
-        
-        search_functions = {
-            "tavily": self.search_with_tavily,
-            "brave": self.search_with_brave,
-            "serper": self.search_with_serper,
-            "exa": self.search_with_exa,
-            "google_factcheck": self.search_with_google_factcheck,
-            "jina": self.search_with_jina,
-        }
-        
-        available_search = get_available_search_apis()
-        for name in available_search:
-            if name in search_functions and not circuit_breaker.is_open(name):
-                search_tasks.append(search_functions[name](claim))
-                search_providers.append(name)
-        
-        if search_tasks:
-            logger.info(f"[SEARCH] Querying {len(search_tasks)} search APIs")
-            search_responses = await asyncio.gather(*search_tasks, return_exceptions=True)
-            for i, response in enumerate(search_responses):
-                if not isinstance(response, Exception) and response and response.get("success"):
-                    search_results.append(response)
-                    circuit_breaker.record_success(search_providers[i])
-                    logger.info(f"✓ Search: {search_providers[i]}")
-                elif isinstance(response, Exception):
-                    circuit_breaker.record_failure(search_providers[i], "exception")
-        
-        # Build search context for AI providers
-        search_context = extracted_context
-        for sr in search_results:
-            if sr.get("response"):
-                search_context += f"\n\n[{sr['provider']} evidence]: {sr['response'][:500]}"
-        
-        # =====================================================================
-        # PHASE 3: RUN ALL AI PROVIDERS (12-15 verification loops)
-        # =====================================================================
-        results = []
-        providers_used = []
-        
-        provider_functions = {
-            "groq": self.verify_with_groq,
-            "perplexity": self.verify_with_perplexity,
-            "google": self.verify_with_google,
-            "openai": self.verify_with_openai,
-            "anthropic": self.verify_with_anthropic,
-            "mistral": self.verify_with_mistral,
-            "cerebras": self.verify_with_cerebras,
-            "sambanova": self.verify_with_sambanova,
-            "fireworks": self.verify_with_fireworks,
-            "deepseek": self.verify_with_deepseek,
-            "openrouter": self.verify_with_openrouter,
-            "together": self.verify_with_together,
-            "xai": self.verify_with_xai,
-            "nvidia": self.verify_with_nvidia,
-            "cloudflare": self.verify_with_cloudflare,
-        }
-        
-        # Get healthy providers
-        healthy_providers = [
-            p for p in self.available_providers
-            if p in provider_functions and not circuit_breaker.is_open(p)
-        ]
-        
-        logger.info(f"[VERIFY] Running {len(healthy_providers)} AI providers")
-        
-        # Run all providers in parallel
-        ai_tasks = []
-        ai_providers = []
-        for provider in healthy_providers[:max_loops]:
-            ai_tasks.append(
-                self._call_provider_with_timeout(
-                    provider,
-                    provider_functions[provider](claim, search_context)
-                )
-            )
-            ai_providers.append(provider)
-        
-        if ai_tasks:
-            responses = await asyncio.gather(*ai_tasks, return_exceptions=True)
+            if temporal_analysis["is_time_sensitive"]:
+                logger.info(f"[TEMPORAL] Time-sensitive claim detected: {temporal_analysis['temporal_type']}")
             
-            for i, response in enumerate(responses):
-                provider = ai_providers[i]
-                if isinstance(response, Exception):
-                    logger.error(f"[FAIL] {provider}: {response}")
-                elif response and response.get("success"):
-                    results.append(response)
-                    providers_used.append(provider)
-                    logger.info(f"✓ {provider}")
-        
-        # =====================================================================
-        # PHASE 4: SECOND PASS - Fill remaining loops with different prompts
-        # =====================================================================
-        remaining_loops = max_loops - len(results)
-        if remaining_loops > 0 and healthy_providers:
-            logger.info(f"[VERIFY] Second pass: {remaining_loops} additional loops")
+            # =====================================================================
+            # PILLAR 4: EVIDENCE AGGREGATION - Point 4.1 & 4.2
+            # =====================================================================
+            search_results = []
+            search_tasks = []
+            search_providers = []
             
-            # Use different context for second pass
-            second_pass_context = f"IMPORTANT: Consider nuance carefully. {nuance_analysis['recommendation']}\n\n{search_context}"
+            search_functions = {
+                "tavily": self.search_with_tavily,
+                "brave": self.search_with_brave,
+                "serper": self.search_with_serper,
+                "exa": self.search_with_exa,
+                "google_factcheck": self.search_with_google_factcheck,
+                "jina": self.search_with_jina,
+            }
             
-            second_tasks = []
-            second_providers = []
+            available_search = get_available_search_apis()
+            for name in available_search:
+                if name in search_functions and not circuit_breaker.is_open(name):
+                    search_tasks.append(self._call_provider_with_timeout(name, search_functions[name](claim)))
+                    search_providers.append(name)
             
-            for provider in healthy_providers[:remaining_loops]:
-                if provider in provider_functions and not circuit_breaker.is_open(provider):
-                    second_tasks.append(
-                        self._call_provider_with_timeout(
-                            provider,
-                            provider_functions[provider](claim, second_pass_context)
-                        )
+            if search_tasks:
+                logger.info(f"[SEARCH] Querying {len(search_tasks)} search APIs")
+                with metrics.phase_timer("search"):
+                    search_responses = await asyncio.gather(*search_tasks, return_exceptions=True)
+                for i, response in enumerate(search_responses):
+                    if not isinstance(response, Exception) and response and response.get("success"):
+                        search_results.append(response)
+                        logger.info(f"✓ Search: {search_providers[i]}")
+            
+            # Rank, deduplicate and number the evidence once; each provider gets what fits its budget
+            for sr in search_results:
+                if sr.get("response"):
+                    evidence.add_search_result(sr)
+                for review in sr.get("claim_reviews", []):
+                    await factcheck_kb.add_claim_review(review)
+            packed_evidence = evidence.pack()
+            logger.info(f"[EVIDENCE] {len(packed_evidence)} of {len(evidence.passages)} passages after deduplication")
+            
+            # =====================================================================
+            # PHASE 3: RUN ALL AI PROVIDERS (12-15 verification loops)
+            # =====================================================================
+            results = []
+            providers_used = []
+            
+            provider_functions = self.get_provider_functions()
+            
+            # Get healthy providers
+            healthy_providers = [
+                p for p in self.available_providers
+                if p in provider_functions and not circuit_breaker.is_open(p)
+            ]
+            
+            logger.info(f"[VERIFY] Running {len(healthy_providers)} AI providers")
+            
+            # Run all providers in parallel
+            ai_tasks = []
+            ai_providers = []
+            for provider in healthy_providers[:max_loops]:
+                ai_tasks.append(
+                    self._call_provider_with_timeout(
+                        provider,
+                        provider_functions[provider](claim, packed_evidence.context_for(provider))
                     )
-                    second_providers.append(provider)
+                )
+                ai_providers.append(provider)
             
-            if second_tasks:
-                second_responses = await asyncio.gather(*second_tasks, return_exceptions=True)
+            if ai_tasks:
+                with metrics.phase_timer("ai_pass1"):
+                    responses = await asyncio.gather(*ai_tasks, return_exceptions=True)
                 
-                for i, response in enumerate(second_responses):
-                    if response and isinstance(response, dict) and response.get("success"):
+                for i, response in enumerate(responses):
+                    provider = ai_providers[i]
+                    if isinstance(response, Exception):
+                        logger.error(f"[FAIL] {provider}: {response}")
+                    elif response and response.get("success"):
                         results.append(response)
-                        providers_used.append(f"{second_providers[i]}_pass2")
-                        logger.info(f"✓ {second_providers[i]} (pass 2)")
+                        providers_used.append(provider)
+                        logger.info(f"✓ {provider}")
+            
+            # =====================================================================
+            # PHASE 4: SECOND PASS - Fill remaining loops with different prompts
+            # =====================================================================
+            remaining_loops = max_loops - len(results)
+            if remaining_loops > 0 and healthy_providers:
+                logger.info(f"[VERIFY] Second pass: {remaining_loops} additional loops")
+                
+                # Same packed evidence (plus references that arrived late), with a nuance preamble
+                late = references.collect()
+                if late and self._add_reference_evidence(evidence, late):
+                    packed_evidence = evidence.pack(after=packed_evidence)
+                second_pass_preamble = f"IMPORTANT: Consider nuance carefully. {nuance_analysis['recommendation']}\n\n"
+                
+                second_tasks = []
+                second_providers = []
+                
+                for provider in healthy_providers[:remaining_loops]:
+                    if provider in provider_functions and not circuit_breaker.is_open(provider):
+                        second_tasks.append(
+                            self._call_provider_with_timeout(
+                                provider,
+                                provider_functions[provider](claim, second_pass_preamble + packed_evidence.context_for(provider))
+                            )
+                        )
+                        second_providers.append(provider)
+                
+                if second_tasks:
+                    with metrics.phase_timer("ai_pass2"):
+                        second_responses = await asyncio.gather(*second_tasks, return_exceptions=True)
+                    
+                    for i, response in enumerate(second_responses):
+                        if response and isinstance(response, dict) and response.get("success"):
+                            results.append(response)
+                            providers_used.append(f"{second_providers[i]}_pass2")
+                            logger.info(f"✓ {second_providers[i]} (pass 2)")
+        finally:
+            references.cancel()  # late fetches still running, also when a pass fails
         
         # =====================================================================
         # PHASE 5: BUILD CONSENSUS WITH NUANCE CONSIDERATION
@@ -2425,19 +2447,47 @@ KEY EVIDENCE: [main supporting/refuting points]"""
                 "verification_loops": 0
             }
         
-        consensus_result = self._build_consensus_with_nuance(
-            claim, results, search_results, providers_used, 
-            nuance_analysis, max_loops, content_analysis,
-            pillar_scores, temporal_analysis
-        )
+        with metrics.phase_timer("consensus"):
+            consensus_result = self._build_consensus_with_nuance(
+                claim, results, search_results, providers_used, 
+                nuance_analysis, max_loops, content_analysis,
+                pillar_scores, temporal_analysis
+            )
         
         processing_time = time.time() - start_time
         consensus_result["processing_time_seconds"] = round(processing_time, 2)
+        if references:
+            consensus_result["reference_extraction"] = references.report()
         
         return consensus_result
     
+    @staticmethod
+    def _add_reference_evidence(evidence: EvidenceCollector, fetches) -> int:
+        """Add fetched references to the evidence; returns how many succeeded."""
+        added = 0
+        for fetch in fetches:
+            if not fetch.ok:
+                continue
+            added += 1
+            content = fetch.result
+            if fetch.kind == "url":
+                evidence.add_text(f"Content from {fetch.ref}", content["content"], score_source_credibility(fetch.ref))
+            elif fetch.kind == "doi":
+                evidence.add_document("Research Paper", f"Title: {content.get('title', '')}. Abstract: {content.get('abstract', '')}", 0.9)
+            else:
+                evidence.add_document("arXiv Paper", f"Title: {content.get('title', '')}. Abstract: {content.get('abstract', '')}",
+                                      score_source_credibility("arxiv.org"))
+        return added
+    
+    def _read_verdict(self, result: Dict) -> Optional[Dict]:
+        """Structured verdict of a provider reply (parsed once per result), or None for free text."""
+        if "structured" not in result:
+            provider = result.get("provider", "unknown").replace("_pass2", "")
+            result["structured"] = read_reply(provider, result.get("response", ""))
+        return result["structured"]
+    
     def _extract_verdict_from_response(self, response_text: str) -> Tuple[str, float]:
-        """Extract standardized verdict and confidence from response text."""
+        """Fallback for replies that are not structured JSON: standardized verdict and confidence from free text."""
         response_lower = response_text.lower()
         
         # Try to extract explicit verdict
@@ -2509,37 +2559,23 @@ KEY EVIDENCE: [main supporting/refuting points]"""
                 "synthesis": {}
             }
         
-        # Provider reliability weights (ConsensusCore™)
-        reliability_weights = {
-            "perplexity": 1.4,  # Best for real-time verification
-            "google": 1.3,
-            "anthropic": 1.3,
-            "openai": 1.2,
-            "groq": 1.1,
-            "mistral": 1.1,
-            "deepseek": 1.0,
-            "fireworks": 1.0,
-            "openrouter": 1.0,
-            "together": 1.0,
-            "cerebras": 0.95,
-            "sambanova": 0.95,
-            "xai": 1.0,
-            "nvidia": 0.95,
-            "cloudflare": 0.9,
-        }
         
         # Extract verdicts from all results
         verdict_data = []
         for result in results:
             provider = result.get("provider", "unknown")
-            response_text = result.get("response", "")
-            verdict, conf = self._extract_verdict_from_response(response_text)
-            weight = reliability_weights.get(provider.replace("_pass2", ""), 0.8)
+            structured = self._read_verdict(result)
+            if structured:
+                verdict, conf = structured["verdict"], structured["confidence"]
+            else:
+                verdict, conf = self._extract_verdict_from_response(result.get("response", ""))
+            weight = self.RELIABILITY_WEIGHTS.get(provider.replace("_pass2", ""), 0.8)
             verdict_data.append({
                 "provider": provider,
                 "verdict": verdict,
                 "confidence": conf,
-                "weight": weight
+                "weight": weight,
+                "cited_evidence": structured["evidence"] if structured else []
             })
         
         # Calculate weighted verdict scores
@@ -2663,7 +2699,8 @@ KEY EVIDENCE: [main supporting/refuting points]"""
         # BUILD EXPLANATION
         # =====================================================================
         primary = results[0] if results else {}
-        primary_explanation = primary.get("response", "")
+        primary_structured = self._read_verdict(primary) if primary else None
+        primary_explanation = primary_structured["rationale"] if primary_structured else primary.get("response", "")
         
         # Truncate explanation if too long
         if len(primary_explanation) > 1500:
@@ -2732,6 +2769,8 @@ class ClaimRequest(BaseModel):
     claim: str = Field(..., min_length=5, max_length=10000)
     detailed: bool = Field(False)
     tier: str = Field("free", description="Pricing tier: free, pro, enterprise")
+    include_timings: bool = Field(False, description="Include a per-span timing breakdown in the response")
+    decompose: bool = Field(False, description="Verify (and cache) each check-worthy sub-claim separately")
     
     @field_validator('claim')
     @classmethod
@@ -2747,9 +2786,23 @@ class ClaimRequest(BaseModel):
         return v.lower()
 
 
+class DocumentRequest(BaseModel):
+    url: Optional[str] = Field(None, description="Link to a PDF document")
+    tier: str = Field("free", description="Pricing tier: free, pro, enterprise")
+    
+    @field_validator('tier')
+    @classmethod
+    def validate_tier(cls, v):
+        valid_tiers = ["free", "pro", "enterprise"]
+        if v.lower() not in valid_tiers:
+            return "free"
+        return v.lower()
+
+
 class BatchRequest(BaseModel):
     claims: List[str] = Field(..., min_length=1, max_length=50)
-    tier: str = Field("enterprise")
+    tier: Optional[str] = Field(None)  # may only lower the caller's tier (see request_tier)
+    dedup: bool = Field(True)  # verify duplicate/near-duplicate claims once
 
 
 # =============================================================================
@@ -2758,11 +2811,15 @@ class BatchRequest(BaseModel):
 
 security = HTTPBearer(auto_error=False)
 
+def request_api_key(request: Request) -> str:
+    return request.headers.get("X-API-Key") or request.headers.get("Authorization", "").replace("Bearer ", "")
+
+
 async def verify_api_key(request: Request, credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not Config.REQUIRE_API_KEY:
         return True
     
-    api_key = request.headers.get("X-API-Key") or request.headers.get("Authorization", "").replace("Bearer ", "")
+    api_key = request_api_key(request)
     
     if not api_key:
         raise HTTPException(status_code=401, detail="API key required")
@@ -2784,7 +2841,31 @@ async def lifespan(app: FastAPI):
     search_apis = get_available_search_apis()
     logger.info(f"[PROVIDERS] {len(providers)} AI providers: {providers}")
     logger.info(f"[SEARCH] {len(search_apis)} search APIs: {search_apis}")
+    breaker_sync = None
+    if circuit_breaker.state_store.shared:
+        breaker_sync = asyncio.create_task(circuit_breaker.run_sync_loop(providers + search_apis))
+    if os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true":
+        loop_monitor.register_routes(app)
+        loop_monitor.start()
+    trace_export = asyncio.create_task(tracing.tracer.run_export_loop()) if tracing.tracer.exporting else None
+    probe_client = None
+    if Config.PROBE_ENABLED and providers:
+        probe_client = httpx.AsyncClient(timeout=15)
+        provider_prober.start(build_model_list_probes(probe_client, providers), models=LATEST_MODELS)
     yield
+    batch_engine.shutdown()
+    pdf_pool.shutdown()
+    article_pool.shutdown()
+    image_forensics.shutdown()
+    factcheck_kb.close()
+    provider_prober.stop()
+    loop_monitor.stop()
+    if trace_export:
+        trace_export.cancel()
+    if probe_client:
+        await probe_client.aclose()
+    if breaker_sync:
+        breaker_sync.cancel()
     logger.info("[STOP] Shutting down")
 
 app = FastAPI(
@@ -2809,38 +2890,73 @@ app.add_middleware(
 # MIDDLEWARE
 # =============================================================================
 
-@app.middleware("http")
-async def rate_limit_middleware(request: Request, call_next):
-    client_ip = request.client.host if request.client else "unknown"
-    api_key = request.headers.get("X-API-Key", "")
-    identifier = api_key if api_key else client_ip
-    
-    if request.url.path in ["/health", "/", "/docs", "/openapi.json"]:
-        return await call_next(request)
-    
-    allowed, rate_info = rate_limiter.is_allowed(identifier)
-    
-    if not allowed:
-        return JSONResponse(
-            status_code=429,
-            content={"error": "Rate limit exceeded", "retry_after": rate_info["reset"]},
-            headers={
-                "X-RateLimit-Limit": str(rate_info["limit"]),
-                "X-RateLimit-Remaining": "0",
-                "Retry-After": str(rate_info["reset"])
-            }
-        )
+class RateLimitMiddleware:
+    """
+    Per-client rate limit (API key, else client IP) as pure ASGI middleware,
+    so request bodies and streamed responses pass through untouched.
+    """
     
-    response = await call_next(request)
-    response.headers["X-RateLimit-Limit"] = str(rate_info["limit"])
-    response.headers["X-RateLimit-Remaining"] = str(rate_info["remaining"])
-    return response
+    EXEMPT_PATHS = ("/health", "/", "/docs", "/openapi.json", "/metrics")
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        client_ip = request.client.host if request.client else "unknown"
+        api_key = request.headers.get("X-API-Key", "")
+        identifier = api_key if api_key else client_ip
+        # Outbound provider calls made for this request are scheduled as this tenant's interactive work
+        provider_scheduler.begin_work(tenant=identifier)
+        
+        if scope["path"] in self.EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        allowed, rate_info = rate_limiter.is_allowed(identifier)
+        
+        if not allowed:
+            metrics.record_rate_limited("api")
+            response = JSONResponse(
+                status_code=429,
+                content={"error": "Rate limit exceeded", "retry_after": rate_info["reset"]},
+                headers={
+                    "X-RateLimit-Limit": str(rate_info["limit"]),
+                    "X-RateLimit-Remaining": "0",
+                    "Retry-After": str(rate_info["reset"])
+                }
+            )
+            await response(scope, receive, send)
+            return
+        
+        async def send_with_limits(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(rate_info["limit"])
+                headers["X-RateLimit-Remaining"] = str(rate_info["remaining"])
+            await send(message)
+        
+        await self.app(scope, receive, send_with_limits)
+
+
+app.add_middleware(RateLimitMiddleware)
+# Outermost: request latency/count per route template and tier
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 # =============================================================================
 # ROUTES
 # =============================================================================
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics: request/phase/provider latency, cache, rate limits, breakers."""
+    return PlainTextResponse(metrics.registry.render(owner=__name__), media_type=metrics.CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 async def root():
     return {
@@ -2861,7 +2977,8 @@ async def root():
             "/v3/batch-verify": "POST - Batch verification",
             "/health": "GET - Health check",
             "/providers": "GET - List providers",
-            "/stats": "GET - API statistics"
+            "/stats": "GET - API statistics",
+            "/metrics": "GET - Prometheus metrics"
         }
     }
 
@@ -2903,7 +3020,8 @@ async def list_providers():
             "model": LATEST_MODELS.get(p, "unknown"),
             "state": status.get("state", "closed"),
             "failures": status.get("failures", 0),
-            "timeout_seconds": circuit_breaker.get_timeout(p)
+            "timeout_seconds": circuit_breaker.get_timeout(p),
+            "probe": provider_prober.provider_summary(p)
         })
     
     return {
@@ -2921,7 +3039,8 @@ async def get_stats():
         "circuit_breaker": circuit_breaker.get_status(),
         "available_providers": get_available_providers(),
         "available_search_apis": get_available_search_apis(),
-        "source_credibility_domains": len(SOURCE_CREDIBILITY),
+        "source_credibility_domains": domain_index.size,
+        "factcheck_kb_claims": len(factcheck_kb),
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -2938,6 +3057,15 @@ async def verify_claim_endpoint(request: ClaimRequest):
     - Source credibility weighting
     - Multi-pass consensus building
     """
+    with tracing.start_trace("verify", record=request.include_timings, tier=request.tier) as root:
+        response = await _verify_claim(request)
+        if request.include_timings:
+            response["timings"] = root.timings()
+        return response
+
+
+async def _verify_claim(request: ClaimRequest) -> Dict:
+    """Body of /verify; runs inside the request's root trace span."""
     start_time = time.time()
     request_id = f"ver_{int(time.time())}_{secrets.randbelow(10000)}"
     
@@ -2949,9 +3077,18 @@ async def verify_claim_endpoint(request: ClaimRequest):
         logger.warning(f"[{request_id}] Potential injection detected")
     
     logger.info(f"[{request_id}] Verifying ({request.tier} tier): {claim[:80]}...")
+    metrics.tag_request(tier=request.tier)
+    provider_scheduler.tag_work(tier=request.tier)
+    
+    if request.decompose:
+        subclaims = find_subclaims(claim)
+        if len(subclaims) > 1:
+            return await _verify_decomposed(request_id, claim, subclaims, request.tier, start_time)
     
     # Check cache
-    cached_result = claim_cache.get(claim, request.tier)
+    with tracing.span("cache.lookup", layer="claim") as cache_span:
+        cached_result = claim_cache.get(claim, request.tier)
+        cache_span.set_outcome("hit" if cached_result else "miss")
     if cached_result:
         processing_time = time.time() - start_time
         return {
@@ -2992,145 +3129,278 @@ async def verify_claim_endpoint(request: ClaimRequest):
     }
 
 
+async def _verify_decomposed(request_id: str, claim: str, subclaims: List[str], tier: str, start_time: float) -> Dict:
+    """
+    /verify with decompose=true: the first ``Config.MAX_SUBCLAIMS`` sub-claims
+    are verified in parallel, each through the claim cache.
+    """
+    checked = subclaims[:Config.MAX_SUBCLAIMS]
+    logger.info(f"[{request_id}] Decomposed into {len(subclaims)} sub-claims, checking {len(checked)}")
+    with tracing.span("decompose", subclaims=len(checked)):
+        async with AIProviders() as providers:
+            entries = await verify_subclaims(providers, checked, tier, cache=claim_cache,
+                                             concurrency=Config.SUBCLAIM_CONCURRENCY)
+    summary = summarize(entries, total=len(subclaims))
+    processing_time = time.time() - start_time
+    return {
+        "id": request_id,
+        "claim": claim,
+        **summary,
+        "tier": tier,
+        "cached": summary["subclaims_cached"] == len(entries),
+        "timestamp": datetime.utcnow().isoformat(),
+        "processing_time_ms": round(processing_time * 1000, 2)
+    }
+
+
 @app.post("/v3/verify")
 async def verify_claim_v3(request: ClaimRequest):
     """V3 API: Verify a claim."""
     return await verify_claim_endpoint(request)
 
 
-@app.post("/v3/batch-verify")
-async def batch_verify(request: BatchRequest):
+@app.post("/v3/verify-document")
+async def verify_document(request: Request, tier: str = "free"):
     """
-    Verify up to 50 claims in parallel.
+    Verify a PDF document: send it as the request body (Content-Type:
+    application/pdf, tier as a query parameter) or send JSON
+    {"url": ..., "tier": ...}. Text is extracted page by page in worker
+    processes, split into check-worthy claims and verified claim by claim.
+    Results are cached by document hash.
     """
+    if request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            document_request = DocumentRequest.model_validate(await request.json())
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        if not document_request.url:
+            raise HTTPException(status_code=422, detail="url is required")
+        async with httpx.AsyncClient() as client:
+            try:
+                data = await fetch_pdf(client, document_request.url, max_bytes=pdf_pool.max_bytes)
+            except PdfError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+    else:
+        document_request = DocumentRequest(tier=tier)
+        chunks, size = [], 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > pdf_pool.max_bytes:
+                raise HTTPException(status_code=413, detail=f"Document exceeds {pdf_pool.max_bytes} bytes")
+            chunks.append(chunk)
+        data = b"".join(chunks)
+    with tracing.start_trace("verify_document", tier=document_request.tier):
+        return await _verify_document(data, document_request.tier)
+
+
+async def _verify_document(data: bytes, tier: str) -> Dict:
     start_time = time.time()
-    job_id = f"batch_{int(time.time())}_{secrets.randbelow(10000)}"
+    request_id = f"doc_{int(time.time())}_{secrets.randbelow(10000)}"
+    metrics.tag_request(tier=tier)
+    provider_scheduler.tag_work(tier=tier)
     
-    logger.info(f"[{job_id}] Batch verification: {len(request.claims)} claims")
-    
-    results = []
-    
-    async with AIProviders() as providers:
-        batch_size = 5
-        
-        for i in range(0, len(request.claims), batch_size):
-            batch = request.claims[i:i + batch_size]
-            sanitized_batch = [sanitize_claim(c) for c in batch]
-            
-            tasks = []
-            for claim in sanitized_batch:
-                cached = claim_cache.get(claim, request.tier)
-                if cached:
-                    results.append({
-                        "claim": claim,
-                        "result": cached,
-                        "cached": True
-                    })
-                else:
-                    tasks.append((claim, providers.verify_claim(claim, tier=request.tier)))
-            
-            if tasks:
-                task_results = await asyncio.gather(*[t[1] for t in tasks], return_exceptions=True)
-                
-                for j, (claim, _) in enumerate(tasks):
-                    response = task_results[j]
-                    if isinstance(response, Exception):
-                        results.append({
-                            "claim": claim,
-                            "result": {"verdict": "error", "confidence": 0, "explanation": str(response)},
-                            "cached": False
-                        })
-                    else:
-                        claim_cache.set(claim, request.tier, response)
-                        results.append({
-                            "claim": claim,
-                            "result": response,
-                            "cached": False
-                        })
-    
-    processing_time = time.time() - start_time
+    digest = document_hash(data)
+    cached_result = document_cache.get(digest, tier)
+    if cached_result:
+        return {"id": request_id, **cached_result, "tier": tier, "cached": True,
+                "timestamp": datetime.utcnow().isoformat(),
+                "processing_time_ms": round((time.time() - start_time) * 1000, 2)}
     
-    # Summary
-    verdicts = {}
-    for r in results:
-        v = r["result"].get("verdict", "unknown")
-        verdicts[v] = verdicts.get(v, 0) + 1
+    with tracing.span("document.extract", bytes=len(data)) as extract_span:
+        try:
+            document = await pdf_pool.extract(data)
+        except PdfError as e:
+            extract_span.set_outcome("failed", ok=False)
+            raise HTTPException(status_code=422, detail=str(e))
+    found = find_subclaims(document["text"])
+    claims = found[:Config.MAX_DOCUMENT_CLAIMS]
+    logger.info(f"[{request_id}] PDF {digest[:12]}: {document['page_count']} pages, "
+                f"{len(found)} claims, checking {len(claims)}")
+    
+    if claims:
+        with tracing.span("decompose", subclaims=len(claims)):
+            async with AIProviders() as providers:
+                entries = await verify_subclaims(providers, claims, tier, cache=claim_cache,
+                                                 concurrency=Config.SUBCLAIM_CONCURRENCY)
+        summary = summarize(entries, total=len(found))
+    else:
+        summary = {"verdict": "unverifiable", "confidence": 0.5, "subclaims": [], "sources": [], "providers_used": [],
+                   "explanation": "No check-worthy claims found in the document text.", "subclaims_cached": 0,
+                   "subclaims_total": 0, "subclaims_truncated": False}
+    result = {
+        "document": {
+            "sha256": digest,
+            "pages": document["page_count"],
+            "characters": len(document["text"]),
+            "truncated": document["truncated"],
+            "extractor": document["engine"],
+        },
+        **summary,
+    }
+    document_cache.set(digest, tier, result)
+    return {"id": request_id, **result, "tier": tier, "cached": False,
+            "timestamp": datetime.utcnow().isoformat(),
+            "processing_time_ms": round((time.time() - start_time) * 1000, 2)}
+
+
+# Background engine for batch routes: constant in-flight claims, no chunk barriers
+batch_engine = BatchJobEngine(
+    session_factory=lambda: AIProviders(),
+    cache=claim_cache,
+    concurrency=Config.BATCH_CONCURRENCY,
+    max_active_jobs=int(os.getenv("BATCH_MAX_ACTIVE_JOBS", 10)),
+    ttl=int(os.getenv("BATCH_JOB_TTL", 3600)),
+    store=create_job_store(os.getenv("BATCH_JOB_STORE", "memory"))
+)
+
+
+VERIFICATION_TIERS = ("free", "pro", "enterprise")
+
+
+def request_tier(http_request: Request, requested: Optional[str]) -> str:
+    """Enterprise for issued API keys, free otherwise; ``requested`` may only lower it."""
+    entitled = "enterprise" if request_api_key(http_request) in Config.API_KEYS else "free"
+    requested = (requested or "").lower()
+    if requested in VERIFICATION_TIERS and VERIFICATION_TIERS.index(requested) < VERIFICATION_TIERS.index(entitled):
+        entitled = requested
+    return entitled
+
+
+def _submit_batch(request: BatchRequest, tier: str):
+    try:
+        return batch_engine.submit([sanitize_claim(c) for c in request.claims], tier=tier,
+                                   options={"dedup": request.dedup})
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.post("/v3/batch-verify")
+async def batch_verify(request: BatchRequest, http_request: Request):
+    """
+    Verify up to 50 claims in parallel (waits for the batch; see /v3/jobs for async).
+    Issued API keys get the enterprise tier, anyone else free; `tier` may only lower it.
+    """
+    tier = request_tier(http_request, request.tier)
+    metrics.tag_request(tier=tier)
+    job = _submit_batch(request, tier)
+    await job.wait()
+    return job.summary()
+
+
+@app.post("/v3/bulk-verify")
+async def bulk_verify(request: Request, tier: Optional[str] = None):
+    """
+    Stream-verify any number of claims.
+    
+    Requires an issued API key; claims are verified at the enterprise tier
+    (`tier` may only lower it).
+    Request body: NDJSON, one claim per line ({"claim": "..."} or a JSON string).
+    Response: NDJSON, one line per input line in completion order with its
+    input `index` (duplicates carry `duplicate_of`), then a `summary` line.
+    The body is read only as fast as claims are verified.
+    """
+    api_key = request_api_key(request)
+    if not api_key:
+        raise HTTPException(status_code=401, detail="API key required")
+    if api_key not in Config.API_KEYS:
+        raise HTTPException(status_code=403, detail="Invalid API key")
+    entitled = request_tier(request, tier)
+    metrics.tag_request(tier=entitled)
     
+    return NDJSONStream(
+        lambda body: batch_engine.stream_ndjson(body, tier=entitled, concurrency=Config.BATCH_CONCURRENCY,
+                                                prepare=sanitize_claim),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/v3/jobs", status_code=202)
+async def create_batch_job(request: BatchRequest, http_request: Request):
+    """Start an async batch job and return its job_id immediately (tier as for /v3/batch-verify)."""
+    tier = request_tier(http_request, request.tier)
+    metrics.tag_request(tier=tier)
+    job = _submit_batch(request, tier)
     return {
-        "job_id": job_id,
-        "total_claims": len(request.claims),
-        "successful": sum(1 for r in results if r["result"].get("verdict") != "error"),
-        "cached": sum(1 for r in results if r.get("cached")),
-        "tier": request.tier,
-        "verdict_summary": verdicts,
-        "results": results,
-        "processing_time_ms": round(processing_time * 1000, 2),
-        "timestamp": datetime.utcnow().isoformat()
+        "job_id": job.job_id,
+        "status": job.status,
+        "total_claims": job.total,
+        "status_url": f"/v3/jobs/{job.job_id}",
+        "results_url": f"/v3/jobs/{job.job_id}/results",
+        "events_url": f"/v3/jobs/{job.job_id}/events"
     }
 
 
+@app.get("/v3/jobs/{job_id}")
+async def get_batch_job(job_id: str, include_results: bool = False):
+    job = batch_engine.get(job_id)
+    if job:
+        return job.summary(include_results=include_results)
+    record = await batch_engine.get_record(job_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if not include_results:
+        record.pop("results", None)
+    record.pop("completion_order", None)
+    return record
+
+
+@app.get("/v3/jobs/{job_id}/results")
+async def get_batch_job_results(job_id: str, after: int = 0, limit: int = 100):
+    """Results completed after the `after` cursor, in completion order."""
+    job = batch_engine.get(job_id)
+    if job is None:
+        record = await batch_engine.get_record(job_id)
+        if not record:
+            raise HTTPException(status_code=404, detail="Job not found or expired")
+        by_index = {r["index"]: r for r in record.get("results", [])}
+        order = record.get("completion_order", [])[after:after + limit]
+        results = [{"seq": after + i + 1, **by_index[idx]} for i, idx in enumerate(order) if idx in by_index]
+        return {"job_id": job_id, "status": record["status"], "results": results,
+                "next_cursor": after + len(order), "progress": record["progress"]}
+    results, cursor = job.results_after(after, min(max(limit, 1), 500))
+    return {"job_id": job_id, "status": job.status, "results": results,
+            "next_cursor": cursor, "progress": job.progress()}
+
+
+@app.get("/v3/jobs/{job_id}/events")
+async def stream_batch_job(job_id: str):
+    """Server-Sent Events: progress, result (one per claim) and done."""
+    job = batch_engine.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found on this worker or expired")
+    
+    async def event_stream():
+        async for event, data in batch_engine.events(job):
+            yield format_sse(event, data)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.delete("/v3/jobs/{job_id}")
+async def cancel_batch_job(job_id: str):
+    if batch_engine.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return {"job_id": job_id, "cancelled": batch_engine.cancel(job_id)}
+
+
+@app.get("/debug/loop")
+async def debug_event_loop(stacks: bool = True, top: int = 10):
+    """Event-loop lag and the top blocking offenders (DEBUG mode only)."""
+    if not Config.DEBUG:
+        raise HTTPException(status_code=403, detail="Debug endpoints are only available in DEBUG mode")
+    return loop_monitor.snapshot(include_stacks=stacks, top=max(1, min(top, 50)))
+
+
 @app.get("/health/deep")
 async def deep_health_check():
-    """Comprehensive health check testing all providers."""
+    """Comprehensive provider health, served from the background prober's latest snapshot."""
     start_time = time.time()
-    test_claim = "Water is composed of hydrogen and oxygen"
-    
-    results = {}
-    
-    async with AIProviders() as providers:
-        provider_functions = {
-            "groq": providers.verify_with_groq,
-            "perplexity": providers.verify_with_perplexity,
-            "google": providers.verify_with_google,
-            "mistral": providers.verify_with_mistral,
-            "cerebras": providers.verify_with_cerebras,
-            "sambanova": providers.verify_with_sambanova,
-            "fireworks": providers.verify_with_fireworks,
-            "openrouter": providers.verify_with_openrouter,
-        }
-        
-        tasks = []
-        provider_names = []
-        
-        for name in providers.available_providers:
-            if name in provider_functions:
-                tasks.append(provider_functions[name](test_claim, ""))
-                provider_names.append(name)
-        
-        if tasks:
-            start_checks = time.time()
-            responses = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for i, response in enumerate(responses):
-                name = provider_names[i]
-                latency = (time.time() - start_checks) * 1000
-                
-                if isinstance(response, Exception):
-                    results[name] = {"status": "error", "error": str(response)[:100], "latency_ms": round(latency, 2)}
-                elif response and response.get("success"):
-                    results[name] = {"status": "healthy", "model": response.get("model", "unknown"), "latency_ms": round(latency, 2)}
-                else:
-                    results[name] = {"status": "degraded", "latency_ms": round(latency, 2)}
-    
-    healthy_count = sum(1 for r in results.values() if r.get("status") == "healthy")
-    total_count = len(results)
-    
-    if healthy_count >= total_count * 0.7:
-        overall = "healthy"
-    elif healthy_count >= total_count * 0.3:
-        overall = "degraded"
-    else:
-        overall = "critical"
-    
     return {
-        "overall_status": overall,
-        "healthy_providers": healthy_count,
-        "total_providers": total_count,
-        "health_percentage": round(healthy_count / total_count * 100, 1) if total_count > 0 else 0,
-        "providers": results,
+        **provider_prober.snapshot(),
         "cache_stats": claim_cache.get_stats(),
         "circuit_breaker_status": circuit_breaker.get_status(),
-        "check_time_ms": round((time.time() - start_time) * 1000, 2),
+        "check_time_ms": round((time.time() - start_time) * 1000, 3),
         "timestamp": datetime.utcnow().isoformat()
     }
 
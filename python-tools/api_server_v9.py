@@ -14,6 +14,7 @@ Features:
 
 import os
 import sys
+import re
 import time
 import json
 import asyncio
@@ -27,14 +28,32 @@ from contextlib import asynccontextmanager
 
 import httpx
 import uvicorn
-from fastapi import FastAPI, HTTPException, Request, Depends, Header, status
+from fastapi import FastAPI, HTTPException, Request, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.datastructures import MutableHeaders
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, Field, field_validator
 from dotenv import load_dotenv
 from pathlib import Path
 
+from circuit_breaker import CircuitBreakerRegistry, CircuitState, create_state_store
+from provider_prober import ProviderProber, build_model_list_probes
+import prometheus_metrics as metrics
+import tracing
+from loop_monitor import loop_monitor
+from batch_jobs import BatchJobEngine, NDJSONStream, create_job_store, format_sse
+import provider_scheduler
+from provider_scheduler import ProviderRateLimiter, ProviderScheduler, concurrency_from_limits
+from claim_packing import plan_packs, pack_limits, build_packed_prompt, parse_packed_response
+from claim_analysis import ClaimAnalyzer
+from structured_output import EXTENDED_VERDICTS, FORMAT_INSTRUCTIONS, output_budget, read_reply, response_format
+from domain_reputation import default_index
+from auth_cache import AuthBusy, ApiKeyCache, PasswordHasher, TokenCache, create_shared_key_cache, hash_api_key
+from user_store import create_user_store
+from stripe_events import StripeEventProcessor, StripeEventQueue
+from image_forensics import ImageError, ImageForensics, ImageIndex, decode_image_input, fetch_image
+
 # Load .env from the script's directory, not the working directory
 _script_dir = Path(__file__).parent
 load_dotenv(_script_dir / ".env")
@@ -135,6 +154,45 @@ class Config:
     # Rate limit for simulate key (requests per minute)
     SIMULATE_KEY_RATE_LIMIT = int(os.getenv("SIMULATE_KEY_RATE_LIMIT", 60))
 
+    # Provider circuit breakers (see circuit_breaker.py)
+    BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", 60))
+    BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", 0.5))
+    BREAKER_MIN_REQUESTS = int(os.getenv("BREAKER_MIN_REQUESTS", 3))
+    BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", 60))
+    BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", 1))
+    # Share breaker OPEN/CLOSED transitions across workers via Upstash Redis
+    BREAKER_SHARED_STATE = os.getenv("BREAKER_SHARED_STATE", "false").lower() == "true"
+
+    # Background synthetic provider probes (feed /health/deep and /providers; failures reach the breakers).
+    # A probe lists the provider's models (no tokens) and counts against its rate limit.
+    PROBE_ENABLED = os.getenv("PROBE_ENABLED", "false").lower() == "true"
+    PROBE_INTERVAL_SECONDS = float(os.getenv("PROBE_INTERVAL_SECONDS", 300))
+
+    # Event-loop lag monitor (see loop_monitor.py; tune with LOOP_MONITOR_INTERVAL / LOOP_STALL_THRESHOLD)
+    LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+
+    # Async batch jobs (see batch_jobs.py)
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))        # claims in flight per job
+    BATCH_MAX_ACTIVE_JOBS = int(os.getenv("BATCH_MAX_ACTIVE_JOBS", 10))
+    BATCH_JOB_TTL = int(os.getenv("BATCH_JOB_TTL", 3600))              # seconds results stay retrievable
+    BATCH_JOB_STORE = os.getenv("BATCH_JOB_STORE", "memory")          # memory | redis
+    BATCH_PACK_GROUP = int(os.getenv("BATCH_PACK_GROUP", 24))         # claims per work item when packing
+
+    # Concurrent calls per provider for providers without a known rpm limit
+    PROVIDER_CONCURRENCY = int(os.getenv("PROVIDER_CONCURRENCY", 4))
+
+    # Authentication (see auth_cache.py): bcrypt threads, hashes allowed in flight before 503,
+    # and whether API-key records are also cached in Upstash Redis for other workers
+    BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", 2))
+    BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", 32))
+    API_KEY_CACHE_SHARED = os.getenv("API_KEY_CACHE_SHARED", "false").lower() == "true"
+
+    # Accounts (see user_store.py): sqlite:///path (shared by local workers) or postgresql://...
+    USER_DB_URL = os.getenv("USER_DB_URL", f"sqlite:///{_script_dir / 'verity_users.db'}")
+
+    # Stripe webhook queue (see stripe_events.py): SQLite file shared by local workers
+    STRIPE_EVENT_DB = os.getenv("STRIPE_EVENT_DB", str(_script_dir / "stripe_events.db"))
+
 
 # =============================================================================
 # LOGGING
@@ -244,45 +302,53 @@ simulate_key_limiter = SimulateKeyRateLimiter(Config.SIMULATE_KEY_RATE_LIMIT)
 # PROVIDER HEALTH TRACKING - ENSURES ALL PROVIDERS WORK AT ALL TIMES
 # =============================================================================
 
-class ProviderHealth:
-    """Track provider health and implement circuit breaker pattern"""
+class ProviderHealth(CircuitBreakerRegistry):
+    """
+    Provider circuit breakers (error-rate window + half-open probes).
+
+    Keeps the original ProviderHealth interface (is_healthy, failures,
+    cooldown_until, get_status) on top of the shared CircuitBreakerRegistry.
+    """
     
     def __init__(self):
-        self.failures: Dict[str, int] = defaultdict(int)
-        self.last_failure: Dict[str, float] = {}
-        self.cooldown_until: Dict[str, float] = {}
-        self.max_failures = 3  # Failures before cooldown
-        self.cooldown_seconds = 60  # Cooldown duration
+        super().__init__(
+            window_seconds=Config.BREAKER_WINDOW_SECONDS,
+            error_rate_threshold=Config.BREAKER_ERROR_RATE,
+            min_requests=Config.BREAKER_MIN_REQUESTS,
+            recovery_timeout=Config.BREAKER_OPEN_SECONDS,
+            rate_limit_timeout=120,  # Longer cooldown for rate limits
+            half_open_max_calls=Config.BREAKER_HALF_OPEN_PROBES,
+            state_store=create_state_store(Config.BREAKER_SHARED_STATE)
+        )
         self.retry_delays = [0.5, 1.0, 2.0]  # Exponential backoff
     
-    def is_healthy(self, provider: str) -> bool:
-        """Check if provider is healthy (not in cooldown)"""
-        if provider in self.cooldown_until:
-            if time.time() < self.cooldown_until[provider]:
-                return False
-            # Cooldown expired, reset
-            del self.cooldown_until[provider]
-            self.failures[provider] = 0
-        return True
+    @property
+    def max_failures(self) -> int:
+        """Failures needed (at 100% error rate) before cooldown"""
+        return self.min_requests
     
-    def record_success(self, provider: str):
-        """Record successful call - reset failure count"""
-        self.failures[provider] = 0
-        if provider in self.cooldown_until:
-            del self.cooldown_until[provider]
-    
-    def record_failure(self, provider: str, status_code: int = 0):
-        """Record failed call - may trigger cooldown"""
-        self.failures[provider] += 1
-        self.last_failure[provider] = time.time()
-        
-        # Rate limit (429) or server error (5xx) - enter cooldown
-        if status_code in [429, 500, 502, 503, 504] or self.failures[provider] >= self.max_failures:
-            cooldown = self.cooldown_seconds
-            if status_code == 429:
-                cooldown = 120  # Longer cooldown for rate limits
-            self.cooldown_until[provider] = time.time() + cooldown
-            logger.warning(f"[HEALTH] {provider} entering {cooldown}s cooldown (failures: {self.failures[provider]})")
+    @property
+    def failures(self) -> Dict[str, int]:
+        """Failures per provider inside the current window (snapshot)"""
+        return {name: cb.failure_count for name, cb in self.breakers.items()}
+    
+    @property
+    def cooldown_until(self) -> Dict[str, float]:
+        """Providers whose circuit is open, with the time it may half-open (snapshot)"""
+        return {name: self.breakers[name].open_until for name in self.in_cooldown()}
+    
+    def is_healthy(self, provider: str) -> bool:
+        """Check if provider would currently be admitted (no probe slot is consumed)"""
+        return not self.is_open(provider)
+    
+    def record_failure(self, provider: str, status_code: int = 0, error_type: str = None):
+        """Record failed call - may open the circuit"""
+        was_open = provider in self.breakers and self.breakers[provider].current_state() == CircuitState.OPEN
+        super().record_failure(provider, status_code=status_code, error_type=error_type)
+        cb = self.breakers[provider]
+        if not was_open and cb.state == CircuitState.OPEN:
+            cooldown = round(cb.open_until - time.time())
+            logger.warning(f"[HEALTH] {provider} entering {cooldown}s cooldown (failures: {cb.failure_count}, error rate: {cb.error_rate:.0%})")
     
     def get_retry_delay(self, attempt: int) -> float:
         """Get retry delay for exponential backoff"""
@@ -293,8 +359,9 @@ class ProviderHealth:
     def get_status(self) -> Dict:
         """Get health status of all providers"""
         return {
-            "failures": dict(self.failures),
-            "in_cooldown": [p for p, t in self.cooldown_until.items() if time.time() < t]
+            "failures": self.failures,
+            "in_cooldown": self.in_cooldown(),
+            "breakers": super().get_status()
         }
 
 
@@ -329,6 +396,7 @@ class ClaimCache:
             entry, timestamp = self.cache[key]
             if time.time() - timestamp < self.ttl:
                 self.hits += 1
+                metrics.record_cache("claim", True)
                 # Move to end of access order
                 if key in self.access_order:
                     self.access_order.remove(key)
@@ -341,6 +409,7 @@ class ClaimCache:
                 if key in self.access_order:
                     self.access_order.remove(key)
         self.misses += 1
+        metrics.record_cache("claim", False)
         return None
     
     def set(self, claim: str, tier: str, result: Dict):
@@ -375,139 +444,39 @@ class ClaimCache:
 claim_cache = ClaimCache(max_size=1000, ttl=3600)
 
 
-# =============================================================================
-# PROVIDER RATE LIMITER - Prevent hitting API limits
-# =============================================================================
+# Global provider rate limiter
+provider_rate_limiter = ProviderRateLimiter()
 
-class ProviderRateLimiter:
-    """Per-provider rate limiting based on known API limits"""
-    
-    # Requests per minute (rpm) and per day (rpd) for each provider
-    LIMITS = {
-        # Free tier limits (be conservative)
-        "groq": {"rpm": 30, "rpd": 14400},
-        "perplexity": {"rpm": 20, "rpd": 1000},
-        "openai": {"rpm": 3, "rpd": 200},
-        "google": {"rpm": 15, "rpd": 1500},
-        "anthropic": {"rpm": 5, "rpd": 100},
-        "mistral": {"rpm": 5, "rpd": 500},
-        "cohere": {"rpm": 20, "rpd": 1000},
-        "cerebras": {"rpm": 30, "rpd": 10000},
-        "sambanova": {"rpm": 30, "rpd": 5000},
-        "fireworks": {"rpm": 10, "rpd": 500},
-        "deepseek": {"rpm": 10, "rpd": 500},
-        "openrouter": {"rpm": 20, "rpd": 1000},
-        "huggingface": {"rpm": 30, "rpd": 10000},
-        "together": {"rpm": 10, "rpd": 1000},
-        "xai": {"rpm": 10, "rpd": 500},
-        "ai21": {"rpm": 10, "rpd": 500},
-        "you": {"rpm": 20, "rpd": 1000},
-        "jina": {"rpm": 20, "rpd": 5000},
-        "tavily": {"rpm": 20, "rpd": 1000},
-        "brave": {"rpm": 20, "rpd": 2000},
-        "serper": {"rpm": 100, "rpd": 2500},
-        "exa": {"rpm": 10, "rpd": 1000},
-    }
-    
-    def __init__(self):
-        self.requests: Dict[str, List[float]] = defaultdict(list)
-    
-    def can_request(self, provider: str) -> bool:
-        """Check if we can make a request to this provider"""
-        now = time.time()
-        limits = self.LIMITS.get(provider, {"rpm": 10, "rpd": 500})
-        
-        # Clean old entries (older than 24 hours)
-        day_ago = now - 86400
-        self.requests[provider] = [t for t in self.requests[provider] if t > day_ago]
-        
-        minute_ago = now - 60
-        minute_count = sum(1 for t in self.requests[provider] if t > minute_ago)
-        day_count = len(self.requests[provider])
-        
-        if minute_count >= limits["rpm"]:
-            logger.debug(f"[RATE] {provider} at minute limit ({minute_count}/{limits['rpm']})")
-            return False
-        
-        if day_count >= limits["rpd"]:
-            logger.debug(f"[RATE] {provider} at daily limit ({day_count}/{limits['rpd']})")
-            return False
-        
-        return True
-    
-    def record(self, provider: str):
-        """Record a request to a provider"""
-        self.requests[provider].append(time.time())
-    
-    def get_stats(self) -> Dict:
-        """Get rate limit stats for all providers"""
-        now = time.time()
-        minute_ago = now - 60
-        stats = {}
-        for provider, requests in self.requests.items():
-            limits = self.LIMITS.get(provider, {"rpm": 10, "rpd": 500})
-            minute_count = sum(1 for t in requests if t > minute_ago)
-            stats[provider] = {
-                "minute_usage": f"{minute_count}/{limits['rpm']}",
-                "day_usage": f"{len(requests)}/{limits['rpd']}"
-            }
-        return stats
+# Background prober - keeps a ready health snapshot and reports failures to provider_health
+provider_prober = ProviderProber(provider_health, interval=Config.PROBE_INTERVAL_SECONDS,
+                                 rate_limiter=provider_rate_limiter)
 
+# Scrape-time metrics from live state
+metrics.registry.add_collector(metrics.collect_breakers(provider_health), owner=__name__)
+metrics.registry.add_collector(metrics.collect_claim_cache(claim_cache), owner=__name__)
+metrics.registry.add_collector(metrics.collect_provider_quota(provider_rate_limiter), owner=__name__)
 
-# Global provider rate limiter
-provider_rate_limiter = ProviderRateLimiter()
+# Every outbound provider call waits here: per-provider slots, interactive before batch,
+# weighted fair share across tenants within each class
+call_scheduler = ProviderScheduler(
+    default_concurrency=Config.PROVIDER_CONCURRENCY,
+    concurrency=concurrency_from_limits(ProviderRateLimiter.LIMITS)
+)
+metrics.registry.add_collector(call_scheduler.collector(), owner=__name__)
 
 
 # =============================================================================
 # SOURCE CREDIBILITY DATABASE
 # =============================================================================
 
-SOURCE_CREDIBILITY = {
-    # Tier 1: Gold Standard (0.95-1.0)
-    "reuters.com": 0.98, "apnews.com": 0.98, "bbc.com": 0.95, "bbc.co.uk": 0.95,
-    "nature.com": 0.99, "science.org": 0.99, "nejm.org": 0.99, "thelancet.com": 0.98,
-    "who.int": 0.97, "cdc.gov": 0.97, "nih.gov": 0.97,
-    
-    # Tier 2: Highly Credible (0.85-0.94)
-    "nytimes.com": 0.90, "washingtonpost.com": 0.88, "theguardian.com": 0.87,
-    "npr.org": 0.92, "pbs.org": 0.92, "economist.com": 0.91,
-    "wsj.com": 0.89, "ft.com": 0.90, "bloomberg.com": 0.88,
-    
-    # Tier 3: Generally Credible (0.70-0.84)
-    "cnn.com": 0.78, "foxnews.com": 0.72, "msnbc.com": 0.75,
-    "usatoday.com": 0.76, "time.com": 0.80, "newsweek.com": 0.75,
-    "wikipedia.org": 0.80, "britannica.com": 0.90,
-    
-    # Tier 4: Fact-Check Sites (0.90-0.95)
-    "snopes.com": 0.94, "factcheck.org": 0.95, "politifact.com": 0.93,
-    "fullfact.org": 0.93, "leadstories.com": 0.90,
-    
-    # Tier 5: Academic (0.85-0.95)
-    "arxiv.org": 0.88, "scholar.google.com": 0.85, "pubmed.ncbi.nlm.nih.gov": 0.95,
-    "semanticscholar.org": 0.88, "jstor.org": 0.92,
-    
-    # Tier 6: Questionable (0.10-0.40)
-    "infowars.com": 0.10, "naturalnews.com": 0.15, "beforeitsnews.com": 0.12,
-    "zerohedge.com": 0.30, "rt.com": 0.35,
-}
+# Credibility by domain: bundled ratings plus any lists named in
+# DOMAIN_REPUTATION_FILES (see domain_reputation.py)
+domain_index = default_index()
+
 
 def score_source_credibility(url: str) -> float:
     """Score a source's credibility based on domain"""
-    if not url:
-        return 0.5
-    try:
-        from urllib.parse import urlparse
-        domain = urlparse(url).netloc.replace("www.", "").lower()
-        # Check exact match
-        if domain in SOURCE_CREDIBILITY:
-            return SOURCE_CREDIBILITY[domain]
-        # Check if domain ends with any known domain
-        for known_domain, score in SOURCE_CREDIBILITY.items():
-            if domain.endswith(known_domain):
-                return score
-    except Exception:
-        pass
-    return 0.5  # Unknown source
+    return domain_index.credibility(url)
 
 
 # =============================================================================
@@ -540,13 +509,8 @@ CATEGORY_SPECIALISTS = {
 
 def categorize_claim(claim: str) -> str:
     """Categorize a claim to route to specialized providers"""
-    claim_lower = claim.lower()
-    scores = {}
-    
-    for category, keywords in CLAIM_CATEGORIES.items():
-        score = sum(1 for kw in keywords if kw in claim_lower)
-        if score > 0:
-            scores[category] = score
+    scores = {category: len(hits)
+              for category, hits in claim_analyzer.scan(claim).keywords("categories").items()}
     
     if scores:
         return max(scores, key=scores.get)
@@ -579,8 +543,14 @@ INJECTION_PATTERNS = [
 
 def detect_injection(claim: str) -> bool:
     """Detect potential prompt injection attempts"""
-    claim_lower = claim.lower()
-    return any(pattern in claim_lower for pattern in INJECTION_PATTERNS)
+    return bool(claim_analyzer.scan(claim).keywords("injection"))
+
+
+# Category and injection keywords, matched in one memoized scan per claim (see claim_analysis.py)
+claim_analyzer = ClaimAnalyzer(
+    families={},
+    keyword_groups={"categories": CLAIM_CATEGORIES, "injection": {"injection": INJECTION_PATTERNS}}
+)
 
 def sanitize_claim(claim: str) -> str:
     """Sanitize user input for safe processing"""
@@ -677,6 +647,32 @@ def get_available_search_apis():
 class AIProviders:
     """Unified interface for 20+ AI verification providers with auto-retry and failover"""
     
+    # Provider reliability weights (based on accuracy history)
+    RELIABILITY_WEIGHTS = {
+        "perplexity": 1.3,  # Best for fact-checking with citations
+        "google": 1.2,
+        "openai": 1.2,
+        "anthropic": 1.2,
+        "groq": 1.1,
+        "mistral": 1.1,
+        "cohere": 1.0,
+        "fireworks": 1.0,
+        "openrouter": 1.0,
+        "cerebras": 0.9,
+        "sambanova": 0.9,
+        "deepseek": 0.9,
+        "together": 0.9,
+        "huggingface": 0.8,
+        "xai": 1.0,
+        "ai21": 0.9,
+        "lepton": 0.8,
+        "anyscale": 0.8,
+        "nvidia": 0.9,
+        "you": 1.0,
+        "jina": 0.8,
+        "novita": 0.8,
+    }
+    
     def __init__(self):
         self.http_client = None
         self.available_providers = []
@@ -697,20 +693,22 @@ class AIProviders:
     
     async def _call_with_retry(self, provider: str, call_func, max_retries: int = 2) -> Dict:
         """Call a provider with automatic retry and health tracking"""
-        if not provider_health.is_healthy(provider):
-            logger.debug(f"[SKIP] {provider} in cooldown")
-            return None
-        
         for attempt in range(max_retries + 1):
+            # Every attempt goes through the breaker; a half-open circuit admits only its probes
+            if not await provider_health.acquire(provider):
+                logger.debug(f"[SKIP] {provider} in cooldown")
+                return None
             try:
                 result = await call_func()
                 if result and result.get("success"):
                     provider_health.record_success(provider)
                     return result
-                elif result and result.get("status_code"):
-                    provider_health.record_failure(provider, result["status_code"])
-                    if result["status_code"] == 429:  # Rate limit - don't retry
+                elif result:
+                    provider_health.record_failure(provider, result.get("status_code", 0))
+                    if result.get("status_code") == 429:  # Rate limit - don't retry
                         break
+                else:
+                    provider_health.release(provider)
             except Exception as e:
                 logger.error(f"[RETRY] {provider} attempt {attempt + 1} failed: {e}")
                 provider_health.record_failure(provider)
@@ -721,11 +719,51 @@ class AIProviders:
         
         return None
     
+    # =========================================================================
+    # PROMPTS AND OUTPUT BUDGETS
+    # =========================================================================
+    # A single claim is asked for a compact JSON verdict (structured_output) within
+    # its tier's output budget. A packed call (verify_claims_packed) passes the
+    # numbered claim list from claim_packing as ``claim`` with ``packed=True``: it
+    # is sent as is, without JSON mode, with the output budget K was planned for.
+    
+    SYSTEM_PROMPT = """You are an expert fact-checker. Analyze claims carefully and provide accurate verdicts.
+
+VERDICT OPTIONS (use exactly one):
+- "true" - Claim is factually accurate
+- "mostly_true" - Claim is largely accurate with minor issues
+- "partially_true" - Claim is accurate only in part
+- "mixed" - Claim has BOTH true and false elements
+- "misleading" - Claim is technically accurate but gives a false impression
+- "mostly_false" - Claim is largely inaccurate with minor true elements
+- "false" - Claim is factually inaccurate
+- "unverifiable" - Cannot be verified with available evidence
+
+""" + FORMAT_INSTRUCTIONS
+    
+    PACKED_SYSTEM_PROMPT = ("You are an expert fact-checker. Check each numbered claim independently "
+                            "and answer only in the line format the user gives.")
+    
+    def _system_prompt(self, packed: bool = False) -> str:
+        return self.PACKED_SYSTEM_PROMPT if packed else self.SYSTEM_PROMPT
+    
+    def _user_prompt(self, claim: str, packed: bool = False) -> str:
+        return claim if packed else f"Fact-check this claim:\n\n\"{claim}\""
+    
+    def _output_budget(self, provider: str, packed: bool = False) -> int:
+        """max_tokens for a call: the packing plan's budget, else the request tier's (structured_output.OUTPUT_BUDGETS)."""
+        if packed:
+            return pack_limits(provider)["output"]
+        return output_budget(provider_scheduler.current_work().get("tier"))
+    
+    def _response_format(self, provider: str, packed: bool = False) -> Dict:
+        return {} if packed else response_format(provider, EXTENDED_VERDICTS)
+    
     # =========================================================================
     # TIER 1 PROVIDERS
     # =========================================================================
     
-    async def verify_with_groq(self, claim: str) -> Dict:
+    async def verify_with_groq(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Groq (Llama 3.3 - Ultra Fast)"""
         if not Config.GROQ_API_KEY:
             return None
@@ -737,11 +775,12 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["groq"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Analyze claims and provide verdicts: 'true', 'false', 'partially_true', 'mostly_true', 'mostly_false', or 'unverifiable'. Include confidence (0-1) and brief explanation."},
-                        {"role": "user", "content": f"Fact-check this claim: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("groq", packed),
+                    **self._response_format("groq", packed)
                 }
             )
             
@@ -757,7 +796,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_perplexity(self, claim: str) -> Dict:
+    async def verify_with_perplexity(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Perplexity (Real-time web search)"""
         if not Config.PERPLEXITY_API_KEY:
             return None
@@ -769,9 +808,10 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["perplexity"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker with access to current information. Verify claims and cite sources. Provide verdict: 'true', 'false', 'partially_true', 'mostly_true', 'mostly_false', or 'unverifiable'."},
-                        {"role": "user", "content": f"Fact-check with sources: {claim}"}
-                    ]
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
+                    ],
+                    "max_tokens": self._output_budget("perplexity", packed)
                 }
             )
             
@@ -787,7 +827,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_google(self, claim: str) -> Dict:
+    async def verify_with_google(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Google Gemini 2.0 Flash"""
         if not Config.GOOGLE_AI_API_KEY:
             return None
@@ -797,9 +837,10 @@ class AIProviders:
                 f"https://generativelanguage.googleapis.com/v1beta/models/{LATEST_MODELS['google']}:generateContent?key={Config.GOOGLE_AI_API_KEY}",
                 json={
                     "contents": [{
-                        "parts": [{"text": f"As a fact-checker, verify this claim and provide: verdict (true/false/partially_true/unverifiable), confidence (0-1), and brief explanation.\n\nClaim: {claim}"}]
+                        "parts": [{"text": f"{self._system_prompt(packed)}\n\n{self._user_prompt(claim, packed)}"}]
                     }],
-                    "generationConfig": {"temperature": 0.1, "maxOutputTokens": 500}
+                    "generationConfig": {"temperature": 0.1, "maxOutputTokens": self._output_budget("google", packed),
+                                         **({} if packed else {"responseMimeType": "application/json"})}
                 }
             )
             
@@ -819,7 +860,7 @@ class AIProviders:
     # TIER 2 PROVIDERS
     # =========================================================================
     
-    async def verify_with_openai(self, claim: str) -> Dict:
+    async def verify_with_openai(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using OpenAI GPT-4o"""
         if not Config.OPENAI_API_KEY:
             return None
@@ -831,11 +872,12 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["openai"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Analyze claims and provide verdicts: 'true', 'false', 'partially_true', 'mostly_true', 'mostly_false', or 'unverifiable'. Include confidence (0-1) and brief explanation."},
-                        {"role": "user", "content": f"Fact-check this claim: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("openai", packed),
+                    **self._response_format("openai", packed)
                 }
             )
             
@@ -851,7 +893,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_mistral(self, claim: str) -> Dict:
+    async def verify_with_mistral(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Mistral Large"""
         if not Config.MISTRAL_API_KEY:
             return None
@@ -863,11 +905,12 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["mistral"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims and provide verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("mistral", packed),
+                    **self._response_format("mistral", packed)
                 }
             )
             
@@ -883,7 +926,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_cohere(self, claim: str) -> Dict:
+    async def verify_with_cohere(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Cohere Command-R+"""
         if not Config.COHERE_API_KEY:
             return None
@@ -894,8 +937,10 @@ class AIProviders:
                 headers={"Authorization": f"Bearer {Config.COHERE_API_KEY}"},
                 json={
                     "model": LATEST_MODELS["cohere"],
-                    "message": f"As a fact-checker, verify this claim and provide: verdict (true/false/partially_true), confidence, and explanation.\n\nClaim: {claim}",
-                    "temperature": 0.1
+                    "preamble": self._system_prompt(packed),
+                    "message": self._user_prompt(claim, packed),
+                    "temperature": 0.1,
+                    "max_tokens": self._output_budget("cohere", packed)
                 }
             )
             
@@ -915,7 +960,7 @@ class AIProviders:
     # TIER 3 PROVIDERS
     # =========================================================================
     
-    async def verify_with_cerebras(self, claim: str) -> Dict:
+    async def verify_with_cerebras(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Cerebras (Ultra-fast inference)"""
         if not Config.CEREBRAS_API_KEY:
             return None
@@ -927,11 +972,12 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["cerebras"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("cerebras", packed),
+                    **self._response_format("cerebras", packed)
                 }
             )
             
@@ -947,7 +993,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_sambanova(self, claim: str) -> Dict:
+    async def verify_with_sambanova(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using SambaNova"""
         if not Config.SAMBANOVA_API_KEY:
             return None
@@ -959,10 +1005,11 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["sambanova"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
-                    "temperature": 0.1
+                    "temperature": 0.1,
+                    "max_tokens": self._output_budget("sambanova", packed)
                 }
             )
             
@@ -978,7 +1025,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_fireworks(self, claim: str) -> Dict:
+    async def verify_with_fireworks(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Fireworks AI"""
         if not Config.FIREWORKS_API_KEY:
             return None
@@ -990,11 +1037,12 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["fireworks"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("fireworks", packed),
+                    **self._response_format("fireworks", packed)
                 }
             )
             
@@ -1014,7 +1062,7 @@ class AIProviders:
     # TIER 4 PROVIDERS
     # =========================================================================
     
-    async def verify_with_openrouter(self, claim: str) -> Dict:
+    async def verify_with_openrouter(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using OpenRouter (Multi-model access)"""
         if not Config.OPENROUTER_API_KEY:
             return None
@@ -1030,10 +1078,11 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["openrouter"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
-                    "temperature": 0.1
+                    "temperature": 0.1,
+                    "max_tokens": self._output_budget("openrouter", packed)
                 }
             )
             
@@ -1049,7 +1098,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_together(self, claim: str) -> Dict:
+    async def verify_with_together(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Together AI"""
         if not Config.TOGETHER_API_KEY:
             return None
@@ -1061,11 +1110,12 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["together"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("together", packed),
+                    **self._response_format("together", packed)
                 }
             )
             
@@ -1081,7 +1131,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_huggingface(self, claim: str) -> Dict:
+    async def verify_with_huggingface(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using HuggingFace Inference API"""
         if not Config.HUGGINGFACE_API_KEY:
             return None
@@ -1091,8 +1141,9 @@ class AIProviders:
                 f"https://api-inference.huggingface.co/models/{LATEST_MODELS['huggingface']}",
                 headers={"Authorization": f"Bearer {Config.HUGGINGFACE_API_KEY}"},
                 json={
-                    "inputs": f"<s>[INST] You are a fact-checker. Verify this claim and provide verdict (true/false/partially_true), confidence (0-1), and explanation.\n\nClaim: {claim} [/INST]",
-                    "parameters": {"max_new_tokens": 500, "temperature": 0.1}
+                    "inputs": f"<s>[INST] {self._system_prompt(packed)}\n\n{self._user_prompt(claim, packed)} [/INST]",
+                    "parameters": {"max_new_tokens": self._output_budget("huggingface", packed), "temperature": 0.1,
+                                   "return_full_text": False}
                 }
             )
             
@@ -1112,7 +1163,7 @@ class AIProviders:
     # TIER 5: ADDITIONAL PROVIDERS
     # =========================================================================
     
-    async def verify_with_anthropic(self, claim: str) -> Dict:
+    async def verify_with_anthropic(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Anthropic Claude"""
         if not Config.ANTHROPIC_API_KEY:
             return None
@@ -1127,9 +1178,10 @@ class AIProviders:
                 },
                 json={
                     "model": LATEST_MODELS["anthropic"],
-                    "max_tokens": 500,
+                    "max_tokens": self._output_budget("anthropic", packed),
+                    "system": self._system_prompt(packed),
                     "messages": [
-                        {"role": "user", "content": f"As a fact-checker, verify this claim and provide: verdict (true/false/partially_true), confidence (0-1), and explanation.\n\nClaim: {claim}"}
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ]
                 }
             )
@@ -1146,7 +1198,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_deepseek(self, claim: str) -> Dict:
+    async def verify_with_deepseek(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using DeepSeek"""
         if not Config.DEEPSEEK_API_KEY:
             return None
@@ -1158,11 +1210,12 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["deepseek"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("deepseek", packed),
+                    **self._response_format("deepseek", packed)
                 }
             )
             
@@ -1178,7 +1231,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_xai(self, claim: str) -> Dict:
+    async def verify_with_xai(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using xAI Grok"""
         if not Config.XAI_API_KEY:
             return None
@@ -1190,11 +1243,12 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["xai"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("xai", packed),
+                    **self._response_format("xai", packed)
                 }
             )
             
@@ -1210,7 +1264,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_ai21(self, claim: str) -> Dict:
+    async def verify_with_ai21(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using AI21 Labs Jamba"""
         if not Config.AI21_API_KEY:
             return None
@@ -1222,11 +1276,11 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["ai21"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("ai21", packed)
                 }
             )
             
@@ -1242,7 +1296,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_lepton(self, claim: str) -> Dict:
+    async def verify_with_lepton(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Lepton AI"""
         if not Config.LEPTON_API_KEY:
             return None
@@ -1254,11 +1308,11 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["lepton"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("lepton", packed)
                 }
             )
             
@@ -1274,7 +1328,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_anyscale(self, claim: str) -> Dict:
+    async def verify_with_anyscale(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Anyscale Endpoints"""
         if not Config.ANYSCALE_API_KEY:
             return None
@@ -1286,11 +1340,11 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["anyscale"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("anyscale", packed)
                 }
             )
             
@@ -1306,7 +1360,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_nvidia(self, claim: str) -> Dict:
+    async def verify_with_nvidia(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using NVIDIA NIM"""
         if not Config.NVIDIA_NIM_API_KEY:
             return None
@@ -1318,11 +1372,11 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS["nvidia"],
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("nvidia", packed)
                 }
             )
             
@@ -1399,7 +1453,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
     
-    async def verify_with_novita(self, claim: str) -> Dict:
+    async def verify_with_novita(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Novita AI (LLM inference)"""
         if not Config.NOVITA_API_KEY:
             return None
@@ -1411,11 +1465,11 @@ class AIProviders:
                 json={
                     "model": LATEST_MODELS.get("novita", "meta-llama/llama-3.3-70b-instruct"),
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("novita", packed)
                 }
             )
             
@@ -1435,7 +1489,7 @@ class AIProviders:
     # TIER 8: ADDITIONAL xAI ALTERNATIVES
     # =========================================================================
 
-    async def verify_with_cloudflare(self, claim: str) -> Dict:
+    async def verify_with_cloudflare(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Cloudflare Workers AI (Free tier available)"""
         account_id = Config.CLOUDFLARE_ACCOUNT_ID
         api_key = Config.CLOUDFLARE_API_KEY
@@ -1448,10 +1502,10 @@ class AIProviders:
                 headers={"Authorization": f"Bearer {api_key}"},
                 json={
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims and provide verdicts: true/false/partially_true/unverifiable. Include confidence (0-1) and brief explanation."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("cloudflare", packed)
                 }
             )
             
@@ -1469,7 +1523,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
 
-    async def verify_with_replicate(self, claim: str) -> Dict:
+    async def verify_with_replicate(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Replicate (Meta Llama, Mixtral, etc.)"""
         if not Config.REPLICATE_API_KEY:
             return None
@@ -1485,8 +1539,9 @@ class AIProviders:
                 json={
                     "version": "meta/llama-3.3-70b-instruct",
                     "input": {
-                        "prompt": f"You are a fact-checker. Verify this claim and provide a verdict (true/false/partially_true/unverifiable), confidence (0-1), and brief explanation.\n\nClaim: {claim}\n\nVerdict:",
-                        "max_tokens": 500,
+                        "system_prompt": self._system_prompt(packed),
+                        "prompt": self._user_prompt(claim, packed),
+                        "max_tokens": self._output_budget("replicate", packed),
                         "temperature": 0.1
                     }
                 }
@@ -1506,7 +1561,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
 
-    async def verify_with_siliconflow(self, claim: str) -> Dict:
+    async def verify_with_siliconflow(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using SiliconFlow (Free tier with Llama, Qwen, DeepSeek)"""
         api_key = os.getenv("SILICONFLOW_API_KEY")
         if not api_key:
@@ -1519,11 +1574,11 @@ class AIProviders:
                 json={
                     "model": "deepseek-ai/DeepSeek-V3",
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts: true/false/partially_true/unverifiable."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("siliconflow", packed)
                 }
             )
             
@@ -1539,7 +1594,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
 
-    async def verify_with_hyperbolic(self, claim: str) -> Dict:
+    async def verify_with_hyperbolic(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Hyperbolic (Fast inference, Llama 405B)"""
         api_key = os.getenv("HYPERBOLIC_API_KEY")
         if not api_key:
@@ -1552,11 +1607,11 @@ class AIProviders:
                 json={
                     "model": "meta-llama/Llama-3.3-70B-Instruct",
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("hyperbolic", packed)
                 }
             )
             
@@ -1572,7 +1627,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
 
-    async def verify_with_lambdalabs(self, claim: str) -> Dict:
+    async def verify_with_lambdalabs(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Lambda Labs (GPU cloud with Llama)"""
         api_key = os.getenv("LAMBDA_API_KEY")
         if not api_key:
@@ -1585,11 +1640,11 @@ class AIProviders:
                 json={
                     "model": "hermes-3-llama-3.1-405b-fp8-128k",
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("lambdalabs", packed)
                 }
             )
             
@@ -1605,7 +1660,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
 
-    async def verify_with_ollama(self, claim: str) -> Dict:
+    async def verify_with_ollama(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using local Ollama (free, runs locally)"""
         ollama_host = os.getenv("OLLAMA_HOST", "http://localhost:11434")
         
@@ -1615,11 +1670,12 @@ class AIProviders:
                 json={
                     "model": "llama3.3:70b",
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "stream": False,
-                    "options": {"temperature": 0.1}
+                    **({} if packed else {"format": "json"}),
+                    "options": {"temperature": 0.1, "num_predict": self._output_budget("ollama", packed)}
                 },
                 timeout=60.0
             )
@@ -1636,7 +1692,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
 
-    async def verify_with_zhipu(self, claim: str) -> Dict:
+    async def verify_with_zhipu(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Zhipu AI (GLM-4, Chinese AI leader)"""
         api_key = os.getenv("ZHIPU_API_KEY")
         if not api_key:
@@ -1649,11 +1705,11 @@ class AIProviders:
                 json={
                     "model": "glm-4-plus",
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts: true/false/partially_true/unverifiable."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("zhipu", packed)
                 }
             )
             
@@ -1669,7 +1725,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
 
-    async def verify_with_alibaba(self, claim: str) -> Dict:
+    async def verify_with_alibaba(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Alibaba Qwen (via DashScope)"""
         api_key = os.getenv("DASHSCOPE_API_KEY")
         if not api_key:
@@ -1682,11 +1738,11 @@ class AIProviders:
                 json={
                     "model": "qwen-max",
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("alibaba", packed)
                 }
             )
             
@@ -1702,7 +1758,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
 
-    async def verify_with_moonshot(self, claim: str) -> Dict:
+    async def verify_with_moonshot(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Moonshot AI (Kimi)"""
         api_key = os.getenv("MOONSHOT_API_KEY")
         if not api_key:
@@ -1715,11 +1771,11 @@ class AIProviders:
                 json={
                     "model": "moonshot-v1-128k",
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("moonshot", packed)
                 }
             )
             
@@ -1735,7 +1791,7 @@ class AIProviders:
         
         return {"success": False, "status_code": 0}
 
-    async def verify_with_baichuan(self, claim: str) -> Dict:
+    async def verify_with_baichuan(self, claim: str, packed: bool = False) -> Dict:
         """Verify claim using Baichuan AI"""
         api_key = os.getenv("BAICHUAN_API_KEY")
         if not api_key:
@@ -1748,11 +1804,11 @@ class AIProviders:
                 json={
                     "model": "Baichuan4",
                     "messages": [
-                        {"role": "system", "content": "You are a fact-checker. Verify claims with verdicts."},
-                        {"role": "user", "content": f"Fact-check: {claim}"}
+                        {"role": "system", "content": self._system_prompt(packed)},
+                        {"role": "user", "content": self._user_prompt(claim, packed)}
                     ],
                     "temperature": 0.1,
-                    "max_tokens": 500
+                    "max_tokens": self._output_budget("baichuan", packed)
                 }
             )
             
@@ -2086,28 +2142,9 @@ class AIProviders:
     # MAIN VERIFICATION WITH MULTI-PROVIDER CROSS-VALIDATION
     # =========================================================================
     
-    async def verify_claim(self, claim: str, tier: str = "free") -> Dict:
-        """
-        Run verification with ALL providers simultaneously and cross-validate.
-        
-        Tier-based verification loops:
-        - free: 4 verification loops
-        - pro: 5 verification loops  
-        - enterprise: 7 verification loops
-        """
-        results = []
-        providers_used = []
-        search_results = []
-        
-        # Tier-based loop configuration
-        tier_loops = {"free": 4, "pro": 5, "enterprise": 7}
-        max_loops = tier_loops.get(tier, 4)
-        
-        logger.info(f"[VERIFY] Starting {tier} tier verification with {max_loops} loops")
-        logger.info(f"[VERIFY] Available providers: {len(self.available_providers)}: {self.available_providers}")
-        
-        # Map provider names to functions (32 AI providers + xAI alternatives)
-        provider_functions = {
+    def get_provider_functions(self) -> Dict[str, Any]:
+        """Map provider names to verification functions (32 AI providers + xAI alternatives)"""
+        return {
             # Tier 1: Primary (fastest)
             "groq": self.verify_with_groq,
             "perplexity": self.verify_with_perplexity,
@@ -2148,7 +2185,17 @@ class AIProviders:
             "moonshot": self.verify_with_moonshot,
             "baichuan": self.verify_with_baichuan,
         }
-        
+    
+    async def verify_claim(self, claim: str, tier: str = "free") -> Dict:
+        """Verify a claim (see _run_verification), tracking in-flight verifications."""
+        metrics.VERIFICATIONS_IN_FLIGHT.inc()
+        try:
+            return await self._run_verification(claim, tier)
+        finally:
+            metrics.VERIFICATIONS_IN_FLIGHT.dec()
+    
+    async def _gather_evidence(self, claim: str) -> List[Dict]:
+        """Query every configured search/fact-check API for evidence on a claim"""
         # Search API functions for gathering evidence (8 search/fact-check APIs)
         search_functions = {
             "tavily": self.search_with_tavily,
@@ -2161,9 +2208,7 @@ class AIProviders:
             "newsapi": self.search_with_newsapi,
         }
         
-        # =====================================================================
-        # PHASE 1: GATHER EVIDENCE FROM ALL SEARCH APIs SIMULTANEOUSLY
-        # =====================================================================
+        search_results = []
         search_tasks = []
         search_providers = []
         
@@ -2182,18 +2227,47 @@ class AIProviders:
         for name, key in search_api_keys.items():
             if key and name in search_functions:
                 if provider_rate_limiter.can_request(name):
-                    search_tasks.append(search_functions[name](claim))
+                    search_tasks.append(call_scheduler.call(name, search_functions[name](claim)))
                     search_providers.append(name)
                     provider_rate_limiter.record(name)
         
         if search_tasks:
             logger.info(f"[SEARCH] Querying {len(search_tasks)} search APIs: {search_providers}")
-            search_responses = await asyncio.gather(*search_tasks, return_exceptions=True)
+            with metrics.phase_timer("search"):
+                search_responses = await asyncio.gather(*search_tasks, return_exceptions=True)
             for i, response in enumerate(search_responses):
                 if not isinstance(response, Exception) and response and response.get("success"):
                     search_results.append(response)
                     logger.info(f"✓ Search: {search_providers[i]} returned evidence")
         
+        return search_results
+    
+    async def _run_verification(self, claim: str, tier: str = "free") -> Dict:
+        """
+        Run verification with ALL providers simultaneously and cross-validate.
+        
+        Tier-based verification loops:
+        - free: 4 verification loops
+        - pro: 5 verification loops  
+        - enterprise: 7 verification loops
+        """
+        results = []
+        providers_used = []
+        
+        # Tier-based loop configuration
+        tier_loops = {"free": 4, "pro": 5, "enterprise": 7}
+        max_loops = tier_loops.get(tier, 4)
+        
+        logger.info(f"[VERIFY] Starting {tier} tier verification with {max_loops} loops")
+        logger.info(f"[VERIFY] Available providers: {len(self.available_providers)}: {self.available_providers}")
+        
+        provider_functions = self.get_provider_functions()
+        
+        # =====================================================================
+        # PHASE 1: GATHER EVIDENCE FROM ALL SEARCH APIs SIMULTANEOUSLY
+        # =====================================================================
+        search_results = await self._gather_evidence(claim)
+        
         # =====================================================================
         # PHASE 2: RUN ALL AI PROVIDERS SIMULTANEOUSLY (with rate limiting)
         # =====================================================================
@@ -2208,48 +2282,64 @@ class AIProviders:
         logger.info(f"[VERIFY] Running {len(healthy_providers)} AI providers simultaneously")
         logger.info(f"[CATEGORY] Claim categorized as: {categorize_claim(claim)}")
         
-        # Create tasks for ALL healthy providers at once
+        # Create tasks for ALL healthy providers at once (half-open circuits only admit their probes)
         ai_tasks = []
         ai_providers = []
         for provider in healthy_providers:
-            ai_tasks.append(provider_functions[provider](claim))
+            if not await provider_health.acquire(provider):
+                metrics.record_provider_skipped(provider)
+                continue
+            ai_tasks.append(call_scheduler.call(provider, provider_functions[provider](claim)))
             ai_providers.append(provider)
             provider_rate_limiter.record(provider)
         
         if ai_tasks:
-            responses = await asyncio.gather(*ai_tasks, return_exceptions=True)
+            with metrics.phase_timer("ai_pass1"):
+                responses = await asyncio.gather(*ai_tasks, return_exceptions=True)
             
             for i, response in enumerate(responses):
                 provider = ai_providers[i]
                 if isinstance(response, Exception):
                     logger.error(f"[FAIL] {provider}: {response}")
-                    provider_health.record_failure(provider)
+                    provider_health.record_failure(provider, error_type=type(response).__name__)
                 elif response and isinstance(response, dict):
                     if response.get("success"):
                         results.append(response)
                         providers_used.append(response["provider"])
                         provider_health.record_success(provider)
                         logger.info(f"✓ {provider} succeeded")
-                    elif response.get("status_code"):
-                        provider_health.record_failure(provider, response["status_code"])
+                    else:
+                        provider_health.record_failure(provider, response.get("status_code", 0))
+                else:
+                    # No answer at all: free the (possibly half-open probe) slot
+                    provider_health.release(provider)
         
         # =====================================================================
-        # PHASE 3: EMERGENCY FALLBACK - Try providers in cooldown
+        # PHASE 3: EMERGENCY FALLBACK - Try providers whose circuit admits a probe
         # =====================================================================
         if not results:
-            logger.warning("[EMERGENCY] All healthy providers failed, trying cooldown providers...")
-            for provider in self.available_providers:
-                if provider not in healthy_providers and provider in provider_functions:
-                    try:
-                        response = await provider_functions[provider](claim)
-                        if response and response.get("success"):
-                            results.append(response)
-                            providers_used.append(response["provider"])
-                            provider_health.record_success(provider)
-                            logger.info(f"✓ {provider} recovered from cooldown")
-                            break
-                    except Exception as e:
-                        logger.error(f"[EMERGENCY FAIL] {provider}: {e}")
+            logger.warning("[EMERGENCY] All healthy providers failed, trying recovering providers...")
+            with metrics.phase_timer("fallback"):
+                for provider in self.available_providers:
+                    if provider not in ai_providers and provider in provider_functions:
+                        # Open circuits fail fast here too; only half-open probe slots get through
+                        if not await provider_health.acquire(provider):
+                            continue
+                        try:
+                            response = await call_scheduler.call(provider, provider_functions[provider](claim))
+                            if response and response.get("success"):
+                                results.append(response)
+                                providers_used.append(response["provider"])
+                                provider_health.record_success(provider)
+                                logger.info(f"✓ {provider} recovered from cooldown")
+                                break
+                            if response:
+                                provider_health.record_failure(provider, response.get("status_code", 0))
+                            else:
+                                provider_health.release(provider)
+                        except Exception as e:
+                            logger.error(f"[EMERGENCY FAIL] {provider}: {e}")
+                            provider_health.record_failure(provider, error_type=type(e).__name__)
         
         if not results:
             return {
@@ -2264,7 +2354,119 @@ class AIProviders:
         # =====================================================================
         # PHASE 4: CROSS-VALIDATION WITH TIERED LOOPS
         # =====================================================================
-        return self._cross_validate_results(claim, results, search_results, providers_used, max_loops)
+        with metrics.phase_timer("consensus"):
+            return self._cross_validate_results(claim, results, search_results, providers_used, max_loops)
+    
+    async def verify_claims_packed(self, claims: List[str], tier: str = "free") -> List[Dict]:
+        """
+        Verify several claims with multi-claim provider requests (batch packing mode).
+        
+        Each provider receives the claims as numbered lists sized for its token
+        budgets (claim_packing.plan_packs). Items missing from a provider's reply
+        are retried with its normal single-claim call. Evidence search and
+        cross-validation still run per claim.
+        """
+        metrics.VERIFICATIONS_IN_FLIGHT.inc(len(claims))
+        try:
+            tier_loops = {"free": 4, "pro": 5, "enterprise": 7}
+            max_loops = tier_loops.get(tier, 4)
+            provider_functions = self.get_provider_functions()
+            
+            evidence = await asyncio.gather(*[self._gather_evidence(c) for c in claims])
+            
+            healthy_providers = [
+                p for p in self.available_providers
+                if p in provider_functions and provider_health.is_healthy(p) and provider_rate_limiter.can_request(p)
+            ]
+            calls = [
+                self._call_packed(provider, provider_functions[provider], [claims[i] for i in group], group)
+                for provider in healthy_providers
+                for group in plan_packs(provider, claims)
+            ]
+            logger.info(f"[PACK] {len(claims)} claims x {len(healthy_providers)} providers in {len(calls)} requests")
+            
+            per_claim: List[List[Dict]] = [[] for _ in claims]
+            if calls:
+                with metrics.phase_timer("ai_pass1"):
+                    answers = await asyncio.gather(*calls, return_exceptions=True)
+                for answer in answers:
+                    if isinstance(answer, Exception):
+                        logger.error(f"[PACK] Packed call failed: {answer}")
+                        continue
+                    for index, result in answer:
+                        per_claim[index].append(result)
+            
+            with metrics.phase_timer("consensus"):
+                consensus = {
+                    i: self._cross_validate_results(claims[i], results, evidence[i],
+                                                    [r["provider"] for r in results], max_loops)
+                    for i, results in enumerate(per_claim) if results
+                }
+            
+            verified = []
+            for i in range(len(claims)):
+                if i in consensus:
+                    verified.append(consensus[i])
+                    continue
+                verified.append({
+                    "verdict": "unverifiable",
+                    "confidence": 0.5,
+                    "explanation": "Unable to verify - no providers available",
+                    "providers_used": [],
+                    "models_used": [],
+                    "cross_validation": {"agreement": 0, "total_checks": 0}
+                })
+            return verified
+        finally:
+            metrics.VERIFICATIONS_IN_FLIGHT.dec(len(claims))
+    
+    async def _call_packed(self, provider: str, call_func, group_claims: List[str], indices: List[int]) -> List[tuple]:
+        """One packed request plus single-claim retries; returns [(claim index, result)]"""
+        answered: Dict[int, Dict] = {}
+        delivered = len(group_claims) == 1
+        if not delivered and await provider_health.acquire(provider):
+            provider_rate_limiter.record(provider)
+            try:
+                response = await call_scheduler.call(provider, call_func(build_packed_prompt(group_claims), packed=True))
+                if response and response.get("success"):
+                    delivered = True
+                    provider_health.record_success(provider)
+                    for j, item in parse_packed_response(response.get("response", ""), len(group_claims)).items():
+                        answered[j] = {
+                            "provider": provider,
+                            "model": response.get("model", "unknown"),
+                            "response": item["explanation"],
+                            "verdict": item["verdict"],
+                            "confidence": item["confidence"],
+                            "success": True,
+                            "packed": True
+                        }
+                elif response:
+                    provider_health.record_failure(provider, response.get("status_code", 0))
+                else:
+                    provider_health.release(provider)
+            except Exception as e:
+                logger.error(f"[PACK] {provider}: {e}")
+                provider_health.record_failure(provider, error_type=type(e).__name__)
+        
+        # Items the reply did not parse for fall back to single-claim calls
+        # (a failed packed request does not - the breaker already counted it)
+        missing = [j for j in range(len(group_claims)) if j not in answered]
+        if delivered and missing and provider_rate_limiter.can_request(provider):
+            if len(group_claims) > 1:
+                logger.info(f"[PACK] {provider} answered {len(answered)}/{len(group_claims)}; retrying the rest singly")
+            for _ in missing:
+                provider_rate_limiter.record(provider)
+            singles = [
+                self._call_with_retry(
+                    provider, lambda c=group_claims[j]: call_scheduler.call(provider, call_func(c)), max_retries=0)
+                for j in missing
+            ]
+            for j, response in zip(missing, await asyncio.gather(*singles, return_exceptions=True)):
+                if isinstance(response, dict) and response.get("success"):
+                    answered[j] = response
+        
+        return [(indices[j], result) for j, result in answered.items()]
     
     def _extract_verdict_from_response(self, response_text: str) -> str:
         """Extract standardized verdict from response text"""
@@ -2318,44 +2520,7 @@ class AIProviders:
             }
         
         # Extract verdicts from all providers
-        verdicts = []
-        verdict_details = []
-        
-        for result in results:
-            response_text = result.get("response", "")
-            verdict = self._extract_verdict_from_response(response_text)
-            verdicts.append(verdict)
-            verdict_details.append({
-                "provider": result.get("provider"),
-                "model": result.get("model", "unknown"),
-                "verdict": verdict
-            })
-        
-        # Provider reliability weights (based on accuracy history)
-        reliability_weights = {
-            "perplexity": 1.3,  # Best for fact-checking with citations
-            "google": 1.2,
-            "openai": 1.2,
-            "anthropic": 1.2,
-            "groq": 1.1,
-            "mistral": 1.1,
-            "cohere": 1.0,
-            "fireworks": 1.0,
-            "openrouter": 1.0,
-            "cerebras": 0.9,
-            "sambanova": 0.9,
-            "deepseek": 0.9,
-            "together": 0.9,
-            "huggingface": 0.8,
-            "xai": 1.0,
-            "ai21": 0.9,
-            "lepton": 0.8,
-            "anyscale": 0.8,
-            "nvidia": 0.9,
-            "you": 1.0,
-            "jina": 0.8,
-            "novita": 0.8,
-        }
+        verdicts = [self._result_verdict(result) for result in results]
         
         # Weighted verdict counting
         verdict_scores = {
@@ -2367,7 +2532,7 @@ class AIProviders:
         total_weight = 0
         for i, verdict in enumerate(verdicts):
             provider = results[i].get("provider", "unknown")
-            weight = reliability_weights.get(provider, 0.8)
+            weight = self.RELIABILITY_WEIGHTS.get(provider, 0.8)
             verdict_scores[verdict] += weight
             total_weight += weight
         
@@ -2402,9 +2567,37 @@ class AIProviders:
         confidence = min(0.98, base_confidence + provider_boost + agreement_boost + 
                         search_boost + loop_confidence_boost)
         
+        return self._cross_validation_report(results, search_results, providers_used, max_loops, verdicts,
+                                             consensus_verdict, agreeing_count, agreement_pct, confidence)
+    
+    def _read_verdict(self, result: Dict) -> Optional[Dict]:
+        """Structured verdict of a provider reply (parsed once per result), or None for free text."""
+        if "structured" not in result:
+            result["structured"] = read_reply(result.get("provider", "unknown"), result.get("response", ""),
+                                              EXTENDED_VERDICTS)
+        return result["structured"]
+    
+    def _result_verdict(self, result: Dict) -> str:
+        # Packed replies carry a parsed verdict; JSON replies are read strictly, free text is classified
+        if result.get("verdict"):
+            return result["verdict"]
+        structured = self._read_verdict(result)
+        return structured["verdict"] if structured else self._extract_verdict_from_response(result.get("response", ""))
+    
+    def _cross_validation_report(self, results: List[Dict], search_results: List[Dict],
+                                 providers_used: List[str], max_loops: int, verdicts: List[str],
+                                 consensus_verdict: str, agreeing_count: int, agreement_pct: float,
+                                 confidence: float) -> Dict:
+        """Response payload for a cross-validated claim"""
+        verdict_details = [
+            {"provider": r.get("provider"), "model": r.get("model", "unknown"), "verdict": verdict}
+            for r, verdict in zip(results, verdicts)
+        ]
+        
         # Build explanation with cross-validation summary
         primary = results[0]
-        primary_explanation = primary.get("response", "")
+        primary_structured = None if primary.get("verdict") else self._read_verdict(primary)
+        primary_explanation = primary_structured["rationale"] if primary_structured else primary.get("response", "")
         
         cross_validation_summary = (
             f"\n\n[CROSS-VALIDATION: {agreeing_count}/{len(verdicts)} providers agree "
@@ -2448,6 +2641,7 @@ class ClaimRequest(BaseModel):
     claim: str = Field(..., min_length=5, max_length=5000)
     detailed: bool = Field(False)
     tier: str = Field("free", description="Pricing tier: free, pro, enterprise")
+    include_timings: bool = Field(False, description="Include a per-span timing breakdown in the response")
     
     @field_validator('claim')
     @classmethod
@@ -2475,6 +2669,59 @@ class BatchRequest(BaseModel):
 
 security = HTTPBearer(auto_error=False)
 
+# Verified JWTs are kept until they expire; API-key records in L1 (+ Redis when shared)
+token_cache = TokenCache()
+password_hasher = PasswordHasher(workers=Config.BCRYPT_WORKERS, max_pending=Config.BCRYPT_MAX_PENDING)
+
+
+async def _load_api_key(api_key: str) -> Optional[Dict]:
+    """Source of truth for API keys (the configured key list)."""
+    if api_key not in Config.API_KEYS:
+        return None
+    return {"key_id": hash_api_key(api_key)[:12]}
+
+api_key_cache = ApiKeyCache(_load_api_key, shared=create_shared_key_cache(Config.API_KEY_CACHE_SHARED))
+
+
+async def resolve_principal(request: Request) -> Optional[Dict]:
+    """
+    The caller of this request - a signed-in user (JWT) or an API key -
+    resolved once and kept on ``request.state``; None when anonymous or
+    the credentials are invalid. A Bearer value that is not a valid JWT
+    is tried as an API key, as is a bare ``Authorization: <key>``.
+    """
+    if hasattr(request.state, "principal"):
+        return request.state.principal
+    principal = None
+    authorization = request.headers.get("Authorization", "")
+    api_key = request.headers.get("X-API-Key")
+    if authorization.startswith("Bearer "):
+        token = authorization[len("Bearer "):]
+        payload = UserAuth.verify_token(token)
+        if payload:
+            principal = {"kind": "user", "user_id": payload["user_id"], "email": payload["email"],
+                         "tier": payload.get("tier", "free")}
+        elif not api_key:
+            api_key = token
+    elif authorization and not api_key:
+        api_key = authorization.strip()
+    if principal is None and api_key:
+        record = await api_key_cache.lookup(api_key)
+        if record:
+            principal = {"kind": "api_key", **record}
+    request.state.principal = principal
+    return principal
+
+
+def require_user(request: Request, principal: Optional[Dict]) -> Dict:
+    """The signed-in user, or 401."""
+    if principal and principal["kind"] == "user":
+        return principal
+    if not request.headers.get("Authorization", "").startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
+    raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+
 async def verify_api_key(
     request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(security)
@@ -2483,13 +2730,11 @@ async def verify_api_key(
     if not Config.REQUIRE_API_KEY:
         return True
     
-    # Check header
-    api_key = request.headers.get("X-API-Key") or request.headers.get("Authorization", "").replace("Bearer ", "")
-    
-    if not api_key:
+    if not (request.headers.get("X-API-Key") or request.headers.get("Authorization")):
         raise HTTPException(status_code=401, detail="API key required")
     
-    if api_key not in Config.API_KEYS:
+    principal = await resolve_principal(request)
+    if not principal or principal["kind"] != "api_key":
         raise HTTPException(status_code=403, detail="Invalid API key")
     
     return True
@@ -2507,8 +2752,50 @@ async def lifespan(app: FastAPI):
     providers = get_available_providers()
     logger.info(f"[PROVIDERS] {len(providers)} available: {providers}")
     
+    # Keep breakers in step with other workers when breaker state is shared
+    breaker_sync = None
+    if provider_health.state_store.shared:
+        breaker_sync = asyncio.create_task(provider_health.run_sync_loop(providers))
+        logger.info("[BREAKER] Sharing circuit breaker state via Redis")
+    
+    # Event-loop lag heartbeat + blocking-call watchdog
+    if Config.LOOP_MONITOR_ENABLED:
+        loop_monitor.register_routes(app)
+        loop_monitor.start()
+    
+    # Export sampled request traces (OTLP/JSON) in the background
+    trace_export = None
+    if tracing.tracer.exporting:
+        trace_export = asyncio.create_task(tracing.tracer.run_export_loop())
+    
+    # Synthetic probes (model listings) run on their own long-lived client
+    probe_client = None
+    if Config.PROBE_ENABLED and providers:
+        probe_client = httpx.AsyncClient(timeout=15)
+        provider_prober.start(build_model_list_probes(probe_client, providers), models=LATEST_MODELS)
+    
+    # Apply queued Stripe webhook events in the background
+    stripe_worker = None
+    if os.getenv("STRIPE_WEBHOOK_SECRET"):
+        stripe_worker = asyncio.create_task(stripe_processor.run())
+    
     yield
     
+    if stripe_worker:
+        stripe_worker.cancel()
+    await stripe_queue.close()
+    batch_engine.shutdown()
+    image_forensics.shutdown()
+    password_hasher.shutdown()
+    await user_store.close()
+    provider_prober.stop()
+    loop_monitor.stop()
+    if trace_export:
+        trace_export.cancel()
+    if probe_client:
+        await probe_client.aclose()
+    if breaker_sync:
+        breaker_sync.cancel()
     logger.info("[STOP] Shutting down")
 
 app = FastAPI(
@@ -2533,32 +2820,62 @@ app.add_middleware(
 # MIDDLEWARE
 # =============================================================================
 
-@app.middleware("http")
-async def rate_limit_middleware(request: Request, call_next):
-    client_ip = request.client.host if request.client else "unknown"
-    api_key = request.headers.get("X-API-Key", "")
-    identifier = api_key if api_key else client_ip
-    
-    if request.url.path in ["/health", "/", "/docs", "/openapi.json", "/tools/simulate"]:
-        return await call_next(request)
-    
-    allowed, rate_info = rate_limiter.is_allowed(identifier)
-    
-    if not allowed:
-        return JSONResponse(
-            status_code=429,
-            content={"error": "Rate limit exceeded", "retry_after": rate_info["reset"]},
-            headers={
-                "X-RateLimit-Limit": str(rate_info["limit"]),
-                "X-RateLimit-Remaining": "0",
-                "Retry-After": str(rate_info["reset"])
-            }
-        )
+class RateLimitMiddleware:
+    """
+    Per-client rate limit (API key, else client IP) as pure ASGI middleware,
+    so request bodies and streamed responses pass through untouched.
+    """
+    
+    # Stripe webhooks are signed and arrive in bursts from a few IPs; a 429 would only make Stripe retry
+    EXEMPT_PATHS = ("/health", "/", "/docs", "/openapi.json", "/tools/simulate", "/metrics", "/stripe/webhook")
     
-    response = await call_next(request)
-    response.headers["X-RateLimit-Limit"] = str(rate_info["limit"])
-    response.headers["X-RateLimit-Remaining"] = str(rate_info["remaining"])
-    return response
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        client_ip = request.client.host if request.client else "unknown"
+        api_key = request.headers.get("X-API-Key", "")
+        identifier = api_key if api_key else client_ip
+        # Outbound provider calls made for this request are scheduled as this tenant's interactive work
+        provider_scheduler.begin_work(tenant=identifier)
+        
+        if scope["path"] in self.EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        allowed, rate_info = rate_limiter.is_allowed(identifier)
+        
+        if not allowed:
+            metrics.record_rate_limited("api")
+            response = JSONResponse(
+                status_code=429,
+                content={"error": "Rate limit exceeded", "retry_after": rate_info["reset"]},
+                headers={
+                    "X-RateLimit-Limit": str(rate_info["limit"]),
+                    "X-RateLimit-Remaining": "0",
+                    "Retry-After": str(rate_info["reset"])
+                }
+            )
+            await response(scope, receive, send)
+            return
+        
+        async def send_with_limits(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(rate_info["limit"])
+                headers["X-RateLimit-Remaining"] = str(rate_info["remaining"])
+            await send(message)
+        
+        await self.app(scope, receive, send_with_limits)
+
+
+app.add_middleware(RateLimitMiddleware)
+# Outermost: request latency/count per route template and tier
+app.add_middleware(metrics.MetricsMiddleware)
 
 
 # =============================================================================
@@ -2567,22 +2884,8 @@ async def rate_limit_middleware(request: Request, call_next):
 
 @app.get('/metrics')
 async def prometheus_metrics():
-    """Expose lightweight Prometheus-style metrics: provider_health, cache stats"""
-    health = provider_health.get_status()
-    lines = []
-    # provider up/down (1 healthy 0 cooldown)
-    for provider, failures in health.get('failures', {}).items():
-        is_cooldown = 1 if provider in health.get('in_cooldown', []) else 0
-        lines.append(f"verity_provider_in_cooldown{{provider=\"{provider}\"}} {is_cooldown}")
-        lines.append(f"verity_provider_failures{{provider=\"{provider}\"}} {failures}")
-    # Cache stats
-    try:
-        cache_stats = {"size": getattr(claim_cache, 'hits', 0), "misses": getattr(claim_cache, 'misses', 0)}
-    except Exception:
-        cache_stats = {"size": 0, "misses": 0}
-    lines.append(f"verity_cache_hits {cache_stats.get('hits', 0)}")
-    lines.append(f"verity_cache_misses {cache_stats.get('misses', 0)}")
-    return PlainTextResponse('\n'.join(lines), media_type='text/plain')
+    """Prometheus metrics: request/phase/provider latency, cache, rate limits, quota, breakers"""
+    return PlainTextResponse(metrics.registry.render(owner=__name__), media_type=metrics.CONTENT_TYPE_LATEST)
 
 
 @app.get("/")
@@ -2602,7 +2905,7 @@ async def root():
             "/providers": "GET - List providers",
             "/tools/provider-health-logs": "GET - Tail provider health log",
             "/tools/test-runs": "GET - Recent internal test runs",
-            "/metrics": "GET - Prometheus metrics (basic)"
+            "/metrics": "GET - Prometheus metrics"
         }
     }
 
@@ -2643,7 +2946,8 @@ async def list_providers():
                 "model": model, 
                 "status": status,
                 "healthy": is_healthy,
-                "failures": failures
+                "failures": failures,
+                "probe": provider_prober.provider_summary(name)
             })
         else:
             unavailable.append({"name": name, "model": model, "status": "no_api_key"})
@@ -2756,7 +3060,7 @@ async def github_artifacts(request: Request):
 
 
 @app.post("/verify")
-async def verify_claim_endpoint(request: ClaimRequest):
+async def verify_claim_endpoint(request: ClaimRequest, principal: Optional[Dict] = Depends(resolve_principal)):
     """
     Verify a claim using multiple AI providers with cross-validation.
     
@@ -2771,6 +3075,21 @@ async def verify_claim_endpoint(request: ClaimRequest):
     - Rate limiting per provider
     - Cross-validation with consensus scoring
     """
+    with tracing.start_trace("verify", record=request.include_timings, tier=request.tier) as root:
+        response = await _verify_claim(request)
+        if request.include_timings:
+            response["timings"] = root.timings()
+        if principal and principal["kind"] == "user":
+            try:
+                await user_store.increment_verifications(principal["user_id"])
+            except Exception as e:
+                # The verification is done; a missed usage count must not turn it into a 500
+                logger.error(f"[USERS] Could not count verification for user {principal['user_id']}: {e}")
+        return response
+
+
+async def _verify_claim(request: ClaimRequest) -> Dict:
+    """Body of /verify; runs inside the request's root trace span."""
     start_time = time.time()
     request_id = f"ver_{int(time.time())}_{secrets.randbelow(10000)}"
     
@@ -2783,9 +3102,13 @@ async def verify_claim_endpoint(request: ClaimRequest):
         # Don't block, but log and proceed with sanitized input
     
     logger.info(f"[{request_id}] Verifying ({request.tier} tier): {claim[:50]}...")
+    metrics.tag_request(tier=request.tier)
+    provider_scheduler.tag_work(tier=request.tier)
     
     # Check cache first
-    cached_result = claim_cache.get(claim, request.tier)
+    with tracing.span("cache.lookup", layer="claim") as cache_span:
+        cached_result = claim_cache.get(claim, request.tier)
+        cache_span.set_outcome("hit" if cached_result else "miss")
     if cached_result:
         processing_time = time.time() - start_time
         return {
@@ -2840,115 +3163,179 @@ async def verify_claim_endpoint(request: ClaimRequest):
 
 
 @app.post("/v3/verify")
-async def verify_claim_v3(request: ClaimRequest):
+async def verify_claim_v3(request: ClaimRequest, principal: Optional[Dict] = Depends(resolve_principal)):
     """V3 API: Verify a claim"""
-    return await verify_claim_endpoint(request)
+    return await verify_claim_endpoint(request, principal)
 
 
 # =============================================================================
 # BATCH VERIFICATION ENDPOINT
 # =============================================================================
 
+VERIFICATION_TIERS = ("free", "pro", "enterprise")
+# Account plan -> verification depth for routes that take the tier from the caller
+PLAN_VERIFICATION_TIERS = {"free": "free", "starter": "pro", "pro": "pro", "professional": "pro",
+                           "business": "enterprise", "business_plus": "enterprise", "enterprise": "enterprise"}
+
+
+async def caller_tier(principal: Dict) -> str:
+    """Verification tier the caller is entitled to (issued API keys: enterprise)"""
+    if principal["kind"] != "user":
+        return "enterprise"
+    user = await user_store.get(principal["email"])
+    return PLAN_VERIFICATION_TIERS.get((user or principal)["tier"], "free")
+
+
+async def request_tier(principal: Optional[Dict], requested: Optional[str]) -> str:
+    """The caller's tier (free when anonymous); ``requested`` may only lower it."""
+    entitled = await caller_tier(principal) if principal else "free"
+    requested = (requested or "").lower()
+    if requested in VERIFICATION_TIERS and VERIFICATION_TIERS.index(requested) < VERIFICATION_TIERS.index(entitled):
+        entitled = requested
+    return entitled
+
+
 class BatchVerifyRequest(BaseModel):
     claims: List[str] = Field(..., min_items=1, max_items=50)
-    tier: str = Field("enterprise")
-    
-    @field_validator('tier')
-    @classmethod
-    def validate_tier(cls, v):
-        valid_tiers = ["free", "pro", "enterprise"]
-        if v.lower() not in valid_tiers:
-            return "enterprise"
-        return v.lower()
+    # May only lower the caller's tier (see request_tier)
+    tier: Optional[str] = Field(None)
+    # Send several claims per provider request (far fewer calls for bulk batches)
+    pack: bool = Field(False)
+    # Verify exact/near-duplicate claims once and share the result
+    dedup: bool = Field(True)
+
+
+# Background engine shared by the batch routes and /v3/jobs
+batch_engine = BatchJobEngine(
+    session_factory=lambda: AIProviders(),
+    cache=claim_cache,
+    concurrency=Config.BATCH_CONCURRENCY,
+    max_active_jobs=Config.BATCH_MAX_ACTIVE_JOBS,
+    ttl=Config.BATCH_JOB_TTL,
+    store=create_job_store(Config.BATCH_JOB_STORE),
+    pack_group=Config.BATCH_PACK_GROUP
+)
+
+
+def _submit_batch(claims: List[str], tier: str, **kwargs):
+    try:
+        return batch_engine.submit([sanitize_claim(c) for c in claims], tier=tier, **kwargs)
+    except RuntimeError as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 
 @app.post("/v3/batch-verify")
-async def batch_verify(request: BatchVerifyRequest):
+async def batch_verify(request: BatchVerifyRequest, principal: Optional[Dict] = Depends(resolve_principal)):
     """
-    Verify up to 50 claims in parallel.
+    Verify up to 50 claims in parallel, at the caller's tier (`tier` may only lower it).
     
-    Enterprise feature for bulk fact-checking.
+    Enterprise feature for bulk fact-checking. Waits for the whole batch;
+    use /v3/jobs to get a job_id back immediately and poll or stream progress.
     """
-    start_time = time.time()
-    job_id = f"batch_{int(time.time())}_{secrets.randbelow(10000)}"
-    
-    logger.info(f"[{job_id}] Batch verification: {len(request.claims)} claims ({request.tier} tier)")
-    
-    results = []
-    
-    async with AIProviders() as providers:
-        # Process claims in parallel (max 10 at a time to avoid overwhelming)
-        batch_size = 10
-        
-        for i in range(0, len(request.claims), batch_size):
-            batch = request.claims[i:i + batch_size]
-            
-            # Sanitize all claims
-            sanitized_batch = [sanitize_claim(c) for c in batch]
-            
-            # Check cache first for each claim
-            tasks = []
-            task_indices = []
-            cached_results = {}
-            
-            for j, claim in enumerate(sanitized_batch):
-                cached = claim_cache.get(claim, request.tier)
-                if cached:
-                    cached_results[i + j] = {
-                        "claim": claim,
-                        "result": cached,
-                        "cached": True
-                    }
-                else:
-                    tasks.append(providers.verify_claim(claim, tier=request.tier))
-                    task_indices.append((i + j, claim))
-            
-            # Run non-cached verifications
-            if tasks:
-                responses = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                for k, response in enumerate(responses):
-                    idx, claim = task_indices[k]
-                    if isinstance(response, Exception):
-                        cached_results[idx] = {
-                            "claim": claim,
-                            "result": {"verdict": "error", "confidence": 0, "explanation": str(response)},
-                            "cached": False
-                        }
-                    else:
-                        # Cache successful results
-                        claim_cache.set(claim, request.tier, response)
-                        cached_results[idx] = {
-                            "claim": claim,
-                            "result": response,
-                            "cached": False
-                        }
-            
-            # Collect results in order
-            for j in range(len(batch)):
-                results.append(cached_results.get(i + j))
-    
-    processing_time = time.time() - start_time
-    
-    # Summary statistics
-    verdicts = {}
-    for r in results:
-        v = r["result"].get("verdict", "unknown")
-        verdicts[v] = verdicts.get(v, 0) + 1
-    
+    tier = await request_tier(principal, request.tier)
+    metrics.tag_request(tier=tier)
+    job = _submit_batch(request.claims, tier, options={"pack": request.pack, "dedup": request.dedup})
+    await job.wait()
+    return job.summary()
+
+
+@app.post("/v3/bulk-verify")
+async def bulk_verify(request: Request, tier: Optional[str] = None,
+                      principal: Optional[Dict] = Depends(resolve_principal)):
+    """
+    Stream-verify any number of claims.
+    
+    Requires an API key or a signed-in user; claims are verified at the
+    caller's tier (`tier` may only lower it).
+    Request body: NDJSON, one claim per line ({"claim": "..."} or a JSON string).
+    Response: NDJSON, one line per input line in completion order with its
+    input `index` (duplicates carry `duplicate_of`), then a `summary` line.
+    The body is read only as fast as claims are verified.
+    """
+    if principal is None:
+        raise HTTPException(status_code=401, detail="API key or sign-in required")
+    entitled = await request_tier(principal, tier)
+    metrics.tag_request(tier=entitled)
+    
+    return NDJSONStream(
+        lambda body: batch_engine.stream_ndjson(body, tier=entitled, concurrency=Config.BATCH_CONCURRENCY,
+                                                prepare=sanitize_claim),
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/v3/jobs", status_code=202)
+async def create_batch_job(request: BatchVerifyRequest, principal: Optional[Dict] = Depends(resolve_principal)):
+    """Start an async batch job. Poll /v3/jobs/{job_id} or stream /v3/jobs/{job_id}/events."""
+    tier = await request_tier(principal, request.tier)
+    metrics.tag_request(tier=tier)
+    job = _submit_batch(request.claims, tier, options={"pack": request.pack, "dedup": request.dedup})
     return {
-        "job_id": job_id,
-        "total_claims": len(request.claims),
-        "successful": sum(1 for r in results if r["result"].get("verdict") != "error"),
-        "cached": sum(1 for r in results if r.get("cached")),
-        "tier": request.tier,
-        "verdict_summary": verdicts,
-        "results": results,
-        "processing_time_ms": round(processing_time * 1000, 2),
-        "timestamp": datetime.utcnow().isoformat()
+        "job_id": job.job_id,
+        "status": job.status,
+        "total_claims": job.total,
+        "status_url": f"/v3/jobs/{job.job_id}",
+        "results_url": f"/v3/jobs/{job.job_id}/results",
+        "events_url": f"/v3/jobs/{job.job_id}/events"
     }
 
 
+@app.get("/v3/jobs/{job_id}")
+async def get_batch_job(job_id: str, include_results: bool = False):
+    """Job status and progress (and the results so far when include_results=true)."""
+    job = batch_engine.get(job_id)
+    if job:
+        return job.summary(include_results=include_results)
+    record = await batch_engine.get_record(job_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    if not include_results:
+        record.pop("results", None)
+    record.pop("completion_order", None)
+    return record
+
+
+@app.get("/v3/jobs/{job_id}/results")
+async def get_batch_job_results(job_id: str, after: int = 0, limit: int = 100):
+    """Results completed after the `after` cursor, in completion order."""
+    job = batch_engine.get(job_id)
+    if job is None:
+        record = await batch_engine.get_record(job_id)
+        if not record:
+            raise HTTPException(status_code=404, detail="Job not found or expired")
+        by_index = {r["index"]: r for r in record.get("results", [])}
+        order = record.get("completion_order", [])[after:after + limit]
+        results = [{"seq": after + i + 1, **by_index[idx]} for i, idx in enumerate(order) if idx in by_index]
+        return {"job_id": job_id, "status": record["status"], "results": results,
+                "next_cursor": after + len(order), "progress": record["progress"]}
+    results, cursor = job.results_after(after, min(max(limit, 1), 500))
+    return {"job_id": job_id, "status": job.status, "results": results,
+            "next_cursor": cursor, "progress": job.progress()}
+
+
+@app.get("/v3/jobs/{job_id}/events")
+async def stream_batch_job(job_id: str):
+    """Server-Sent Events: progress, result (one per claim) and done."""
+    job = batch_engine.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found on this worker or expired")
+    
+    async def event_stream():
+        async for event, data in batch_engine.events(job):
+            yield format_sse(event, data)
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.delete("/v3/jobs/{job_id}")
+async def cancel_batch_job(job_id: str):
+    """Cancel a running job; results completed so far stay retrievable."""
+    if batch_engine.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return {"job_id": job_id, "cancelled": batch_engine.cancel(job_id)}
+
+
 # =============================================================================
 # DEEP HEALTH CHECK & DIAGNOSTICS
 # =============================================================================
@@ -2956,91 +3343,20 @@ async def batch_verify(request: BatchVerifyRequest):
 @app.get("/health/deep")
 async def deep_health_check():
     """
-    Comprehensive health check that tests all providers.
+    Comprehensive provider health from the background prober.
     
-    Returns status, latency, and availability for each provider.
+    Returns status, latency and error classes for each provider as of its
+    latest synthetic probe; no provider is called while serving this request.
     """
     start_time = time.time()
-    test_claim = "The sky is blue"
-    
-    results = {}
-    
-    async with AIProviders() as providers:
-        provider_functions = {
-            "groq": providers.verify_with_groq,
-            "perplexity": providers.verify_with_perplexity,
-            "google": providers.verify_with_google,
-            "openai": providers.verify_with_openai,
-            "mistral": providers.verify_with_mistral,
-            "cohere": providers.verify_with_cohere,
-            "cerebras": providers.verify_with_cerebras,
-            "sambanova": providers.verify_with_sambanova,
-            "fireworks": providers.verify_with_fireworks,
-            "openrouter": providers.verify_with_openrouter,
-            "huggingface": providers.verify_with_huggingface,
-            "you": providers.verify_with_you,
-            "jina": providers.verify_with_jina,
-        }
-        
-        tasks = []
-        provider_names = []
-        
-        for name in providers.available_providers:
-            if name in provider_functions:
-                tasks.append(provider_functions[name](test_claim))
-                provider_names.append(name)
-        
-        # Run all health checks in parallel with timeout
-        if tasks:
-            start_checks = time.time()
-            responses = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            for i, response in enumerate(responses):
-                name = provider_names[i]
-                latency = (time.time() - start_checks) * 1000
-                
-                if isinstance(response, Exception):
-                    results[name] = {
-                        "status": "error",
-                        "error": str(response)[:100],
-                        "latency_ms": round(latency, 2)
-                    }
-                elif response and response.get("success"):
-                    results[name] = {
-                        "status": "healthy",
-                        "model": response.get("model", "unknown"),
-                        "latency_ms": round(latency, 2)
-                    }
-                else:
-                    results[name] = {
-                        "status": "degraded",
-                        "status_code": response.get("status_code") if response else None,
-                        "latency_ms": round(latency, 2)
-                    }
-    
-    # Calculate overall status
-    healthy_count = sum(1 for r in results.values() if r.get("status") == "healthy")
-    total_count = len(results)
-    
-    if healthy_count >= total_count * 0.7:
-        overall = "healthy"
-    elif healthy_count >= total_count * 0.3:
-        overall = "degraded"
-    else:
-        overall = "critical"
-    
-    processing_time = time.time() - start_time
+    snapshot = provider_prober.snapshot()
     
     return {
-        "overall_status": overall,
-        "healthy_providers": healthy_count,
-        "total_providers": total_count,
-        "health_percentage": round(healthy_count / total_count * 100, 1) if total_count > 0 else 0,
-        "providers": results,
+        **snapshot,
         "cache_stats": claim_cache.get_stats(),
         "rate_limit_stats": provider_rate_limiter.get_stats(),
         "provider_health": provider_health.get_status(),
-        "check_time_ms": round(processing_time * 1000, 2),
+        "check_time_ms": round((time.time() - start_time) * 1000, 3),
         "timestamp": datetime.utcnow().isoformat()
     }
 
@@ -3054,7 +3370,7 @@ async def get_stats():
         "provider_health": provider_health.get_status(),
         "available_providers": get_available_providers(),
         "available_search_apis": get_available_search_apis(),
-        "source_credibility_count": len(SOURCE_CREDIBILITY),
+        "source_credibility_count": domain_index.size,
         "claim_categories": list(CLAIM_CATEGORIES.keys()),
         "timestamp": datetime.utcnow().isoformat()
     }
@@ -3064,27 +3380,12 @@ async def get_stats():
 # ENTERPRISE TOOL ENDPOINTS
 # =============================================================================
 
-# Known credible sources database
-CREDIBLE_SOURCES = {
-    "reuters": {"tier": 1, "rating": "Highly Credible"},
-    "ap": {"tier": 1, "rating": "Highly Credible"},
-    "bbc": {"tier": 1, "rating": "Highly Credible"},
-    "nytimes": {"tier": 1, "rating": "Highly Credible"},
-    "washingtonpost": {"tier": 1, "rating": "Highly Credible"},
-    "theguardian": {"tier": 1, "rating": "Highly Credible"},
-    "economist": {"tier": 1, "rating": "Highly Credible"},
-    "nature": {"tier": 1, "rating": "Highly Credible"},
-    "science": {"tier": 1, "rating": "Highly Credible"},
-    "cnn": {"tier": 2, "rating": "Generally Credible"},
-    "foxnews": {"tier": 2, "rating": "Generally Credible - Check for bias"},
-    "msnbc": {"tier": 2, "rating": "Generally Credible - Check for bias"},
-    "npr": {"tier": 1, "rating": "Highly Credible"},
-    "pbs": {"tier": 1, "rating": "Highly Credible"},
-    "wikipedia": {"tier": 2, "rating": "Good starting point - Verify sources"},
-    "snopes": {"tier": 1, "rating": "Highly Credible for fact-checking"},
-    "factcheck": {"tier": 1, "rating": "Highly Credible for fact-checking"},
-    "politifact": {"tier": 1, "rating": "Highly Credible for fact-checking"},
-}
+# /tools/source-credibility rating bands: (minimum credibility, tier, rating)
+CREDIBILITY_BANDS = [
+    (0.85, 1, "Highly Credible"),
+    (0.65, 2, "Generally Credible - Check for bias"),
+    (0.0, 3, "Low Credibility - Verify independently"),
+]
 
 
 @app.post("/tools/social-media")
@@ -3140,12 +3441,16 @@ async def analyze_social_media(request: ToolRequest):
 @app.post("/tools/source-credibility")
 async def check_source_credibility(request: ToolRequest):
     """Check the credibility of news sources"""
-    content = request.content.lower()
     sources_found = []
     
-    for source, info in CREDIBLE_SOURCES.items():
-        if source in content:
-            sources_found.append({"name": source, **info})
+    # Sources mentioned by URL, domain or bare name ("reuters")
+    for name, rating in domain_index.find_in_text(request.content):
+        credibility = rating.credibility if rating.credibility is not None else rating.authority_score
+        if credibility is None:
+            continue
+        tier, label = next((t, r) for floor, t, r in CREDIBILITY_BANDS if credibility >= floor)
+        sources_found.append({"name": name, "domain": rating.domain, "credibility": credibility,
+                              "tier": tier, "rating": label})
     
     if sources_found:
         avg_tier = sum(s["tier"] for s in sources_found) / len(sources_found)
@@ -3193,6 +3498,7 @@ async def tools_simulate(request: Request):
         # rate-limit per-sim-key
         allowed, info = simulate_key_limiter.is_allowed(provided_sim_key)
         if not allowed:
+            metrics.record_rate_limited("simulate_key")
             return JSONResponse(status_code=429, content={"error": "Simulation key rate limit exceeded", "info": info})
     else:
         if not Config.DEBUG:
@@ -3242,9 +3548,7 @@ async def tools_simulate(request: Request):
 
     if action == "provider_recover":
         provider = body.get("provider")
-        provider_health.record_success(provider)
-        provider_health.failures.pop(provider, None)
-        provider_health.cooldown_until.pop(provider, None)
+        provider_health.reset(provider)
         return {"status": "ok", "message": f"Recovered {provider}"}
 
     if action == "set_rate_limit":
@@ -3263,6 +3567,24 @@ async def tools_simulate(request: Request):
     raise HTTPException(status_code=400, detail="Unknown simulation action")
 
 
+@app.get("/debug/loop")
+async def debug_event_loop(request: Request, stacks: bool = True, top: int = 10):
+    """Event-loop lag and the top blocking offenders (debug-only or with SIMULATE_KEY)"""
+    if Config.SIMULATE_ALLOWED_IPS:
+        client_ip = request.client.host if request.client else None
+        if client_ip not in Config.SIMULATE_ALLOWED_IPS:
+            raise HTTPException(status_code=403, detail="Client IP not allowed to use debug endpoints")
+
+    provided_sim_key = request.headers.get("X-SIM-KEY") or request.headers.get("X-Sim-Key")
+    if Config.SIMULATE_KEY is not None:
+        if provided_sim_key != Config.SIMULATE_KEY:
+            raise HTTPException(status_code=403, detail="Invalid or missing simulation key")
+    elif not Config.DEBUG:
+        raise HTTPException(status_code=403, detail="Debug endpoints require DEBUG mode or SIMULATE_KEY")
+
+    return loop_monitor.snapshot(include_stacks=stacks, top=max(1, min(top, 50)))
+
+
 @app.post("/tools/run-internal-tests")
 async def run_internal_tests(request: Request):
     """Run a small, safe subset of internal tests on demand (debug-only or with SIMULATE_KEY)
@@ -3378,40 +3700,65 @@ async def validate_statistics(request: ToolRequest):
     }
 
 
+# Decoding in worker processes; repeat submissions answered from the hash index
+image_forensics = ImageForensics(workers=int(os.getenv("IMAGE_WORKERS", 2)),
+                                 index=ImageIndex(int(os.getenv("IMAGE_INDEX_SIZE", 20000))))
+IMAGE_URL_PATTERN = re.compile(r'https?://[^\s<>"\']+')
+
+
 @app.post("/tools/image-forensics")
-async def analyze_image(request: ToolRequest):
-    """Analyze image for manipulation indicators"""
-    content = request.content.lower()
-    findings = []
-    score = 75  # Start optimistic
-    
-    # Check URL patterns
-    if "deepfake" in content:
-        findings.append({"type": "deepfake_mention", "severity": "high", "detail": "Content mentions deepfake"})
-        score -= 30
-    
-    if any(ext in content for ext in [".png", ".jpg", ".jpeg", ".gif", ".webp"]):
-        findings.append({"type": "analysis", "severity": "low", "detail": "No obvious manipulation detected. Recommend reverse image search."})
-    else:
-        findings.append({"type": "info", "severity": "low", "detail": "Provide image URL for detailed analysis"})
-    
-    if score >= 70:
-        verdict = "likely_authentic"
-        summary = "🟢 No obvious manipulation detected"
-    elif score >= 40:
-        verdict = "needs_review"
-        summary = "🟡 Image requires further analysis"
+async def analyze_image(request: Request):
+    """
+    Analyze an image for manipulation indicators: send it as the request
+    body (Content-Type: image/*) or send JSON {"content": ...} with a
+    data URL, base64 image or image URL. Metadata, error levels and
+    perceptual hashes are computed in worker processes (image_forensics.py);
+    images seen before are answered from the hash index.
+    """
+    start_time = time.time()
+    if request.headers.get("content-type", "").startswith("image/"):
+        chunks, size = [], 0
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > image_forensics.max_bytes:
+                raise HTTPException(status_code=413, detail=f"Image exceeds {image_forensics.max_bytes} bytes")
+            chunks.append(chunk)
+        data = b"".join(chunks)
     else:
-        verdict = "likely_manipulated"
-        summary = "🔴 Signs of potential manipulation"
+        try:
+            content = ToolRequest.model_validate(await request.json()).content
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        data = decode_image_input(content)
+        url = IMAGE_URL_PATTERN.search(content) if data is None else None
+        if url:
+            async with httpx.AsyncClient() as client:
+                try:
+                    data = await fetch_image(client, url.group(0), max_bytes=image_forensics.max_bytes)
+                except ImageError as e:
+                    raise HTTPException(status_code=422, detail=str(e))
+        if data is None:
+            return {
+                "tool": "Image Forensics",
+                "score": None,
+                "verdict": "no_image",
+                "summary": "Provide an image (upload, data URL, base64 or image URL) for analysis",
+                "findings": [{"type": "info", "severity": "low", "detail": "No image found in the request"}],
+                "processing_time_ms": round((time.time() - start_time) * 1000, 2)
+            }
     
+    with tracing.start_trace("image_forensics", bytes=len(data)) as span:
+        try:
+            result = await image_forensics.analyze(data)
+        except ImageError as e:
+            span.set_outcome("failed", ok=False)
+            raise HTTPException(status_code=422, detail=str(e))
+    logger.info(f"[IMAGE] {result['sha256'][:12]} {result['verdict']} "
+                f"(repeat: {result['repeat']['match'] if result['repeat'] else 'no'})")
     return {
         "tool": "Image Forensics",
-        "score": score,
-        "verdict": verdict,
-        "summary": summary,
-        "findings": findings,
-        "processing_time_ms": round(time.time() * 1000 % 1000, 2)
+        **result,
+        "processing_time_ms": round((time.time() - start_time) * 1000, 2)
     }
 
 
@@ -3478,16 +3825,13 @@ async def realtime_stream(request: ToolRequest):
 
 
 # =============================================================================
-# USER DATABASE (In-Memory - Replace with PostgreSQL in production)
+# USER DATABASE (SQLite locally, Postgres in production - see user_store.py)
 # =============================================================================
 
 import jwt
-import bcrypt
 from datetime import datetime, timedelta
 
-# In-memory user store (replace with database in production)
-USERS_DB: Dict[str, Dict] = {}
-SESSIONS_DB: Dict[str, Dict] = {}
+user_store = create_user_store(Config.USER_DB_URL)
 
 # JWT Configuration
 JWT_SECRET = os.getenv("JWT_SECRET", Config.SECRET_KEY)
@@ -3498,14 +3842,14 @@ class UserAuth:
     """User authentication and session management"""
     
     @staticmethod
-    def hash_password(password: str) -> str:
-        """Hash a password using bcrypt"""
-        return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    async def hash_password(password: str) -> str:
+        """Hash a password using bcrypt (on the bcrypt threads; raises AuthBusy when saturated)"""
+        return await password_hasher.hash(password)
     
     @staticmethod
-    def verify_password(password: str, hashed: str) -> bool:
-        """Verify a password against its hash"""
-        return bcrypt.checkpw(password.encode(), hashed.encode())
+    async def verify_password(password: str, hashed: str) -> bool:
+        """Verify a password against its hash (on the bcrypt threads; raises AuthBusy when saturated)"""
+        return await password_hasher.verify(password, hashed)
     
     @staticmethod
     def create_token(user_id: str, email: str, tier: str = "free") -> str:
@@ -3521,46 +3865,38 @@ class UserAuth:
     
     @staticmethod
     def verify_token(token: str) -> Optional[Dict]:
-        """Verify and decode a JWT token"""
+        """Verify and decode a JWT token (verified tokens are cached until they expire)"""
+        payload = token_cache.get(token)
+        if payload:
+            return payload
         try:
             payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-            return payload
         except jwt.ExpiredSignatureError:
             return None
         except jwt.InvalidTokenError:
             return None
+        token_cache.put(token, payload)
+        return payload
     
     @staticmethod
-    def register_user(email: str, password: str, name: str = "") -> Dict:
-        """Register a new user"""
-        if email in USERS_DB:
+    async def register_user(email: str, password: str, name: str = "") -> Dict:
+        """Register a new user (raises ValueError, incl. UserExists, if the email is taken)"""
+        if await user_store.get(email):
             raise ValueError("Email already registered")
         
-        user_id = secrets.token_hex(16)
-        USERS_DB[email] = {
-            "user_id": user_id,
-            "email": email,
-            "name": name,
-            "password_hash": UserAuth.hash_password(password),
-            "tier": "free",
-            "stripe_customer_id": None,
-            "stripe_subscription_id": None,
-            "verifications_used": 0,
-            "created_at": datetime.utcnow().isoformat(),
-            "last_login": None
-        }
-        return {"user_id": user_id, "email": email}
+        password_hash = await UserAuth.hash_password(password)
+        return await user_store.create(email, password_hash, name)
     
     @staticmethod
-    def login_user(email: str, password: str) -> Optional[Dict]:
+    async def login_user(email: str, password: str) -> Optional[Dict]:
         """Authenticate user and return token"""
-        user = USERS_DB.get(email)
+        user = await user_store.get(email)
         if not user:
             return None
-        if not UserAuth.verify_password(password, user["password_hash"]):
+        if not await UserAuth.verify_password(password, user["password_hash"]):
             return None
         
-        user["last_login"] = datetime.utcnow().isoformat()
+        await user_store.record_login(email)
         token = UserAuth.create_token(user["user_id"], email, user["tier"])
         return {
             "token": token,
@@ -3600,7 +3936,7 @@ class LoginRequest(BaseModel):
 async def register(request: RegisterRequest):
     """Register a new user"""
     try:
-        result = UserAuth.register_user(request.email, request.password, request.name)
+        result = await UserAuth.register_user(request.email, request.password, request.name)
         token = UserAuth.create_token(result["user_id"], request.email, "free")
         return {
             "success": True,
@@ -3611,27 +3947,26 @@ async def register(request: RegisterRequest):
         }
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except AuthBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
 @app.post("/auth/login")
 async def login(request: LoginRequest):
     """Login user and get JWT token"""
-    result = UserAuth.login_user(request.email, request.password)
+    try:
+        result = await UserAuth.login_user(request.email, request.password)
+    except AuthBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     if not result:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return {"success": True, **result}
 
 @app.get("/auth/me")
-async def get_current_user(authorization: Optional[str] = Header(None)):
+async def get_current_user(request: Request, principal: Optional[Dict] = Depends(resolve_principal)):
     """Get current user from JWT token"""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
-    
-    token = authorization.split(" ")[1]
-    payload = UserAuth.verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    payload = require_user(request, principal)
     
-    user = USERS_DB.get(payload["email"])
+    user = await user_store.get(payload["email"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -3665,13 +4000,25 @@ STRIPE_PRICES = {
     "enterprise": os.getenv("STRIPE_ENTERPRISE_PRICE_ID")
 }
 
+def stripe_customer_email(customer_id: str) -> Optional[str]:
+    """Email of a Stripe customer, or None if the customer was deleted or has none."""
+    customer = stripe.Customer.retrieve(customer_id)
+    if getattr(customer, "deleted", False):
+        return None
+    return getattr(customer, "email", None) or None
+
+# Webhook events are queued durably and applied by the worker started in lifespan()
+stripe_queue = StripeEventQueue(Config.STRIPE_EVENT_DB)
+stripe_processor = StripeEventProcessor(stripe_queue, user_store, STRIPE_PRICES,
+                                        retrieve_email=stripe_customer_email)
+
 class CheckoutRequest(BaseModel):
     tier: str
     success_url: str = "https://verity-systems.com/success"
     cancel_url: str = "https://verity-systems.com/pricing"
 
 @app.post("/stripe/create-checkout")
-async def create_checkout_session(request: CheckoutRequest, authorization: Optional[str] = Header(None)):
+async def create_checkout_session(request: CheckoutRequest, principal: Optional[Dict] = Depends(resolve_principal)):
     """Create Stripe checkout session for subscription"""
     if not Config.STRIPE_SECRET_KEY:
         raise HTTPException(status_code=503, detail="Stripe not configured")
@@ -3684,15 +4031,11 @@ async def create_checkout_session(request: CheckoutRequest, authorization: Optio
         raise HTTPException(status_code=503, detail=f"Price ID not configured for tier: {request.tier}")
     
     # Get user email if authenticated
-    customer_email = None
-    if authorization and authorization.startswith("Bearer "):
-        token = authorization.split(" ")[1]
-        payload = UserAuth.verify_token(token)
-        if payload:
-            customer_email = payload.get("email")
+    customer_email = principal["email"] if principal and principal["kind"] == "user" else None
     
     try:
-        session = stripe.checkout.Session.create(
+        session = await asyncio.to_thread(
+            stripe.checkout.Session.create,
             payment_method_types=["card"],
             line_items=[{"price": price_id, "quantity": 1}],
             mode="subscription",
@@ -3710,7 +4053,7 @@ async def create_checkout_session(request: CheckoutRequest, authorization: Optio
 
 @app.post("/stripe/webhook")
 async def stripe_webhook(request: Request):
-    """Handle Stripe webhooks"""
+    """Verify a Stripe webhook and queue it; stripe_processor applies it in the background"""
     payload = await request.body()
     sig_header = request.headers.get("stripe-signature")
     webhook_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
@@ -3720,49 +4063,19 @@ async def stripe_webhook(request: Request):
     
     try:
         event = stripe.Webhook.construct_event(payload, sig_header, webhook_secret)
-    except stripe.error.SignatureVerificationError:
+    except (stripe.error.SignatureVerificationError, ValueError):
         raise HTTPException(status_code=400, detail="Invalid signature")
     
-    # Handle subscription events
-    if event["type"] == "customer.subscription.created":
-        subscription = event["data"]["object"]
-        customer_id = subscription["customer"]
-        # Update user tier based on subscription
-        customer = stripe.Customer.retrieve(customer_id)
-        email = customer.get("email")
-        if email and email in USERS_DB:
-            # Determine tier from price
-            price_id = subscription["items"]["data"][0]["price"]["id"]
-            for tier, pid in STRIPE_PRICES.items():
-                if pid == price_id:
-                    USERS_DB[email]["tier"] = tier
-                    USERS_DB[email]["stripe_customer_id"] = customer_id
-                    USERS_DB[email]["stripe_subscription_id"] = subscription["id"]
-                    break
-    
-    elif event["type"] == "customer.subscription.deleted":
-        subscription = event["data"]["object"]
-        customer_id = subscription["customer"]
-        customer = stripe.Customer.retrieve(customer_id)
-        email = customer.get("email")
-        if email and email in USERS_DB:
-            USERS_DB[email]["tier"] = "free"
-            USERS_DB[email]["stripe_subscription_id"] = None
-    
-    return {"received": True}
+    # Acknowledge as soon as the event is stored; a redelivery is acknowledged again but not re-applied
+    queued = await stripe_queue.append(event["id"], event["type"], payload.decode("utf-8"))
+    return {"received": True, "duplicate": not queued}
 
 @app.get("/stripe/subscription")
-async def get_subscription(authorization: Optional[str] = Header(None)):
+async def get_subscription(request: Request, principal: Optional[Dict] = Depends(resolve_principal)):
     """Get user's current subscription"""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing authorization")
+    payload = require_user(request, principal)
     
-    token = authorization.split(" ")[1]
-    payload = UserAuth.verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-    user = USERS_DB.get(payload["email"])
+    user = await user_store.get(payload["email"])
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -3775,7 +4088,7 @@ async def get_subscription(authorization: Optional[str] = Header(None)):
         }
     
     try:
-        subscription = stripe.Subscription.retrieve(subscription_id)
+        subscription = await asyncio.to_thread(stripe.Subscription.retrieve, subscription_id)
         return {
             "tier": user["tier"],
             "status": subscription.status,
@@ -3786,22 +4099,17 @@ async def get_subscription(authorization: Optional[str] = Header(None)):
         return {"tier": user["tier"], "status": "error", "error": str(e)}
 
 @app.post("/stripe/cancel")
-async def cancel_subscription(authorization: Optional[str] = Header(None)):
+async def cancel_subscription(request: Request, principal: Optional[Dict] = Depends(resolve_principal)):
     """Cancel user's subscription"""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing authorization")
-    
-    token = authorization.split(" ")[1]
-    payload = UserAuth.verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    payload = require_user(request, principal)
     
-    user = USERS_DB.get(payload["email"])
+    user = await user_store.get(payload["email"])
     if not user or not user.get("stripe_subscription_id"):
         raise HTTPException(status_code=400, detail="No active subscription")
     
     try:
-        subscription = stripe.Subscription.modify(
+        subscription = await asyncio.to_thread(
+            stripe.Subscription.modify,
             user["stripe_subscription_id"],
             cancel_at_period_end=True
         )
@@ -3828,17 +4136,17 @@ async def get_stripe_config():
 
 @app.post("/v3/batch")
 async def batch_verify(request: BatchRequest):
-    """Batch verify multiple claims"""
+    """Batch verify multiple claims (one at a time, via the batch engine)"""
+    job = await batch_engine.run(request.claims, tier="free", concurrency=1, options={"use_cache": False})
     results = []
-    async with AIProviders() as providers:
-        for claim in request.claims:
-            result = await providers.verify_claim(claim)
-            results.append({
-                "claim": claim,
-                "verdict": result["verdict"],
-                "confidence": result["confidence"],
-                "providers_used": result["providers_used"]
-            })
+    for entry in job.summary()["results"]:
+        result = entry["result"]
+        results.append({
+            "claim": entry["claim"],
+            "verdict": result["verdict"],
+            "confidence": result["confidence"],
+            "providers_used": result.get("providers_used", [])
+        })
     
     return {"results": results, "total": len(results)}
 
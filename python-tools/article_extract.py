@@ -0,0 +1,410 @@
+"""
+Verity API - Main-Content (Readability) Extraction
+==================================================
+Pulls the article out of a web page: title, byline, publication date and
+body text, without navigation, cookie banners, share widgets or footers.
+
+- The page is parsed into a small DOM (stdlib ``html.parser``). Elements
+  whose class or id look like page furniture (``UNLIKELY_RE``), and are
+  not also marked as content (``MAYBE_RE``), are dropped with their
+  subtree, along with script, style, nav, aside and forms.
+- Scoring follows the readability algorithm. Every paragraph of 25+
+  characters scores 1 + its commas + one point per 100 characters (max 3).
+  Its parent gets the full score, its grandparent half and the next
+  ancestor a third. Candidates start from a tag and class/id weight and
+  are scaled by ``1 - link density``.
+- The best candidate is kept together with siblings that score close to it
+  or that are link-poor paragraphs.
+- Metadata comes from OpenGraph/article meta tags, JSON-LD, ``<time>``
+  and byline markup, with fallbacks to ``<title>``/``<h1>``.
+- ``ArticlePool`` runs extraction in a ``worker_pool.WorkerPool`` with a
+  timeout (a stuck page costs only its own worker) and a bound on queued
+  pages. Callers fall back to the streaming text path (html_extract.py)
+  when it returns None.
+
+``python benchmark_article_extract.py --corpus DIR`` compares both paths on
+saved pages.
+"""
+
+import asyncio
+import json
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+import prometheus_metrics as metrics
+from worker_pool import BrokenWorker, WorkerPool
+
+
+MIN_PARAGRAPH_CHARS = 25
+MIN_ARTICLE_CHARS = 250       # shorter results are treated as failures
+MAX_ARTICLE_CHARS = 10000
+SIBLING_SCORE_RATIO = 0.2
+ARTICLE_WORKERS = 2
+ARTICLE_TIMEOUT = 3.0
+MAX_QUEUED_PAGES = 8
+
+UNLIKELY_RE = re.compile(
+    r"-ad-|ad-break|agegate|banner|breadcrumb|combx|comment|community|consent|cookie|cover-wrap|disqus|"
+    r"extra|footer|gdpr|header|legends|menu|modal|newsletter|nav|pager|pagination|popup|promo|related|"
+    r"remark|replies|rss|share|shoutbox|sidebar|skyscraper|social|sponsor|subscribe|supplemental|"
+    r"tags|toolbar|widget", re.IGNORECASE)
+MAYBE_RE = re.compile(r"and|article|body|column|content|main|post|shadow|story|text", re.IGNORECASE)
+POSITIVE_RE = re.compile(r"article|body|content|entry|hentry|h-entry|main|page|post|text|blog|story",
+                         re.IGNORECASE)
+NEGATIVE_RE = re.compile(
+    r"-ad-|hidden|banner|combx|comment|contact|footer|footnote|gdpr|masthead|media|meta|outbrain|promo|"
+    r"related|scroll|share|shoutbox|sidebar|skyscraper|sponsor|shopping|tags|tool|widget|cookie|consent",
+    re.IGNORECASE)
+BYLINE_RE = re.compile(r"byline|author|writtenby|p-author", re.IGNORECASE)
+
+REMOVE_TAGS = frozenset("""
+script style noscript template svg canvas iframe object embed nav aside form button select input textarea
+footer link meta
+""".split())
+VOID_TAGS = frozenset("area base br col embed hr img input link meta param source track wbr".split())
+PARAGRAPH_TAGS = frozenset("p pre td blockquote li h2 h3 h4 dd".split())
+BLOCK_TAGS = frozenset("""
+p div br hr li ul ol dl dt dd h1 h2 h3 h4 h5 h6 tr table section article main blockquote pre figure figcaption
+header address
+""".split())
+TAG_WEIGHTS = {"div": 5, "article": 10, "main": 5, "section": 3, "pre": 3, "td": 3, "blockquote": 3,
+               "address": -3, "ol": -3, "ul": -3, "dl": -3, "dd": -3, "dt": -3, "li": -3,
+               "h1": -5, "h2": -5, "h3": -5, "h4": -5, "h5": -5, "h6": -5, "th": -5}
+_TITLE_SEPARATOR_RE = re.compile(r"\s+[|\-–—:»·]\s+")
+_BY_PREFIX_RE = re.compile(r"^\s*by\s+", re.IGNORECASE)
+
+ARTICLE_EXTRACTIONS = metrics.registry.counter(
+    "verity_article_extractions_total", "Main-content extractions by outcome", ("result",),
+    allowed={"result": ("article", "too_short", "busy", "timeout", "failed")})
+
+
+class Node:
+    __slots__ = ("tag", "attrs", "children", "parent", "score", "scored")
+
+    def __init__(self, tag: str, attrs: Dict[str, str], parent: Optional["Node"] = None):
+        self.tag = tag
+        self.attrs = attrs
+        self.children: List[Any] = []  # Node or str
+        self.parent = parent
+        self.score = 0.0
+        self.scored = False
+
+    @property
+    def class_id(self) -> str:
+        return f"{self.attrs.get('class', '')} {self.attrs.get('id', '')}"
+
+    def text(self) -> str:
+        parts: List[str] = []
+        self._text(parts)
+        return " ".join("".join(parts).split())
+
+    def _text(self, parts: List[str]):
+        for child in self.children:
+            if isinstance(child, str):
+                parts.append(child)
+            else:
+                if child.tag in BLOCK_TAGS:
+                    parts.append(" ")
+                child._text(parts)
+
+    def iter(self):
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed([c for c in node.children if isinstance(c, Node)]))
+
+    def link_density(self) -> float:
+        length = len(self.text())
+        if not length:
+            return 0.0
+        linked = sum(len(a.text()) for a in self.iter() if a.tag == "a")
+        return linked / length
+
+
+class _TreeBuilder(HTMLParser):
+    """Builds a ``Node`` tree, keeping page metadata from the head on the side."""
+
+    # elements closed implicitly when a sibling of the same kind starts
+    _AUTO_CLOSE = {"p": {"p", "div", "ul", "ol", "table", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre"},
+                   "li": {"li"}, "td": {"td", "th", "tr"}, "th": {"td", "th", "tr"}, "tr": {"tr"},
+                   "dt": {"dt", "dd"}, "dd": {"dt", "dd"}, "option": {"option"}}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#root", {})
+        self.current = self.root
+        self.meta: Dict[str, str] = {}
+        self.json_ld: List[str] = []
+        self.title = ""
+        self._skip: Optional[str] = None
+        self._skip_depth = 0
+        self._capture: Optional[str] = None
+        self._captured: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = {k: v or "" for k, v in attrs}
+        if tag == "meta":
+            key = (attrs.get("property") or attrs.get("name") or attrs.get("itemprop") or "").lower()
+            if key and attrs.get("content") and key not in self.meta:
+                self.meta[key] = attrs["content"].strip()
+            return
+        if self._skip:
+            if tag == self._skip:
+                self._skip_depth += 1
+            return
+        if tag == "title" and not self.title:
+            self._capture, self._captured = "title", []
+            return
+        if tag == "script" and "ld+json" in attrs.get("type", ""):
+            self._capture, self._captured = "json_ld", []
+            return
+        if tag in REMOVE_TAGS or (
+                tag not in ("body", "html", "article", "main")
+                and UNLIKELY_RE.search(f"{attrs.get('class', '')} {attrs.get('id', '')} {attrs.get('role', '')}")
+                and not MAYBE_RE.search(f"{attrs.get('class', '')} {attrs.get('id', '')}")):
+            if tag not in VOID_TAGS:
+                self._skip, self._skip_depth = tag, 1
+            return
+        closes = self._AUTO_CLOSE
+        while self.current is not self.root and self.current.tag in closes and tag in closes[self.current.tag]:
+            self.current = self.current.parent
+        node = Node(tag, attrs, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.current.tag == tag and not self._skip:
+            self.current = self.current.parent
+
+    def handle_endtag(self, tag):
+        if self._skip:
+            if tag == self._skip:
+                self._skip_depth -= 1
+                if not self._skip_depth:
+                    self._skip = None
+            return
+        if self._capture and tag in ("title", "script"):
+            text = "".join(self._captured)
+            if self._capture == "title":
+                self.title = " ".join(text.split())
+            else:
+                self.json_ld.append(text)
+            self._capture = None
+            return
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        if self._capture:
+            self._captured.append(data)
+        elif not self._skip:
+            self.current.children.append(data)
+
+
+def _class_weight(node: Node) -> int:
+    weight = 0
+    class_id = node.class_id
+    if class_id.strip():
+        if NEGATIVE_RE.search(class_id):
+            weight -= 25
+        if POSITIVE_RE.search(class_id):
+            weight += 25
+    return weight
+
+
+def _init_candidate(node: Node) -> bool:
+    """Give ``node`` its starting score; True the first time."""
+    if node.scored:
+        return False
+    node.scored = True
+    node.score = TAG_WEIGHTS.get(node.tag, 0) + _class_weight(node)
+    return True
+
+
+def _paragraphs(node: Node) -> List[str]:
+    """Block-level text of ``node`` as paragraphs."""
+    paragraphs: List[str] = []
+    current: List[str] = []
+
+    def flush():
+        text = " ".join("".join(current).split())
+        current.clear()
+        if text:
+            paragraphs.append(text)
+
+    def walk(n: Node):
+        for child in n.children:
+            if isinstance(child, str):
+                current.append(child)
+            elif child.tag in BLOCK_TAGS:
+                flush()
+                walk(child)
+                flush()
+            else:
+                walk(child)
+
+    walk(node)
+    flush()
+    return paragraphs
+
+
+def _find_body(root: Node) -> List[Node]:
+    """Top candidate plus related siblings."""
+    candidates: List[Node] = []
+    for node in root.iter():
+        if node.tag not in PARAGRAPH_TAGS and not (node.tag == "div" and not any(
+                isinstance(c, Node) and c.tag in BLOCK_TAGS for c in node.children)):
+            continue
+        text = node.text()
+        if len(text) < MIN_PARAGRAPH_CHARS:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        ancestor, level = node.parent, 0
+        while ancestor is not None and ancestor is not root and level < 3:
+            if _init_candidate(ancestor):
+                candidates.append(ancestor)
+            ancestor.score += score / (1, 2, 3)[level]
+            ancestor, level = ancestor.parent, level + 1
+    if not candidates:
+        return []
+    for candidate in candidates:
+        candidate.score *= 1 - candidate.link_density()
+    top = max(candidates, key=lambda c: c.score)
+    if top.score <= 0:
+        return []
+
+    parent = top.parent if top.parent is not None else root
+    threshold = max(10.0, top.score * SIBLING_SCORE_RATIO)
+    selected = []
+    for sibling in parent.children:
+        if not isinstance(sibling, Node):
+            continue
+        if sibling is top:
+            selected.append(sibling)
+            continue
+        bonus = top.score * 0.2 if sibling.class_id.strip() and sibling.class_id == top.class_id else 0
+        if sibling.scored and sibling.score + bonus >= threshold:
+            selected.append(sibling)
+        elif sibling.tag == "p":
+            text = sibling.text()
+            density = sibling.link_density()
+            if (len(text) > 80 and density < 0.25) or (0 < len(text) <= 80 and density == 0 and re.search(r"\.( |$)", text)):
+                selected.append(sibling)
+    return selected
+
+
+def _json_ld_field(blocks: List[str], *keys: str) -> Optional[str]:
+    for block in blocks:
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        items = data if isinstance(data, list) else data.get("@graph", [data]) if isinstance(data, dict) else []
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            for key in keys:
+                value = item.get(key)
+                if isinstance(value, list):
+                    value = value[0] if value else None
+                if isinstance(value, dict):
+                    value = value.get("name")
+                if isinstance(value, str) and value.strip():
+                    return value.strip()
+    return None
+
+
+def _clean_title(title: str, h1: Optional[str]) -> str:
+    if h1 and h1 in title:
+        return h1
+    parts = _TITLE_SEPARATOR_RE.split(title)
+    if len(parts) > 1 and len(parts[0].split()) >= 3:
+        return parts[0]
+    return title
+
+
+def extract_article(html: str, max_chars: int = MAX_ARTICLE_CHARS) -> Optional[Dict[str, Any]]:
+    """
+    ``{"title", "byline", "published", "text"}`` of the page's main article,
+    or None when no block of text looks like one (MIN_ARTICLE_CHARS).
+    """
+    builder = _TreeBuilder()
+    builder.feed(html)
+    builder.close()
+    root = builder.root
+    meta = builder.meta
+
+    h1 = next((n.text() for n in root.iter() if n.tag == "h1" and n.text()), None)
+    byline_node = next((n for n in root.iter()
+                        if (n.attrs.get("rel") == "author" or n.attrs.get("itemprop") == "author"
+                            or BYLINE_RE.search(n.class_id)) and 0 < len(n.text()) < 100), None)
+    time_node = next((n for n in root.iter() if n.tag == "time" and n.attrs.get("datetime")), None)
+
+    body = _find_body(root)
+    paragraphs = [p for node in body for p in _paragraphs(node)]
+    title = meta.get("og:title") or _json_ld_field(builder.json_ld, "headline")
+    if not title:
+        title = _clean_title(builder.title, h1) if builder.title else (h1 or "")
+    repeated = {title, h1, byline_node.text() if byline_node is not None else None}
+    text = "\n\n".join(p for p in paragraphs if p not in repeated)
+    if len(text) < MIN_ARTICLE_CHARS:
+        return None
+
+    byline = meta.get("author") or meta.get("article:author") or _json_ld_field(builder.json_ld, "author") or \
+        (byline_node.text() if byline_node is not None else None)
+    if byline:
+        byline = _BY_PREFIX_RE.sub("", byline).strip() or None
+    published = meta.get("article:published_time") or meta.get("datepublished") or meta.get("date") or \
+        _json_ld_field(builder.json_ld, "datePublished") or \
+        (time_node.attrs["datetime"] if time_node is not None else None)
+    return {"title": title or "", "byline": byline, "published": published, "text": text[:max_chars]}
+
+
+class ArticlePool:
+    """
+    Worker processes for ``extract_article``. At most ``max_queued`` pages
+    are waiting or running; beyond that, and on timeout or error, ``extract``
+    returns None so the caller uses its fallback.
+    """
+
+    def __init__(self, workers: int = ARTICLE_WORKERS, timeout: float = ARTICLE_TIMEOUT,
+                 max_queued: int = MAX_QUEUED_PAGES):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_queued = max_queued
+        self._queued = 0
+        self._pool = WorkerPool(self.workers, timeout)
+
+    async def extract(self, html: str) -> Optional[Dict[str, Any]]:
+        if self._queued >= self.max_queued:
+            ARTICLE_EXTRACTIONS.inc(result="busy")
+            return None
+        self._queued += 1
+        try:
+            article = await self._pool.run(extract_article, html, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            ARTICLE_EXTRACTIONS.inc(result="timeout")  # the pool has killed the stuck worker
+            return None
+        except BrokenWorker:
+            ARTICLE_EXTRACTIONS.inc(result="failed")
+            return None
+        except Exception:
+            ARTICLE_EXTRACTIONS.inc(result="failed")
+            return None
+        finally:
+            self._queued -= 1
+        ARTICLE_EXTRACTIONS.inc(result="article" if article else "too_short")
+        return article
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+__all__ = ['extract_article', 'ArticlePool', 'MIN_ARTICLE_CHARS']
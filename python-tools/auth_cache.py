@@ -0,0 +1,191 @@
+"""
+Verity API - Authentication Fast Path
+=====================================
+Keeps password hashing off the event loop and makes resolving the caller
+of a request cheap.
+
+- ``PasswordHasher`` runs bcrypt in a small thread pool (bcrypt releases
+  the GIL, so the loop keeps serving while a hash is computed). At most
+  ``max_pending`` hashes may be running or queued; beyond that ``AuthBusy``
+  is raised and the handler answers 503, so a login burst queues in front
+  of the auth endpoints instead of in front of everything else.
+- ``TokenCache`` is an LRU of verified JWT payloads, keyed by the token's
+  SHA-256 and held until the token's ``exp``. A signed token cannot change,
+  so a hit is exactly as good as re-verifying it.
+- ``ApiKeyCache`` holds API-key records in an in-process LRU (L1, with a
+  short negative TTL for unknown keys) in front of ``VerityCache`` in Redis
+  (L2, shared by workers) in front of the source of truth.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import bcrypt
+
+import prometheus_metrics as metrics
+
+
+BCRYPT_WORKERS = 2
+BCRYPT_MAX_PENDING = 32
+TOKEN_CACHE_SIZE = 10000
+API_KEY_CACHE_SIZE = 5000
+API_KEY_TTL = 300           # seconds a record is trusted in L1/L2
+API_KEY_NEGATIVE_TTL = 30   # seconds an unknown key is remembered in L1
+
+PASSWORD_HASHES = metrics.registry.counter(
+    "verity_password_hashes_total", "bcrypt hash/verify calls by outcome", ("op", "result"),
+    allowed={"op": ("hash", "verify"), "result": ("ok", "rejected")})
+
+
+class AuthBusy(RuntimeError):
+    """Too many password hashes in flight; retry shortly."""
+
+
+def hash_api_key(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode()).hexdigest()[:32]
+
+
+class PasswordHasher:
+    """bcrypt on a bounded thread pool with admission control."""
+
+    def __init__(self, workers: int = BCRYPT_WORKERS, max_pending: int = BCRYPT_MAX_PENDING, rounds: int = 12):
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, op: str, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            PASSWORD_HASHES.inc(op=op, result="rejected")
+            raise AuthBusy("Too many authentication requests, retry shortly")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="bcrypt")
+        self.pending += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+        PASSWORD_HASHES.inc(op=op, result="ok")
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", self._hash, password, self.rounds)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run("verify", self._verify, password, hashed)
+
+    @staticmethod
+    def _hash(password: str, rounds: int) -> str:
+        return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+    @staticmethod
+    def _verify(password: str, hashed: str) -> bool:
+        try:
+            return bcrypt.checkpw(password.encode(), hashed.encode())
+        except ValueError:  # malformed stored hash
+            return False
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class TokenCache:
+    """Verified JWT payloads by token hash, until each token's ``exp``."""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict]:
+        key = self._key(token)
+        entry = self.entries.get(key)
+        if entry and entry[1] > time.time():
+            self.entries.move_to_end(key)
+            metrics.record_cache("jwt", True)
+            return entry[0]
+        if entry:
+            del self.entries[key]
+        metrics.record_cache("jwt", False)
+        return None
+
+    def put(self, token: str, payload: Dict):
+        expires = payload.get("exp")
+        if not isinstance(expires, (int, float)) or expires <= time.time():
+            return
+        key = self._key(token)
+        self.entries[key] = (payload, float(expires))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+
+class ApiKeyCache:
+    """
+    API-key records: L1 (this process) -> L2 (``VerityCache``, optional) ->
+    ``load(api_key)``, the source of truth, which returns the record or None.
+    """
+
+    def __init__(self, load: Callable[[str], Awaitable[Optional[Dict]]], shared: Any = None,
+                 max_size: int = API_KEY_CACHE_SIZE, ttl: float = API_KEY_TTL,
+                 negative_ttl: float = API_KEY_NEGATIVE_TTL):
+        self.load = load
+        self.shared = shared
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.entries: "OrderedDict[str, Tuple[Optional[Dict], float]]" = OrderedDict()
+
+    async def lookup(self, api_key: str) -> Optional[Dict]:
+        key_hash = hash_api_key(api_key)
+        entry = self.entries.get(key_hash)
+        if entry and entry[1] > time.monotonic():
+            self.entries.move_to_end(key_hash)
+            metrics.record_cache("api_key", True)
+            return entry[0]
+        metrics.record_cache("api_key", False)
+        record = await self.shared.get_cached_api_key(key_hash) if self.shared else None
+        if record is None:
+            record = await self.load(api_key)
+            if record is not None and self.shared:
+                await self.shared.cache_api_key(key_hash, record, ttl=int(self.ttl))
+        self._remember(key_hash, record)
+        return record
+
+    def _remember(self, key_hash: str, record: Optional[Dict]):
+        self.entries[key_hash] = (record, time.monotonic() + (self.ttl if record is not None else self.negative_ttl))
+        self.entries.move_to_end(key_hash)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def invalidate(self, api_key: str):
+        key_hash = hash_api_key(api_key)
+        self.entries.pop(key_hash, None)
+        if self.shared:
+            await self.shared.invalidate_api_key(key_hash)
+
+
+def create_shared_key_cache(shared: bool = False):
+    """``VerityCache`` on Upstash when requested and configured, else None (L1 only)."""
+    if not shared:
+        return None
+    try:
+        from upstash_redis import UpstashRedis, UPSTASH_REDIS_REST_TOKEN, VerityCache
+    except ImportError:
+        return None
+    if not UPSTASH_REDIS_REST_TOKEN:
+        return None
+    return VerityCache(UpstashRedis())
+
+
+__all__ = ['AuthBusy', 'PasswordHasher', 'TokenCache', 'ApiKeyCache', 'hash_api_key', 'create_shared_key_cache']
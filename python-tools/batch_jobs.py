@@ -0,0 +1,735 @@
+"""
+Verity API - Batch Job Engine
+=============================
+Asynchronous batch verification with progress streaming.
+
+- ``submit()`` registers a job and returns immediately; the job runs in the
+  background with a worker pool that keeps ``concurrency`` claims in flight
+  (no chunk barriers - a slow claim only occupies one worker).
+- Progress and partial results are available while the job runs, by polling
+  (``results_after(cursor)``) or by subscribing to events (used for SSE).
+- Finished jobs are kept until ``ttl`` expires. An optional Redis store makes
+  snapshots visible to every worker and survives the in-memory copy.
+
+The same engine serves the synchronous batch routes: they submit a job and
+simply wait for it.
+
+``stream_ndjson()`` handles unbounded bulk input instead: claims are read from
+an NDJSON body as it arrives, deduplicated on the fly and verified by the same
+kind of worker pool, and results are yielded in completion order. Every queue
+between the reader, the workers and the response is bounded, so memory stays
+flat and a saturated provider scheduler (or a slow client) stops the reading.
+``NDJSONStream`` is the response that serves it: it reads the request body
+itself while writing results back.
+"""
+
+import asyncio
+import json
+import secrets
+import time
+from collections import OrderedDict
+from datetime import datetime
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import logging
+
+from starlette.responses import Response
+
+import provider_scheduler
+from claim_dedup import canonical_key, group_claims
+
+logger = logging.getLogger(__name__)
+
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_CANCELLED = "cancelled"
+JOB_FAILED = "failed"
+FINAL_STATES = (JOB_COMPLETED, JOB_CANCELLED, JOB_FAILED)
+
+
+def error_result(message: str) -> Dict:
+    return {"verdict": "error", "confidence": 0, "explanation": message}
+
+
+async def iter_ndjson_lines(chunks: AsyncIterator[bytes], max_line_bytes: int = 65536) -> AsyncIterator[Optional[bytes]]:
+    """
+    Split a streamed body into non-blank lines. An over-long line is dropped
+    and reported as ``None`` so it still takes up an input index.
+    """
+    buffer = bytearray()
+    skipping = False
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        while True:
+            newline = buffer.find(b"\n")
+            if newline < 0:
+                break
+            line = bytes(buffer[:newline]).strip()
+            del buffer[:newline + 1]
+            if skipping:
+                skipping = False
+                yield None
+            elif line:
+                yield line
+        if len(buffer) > max_line_bytes:
+            buffer.clear()
+            skipping = True
+    if skipping:
+        yield None
+    elif buffer.strip():
+        yield bytes(buffer).strip()
+
+
+def parse_ndjson_claim(line: Optional[bytes]) -> str:
+    """A claim from one NDJSON line: ``{"claim": "..."}`` or a bare JSON string."""
+    if line is None:
+        raise ValueError("line too long")
+    try:
+        value = json.loads(line)
+    except ValueError:
+        raise ValueError("invalid JSON")
+    if isinstance(value, dict):
+        value = value.get("claim")
+    if not isinstance(value, str):
+        raise ValueError('expected {"claim": "..."} or a JSON string')
+    return value
+
+
+class BatchJob:
+    """State of one batch job. Mutated only from the event loop."""
+
+    def __init__(self, job_id: str, claims: List[str], tier: str, concurrency: int,
+                 ttl: int, options: Optional[Dict] = None):
+        self.job_id = job_id
+        self.claims = claims
+        self.tier = tier
+        self.concurrency = concurrency
+        self.ttl = ttl
+        self.options = options or {}
+        self.tenant = provider_scheduler.current_work().get("tenant", "anonymous")
+        self.status = JOB_QUEUED
+        self.error: Optional[str] = None
+        self.results: List[Optional[Dict]] = [None] * len(claims)
+        self.completion_order: List[int] = []
+        # Duplicate groups (see claim_dedup): representative index -> other member indices
+        self.groups: List[Dict] = []
+        self.duplicates: Dict[int, List[int]] = {}
+        self.cached = 0
+        self.errors = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.expires_at = self.created_at + ttl
+        self.task: Optional[asyncio.Task] = None
+        self._listeners: List[asyncio.Queue] = []
+        self._done = asyncio.Event()
+        self._last_saved = 0.0
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    @property
+    def completed(self) -> int:
+        return len(self.completion_order)
+
+    @property
+    def total(self) -> int:
+        return len(self.claims)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINAL_STATES
+
+    def complete(self, index: int, result: Dict, cached: bool = False, **extra):
+        """Record the result for claim ``index`` (first write wins)."""
+        if self.results[index] is not None:
+            return
+        entry = {"index": index, "claim": self.claims[index], "result": result, "cached": cached, **extra}
+        self.results[index] = entry
+        self.completion_order.append(index)
+        if cached:
+            self.cached += 1
+        if result.get("verdict") == "error":
+            self.errors += 1
+        self._publish("result", {"seq": self.completed, **entry})
+        self._publish("progress", self.progress())
+
+    def complete_group(self, index: int, result: Dict, cached: bool = False):
+        """Record a representative's result and fan it out to its duplicates."""
+        self.complete(index, result, cached=cached)
+        for member in self.duplicates.get(index, ()):
+            self.complete(member, result, cached=cached, duplicate_of=index)
+
+    def set_groups(self, groups: List[Dict]):
+        self.groups = [g for g in groups if len(g["members"]) > 1]
+        self.duplicates = {g["representative"]: [m for m in g["members"] if m != g["representative"]]
+                           for g in self.groups}
+
+    def start(self):
+        self.status = JOB_RUNNING
+        self.started_at = time.time()
+        self._publish("status", {"status": self.status})
+
+    def finish(self, status: str = JOB_COMPLETED, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self.expires_at = self.finished_at + self.ttl
+        self._publish("done", self.summary(include_results=False))
+        self._done.set()
+
+    async def wait(self):
+        await self._done.wait()
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        if queue in self._listeners:
+            self._listeners.remove(queue)
+
+    def _publish(self, event: str, data: Dict):
+        for queue in self._listeners:
+            queue.put_nowait((event, data))
+
+    # ------------------------------------------------------------------
+    # Views
+    # ------------------------------------------------------------------
+
+    def progress(self) -> Dict:
+        return {
+            "completed": self.completed,
+            "total": self.total,
+            "percent": round(self.completed / self.total * 100, 1) if self.total else 100.0,
+            "cached": self.cached,
+            "errors": self.errors
+        }
+
+    def results_after(self, cursor: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict], int]:
+        """Results completed after ``cursor`` (a completion sequence number) and the new cursor."""
+        order = self.completion_order[cursor:cursor + limit if limit else None]
+        entries = [{"seq": cursor + i + 1, **self.results[idx]} for i, idx in enumerate(order)]
+        return entries, cursor + len(order)
+
+    def summary(self, include_results: bool = True) -> Dict:
+        done = [r for r in self.results if r is not None]
+        verdicts: Dict[str, int] = {}
+        for r in done:
+            v = r["result"].get("verdict", "unknown")
+            verdicts[v] = verdicts.get(v, 0) + 1
+        end = self.finished_at or time.time()
+        out = {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total_claims": self.total,
+            "progress": self.progress(),
+            "successful": sum(1 for r in done if r["result"].get("verdict") != "error"),
+            "cached": self.cached,
+            "unique_claims": self.total - sum(len(m) for m in self.duplicates.values()),
+            "duplicate_groups": self.groups,
+            "tier": self.tier,
+            "verdict_summary": verdicts,
+            "created_at": datetime.utcfromtimestamp(self.created_at).isoformat(),
+            "expires_at": datetime.utcfromtimestamp(self.expires_at).isoformat(),
+            "processing_time_ms": round((end - (self.started_at or self.created_at)) * 1000, 2),
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        if self.error:
+            out["error"] = self.error
+        if include_results:
+            out["results"] = [r for r in self.results if r is not None] if not self.finished else \
+                [r if r is not None else {"index": i, "claim": c, "result": error_result("not processed"), "cached": False}
+                 for i, (r, c) in enumerate(zip(self.results, self.claims))]
+        return out
+
+    def to_record(self) -> Dict:
+        """Serializable snapshot for the persistent store."""
+        record = self.summary(include_results=True)
+        record["completion_order"] = list(self.completion_order)
+        record["expires_at_ts"] = self.expires_at
+        return record
+
+
+# ============================================================================
+# PERSISTENCE
+# ============================================================================
+
+class RedisJobStore:
+    """Job snapshots in Upstash Redis (``{prefix}:{job_id}``, expiring with the job)."""
+
+    def __init__(self, redis, prefix: str = "verity:job"):
+        self.redis = redis
+        self.prefix = prefix
+
+    async def save(self, job: BatchJob):
+        ttl = max(60, int(job.expires_at - time.time()))
+        await self.redis.command("SET", f"{self.prefix}:{job.job_id}",
+                                 json.dumps(job.to_record(), default=str), "EX", ttl)
+
+    async def load(self, job_id: str) -> Optional[Dict]:
+        raw = await self.redis.command("GET", f"{self.prefix}:{job_id}")
+        if not raw:
+            return None
+        try:
+            return json.loads(raw)
+        except (TypeError, ValueError):
+            return None
+
+
+def create_job_store(backend: str = "memory"):
+    """Redis-backed snapshots when requested and Upstash is configured, else memory only."""
+    if backend != "redis":
+        return None
+    try:
+        from upstash_redis import UpstashRedis, UPSTASH_REDIS_REST_TOKEN
+    except ImportError:
+        return None
+    if not UPSTASH_REDIS_REST_TOKEN:
+        logger.warning("BATCH_JOB_STORE=redis but UPSTASH_REDIS_REST_TOKEN is not set; using memory")
+        return None
+    return RedisJobStore(UpstashRedis())
+
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+class BatchJobEngine:
+    """
+    Args:
+        session_factory: Callable returning an async context manager whose value has
+            ``async verify_claim(claim, tier=...)`` (AIProviders in the servers)
+        cache: Optional ClaimCache-style object with ``get(claim, tier)``/``set(claim, tier, result)``
+        concurrency: Claims in flight per job
+        max_active_jobs: Jobs running at once; later jobs wait in ``queued``
+        pack_group: Claims per work item in packing mode
+        ttl: Seconds a finished job (and its results) stays retrievable
+        store: Optional persistent store (RedisJobStore)
+    """
+
+    def __init__(self, session_factory: Callable[[], Any], cache=None, concurrency: int = 8,
+                 max_active_jobs: int = 10, ttl: int = 3600, store=None, max_jobs: int = 1000,
+                 pack_group: int = 24):
+        self.session_factory = session_factory
+        self.cache = cache
+        self.concurrency = concurrency
+        self.max_active_jobs = max_active_jobs
+        self.ttl = ttl
+        self.store = store
+        self.max_jobs = max_jobs
+        self.pack_group = pack_group
+        self.jobs: Dict[str, BatchJob] = {}
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    # ------------------------------------------------------------------
+    # Job lifecycle
+    # ------------------------------------------------------------------
+
+    def _sweep(self):
+        now = time.time()
+        for job_id in [j for j, job in self.jobs.items() if job.finished and job.expires_at < now]:
+            del self.jobs[job_id]
+
+    def submit(self, claims: List[str], tier: str = "enterprise", concurrency: Optional[int] = None,
+               options: Optional[Dict] = None) -> BatchJob:
+        """Create a job and start it in the background. Returns immediately."""
+        self._sweep()
+        if len(self.jobs) >= self.max_jobs:
+            raise RuntimeError("Too many batch jobs are being tracked; try again later")
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_active_jobs)
+        job_id = f"job_{secrets.token_urlsafe(12)}"
+        job = BatchJob(job_id, list(claims), tier, concurrency or self.concurrency, self.ttl, options)
+        self.jobs[job_id] = job
+        job.task = asyncio.create_task(self._run(job))
+        logger.info(f"[{job_id}] Batch job queued: {job.total} claims ({tier} tier)")
+        return job
+
+    async def run(self, claims: List[str], tier: str = "enterprise", concurrency: Optional[int] = None,
+                  options: Optional[Dict] = None) -> BatchJob:
+        """Submit and wait for completion (synchronous batch routes)."""
+        job = self.submit(claims, tier, concurrency, options)
+        await job.wait()
+        return job
+
+    def get(self, job_id: str) -> Optional[BatchJob]:
+        job = self.jobs.get(job_id)
+        if job and job.finished and job.expires_at < time.time():
+            del self.jobs[job_id]
+            return None
+        return job
+
+    async def get_record(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job from this worker or, failing that, the persistent store."""
+        job = self.get(job_id)
+        if job:
+            return job.to_record()
+        if self.store is not None:
+            return await self.store.load(job_id)
+        return None
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if not job or job.finished:
+            return False
+        if job.task:
+            job.task.cancel()
+        return True
+
+    def shutdown(self):
+        """Cancel unfinished jobs (server shutdown)."""
+        for job in self.jobs.values():
+            if not job.finished and job.task:
+                job.task.cancel()
+
+    async def _save(self, job: BatchJob, force: bool = False):
+        if self.store is None:
+            return
+        now = time.time()
+        if not force and now - job._last_saved < 1.0:
+            return
+        job._last_saved = now
+        try:
+            await self.store.save(job)
+        except Exception as e:
+            logger.debug(f"[{job.job_id}] Job snapshot save failed: {e}")
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+
+    async def _run(self, job: BatchJob):
+        # Provider calls for this job queue behind interactive requests
+        provider_scheduler.begin_work(tenant=job.tenant, tier=job.tier, priority=provider_scheduler.BATCH)
+        try:
+            async with self._slots:
+                job.start()
+                await self._save(job, force=True)
+                await self.execute(job)
+            job.finish(JOB_COMPLETED)
+        except asyncio.CancelledError:
+            job.finish(JOB_CANCELLED)
+        except Exception as e:
+            logger.error(f"[{job.job_id}] Batch job failed: {e}")
+            job.finish(JOB_FAILED, str(e))
+        await self._save(job, force=True)
+        logger.info(f"[{job.job_id}] Batch job {job.status}: {job.completed}/{job.total} claims")
+
+    async def execute(self, job: BatchJob):
+        """
+        Group duplicate claims (one verification per group, unless
+        ``options["dedup"]`` is false), serve cached representatives, then
+        verify the rest with a constant-size worker pool.
+
+        With ``options["pack"]`` (and a session providing ``verify_claims_packed``)
+        workers take groups of ``pack_group`` claims, which the session sends to
+        providers as multi-claim requests.
+        """
+        use_cache = self.cache is not None and job.options.get("use_cache", True)
+        if job.options.get("dedup", True):
+            job.set_groups(group_claims(job.claims))
+        members = {m for dups in job.duplicates.values() for m in dups}
+        uncached: List[int] = []
+        for index, claim in enumerate(job.claims):
+            if index in members:
+                continue  # answered with its representative
+            cached = self.cache.get(claim, job.tier) if use_cache else None
+            if cached:
+                job.complete_group(index, cached, cached=True)
+            else:
+                uncached.append(index)
+        if not uncached:
+            return
+
+        async with self.session_factory() as session:
+            packed = bool(job.options.get("pack")) and hasattr(session, "verify_claims_packed")
+            size = self.pack_group if packed else 1
+            pending: asyncio.Queue = asyncio.Queue()
+            for start in range(0, len(uncached), size):
+                pending.put_nowait(uncached[start:start + size])
+            workers = [asyncio.create_task(self._worker(job, pending, session, use_cache, packed))
+                       for _ in range(min(job.concurrency, pending.qsize()))]
+            try:
+                await asyncio.gather(*workers)
+            finally:
+                for w in workers:
+                    w.cancel()
+
+    async def _worker(self, job: BatchJob, pending: asyncio.Queue, session, use_cache: bool, packed: bool):
+        while True:
+            try:
+                group = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            claims = [job.claims[i] for i in group]
+            try:
+                if packed:
+                    results = await session.verify_claims_packed(claims, tier=job.tier)
+                else:
+                    results = [await session.verify_claim(claims[0], tier=job.tier)]
+                if use_cache:
+                    for claim, result in zip(claims, results):
+                        self.cache.set(claim, job.tier, result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                results = [error_result(str(e))] * len(group)
+            for index, result in zip(group, results):
+                job.complete_group(index, result)
+            await self._save(job)
+
+    # ------------------------------------------------------------------
+    # Bulk NDJSON streams
+    # ------------------------------------------------------------------
+
+    async def stream_ndjson(self, body: AsyncIterator[bytes], tier: str = "enterprise",
+                            concurrency: Optional[int] = None, prepare: Optional[Callable[[str], str]] = None,
+                            tenant: Optional[str] = None, dedup_window: int = 10000) -> AsyncIterator[Dict]:
+        """
+        Verify claims from an NDJSON body, yielding one dict per input line in
+        completion order (``index`` is the line's position among non-blank
+        lines), then a final ``{"summary": ...}``.
+
+        Duplicates of a claim seen in the last ``dedup_window`` unique claims
+        are answered from the first occurrence (``duplicate_of``). At most
+        ``concurrency * 16`` duplicates wait for a claim still in flight;
+        beyond that reading pauses until the claim is answered.
+        """
+        concurrency = concurrency or self.concurrency
+        max_waiting = concurrency * 16
+        tenant = tenant or provider_scheduler.current_work().get("tenant", "anonymous")
+        work: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+        out: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 4)
+        seen: "OrderedDict[str, Dict]" = OrderedDict()
+        stats = {"total": 0, "unique": 0, "duplicates": 0, "cached": 0, "invalid": 0, "errors": 0}
+        waiting = {"count": 0}
+        done = object()
+        started = time.time()
+
+        def remember(key: str, entry: Dict):
+            seen[key] = entry
+            if len(seen) > dedup_window:
+                # Forget the oldest answered claim; in-flight ones wait for their result
+                for old_key, old in seen.items():
+                    if old["result"] is not None:
+                        del seen[old_key]
+                        break
+
+        async def read_body():
+            index = 0
+            async for line in iter_ndjson_lines(body):
+                i, index = index, index + 1
+                stats["total"] += 1
+                try:
+                    claim = parse_ndjson_claim(line)
+                    if prepare:
+                        claim = prepare(claim)
+                    if len(claim) < 3:
+                        raise ValueError("claim too short")
+                except ValueError as e:
+                    stats["invalid"] += 1
+                    await out.put({"index": i, "error": str(e)})
+                    continue
+
+                key = canonical_key(claim)
+                entry = seen.get(key)
+                if entry is not None:
+                    stats["duplicates"] += 1
+                    if entry["result"] is None and waiting["count"] >= max_waiting:
+                        await entry["answered"].wait()  # backpressure: too many parked duplicates
+                    if entry["result"] is None:
+                        entry["waiting"].append((i, claim))
+                        waiting["count"] += 1
+                    else:
+                        await out.put({"index": i, "claim": claim, "result": entry["result"],
+                                       "cached": False, "duplicate_of": entry["index"]})
+                    continue
+
+                stats["unique"] += 1
+                cached = self.cache.get(claim, tier) if self.cache is not None else None
+                if cached:
+                    stats["cached"] += 1
+                    remember(key, {"index": i, "result": cached, "waiting": [], "answered": None})
+                    await out.put({"index": i, "claim": claim, "result": cached, "cached": True})
+                    continue
+                remember(key, {"index": i, "result": None, "waiting": [], "answered": asyncio.Event()})
+                # Blocks while the workers are saturated - this is the backpressure
+                await work.put((i, claim, key))
+
+        async def verify(session):
+            while True:
+                item = await work.get()
+                if item is None:
+                    return
+                i, claim, key = item
+                try:
+                    result = await session.verify_claim(claim, tier=tier)
+                    if self.cache is not None:
+                        self.cache.set(claim, tier, result)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    result = error_result(str(e))
+                if result.get("verdict") == "error":
+                    stats["errors"] += 1
+                await out.put({"index": i, "claim": claim, "result": result, "cached": False})
+                entry = seen.get(key)
+                if entry is not None:
+                    entry["result"] = result
+                    entry["answered"].set()
+                    parked, entry["waiting"] = entry["waiting"], []
+                    waiting["count"] -= len(parked)
+                    for j, dup in parked:
+                        await out.put({"index": j, "claim": dup, "result": result,
+                                       "cached": False, "duplicate_of": i})
+
+        async def run():
+            provider_scheduler.begin_work(tenant=tenant, tier=tier, priority=provider_scheduler.BATCH)
+            error = None
+            try:
+                async with self.session_factory() as session:
+                    workers = [asyncio.create_task(verify(session)) for _ in range(concurrency)]
+                    try:
+                        await read_body()
+                        for _ in workers:
+                            await work.put(None)
+                        await asyncio.gather(*workers)
+                    finally:
+                        for w in workers:
+                            w.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[BULK] Stream aborted: {e}")
+                error = str(e)
+            await out.put((done, error))
+
+        task = asyncio.create_task(run())
+        try:
+            while True:
+                item = await out.get()
+                if isinstance(item, tuple) and item[0] is done:
+                    summary = {**stats, "tier": tier,
+                               "processing_time_ms": round((time.time() - started) * 1000, 2)}
+                    if item[1]:
+                        summary["error"] = item[1]
+                    yield {"summary": summary}
+                    return
+                yield item
+        finally:
+            task.cancel()
+
+    # ------------------------------------------------------------------
+    # Streaming
+    # ------------------------------------------------------------------
+
+    async def events(self, job: BatchJob, keepalive: float = 15.0) -> AsyncIterator[Tuple[str, Dict]]:
+        """Yield (event, data) until the job finishes; ("keepalive", {}) while idle."""
+        queue = job.subscribe()
+        try:
+            yield "progress", {"status": job.status, **job.progress()}
+            if job.finished:
+                yield "done", job.summary(include_results=False)
+                return
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield "keepalive", {}
+                    continue
+                yield event, data
+                if event == "done":
+                    return
+        finally:
+            job.unsubscribe(queue)
+
+
+class NDJSONStream(Response):
+    """
+    Streaming NDJSON response whose producer consumes the request body:
+    ``produce(body)`` gets the body as an async iterator of chunks and
+    yields dicts, each written as one line as soon as it is ready.
+
+    The response is the only reader of ``receive`` - StreamingResponse
+    would also listen there for a disconnect and swallow body chunks. Once
+    the body is read it watches for the client going away and stops.
+    """
+    media_type = "application/x-ndjson"
+
+    def __init__(self, produce: Callable[[AsyncIterator[bytes]], AsyncIterator[Dict]],
+                 headers: Optional[Dict[str, str]] = None):
+        self.produce = produce
+        self.status_code = 200
+        self.background = None
+        self.init_headers(headers)
+
+    async def __call__(self, scope, receive, send):
+        body_read = asyncio.Event()
+        disconnected = asyncio.Event()
+
+        async def body():
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    disconnected.set()
+                    return
+                if message.get("body"):
+                    yield message["body"]
+                if not message.get("more_body", False):
+                    body_read.set()
+                    return
+
+        async def watch_disconnect():
+            await body_read.wait()
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        async def stream():
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            async with aclosing(self.produce(body())) as items:
+                async for item in items:
+                    line = (json.dumps(item, default=str) + "\n").encode()
+                    await send({"type": "http.response.body", "body": line, "more_body": True})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+        streaming = asyncio.ensure_future(stream())
+        watcher = asyncio.ensure_future(watch_disconnect())
+        gone = asyncio.ensure_future(disconnected.wait())
+        try:
+            await asyncio.wait({streaming, gone}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (streaming, watcher, gone):
+                task.cancel()
+            await asyncio.gather(streaming, watcher, gone, return_exceptions=True)
+        if not streaming.cancelled() and streaming.exception():
+            raise streaming.exception()
+
+
+def format_sse(event: str, data: Dict) -> str:
+    """Server-Sent Events frame."""
+    if event == "keepalive":
+        return ": keepalive\n\n"
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+__all__ = [
+    'BatchJob',
+    'BatchJobEngine',
+    'RedisJobStore',
+    'create_job_store',
+    'NDJSONStream',
+    'format_sse',
+    'iter_ndjson_lines',
+    'error_result',
+    'JOB_QUEUED', 'JOB_RUNNING', 'JOB_COMPLETED', 'JOB_CANCELLED', 'JOB_FAILED'
+]
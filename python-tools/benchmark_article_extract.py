@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark: main-content (readability) extraction vs the streamed page text.
+
+For every saved page in a corpus directory (``NAME.html``, optionally with
+the hand-checked article body as ``NAME.txt``), runs
+article_extract.extract_article and the streaming html_extract.TextExtractor
+the direct-fetch path used before, and reports:
+
+- per-page and total extraction time;
+- characters of text each path produces;
+- with a ``.txt`` reference: precision (share of extracted words that belong
+  to the article, i.e. how little boilerplate reaches providers), recall and
+  F1 over word multisets.
+
+The pages used in the default run (no ``--corpus``) are synthetic: a known
+article wrapped in navigation, cookie banner, share bar, related links and
+footer. They check the mechanics only. No corpus of real article pages
+with hand-checked bodies ships with the repo, so extraction quality on
+real sites is not yet measured; save real article HTML (and its body as
+``.txt``) and run with ``--corpus`` for numbers that mean something.
+
+Usage:
+    python benchmark_article_extract.py [--corpus DIR] [--repeat 5]
+"""
+
+import argparse
+import glob
+import os
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from article_extract import extract_article
+from html_extract import MAX_TEXT_CHARS, TextExtractor
+
+
+def load_corpus(directory: str) -> List[Tuple[str, str, Optional[str]]]:
+    """(name, html, reference text or None) for each .html file in ``directory``."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html")) + glob.glob(os.path.join(directory, "*.htm"))):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            html = f.read()
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        reference = None
+        if os.path.exists(reference_path):
+            with open(reference_path, encoding="utf-8", errors="replace") as f:
+                reference = f.read()
+        pages.append((os.path.basename(path), html, reference))
+    return pages
+
+
+SENTENCES = [
+    "The city council approved the budget on Tuesday after a six-hour debate",
+    "Officials said the new transit line would open in 2027, two years later than planned",
+    "Critics argued that the cost estimates, now at 4.2 billion dollars, were still too low",
+    "Residents in the northern districts have waited more than a decade for the project",
+    "The mayor called the vote a turning point for the region's economy",
+    "An independent audit last year found that earlier estimates had ignored land acquisition costs",
+    "Construction is expected to employ roughly 3,000 workers at its peak",
+]
+
+
+def synthetic_corpus(pages: int = 12, seed: int = 3) -> List[Tuple[str, str, Optional[str]]]:
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(pages):
+        paragraphs = [". ".join(rng.sample(SENTENCES, 3)) + "." for _ in range(rng.randint(4, 12))]
+        links = "".join(f'<li><a href="/s/{k}">Section {k} news and more</a></li>' for k in range(rng.randint(10, 40)))
+        related = "".join(f'<p><a href="/r/{k}">Related story number {k} that you might like to read</a></p>'
+                          for k in range(rng.randint(3, 10)))
+        html = (
+            f"<html><head><title>Council approves transit budget | Example News</title>"
+            f'<meta property="article:published_time" content="2026-03-0{i % 9 + 1}T10:00:00Z">'
+            f"<style>.x{{color:red}}</style><script>var tracking = {i};</script></head><body>"
+            f'<div class="cookie-banner"><p>We use cookies to improve your experience, by continuing you accept them.</p></div>'
+            f'<div id="top-nav"><ul>{links}</ul></div>'
+            f'<div class="layout"><div class="main-column"><article><h1>Council approves transit budget</h1>'
+            f'<div class="byline">By Jane Reporter</div>'
+            + "".join(f"<p>{p}</p>" for p in paragraphs)
+            + f'</article><div class="share-bar"><a href="#">Share on social media, email or print this page</a></div>'
+            f'<div class="related">{related}</div></div>'
+            f'<div class="sidebar"><p>Subscribe to our newsletter for daily updates, offers and more.</p></div></div>'
+            f"<footer><p>Copyright 2026 Example News, all rights reserved, terms and privacy policy.</p></footer>"
+            f"</body></html>"
+        )
+        corpus.append((f"synthetic-{i}.html", html, "\n\n".join(paragraphs)))
+    return corpus
+
+
+def streamed_text(html: str) -> str:
+    parser = TextExtractor(MAX_TEXT_CHARS)
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+
+def overlap(extracted: str, reference: str) -> Dict[str, float]:
+    got, want = Counter(extracted.lower().split()), Counter(reference.lower().split())
+    common = sum((got & want).values())
+    precision = common / max(sum(got.values()), 1)
+    recall = common / max(sum(want.values()), 1)
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def timed(fn, html: str, repeat: int) -> Tuple[float, object]:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(html)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of saved pages (NAME.html, optional NAME.txt reference)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not corpus:
+        raise SystemExit(f"No .html files in {args.corpus}")
+    print(f"{len(corpus)} pages ({'corpus ' + args.corpus if args.corpus else 'synthetic'})")
+    if not args.corpus:
+        print("Synthetic pages: timings and mechanics only, not extraction quality on real sites")
+
+    totals = {"article": 0.0, "streamed": 0.0}
+    scores: Dict[str, List[Dict[str, float]]] = {"article": [], "streamed": []}
+    fallbacks = 0
+    for name, html, reference in corpus:
+        article_time, article = timed(extract_article, html, args.repeat)
+        streamed_time, streamed = timed(streamed_text, html, args.repeat)
+        totals["article"] += article_time
+        totals["streamed"] += streamed_time
+        article_text = article["text"] if article else streamed
+        fallbacks += article is None
+        line = (f"{name[:40]:<40} {len(html) / 1024:7.1f} KB | article {article_time * 1000:7.2f} ms "
+                f"{len(article_text):6} chars{' (fallback)' if article is None else ''} | "
+                f"streamed {streamed_time * 1000:7.2f} ms {len(streamed):6} chars")
+        if reference:
+            a, s = overlap(article_text, reference), overlap(streamed, reference)
+            scores["article"].append(a)
+            scores["streamed"].append(s)
+            line += f" | P/R article {a['precision']:.2f}/{a['recall']:.2f} streamed {s['precision']:.2f}/{s['recall']:.2f}"
+        print(line)
+
+    print(f"\nTotal: article {totals['article'] * 1000:.1f} ms | streamed {totals['streamed'] * 1000:.1f} ms "
+          f"| fallbacks {fallbacks}/{len(corpus)}")
+    if scores["article"]:
+        for path, rows in scores.items():
+            mean = {k: sum(r[k] for r in rows) / len(rows) for k in ("precision", "recall", "f1")}
+            print(f"{path:>9}: precision {mean['precision']:.3f}  recall {mean['recall']:.3f}  F1 {mean['f1']:.3f} "
+                  f"({len(rows)} pages with references)")
+
+
+if __name__ == "__main__":
+    main()
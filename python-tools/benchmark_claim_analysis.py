@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compiled claim-analysis engine vs the original per-pattern scans.
+
+Runs the text analysis a v10 /verify performs on each claim
+(NuanceDetector.analyze_claim, NuanceDetector.should_force_mixed,
+TemporalVerifier.analyze_temporal_context, detect_injection) and the v9
+categorize_claim/detect_injection pair, first checking that both
+implementations return the same results on every claim from the test
+suites, then timing them on those claims and on ~10,000-character claims.
+
+Usage:
+    python benchmark_claim_analysis.py [--repeat 20]
+"""
+
+import argparse
+import ast
+import os
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+import api_server_v9 as v9
+import api_server_v10 as v10
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLAIM_SOURCES = ["comprehensive_test_v10.py", "v10_test_suite.py", "extensive_test_suite.py"]
+
+
+# =============================================================================
+# ORIGINAL IMPLEMENTATIONS (reference - one re.findall/re.search per pattern)
+# =============================================================================
+
+def legacy_analyze_claim(claim: str) -> Dict[str, Any]:
+    cls = v10.NuanceDetector
+    claim_lower = claim.lower()
+    absolute_matches = []
+    for pattern in cls.ABSOLUTE_PATTERNS:
+        absolute_matches.extend(re.findall(pattern, claim_lower, re.IGNORECASE))
+    comparative_matches = []
+    for pattern in cls.COMPARATIVE_PATTERNS:
+        comparative_matches.extend(re.findall(pattern, claim_lower, re.IGNORECASE))
+    detected_topics = []
+    topic_keywords = []
+    for topic, keywords in cls.NUANCED_TOPICS.items():
+        for kw in keywords:
+            if kw.lower() in claim_lower:
+                if topic not in detected_topics:
+                    detected_topics.append(topic)
+                topic_keywords.append(kw)
+    detected_topic = detected_topics[0] if detected_topics else None
+    inherent_nuance = any(re.search(p, claim_lower, re.IGNORECASE) for p in cls.INHERENTLY_NUANCED_PATTERNS)
+    has_academic_hedging = any(re.search(p, claim_lower, re.IGNORECASE) for p in cls.ACADEMIC_HEDGING_PATTERNS)
+    balanced_indicators = sum(1 for p in cls.BALANCED_CLAIM_PATTERNS if re.search(p, claim_lower, re.IGNORECASE))
+    is_balanced_claim = balanced_indicators > 0
+    has_generalization = any(re.search(p, claim_lower, re.IGNORECASE) for p in cls.GENERALIZATION_PATTERNS)
+
+    nuance_score = 0.0
+    if inherent_nuance:
+        nuance_score += 0.5
+    if has_academic_hedging and detected_topic in ["health", "nutrition"]:
+        nuance_score += 0.45
+    elif has_academic_hedging:
+        nuance_score += 0.3
+    if is_balanced_claim:
+        nuance_score += 0.35 + (0.1 * min(balanced_indicators, 2))
+    if absolute_matches and detected_topic:
+        nuance_score += 0.4
+    if absolute_matches:
+        nuance_score += 0.2 * min(len(absolute_matches), 3)
+    if detected_topic:
+        nuance_score += 0.25
+    if len(detected_topics) > 1:
+        nuance_score += 0.15
+    if has_generalization:
+        nuance_score += 0.2
+    nuance_score = min(1.0, nuance_score)
+    is_nuanced = nuance_score >= 0.3 or inherent_nuance or is_balanced_claim
+    if nuance_score >= 0.6 or inherent_nuance or (is_balanced_claim and has_academic_hedging):
+        recommendation = "STRONGLY consider MIXED verdict - claim uses academic hedging or presents balanced view"
+    elif nuance_score >= 0.3 or is_balanced_claim:
+        recommendation = "Consider MIXED verdict if evidence is not unanimous"
+    else:
+        recommendation = "Standard TRUE/FALSE verdict appropriate"
+    return {
+        "is_nuanced": is_nuanced,
+        "nuance_score": round(nuance_score, 3),
+        "absolute_language": list(set(absolute_matches)),
+        "comparative_language": list(set(comparative_matches)),
+        "nuanced_topic": detected_topic,
+        "all_topics": detected_topics,
+        "topic_keywords": list(set(topic_keywords)),
+        "has_generalization": has_generalization,
+        "inherent_nuance": inherent_nuance,
+        "has_academic_hedging": has_academic_hedging,
+        "is_balanced_claim": is_balanced_claim,
+        "recommendation": recommendation
+    }
+
+
+def legacy_temporal(claim: str) -> Tuple:
+    cls = v10.TemporalVerifier
+    claim_lower = claim.lower()
+    found = []
+    for patterns in (cls.TIME_SENSITIVE_KEYWORDS, cls.HISTORICAL_KEYWORDS, cls.TIMELESS_KEYWORDS):
+        matches = []
+        for pattern in patterns:
+            matches.extend(re.findall(pattern, claim_lower, re.IGNORECASE))
+        found.append(matches)
+    years = re.findall(r'\b(19|20)\d{2}\b', claim)
+    return found, years
+
+
+def legacy_flags(claim: str) -> Tuple[bool, bool]:
+    cls = v10.NuanceDetector
+    claim_lower = claim.lower()
+    factual = any(re.search(p, claim_lower, re.IGNORECASE) for p in cls.FACTUAL_INDICATORS)
+    known_false = any(re.search(p, claim_lower, re.IGNORECASE) for p in cls.FALSE_INDICATORS)
+    return factual, known_false
+
+
+def legacy_injection(claim: str, patterns) -> bool:
+    claim_lower = claim.lower()
+    return any(pattern in claim_lower for pattern in patterns)
+
+
+def legacy_categorize(claim: str) -> str:
+    claim_lower = claim.lower()
+    scores = {}
+    for category, keywords in v9.CLAIM_CATEGORIES.items():
+        score = sum(1 for kw in keywords if kw in claim_lower)
+        if score > 0:
+            scores[category] = score
+    if scores:
+        return max(scores, key=scores.get)
+    return "general"
+
+
+# =============================================================================
+# COMPARISON
+# =============================================================================
+
+def load_claims() -> List[str]:
+    """Every "claim" string literal in the test-suite scripts."""
+    claims = []
+    for name in CLAIM_SOURCES:
+        path = os.path.join(HERE, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Dict):
+                for key, value in zip(node.keys, node.values):
+                    if (isinstance(key, ast.Constant) and key.value == "claim"
+                            and isinstance(value, ast.Constant) and isinstance(value.value, str)):
+                        claims.append(value.value)
+    return claims
+
+
+def long_claims(claims: List[str], size: int = 10000, count: int = 10) -> List[str]:
+    out = []
+    for i in range(count):
+        parts, total = [], 0
+        j = i
+        while total < size:
+            part = claims[j % len(claims)]
+            parts.append(part)
+            total += len(part) + 1
+            j += 1
+        out.append(" ".join(parts)[:size])
+    return out
+
+
+def _normalized(analysis: Dict) -> Dict:
+    out = dict(analysis)
+    for key in ("absolute_language", "comparative_language", "topic_keywords", "time_sensitive_matches"):
+        if key in out:
+            out[key] = sorted(out[key])
+    return out
+
+
+def check_equivalence(claims: List[str]) -> int:
+    """Compare every feature on every claim; returns the number of claims checked."""
+    for claim in claims:
+        assert _normalized(v10.NuanceDetector.analyze_claim(claim)) == _normalized(legacy_analyze_claim(claim)), claim
+        features = v10.claim_analyzer.scan(claim)
+        (ts, hist, timeless), years = legacy_temporal(claim)
+        assert features.family("time_sensitive").findall() == ts, claim
+        assert features.family("historical").findall() == hist, claim
+        assert features.family("timeless").findall() == timeless, claim
+        temporal = v10.TemporalVerifier.analyze_temporal_context(claim)
+        assert temporal["detected_dates"] == years, claim
+        assert sorted(temporal["time_sensitive_matches"]) == sorted(list(set(ts))[:5]) or len(set(ts)) > 5, claim
+        assert (v10.NuanceDetector._is_factual_statement(claim),
+                v10.NuanceDetector._is_known_false_claim(claim)) == legacy_flags(claim), claim
+        assert v10.detect_injection(claim) == legacy_injection(claim, v10.INJECTION_PATTERNS), claim
+        assert v9.detect_injection(claim) == legacy_injection(claim, v9.INJECTION_PATTERNS), claim
+        assert v9.categorize_claim(claim) == legacy_categorize(claim), claim
+    return len(claims)
+
+
+def run_legacy(claim: str):
+    legacy_analyze_claim(claim)
+    legacy_analyze_claim(claim)  # should_force_mixed re-analyzes the claim
+    legacy_flags(claim)
+    legacy_temporal(claim)
+    legacy_injection(claim, v10.INJECTION_PATTERNS)
+    legacy_categorize(claim)
+    legacy_injection(claim, v9.INJECTION_PATTERNS)
+
+
+def run_engine(claim: str):
+    v10.NuanceDetector.analyze_claim(claim)
+    v10.NuanceDetector.should_force_mixed(claim, "false", 0.5)
+    v10.TemporalVerifier.analyze_temporal_context(claim)
+    v10.detect_injection(claim)
+    v9.categorize_claim(claim)
+    v9.detect_injection(claim)
+
+
+def clear_caches():
+    v10.claim_analyzer._cache.clear()
+    v9.claim_analyzer._cache.clear()
+
+
+def timed(fn, claims: List[str], repeat: int) -> float:
+    """Mean seconds per claim; the engine's memo is cleared before every claim."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for claim in claims:
+            clear_caches()
+            fn(claim)
+    return (time.perf_counter() - start) / (repeat * len(claims))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    claims = load_claims()
+    big = long_claims(claims)
+    checked = check_equivalence(claims + big)
+    print(f"Equivalence: identical results on {checked} claims")
+
+    for label, corpus in (("test-suite claims", claims), ("10,000-char claims", big)):
+        legacy = timed(run_legacy, corpus, args.repeat)
+        engine = timed(run_engine, corpus, args.repeat)
+        print(f"{label:>20}: legacy {legacy * 1e6:9.1f} us/claim | engine {engine * 1e6:9.1f} us/claim "
+              f"| {legacy / engine:4.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
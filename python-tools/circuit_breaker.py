@@ -2,14 +2,24 @@
 Verity API - Circuit Breaker Pattern
 ====================================
 Implements resilient provider failover with circuit breakers
+
+This is the single breaker implementation shared by every API server:
+
+- Breakers trip on the error *rate* over a sliding time window (once a
+  minimum request volume is reached), not on a raw failure count.
+- After the open period, HALF_OPEN admits exactly ``half_open_max_calls``
+  probe requests; everything else keeps failing fast until the probes report.
+- OPEN/CLOSED transitions can optionally be shared across workers through
+  Upstash Redis, so a failure seen by one worker protects all of them.
 """
 
 import asyncio
+import json
 import time
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, Optional, Callable, Any
-from collections import defaultdict
+from typing import Dict, Optional, Callable, Any, Iterable, List
+from collections import defaultdict, deque
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,146 +32,551 @@ class CircuitState(Enum):
     HALF_OPEN = "half_open"  # Testing if service recovered
 
 
+# Status codes that open the circuit immediately, regardless of error rate
+RATE_LIMIT_STATUS_CODES = (429,)
+
+
 @dataclass
 class CircuitBreaker:
     """
     Circuit breaker for individual AI providers.
-    
+
     Prevents cascading failures by failing fast when a provider is down.
+    The circuit opens when at least ``min_requests`` calls were seen in the
+    last ``window_seconds`` and their error rate reaches ``error_rate_threshold``.
     """
     name: str
-    failure_threshold: int = 5
-    recovery_timeout: int = 60
-    half_open_max_calls: int = 3
-    
+    window_seconds: float = 60
+    error_rate_threshold: float = 0.5
+    min_requests: int = 5
+    recovery_timeout: float = 60
+    rate_limit_timeout: float = 120
+    half_open_max_calls: int = 1
+    probe_timeout: float = 30  # An admitted probe that never reports frees its slot after this
+
     # State
     state: CircuitState = field(default=CircuitState.CLOSED)
-    failure_count: int = field(default=0)
-    success_count: int = field(default=0)
+    opened_at: Optional[float] = field(default=None)
+    open_until: Optional[float] = field(default=None)
     last_failure_time: Optional[float] = field(default=None)
-    half_open_calls: int = field(default=0)
-    
+    last_error: Optional[str] = field(default=None)
+    half_open_admitted: int = field(default=0)
+    half_open_successes: int = field(default=0)
+
     # Metrics
     total_calls: int = field(default=0)
     total_failures: int = field(default=0)
     total_successes: int = field(default=0)
-    
-    def can_execute(self) -> bool:
-        """Check if request can proceed"""
+    times_opened: int = field(default=0)
+
+    # Sliding window of (timestamp, ok) outcomes and in-flight probe admissions
+    _window: deque = field(default_factory=deque, repr=False)
+    _window_failures: int = field(default=0, repr=False)
+    _probes: deque = field(default_factory=deque, repr=False)
+
+    # ------------------------------------------------------------------
+    # Sliding window
+    # ------------------------------------------------------------------
+
+    def _trim(self, now: float):
+        cutoff = now - self.window_seconds
+        window = self._window
+        while window and window[0][0] < cutoff:
+            _, ok = window.popleft()
+            if not ok:
+                self._window_failures -= 1
+
+    @property
+    def failure_count(self) -> int:
+        """Failures inside the current window"""
+        self._trim(time.time())
+        return self._window_failures
+
+    @property
+    def request_count(self) -> int:
+        """Calls inside the current window"""
+        self._trim(time.time())
+        return len(self._window)
+
+    @property
+    def error_rate(self) -> float:
+        self._trim(time.time())
+        return self._window_failures / len(self._window) if self._window else 0.0
+
+    # ------------------------------------------------------------------
+    # State transitions
+    # ------------------------------------------------------------------
+
+    def _refresh(self, now: float):
+        """Move OPEN -> HALF_OPEN once the open period is over."""
+        if self.state == CircuitState.OPEN and self.open_until is not None and now >= self.open_until:
+            self.state = CircuitState.HALF_OPEN
+            self.half_open_admitted = 0
+            self.half_open_successes = 0
+            self._probes.clear()
+            logger.info(f"Circuit breaker {self.name}: OPEN -> HALF_OPEN")
+        if self.state == CircuitState.HALF_OPEN:
+            # Reclaim slots of probes that never reported back
+            cutoff = now - self.probe_timeout
+            while self._probes and self._probes[0] < cutoff:
+                self._probes.popleft()
+                self.half_open_admitted -= 1
+
+    def trip(self, now: Optional[float] = None, duration: Optional[float] = None,
+             opened_at: Optional[float] = None, open_until: Optional[float] = None):
+        """Open the circuit (locally tripped, or adopted from another worker)."""
+        now = now if now is not None else time.time()
+        self.state = CircuitState.OPEN
+        self.opened_at = opened_at if opened_at is not None else now
+        self.open_until = open_until if open_until is not None else self.opened_at + (duration or self.recovery_timeout)
+        self.half_open_admitted = 0
+        self.half_open_successes = 0
+        self._probes.clear()
+        self.times_opened += 1
+
+    def reset(self):
+        """Close the circuit and forget the window."""
+        self.state = CircuitState.CLOSED
+        self.opened_at = None
+        self.open_until = None
+        self.half_open_admitted = 0
+        self.half_open_successes = 0
+        self._probes.clear()
+        self._window.clear()
+        self._window_failures = 0
+
+    def current_state(self) -> CircuitState:
+        self._refresh(time.time())
+        return self.state
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    def is_available(self) -> bool:
+        """Would a request be admitted right now? (does not consume a probe slot)"""
+        self._refresh(time.time())
         if self.state == CircuitState.CLOSED:
             return True
-            
-        if self.state == CircuitState.OPEN:
-            # Check if recovery timeout has passed
-            if self.last_failure_time and time.time() - self.last_failure_time >= self.recovery_timeout:
-                self.state = CircuitState.HALF_OPEN
-                self.half_open_calls = 0
-                logger.info(f"Circuit breaker {self.name}: OPEN -> HALF_OPEN")
-                return True
-            return False
-            
         if self.state == CircuitState.HALF_OPEN:
-            return self.half_open_calls < self.half_open_max_calls
-            
-        return True
-    
+            return self.half_open_admitted < self.half_open_max_calls
+        return False
+
+    def can_execute(self) -> bool:
+        """Check if request can proceed; in HALF_OPEN this claims one of the probe slots."""
+        now = time.time()
+        self._refresh(now)
+        if self.state == CircuitState.CLOSED:
+            return True
+        if self.state == CircuitState.HALF_OPEN and self.half_open_admitted < self.half_open_max_calls:
+            self.half_open_admitted += 1
+            self._probes.append(now)
+            return True
+        return False
+
+    def release_probe(self):
+        """Give back a probe slot that was claimed but not used."""
+        if self.state == CircuitState.HALF_OPEN and self.half_open_admitted > 0:
+            self.half_open_admitted -= 1
+            if self._probes:
+                self._probes.pop()
+
+    # ------------------------------------------------------------------
+    # Outcomes
+    # ------------------------------------------------------------------
+
     def record_success(self):
         """Record successful call"""
+        now = time.time()
         self.total_calls += 1
         self.total_successes += 1
-        self.success_count += 1
-        
+        self._window.append((now, True))
+        self._trim(now)
+        self._refresh(now)
+
         if self.state == CircuitState.HALF_OPEN:
-            self.half_open_calls += 1
-            if self.half_open_calls >= self.half_open_max_calls:
-                # All test calls succeeded, close circuit
-                self.state = CircuitState.CLOSED
-                self.failure_count = 0
-                self.success_count = 0
+            if self._probes:
+                self._probes.popleft()
+            self.half_open_successes += 1
+            if self.half_open_successes >= self.half_open_max_calls:
+                # All probes succeeded, close circuit
+                self.reset()
                 logger.info(f"Circuit breaker {self.name}: HALF_OPEN -> CLOSED")
-        else:
-            # Reset failure count on success in closed state
-            if self.success_count >= self.failure_threshold:
-                self.failure_count = 0
-                self.success_count = 0
-    
-    def record_failure(self):
+
+    def record_failure(self, status_code: int = 0, error_type: Optional[str] = None):
         """Record failed call"""
+        now = time.time()
         self.total_calls += 1
         self.total_failures += 1
-        self.failure_count += 1
-        self.success_count = 0
-        self.last_failure_time = time.time()
-        
+        self.last_failure_time = now
+        self.last_error = error_type or (f"status_{status_code}" if status_code else "unknown")
+        self._window.append((now, False))
+        self._window_failures += 1
+        self._trim(now)
+        self._refresh(now)
+
         if self.state == CircuitState.HALF_OPEN:
             # Failure during recovery, reopen circuit
-            self.state = CircuitState.OPEN
-            logger.warning(f"Circuit breaker {self.name}: HALF_OPEN -> OPEN (failure during recovery)")
-        elif self.failure_count >= self.failure_threshold:
-            # Threshold reached, trip circuit
-            self.state = CircuitState.OPEN
-            logger.warning(f"Circuit breaker {self.name}: CLOSED -> OPEN (threshold reached)")
-    
+            self.trip(now)
+            logger.warning(f"Circuit breaker {self.name}: HALF_OPEN -> OPEN (probe failed: {self.last_error})")
+        elif self.state == CircuitState.CLOSED:
+            if status_code in RATE_LIMIT_STATUS_CODES:
+                self.trip(now, duration=self.rate_limit_timeout)
+                logger.warning(f"Circuit breaker {self.name}: CLOSED -> OPEN (rate limited)")
+            elif len(self._window) >= self.min_requests and self.error_rate >= self.error_rate_threshold:
+                self.trip(now)
+                logger.warning(
+                    f"Circuit breaker {self.name}: CLOSED -> OPEN "
+                    f"(error rate {self.error_rate:.0%} over {len(self._window)} calls)"
+                )
+
     def get_stats(self) -> Dict:
         """Get circuit breaker statistics"""
+        now = time.time()
+        state = self.current_state()
         return {
             "name": self.name,
-            "state": self.state.value,
+            "state": state.value,
             "failure_count": self.failure_count,
+            "window_requests": self.request_count,
+            "error_rate": round(self.error_rate, 3),
             "total_calls": self.total_calls,
             "total_failures": self.total_failures,
             "total_successes": self.total_successes,
             "success_rate": round(self.total_successes / max(self.total_calls, 1) * 100, 2),
-            "last_failure": self.last_failure_time
+            "times_opened": self.times_opened,
+            "probes_in_flight": self.half_open_admitted if state == CircuitState.HALF_OPEN else 0,
+            "reset_in_seconds": round(max(0.0, self.open_until - now), 1) if state == CircuitState.OPEN else 0,
+            "last_failure": self.last_failure_time,
+            "last_error": self.last_error
         }
 
 
+# ============================================================================
+# CROSS-WORKER STATE
+# ============================================================================
+
+class BreakerStateStore:
+    """
+    Process-local state store (the default): nothing is shared between workers.
+    """
+    shared = False
+
+    async def publish_open(self, name: str, opened_at: float, open_until: float, reason: str = ""):
+        return None
+
+    async def publish_closed(self, name: str, closed_at: float):
+        return None
+
+    async def fetch(self, names: Iterable[str]) -> Dict[str, Dict]:
+        return {}
+
+    async def acquire_probe(self, name: str, epoch: int, limit: int) -> bool:
+        return True
+
+
+class RedisBreakerStateStore(BreakerStateStore):
+    """
+    Shares breaker transitions through Upstash Redis.
+
+    Keys:
+        {prefix}:{name}                 JSON {state, opened_at, open_until | closed_at}
+        {prefix}:{name}:probe:{epoch}   INCR counter limiting probes per open cycle
+
+    An open record is kept ``PROBE_WINDOW`` seconds past ``open_until`` so
+    that every worker can key its half-open probes on the same ``opened_at``.
+
+    Redis errors never block traffic: failed reads fall back to the local
+    breaker and a failed probe INCR admits the (locally admitted) probe.
+    """
+    shared = True
+    PROBE_WINDOW = 600
+
+    def __init__(self, redis, prefix: str = "verity:breaker"):
+        self.redis = redis
+        self.prefix = prefix
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:{name}"
+
+    async def publish_open(self, name: str, opened_at: float, open_until: float, reason: str = ""):
+        ttl_ms = max(1000, int((open_until - time.time() + self.PROBE_WINDOW) * 1000))
+        record = {"state": "open", "opened_at": opened_at, "open_until": open_until, "reason": reason}
+        await self.redis.command("SET", self._key(name), json.dumps(record), "PX", ttl_ms)
+
+    async def publish_closed(self, name: str, closed_at: float):
+        record = {"state": "closed", "closed_at": closed_at}
+        await self.redis.command("SET", self._key(name), json.dumps(record), "EX", 300)
+
+    async def fetch(self, names: Iterable[str]) -> Dict[str, Dict]:
+        names = list(names)
+        if not names:
+            return {}
+        raw = await self.redis.command("MGET", *[self._key(n) for n in names])
+        records = {}
+        for name, value in zip(names, raw or []):
+            if not value:
+                continue
+            try:
+                records[name] = json.loads(value)
+            except (TypeError, ValueError):
+                continue
+        return records
+
+    async def acquire_probe(self, name: str, epoch: int, limit: int) -> bool:
+        key = f"{self._key(name)}:probe:{epoch}"
+        count = await self.redis.command("INCR", key)
+        if count is None:
+            return True
+        if count == 1:
+            await self.redis.command("EXPIRE", key, self.PROBE_WINDOW)
+        return int(count) <= limit
+
+
+def create_state_store(shared: bool = False) -> BreakerStateStore:
+    """Build the Redis-backed store when sharing is enabled and Upstash is configured."""
+    if not shared:
+        return BreakerStateStore()
+    try:
+        from upstash_redis import UpstashRedis, UPSTASH_REDIS_REST_TOKEN
+    except ImportError:
+        logger.warning("Shared breaker state requested but upstash_redis is unavailable")
+        return BreakerStateStore()
+    if not UPSTASH_REDIS_REST_TOKEN:
+        logger.warning("Shared breaker state requested but UPSTASH_REDIS_REST_TOKEN is not set")
+        return BreakerStateStore()
+    return RedisBreakerStateStore(UpstashRedis())
+
+
+# ============================================================================
+# BREAKER REGISTRY
+# ============================================================================
+
+class CircuitBreakerRegistry:
+    """
+    Per-provider circuit breakers with shared configuration and per-provider
+    call timeouts. This is what the API servers hold as their global breaker.
+    """
+
+    def __init__(self, window_seconds: float = 60, error_rate_threshold: float = 0.5,
+                 min_requests: int = 5, recovery_timeout: float = 60,
+                 rate_limit_timeout: float = 120, half_open_max_calls: int = 1,
+                 probe_timeout: float = 30, timeouts: Optional[Dict[str, float]] = None,
+                 default_timeout: float = 12, state_store: Optional[BreakerStateStore] = None):
+        self.window_seconds = window_seconds
+        self.error_rate_threshold = error_rate_threshold
+        self.min_requests = min_requests
+        self.recovery_timeout = recovery_timeout
+        self.rate_limit_timeout = rate_limit_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.probe_timeout = probe_timeout
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.state_store = state_store or BreakerStateStore()
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._background: set = set()
+
+    def get(self, name: str) -> CircuitBreaker:
+        cb = self.breakers.get(name)
+        if cb is None:
+            cb = CircuitBreaker(
+                name=name,
+                window_seconds=self.window_seconds,
+                error_rate_threshold=self.error_rate_threshold,
+                min_requests=self.min_requests,
+                recovery_timeout=self.recovery_timeout,
+                rate_limit_timeout=self.rate_limit_timeout,
+                half_open_max_calls=self.half_open_max_calls,
+                probe_timeout=self.probe_timeout
+            )
+            self.breakers[name] = cb
+        return cb
+
+    def get_timeout(self, name: str) -> float:
+        """Get call timeout for a specific provider."""
+        return self.timeouts.get(name, self.default_timeout)
+
+    # ------------------------------------------------------------------
+    # Admission
+    # ------------------------------------------------------------------
+
+    def is_open(self, name: str) -> bool:
+        """True if a request to this provider would be rejected right now (no side effects)."""
+        return not self.get(name).is_available()
+
+    def allow_request(self, name: str) -> bool:
+        """Admit a request locally; in HALF_OPEN this claims a probe slot."""
+        return self.get(name).can_execute()
+
+    async def acquire(self, name: str) -> bool:
+        """
+        Admit a request. HALF_OPEN probes are additionally limited across
+        workers when a shared state store is configured; the limit is keyed
+        on the shared record's ``opened_at`` (each worker's local one differs
+        when several tripped on their own).
+        """
+        cb = self.get(name)
+        if not cb.can_execute():
+            return False
+        if cb.state == CircuitState.HALF_OPEN and self.state_store.shared:
+            try:
+                record = (await self.state_store.fetch([name])).get(name) or {}
+            except Exception as e:
+                logger.debug(f"Breaker state fetch failed: {e}")
+                record = {}
+            opened_at = record.get("opened_at") if record.get("state") == "open" else cb.opened_at
+            epoch = int(float(opened_at or 0) * 1000)
+            if not await self.state_store.acquire_probe(name, epoch, self.half_open_max_calls):
+                cb.release_probe()
+                return False
+        return True
+
+    def release(self, name: str):
+        """Give back an admitted slot whose call produced no outcome (e.g. provider not configured)."""
+        self.get(name).release_probe()
+
+    # ------------------------------------------------------------------
+    # Outcomes
+    # ------------------------------------------------------------------
+
+    def record_success(self, name: str):
+        cb = self.get(name)
+        was_half_open = cb.state == CircuitState.HALF_OPEN
+        cb.record_success()
+        if was_half_open and cb.state == CircuitState.CLOSED:
+            self._spawn(self.state_store.publish_closed(name, time.time()))
+
+    def record_failure(self, name: str, status_code: int = 0, error_type: str = None):
+        cb = self.get(name)
+        opened_before = cb.opened_at
+        cb.record_failure(status_code=status_code, error_type=error_type)
+        if cb.state == CircuitState.OPEN and cb.opened_at != opened_before:
+            self._spawn(self.state_store.publish_open(name, cb.opened_at, cb.open_until, cb.last_error or ""))
+
+    def reset(self, name: str):
+        """Manually close a circuit."""
+        self.get(name).reset()
+        self._spawn(self.state_store.publish_closed(name, time.time()))
+        logger.info(f"Circuit breaker {name} manually reset")
+
+    # ------------------------------------------------------------------
+    # Cross-worker sync
+    # ------------------------------------------------------------------
+
+    def _spawn(self, coro):
+        if not self.state_store.shared:
+            coro.close()
+            return
+        try:
+            task = asyncio.get_running_loop().create_task(coro)
+        except RuntimeError:
+            coro.close()
+            return
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def sync_from_store(self, names: Optional[Iterable[str]] = None):
+        """Adopt OPEN/CLOSED transitions published by other workers."""
+        names = list(names) if names is not None else list(self.breakers)
+        records = await self.state_store.fetch(names)
+        now = time.time()
+        for name, record in records.items():
+            cb = self.get(name)
+            if record.get("state") == "open":
+                opened_at = float(record.get("opened_at", 0))
+                open_until = float(record.get("open_until", 0))
+                if open_until > now and opened_at > (cb.opened_at or 0):
+                    cb.trip(now, opened_at=opened_at, open_until=open_until)
+                    logger.warning(f"Circuit breaker {name}: OPEN (tripped by another worker)")
+            elif record.get("state") == "closed":
+                if cb.state != CircuitState.CLOSED and float(record.get("closed_at", 0)) > (cb.opened_at or 0):
+                    cb.reset()
+                    logger.info(f"Circuit breaker {name}: CLOSED (recovered on another worker)")
+
+    async def run_sync_loop(self, names: Optional[Iterable[str]] = None, interval: float = 2.0):
+        """Background task: keep local breakers in step with the shared store."""
+        names = list(names) if names is not None else None
+        while True:
+            try:
+                await self.sync_from_store(names if names is not None else None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"Breaker state sync failed: {e}")
+            await asyncio.sleep(interval)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def in_cooldown(self) -> List[str]:
+        """Providers whose circuit is currently OPEN."""
+        return [name for name, cb in self.breakers.items() if cb.current_state() == CircuitState.OPEN]
+
+    def get_status(self) -> Dict[str, Any]:
+        """Get circuit breaker status for all providers."""
+        status = {}
+        for name, cb in self.breakers.items():
+            stats = cb.get_stats()
+            status[name] = {
+                "state": stats["state"],
+                "failures": stats["failure_count"],
+                "requests": stats["window_requests"],
+                "error_rate": stats["error_rate"],
+                "reset_in_seconds": stats["reset_in_seconds"],
+                "probes_in_flight": stats["probes_in_flight"]
+            }
+        return status
+
+
 class ProviderManager:
     """
     Manages multiple AI providers with circuit breakers and failover.
     """
-    
-    def __init__(self):
-        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+    def __init__(self, breakers: Optional[CircuitBreakerRegistry] = None):
+        self.breakers = breakers or CircuitBreakerRegistry()
         self.provider_priority: list = []
         self.request_dedup: Dict[str, Any] = {}
         self.cache: Dict[str, Any] = {}
         self.cache_ttl = 3600  # 1 hour cache
-        
-    def register_provider(self, name: str, priority: int = 50, 
+
+    @property
+    def circuit_breakers(self) -> Dict[str, CircuitBreaker]:
+        return self.breakers.breakers
+
+    def register_provider(self, name: str, priority: int = 50,
                          failure_threshold: int = 5, recovery_timeout: int = 60):
         """Register a provider with circuit breaker"""
-        self.circuit_breakers[name] = CircuitBreaker(
-            name=name,
-            failure_threshold=failure_threshold,
-            recovery_timeout=recovery_timeout
-        )
+        cb = self.breakers.get(name)
+        cb.min_requests = failure_threshold
+        cb.recovery_timeout = recovery_timeout
         self.provider_priority.append((priority, name))
         self.provider_priority.sort(key=lambda x: x[0])
         logger.info(f"Registered provider: {name} (priority: {priority})")
-        
+
     def get_available_providers(self) -> list:
         """Get list of available providers in priority order"""
         available = []
         for priority, name in self.provider_priority:
             cb = self.circuit_breakers.get(name)
-            if cb and cb.can_execute():
+            if cb and cb.is_available():
                 available.append(name)
         return available
-    
+
     def get_healthy_providers(self) -> list:
         """Get providers with closed circuits only"""
-        return [name for name, cb in self.circuit_breakers.items() 
-                if cb.state == CircuitState.CLOSED]
-    
+        return [name for name, cb in self.circuit_breakers.items()
+                if cb.current_state() == CircuitState.CLOSED]
+
     async def execute_with_failover(self, providers: dict, claim: str) -> Optional[Dict]:
         """
         Execute verification with automatic failover.
-        
+
         Args:
             providers: Dict mapping provider name to async callable
             claim: The claim to verify
-            
+
         Returns:
             Result from first successful provider, or None if all fail
         """
@@ -172,91 +587,89 @@ class ProviderManager:
             if time.time() - cached['timestamp'] < self.cache_ttl:
                 logger.info(f"Cache hit for claim: {claim[:50]}...")
                 return cached['result']
-        
+
         # Check for in-flight duplicate request
         if cache_key in self.request_dedup:
             logger.info(f"Deduplicating request for claim: {claim[:50]}...")
             return await self.request_dedup[cache_key]
-        
+
         # Create dedup future
         future = asyncio.Future()
         self.request_dedup[cache_key] = future
-        
+
         try:
             result = await self._execute_with_failover_internal(providers, claim)
-            
+
             # Cache result
             if result:
                 self.cache[cache_key] = {
                     'result': result,
                     'timestamp': time.time()
                 }
-            
+
             future.set_result(result)
             return result
-            
+
         except Exception as e:
             future.set_exception(e)
             raise
         finally:
             del self.request_dedup[cache_key]
-    
+
     async def _execute_with_failover_internal(self, providers: dict, claim: str) -> Optional[Dict]:
         """Internal failover logic"""
         available = self.get_available_providers()
-        
+
         if not available:
             logger.error("No providers available - all circuits open")
             raise Exception("All AI providers are currently unavailable. Please try again later.")
-        
+
         errors = []
-        
+
         for provider_name in available:
             if provider_name not in providers:
                 continue
-                
-            cb = self.circuit_breakers[provider_name]
-            
-            if not cb.can_execute():
+
+            if not await self.breakers.acquire(provider_name):
                 continue
-                
+
             try:
                 logger.info(f"Trying provider: {provider_name}")
                 result = await providers[provider_name](claim)
-                cb.record_success()
-                
+                self.breakers.record_success(provider_name)
+
                 # Add provider info to result
                 if isinstance(result, dict):
                     result['provider'] = provider_name
-                
+
                 return result
-                
+
             except Exception as e:
-                cb.record_failure()
+                self.breakers.record_failure(provider_name, error_type=type(e).__name__)
                 errors.append(f"{provider_name}: {str(e)}")
                 logger.warning(f"Provider {provider_name} failed: {e}")
                 continue
-        
+
         # All providers failed
         logger.error(f"All providers failed: {errors}")
         return None
-    
+
     def _get_cache_key(self, claim: str) -> str:
         """Generate cache key for claim"""
         import hashlib
         normalized = claim.lower().strip()
         return hashlib.sha256(normalized.encode()).hexdigest()[:16]
-    
+
     def record_success(self, provider_name: str):
         """Record successful call for provider"""
         if provider_name in self.circuit_breakers:
-            self.circuit_breakers[provider_name].record_success()
-    
+            self.breakers.record_success(provider_name)
+
     def record_failure(self, provider_name: str):
         """Record failed call for provider"""
         if provider_name in self.circuit_breakers:
-            self.circuit_breakers[provider_name].record_failure()
-    
+            self.breakers.record_failure(provider_name)
+
     def get_all_stats(self) -> Dict:
         """Get statistics for all providers"""
         stats = {
@@ -268,28 +681,25 @@ class ProviderManager:
                 "unavailable": 0
             }
         }
-        
+
         for name, cb in self.circuit_breakers.items():
             stats["providers"][name] = cb.get_stats()
-            
-            if cb.state == CircuitState.CLOSED:
+            state = cb.current_state()
+
+            if state == CircuitState.CLOSED:
                 stats["summary"]["healthy"] += 1
-            elif cb.state == CircuitState.HALF_OPEN:
+            elif state == CircuitState.HALF_OPEN:
                 stats["summary"]["degraded"] += 1
             else:
                 stats["summary"]["unavailable"] += 1
-        
+
         return stats
-    
+
     def reset_circuit(self, provider_name: str):
         """Manually reset a circuit breaker"""
         if provider_name in self.circuit_breakers:
-            cb = self.circuit_breakers[provider_name]
-            cb.state = CircuitState.CLOSED
-            cb.failure_count = 0
-            cb.success_count = 0
-            logger.info(f"Circuit breaker {provider_name} manually reset")
-    
+            self.breakers.reset(provider_name)
+
     def clear_cache(self):
         """Clear the response cache"""
         self.cache.clear()
@@ -308,7 +718,7 @@ class RateLimiter:
     """
     Token bucket rate limiter with sliding window.
     """
-    
+
     def __init__(self, rate: int = 100, window: int = 60):
         """
         Args:
@@ -318,40 +728,40 @@ class RateLimiter:
         self.rate = rate
         self.window = window
         self.requests: Dict[str, list] = defaultdict(list)
-    
+
     def is_allowed(self, key: str) -> tuple:
         """
         Check if request is allowed.
-        
+
         Returns:
             Tuple of (is_allowed, remaining, reset_time)
         """
         now = time.time()
         window_start = now - self.window
-        
+
         # Clean old requests
         self.requests[key] = [t for t in self.requests[key] if t > window_start]
-        
+
         current_count = len(self.requests[key])
         remaining = max(0, self.rate - current_count)
-        
+
         if current_count >= self.rate:
             # Calculate reset time
             reset_time = self.requests[key][0] + self.window - now
             return False, remaining, reset_time
-        
+
         # Allow request
         self.requests[key].append(now)
         return True, remaining - 1, self.window
-    
+
     def get_usage(self, key: str) -> Dict:
         """Get rate limit usage for a key"""
         now = time.time()
         window_start = now - self.window
-        
+
         # Clean old requests
         self.requests[key] = [t for t in self.requests[key] if t > window_start]
-        
+
         return {
             "used": len(self.requests[key]),
             "limit": self.rate,
@@ -369,29 +779,29 @@ class HealthChecker:
     """
     Performs health checks on providers.
     """
-    
+
     def __init__(self, provider_manager: ProviderManager):
         self.provider_manager = provider_manager
         self.last_check: Dict[str, Dict] = {}
         self.check_interval = 60  # seconds
-    
+
     async def check_provider(self, name: str, test_func: Callable) -> Dict:
         """
         Check health of a single provider.
-        
+
         Args:
             name: Provider name
             test_func: Async function to test provider
-            
+
         Returns:
             Health status dict
         """
         start_time = time.time()
-        
+
         try:
             await test_func()
             latency = time.time() - start_time
-            
+
             status = {
                 "name": name,
                 "status": "healthy",
@@ -399,9 +809,9 @@ class HealthChecker:
                 "timestamp": time.time(),
                 "message": "OK"
             }
-            
+
             self.provider_manager.record_success(name)
-            
+
         except Exception as e:
             status = {
                 "name": name,
@@ -410,19 +820,19 @@ class HealthChecker:
                 "timestamp": time.time(),
                 "message": str(e)
             }
-            
+
             self.provider_manager.record_failure(name)
-        
+
         self.last_check[name] = status
         return status
-    
+
     async def check_all(self, test_funcs: Dict[str, Callable]) -> Dict:
         """
         Check health of all providers.
-        
+
         Args:
             test_funcs: Dict mapping provider name to test function
-            
+
         Returns:
             Overall health status
         """
@@ -430,10 +840,10 @@ class HealthChecker:
             self.check_provider(name, func)
             for name, func in test_funcs.items()
         ], return_exceptions=True)
-        
+
         healthy = sum(1 for r in results if isinstance(r, dict) and r.get("status") == "healthy")
         total = len(results)
-        
+
         return {
             "status": "healthy" if healthy == total else "degraded" if healthy > 0 else "unhealthy",
             "healthy_count": healthy,
@@ -441,11 +851,11 @@ class HealthChecker:
             "providers": [r for r in results if isinstance(r, dict)],
             "timestamp": time.time()
         }
-    
+
     def get_overall_status(self) -> str:
         """Get overall system health status"""
         stats = self.provider_manager.get_all_stats()
-        
+
         if stats["summary"]["healthy"] == stats["summary"]["total"]:
             return "healthy"
         elif stats["summary"]["healthy"] > 0:
@@ -457,7 +867,11 @@ class HealthChecker:
 # Export classes
 __all__ = [
     'CircuitBreaker',
-    'CircuitState', 
+    'CircuitState',
+    'CircuitBreakerRegistry',
+    'BreakerStateStore',
+    'RedisBreakerStateStore',
+    'create_state_store',
     'ProviderManager',
     'provider_manager',
     'RateLimiter',
@@ -0,0 +1,166 @@
+"""
+Verity API - Claim Text Analysis Engine
+=======================================
+Extracts every text feature the verification pipeline uses (nuance,
+temporal, category and injection signals) from one scan set per claim.
+
+The pattern lists stay where they are defined (``NuanceDetector``,
+``TemporalVerifier``, ``INJECTION_PATTERNS``, ``CLAIM_CATEGORIES``); the
+engine compiles them once:
+
+- All literal keyword groups share one ``KeywordSet``: each distinct keyword
+  is checked once per claim (substring semantics, same as ``kw in text``),
+  however many groups list it.
+- Each regex family gets one combined gate. A family whose gate does not match
+  is skipped entirely; only when it matches are its individual patterns run,
+  so results (including ``findall`` counts) are exactly those of the
+  original per-pattern loops.
+- The claim is lowercased once and the scan result is memoized, so the
+  several analyzers that look at the same claim during one verification
+  reuse it.
+"""
+
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class KeywordSet:
+    """Which of many literal keywords occur in a text.
+
+    Keywords are deduplicated across every group and checked once with ``in``
+    (CPython's substring search beats a regex alternation of lookaheads here,
+    which has to be attempted at every text position).
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = list(dict.fromkeys(keywords))
+
+    def present(self, text: str) -> Set[str]:
+        return {keyword for keyword in self.keywords if keyword in text}
+
+
+class PatternFamily:
+    """Regexes applied to the same text, compiled once and gated by their union."""
+
+    def __init__(self, patterns: Sequence[str], flags: int = re.IGNORECASE):
+        self.patterns = [re.compile(p, flags) for p in patterns]
+        self.gate = re.compile("|".join(f"(?:{p})" for p in patterns), flags) if patterns else None
+
+    def scan(self, text: str) -> "FamilyMatch":
+        if self.gate is None or self.gate.search(text) is None:
+            return FamilyMatch.EMPTY
+        return FamilyMatch(self, text)
+
+
+class FamilyMatch:
+    """Per-family results, computed on first use."""
+    EMPTY: "FamilyMatch"
+
+    __slots__ = ("family", "text", "_findall", "_hits")
+
+    def __init__(self, family: Optional[PatternFamily], text: str):
+        self.family = family
+        self.text = text
+        self._findall: Optional[List] = None
+        self._hits: Optional[List[bool]] = None
+
+    def __bool__(self) -> bool:
+        return self.family is not None
+
+    def findall(self) -> List:
+        """Concatenated ``re.findall`` results of every pattern, in pattern order."""
+        if self._findall is None:
+            out: List = []
+            if self.family is not None:
+                for pattern in self.family.patterns:
+                    out.extend(pattern.findall(self.text))
+            self._findall = out
+        return self._findall
+
+    def hits(self) -> List[bool]:
+        """Whether each pattern matches anywhere (``re.search``)."""
+        if self._hits is None:
+            if self.family is None:
+                self._hits = []
+            else:
+                self._hits = [pattern.search(self.text) is not None for pattern in self.family.patterns]
+        return self._hits
+
+    def first(self) -> Optional[int]:
+        """Index of the first pattern that matches (the loop-and-break idiom)."""
+        if self.family is None:
+            return None
+        for i, pattern in enumerate(self.family.patterns):
+            if pattern.search(self.text) is not None:
+                return i
+        return None
+
+    def count(self) -> int:
+        """Number of patterns that match."""
+        return sum(self.hits())
+
+
+FamilyMatch.EMPTY = FamilyMatch(None, "")
+
+
+class ClaimFeatures:
+    """Scan result for one claim (see ``ClaimAnalyzer.scan``)."""
+
+    __slots__ = ("claim", "lower", "families", "_analyzer", "_keywords")
+
+    def __init__(self, analyzer: "ClaimAnalyzer", claim: str):
+        self._analyzer = analyzer
+        self.claim = claim
+        self.lower = claim.lower()
+        self._keywords = analyzer.keywords.present(self.lower)
+        self.families = {name: family.scan(self.lower) for name, family in analyzer.families.items()}
+
+    def family(self, name: str) -> FamilyMatch:
+        return self.families[name]
+
+    def keywords(self, group: str) -> Dict[str, List[str]]:
+        """{subgroup: [keywords present, in definition order]} for a keyword group."""
+        out: Dict[str, List[str]] = {}
+        for subgroup, keywords in self._analyzer.keyword_groups[group].items():
+            hits = [kw for kw in keywords if kw.lower() in self._keywords]
+            if hits:
+                out[subgroup] = hits
+        return out
+
+
+class ClaimAnalyzer:
+    """
+    Args:
+        families: {name: regex patterns} - each run against the lowercased claim
+        keyword_groups: {group: {subgroup: [keywords]}} - substring-matched
+            against the lowercased claim (keywords are lowercased for matching)
+        cache_size: Memoized claims
+    """
+
+    def __init__(self, families: Mapping[str, Sequence[str]],
+                 keyword_groups: Mapping[str, Mapping[str, Sequence[str]]], cache_size: int = 512):
+        self.families = {name: PatternFamily(patterns) for name, patterns in families.items()}
+        self.keyword_groups = {g: {s: list(kws) for s, kws in subs.items()} for g, subs in keyword_groups.items()}
+        self.keywords = KeywordSet(
+            kw.lower() for subs in self.keyword_groups.values() for kws in subs.values() for kw in kws
+        )
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, ClaimFeatures]" = OrderedDict()
+
+    def scan(self, claim: str) -> ClaimFeatures:
+        features = self._cache.get(claim)
+        if features is not None:
+            self._cache.move_to_end(claim)
+            return features
+        features = ClaimFeatures(self, claim)
+        self._cache[claim] = features
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return features
+
+
+__all__ = ['ClaimAnalyzer', 'ClaimFeatures', 'KeywordSet', 'PatternFamily']
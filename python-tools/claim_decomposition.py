@@ -0,0 +1,207 @@
+"""
+Verity API - Sub-claim Decomposition
+====================================
+Splits long, compound input (an article paragraph, a social post) into
+atomic check-worthy sub-claims. Each one is verified and cached on its own,
+and the verdicts are aggregated into one overall verdict.
+
+- Sentences are the unit. Semicolon-joined clauses are split too, and a
+  sentence that leans on the previous one ("It was ...", "This means ...")
+  stays attached to it so every sub-claim can be checked on its own.
+- Questions, very short fragments and first-person opinions are not
+  check-worthy and are skipped.
+- Sub-claims are looked up in the claim cache individually, so a resubmitted
+  article with one edited sentence only verifies that sentence. Identical
+  sub-claims are verified once.
+- Only the first ``max_subclaims`` are verified (each costs a full
+  verification). ``summarize`` is told how many were found and reports
+  ``subclaims_total`` / ``subclaims_truncated``, so a cut is never silent.
+"""
+
+import asyncio
+import re
+from typing import Any, Dict, List, Optional, Sequence
+
+from batch_jobs import error_result
+from claim_dedup import canonical_key
+
+
+MAX_SUBCLAIMS = 12
+MIN_SUBCLAIM_WORDS = 3
+SUBCLAIM_CONCURRENCY = 4
+
+VERDICT_SCORES = {"true": 1.0, "mostly_true": 0.75, "mixed": 0.5, "mostly_false": 0.25, "false": 0.0}
+
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])[\"')\]]*\s+(?=[\"'(\[]?[A-Z0-9])")
+_ABBREVIATIONS = frozenset("""
+mr mrs ms dr prof st jr sr vs etc inc ltd co corp no fig approx est dept gen gov sen rep e.g i.e u.s u.k
+jan feb mar apr jun jul aug sep sept oct nov dec
+""".split())
+_DEPENDENT_START_RE = re.compile(r"^(?:it|its|this|that|these|those|they|their|he|she|his|her|such|so|but|and|also)\b",
+                                 re.IGNORECASE)
+_OPINION_RE = re.compile(r"^(?:i|we)\s+(?:think|believe|feel|guess|hope|wish|love|hate)\b|"
+                         r"^(?:in my (?:opinion|view)|imho|personally)\b", re.IGNORECASE)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of ``text``, not split after common abbreviations or initials."""
+    text = " ".join(text.split())
+    sentences: List[str] = []
+    start = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        candidate = text[start:match.start()]
+        last_word = candidate.rsplit(" ", 1)[-1].rstrip(".").lower()
+        if last_word in _ABBREVIATIONS or (len(last_word) == 1 and last_word.isalpha()):
+            continue
+        sentences.append(candidate.strip())
+        start = match.end()
+    if text[start:].strip():
+        sentences.append(text[start:].strip())
+    return sentences
+
+
+def is_check_worthy(sentence: str) -> bool:
+    words = sentence.split()
+    return (len(words) >= MIN_SUBCLAIM_WORDS
+            and not sentence.rstrip().endswith("?")
+            and not _OPINION_RE.match(sentence))
+
+
+def find_subclaims(text: str) -> List[str]:
+    """
+    All check-worthy sub-claims of ``text`` in order. Input that is a single
+    claim comes back as one sub-claim.
+    """
+    clauses: List[str] = []
+    for sentence in split_sentences(text):
+        for clause in sentence.split(";"):
+            clause = clause.strip()
+            if not clause:
+                continue
+            if clauses and _DEPENDENT_START_RE.match(clause):
+                clauses[-1] = f"{clauses[-1].rstrip('.')}; {clause}"
+            else:
+                clauses.append(clause)
+    return [c for c in clauses if is_check_worthy(c)]
+
+
+def decompose(text: str, max_subclaims: int = MAX_SUBCLAIMS) -> List[str]:
+    """The first ``max_subclaims`` check-worthy sub-claims of ``text``."""
+    return find_subclaims(text)[:max_subclaims]
+
+
+def aggregate(subresults: Sequence[Dict]) -> Dict[str, Any]:
+    """
+    Overall verdict for verified sub-claims: the confidence-weighted mean of
+    their verdict scores, bucketed back into a verdict. A text is "true" only
+    when none of its parts leans false. Unverifiable parts do not count
+    towards the verdict but lower the confidence.
+    """
+    scored = [r for r in subresults if r.get("verdict") in VERDICT_SCORES]
+    if not scored:
+        return {"verdict": "unverifiable", "confidence": 0.5}
+    weights = [max(float(r.get("confidence") or 0), 0.05) for r in scored]
+    mean = sum(VERDICT_SCORES[r["verdict"]] * w for r, w in zip(scored, weights)) / sum(weights)
+    if mean >= 0.875:
+        verdict = "true"
+    elif mean >= 0.625:
+        verdict = "mostly_true"
+    elif mean > 0.375:
+        verdict = "mixed"
+    elif mean > 0.125:
+        verdict = "mostly_false"
+    else:
+        verdict = "false"
+    if verdict == "true" and any(VERDICT_SCORES[r["verdict"]] < 0.5 for r in scored):
+        verdict = "mostly_true"
+    confidence = sum(weights) / len(weights) * len(scored) / len(subresults)
+    return {"verdict": verdict, "confidence": round(confidence, 3)}
+
+
+async def verify_subclaims(session, subclaims: Sequence[str], tier: str, cache=None,
+                           concurrency: int = SUBCLAIM_CONCURRENCY) -> List[Dict]:
+    """
+    Verify sub-claims in parallel with ``session.verify_claim``, using and
+    filling ``cache`` (``get(claim, tier)`` / ``set(claim, tier, result)``).
+    Returns one ``{"claim", "result", "cached"}`` entry per sub-claim, in order;
+    a sub-claim whose verification raises gets an ``error_result`` (not cached)
+    and the others carry on.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    inflight: Dict[str, asyncio.Task] = {}
+
+    async def verify(claim: str) -> Dict:
+        cached = cache.get(claim, tier) if cache is not None else None
+        if cached is not None:
+            return {"result": cached, "cached": True}
+        try:
+            async with semaphore:
+                result = await session.verify_claim(claim, tier=tier)
+        except Exception as e:
+            return {"result": error_result(str(e) or type(e).__name__), "cached": False}
+        if cache is not None:
+            cache.set(claim, tier, result)
+        return {"result": result, "cached": False}
+
+    tasks = []
+    for claim in subclaims:
+        key = canonical_key(claim)
+        if key not in inflight:
+            inflight[key] = asyncio.ensure_future(verify(claim))
+        tasks.append(inflight[key])
+    outcomes = await asyncio.gather(*tasks)
+    return [{"claim": claim, **outcome} for claim, outcome in zip(subclaims, outcomes)]
+
+
+def summarize(entries: Sequence[Dict], total: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Aggregate ``verify_subclaims`` output into an overall verdict with a
+    per-sub-claim breakdown. ``total`` is how many sub-claims the text had
+    when only the first ``len(entries)`` were verified.
+    """
+    total = max(total or 0, len(entries))
+    results = [e["result"] for e in entries]
+    overall = aggregate(results)
+    breakdown = [
+        {
+            "claim": e["claim"],
+            "verdict": e["result"].get("verdict"),
+            "confidence": e["result"].get("confidence"),
+            "explanation": e["result"].get("explanation", ""),
+            "cached": e["cached"],
+        }
+        for e in entries
+    ]
+    counts: Dict[str, int] = {}
+    for r in results:
+        counts[r.get("verdict")] = counts.get(r.get("verdict"), 0) + 1
+    parts = ", ".join(f"{n} {v}" for v, n in counts.items())
+    flagged = [b["claim"] for b in breakdown if VERDICT_SCORES.get(b["verdict"], 1) < 0.5]
+    explanation = f"{len(entries)} sub-claims checked ({parts})."
+    if total > len(entries):
+        explanation += f" Only the first {len(entries)} of {total} sub-claims were checked."
+    if flagged:
+        explanation += " Inaccurate: " + " | ".join(flagged)
+    seen, sources, providers = set(), [], []
+    for r in results:
+        for source in r.get("sources", []):
+            if source.get("url") and source["url"] not in seen:
+                seen.add(source["url"])
+                sources.append(source)
+        for provider in r.get("providers_used", []):
+            if provider not in providers:
+                providers.append(provider)
+    return {
+        **overall,
+        "explanation": explanation,
+        "subclaims": breakdown,
+        "sources": sorted(sources, key=lambda s: s.get("credibility", 0.5), reverse=True)[:10],
+        "providers_used": providers,
+        "subclaims_cached": sum(1 for e in entries if e["cached"]),
+        "subclaims_total": total,
+        "subclaims_truncated": total > len(entries),
+    }
+
+
+__all__ = ['MAX_SUBCLAIMS', 'split_sentences', 'is_check_worthy', 'find_subclaims', 'decompose', 'aggregate',
+           'verify_subclaims', 'summarize']
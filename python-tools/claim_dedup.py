@@ -0,0 +1,176 @@
+"""
+Verity API - Claim Deduplication
+================================
+Groups exact and near-duplicate claims so a batch verifies each distinct
+claim once.
+
+- Exact duplicates share a canonical form: Unicode-normalized, lowercased,
+  punctuation and repeated whitespace removed.
+- Near duplicates are trivial rewordings ("The Earth is flat" /
+  "earth is flat!!" / "Earth's flat, the"): the same content words, in an
+  order whose word-pair shingles overlap by at least ``threshold``. Any
+  content word present in one claim and not the other keeps them apart, and
+  so does a change of order - "Biden defeated Trump" and "Trump defeated
+  Biden", or "FDA approved X" and "FDA rejected X", are different claims
+  however similar their bags of words. Candidates are bucketed by their
+  content-word set, so grouping stays linear.
+  Claims never group when their numbers or their negation differ - "sea level
+  rose 3mm" and "sea level rose 30mm", or "X is safe" and "X is not safe".
+- ``claim_similarity`` is the looser, order-blind score, for ranking
+  candidates; it is not evidence that two claims say the same thing.
+"""
+
+import hashlib
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, FrozenSet, List, Sequence, Tuple
+
+
+STOPWORDS = frozenset("""
+a an the and or but of to in on at by for with from as into about than that this these those
+is are was were be been being am do does did has have had it its it's there their they them
+which who whom whose what when where why how very really actually just also so such
+""".split())
+
+NEGATIONS = frozenset("""
+no not never none nobody nothing neither nor cannot can't don't doesn't didn't isn't aren't
+wasn't weren't won't wouldn't shouldn't couldn't hasn't haven't hadn't without
+""".split())
+
+_PUNCT_RE = re.compile(r"[^\w\s%.'-]|(?<!\d)\.|\.(?!\d)|(?<!\w)['-]|['-](?!\w)")
+_SPACE_RE = re.compile(r"\s+")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?%?")
+
+
+def canonical_claim(claim: str) -> str:
+    """Normalized form used for exact-duplicate detection."""
+    text = unicodedata.normalize("NFKC", claim).lower().replace("’", "'")
+    text = _PUNCT_RE.sub(" ", text)
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def canonical_key(claim: str) -> str:
+    """Compact hash of ``canonical_claim`` (for dictionaries of recent claims)."""
+    return hashlib.sha1(canonical_claim(claim).encode()).hexdigest()
+
+
+def _content_words(canonical: str) -> Tuple[str, ...]:
+    """Content words of a canonical claim in order, crudely singularized."""
+    words = []
+    for w in canonical.split():
+        if w in STOPWORDS or w in NEGATIONS:
+            continue
+        if w.endswith("'s"):
+            w = w[:-2]
+        elif len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]
+        words.append(w)
+    return tuple(words)
+
+
+def _signature(canonical: str) -> Tuple[FrozenSet[str], FrozenSet[str], bool]:
+    """(content tokens, numbers, negated) for near-duplicate comparison."""
+    words = canonical.split()
+    numbers = frozenset(_NUMBER_RE.findall(canonical))
+    negated = any(w in NEGATIONS or w.endswith("n't") for w in words)
+    return frozenset(_content_words(canonical)), numbers, negated
+
+
+def _shingles(words: Sequence[str]) -> FrozenSet[Tuple[str, str]]:
+    """Adjacent word pairs, with the ends marked so first and last words count."""
+    padded = ("^", *words, "$")
+    return frozenset(zip(padded, padded[1:]))
+
+
+def _jaccard(a: FrozenSet, b: FrozenSet) -> float:
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def claim_similarity(a: str, b: str) -> float:
+    """
+    Content-word Jaccard similarity of two claims (1.0 for the same canonical
+    form), or 0.0 when their numbers or their negation differ. Order-blind:
+    use ``near_duplicate`` to decide whether two claims are the same claim.
+    """
+    ca, cb = canonical_claim(a), canonical_claim(b)
+    if ca == cb:
+        return 1.0
+    (ta, na, nega), (tb, nb, negb) = _signature(ca), _signature(cb)
+    if na != nb or nega != negb:
+        return 0.0
+    return _jaccard(ta, tb)
+
+
+def near_duplicate(a: str, b: str, threshold: float = 0.8) -> bool:
+    """
+    True when two claims say the same thing: the same canonical form, or the
+    same numbers, negation and content words with word-pair shingles
+    overlapping by at least ``threshold``.
+    """
+    ca, cb = canonical_claim(a), canonical_claim(b)
+    if ca == cb:
+        return True
+    if _signature(ca) != _signature(cb):
+        return False
+    return _jaccard(_shingles(_content_words(ca)), _shingles(_content_words(cb))) >= threshold
+
+
+def group_claims(claims: Sequence[str], threshold: float = 0.8) -> List[Dict]:
+    """
+    Group duplicate claims. Returns one entry per distinct claim, in order of
+    first appearance::
+
+        {"representative": 0, "members": [0, 4, 7], "match": "exact" | "near"}
+
+    ``match`` is "near" when any member joined through similarity rather than
+    an identical canonical form.
+    """
+    # Exact groups by canonical form
+    exact: Dict[str, List[int]] = {}
+    for i, claim in enumerate(claims):
+        exact.setdefault(canonical_claim(claim), []).append(i)
+
+    reps = list(exact.items())  # (canonical, members) in first-appearance order
+
+    # Near duplicates share a signature (content-word set, numbers, negation);
+    # within a signature bucket they must also keep the word order
+    parent = list(range(len(reps)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    buckets: Dict[Tuple[FrozenSet[str], FrozenSet[str], bool], List[int]] = defaultdict(list)
+    shingles = []
+    for g, (canonical, _) in enumerate(reps):
+        tokens, numbers, negated = _signature(canonical)
+        shingles.append(_shingles(_content_words(canonical)))
+        bucket = buckets[(tokens, numbers, negated)]
+        for other in bucket:
+            if tokens and _jaccard(shingles[g], shingles[other]) >= threshold:
+                a, b = find(g), find(other)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+        bucket.append(g)
+
+    merged: Dict[int, Dict] = {}
+    for g, (_, members) in enumerate(reps):
+        root = find(g)
+        entry = merged.get(root)
+        if entry is None:
+            merged[root] = {"representative": members[0], "members": list(members), "match": "exact"}
+        else:
+            entry["members"].extend(members)
+            entry["match"] = "near"
+    groups = list(merged.values())
+    for entry in groups:
+        entry["members"].sort()
+    groups.sort(key=lambda e: e["representative"])
+    return groups
+
+
+__all__ = ['canonical_claim', 'canonical_key', 'claim_similarity', 'near_duplicate', 'group_claims']
@@ -0,0 +1,153 @@
+"""
+Verity API - Multi-Claim Prompt Packing
+=======================================
+Sends several batch claims to a provider in one request.
+
+The claims go out as a numbered list and the model must answer with exactly
+one line per claim::
+
+    <n> | <verdict> | <confidence 0-1> | <one-sentence reason>
+
+``parse_packed_response`` returns only the items whose line parses cleanly;
+the caller re-checks any missing item with a normal single-claim call.
+
+How many claims share a request (K) is chosen per provider: every answer line
+needs room in the provider's output budget (the ``max_tokens`` its call
+sends), and the numbered claims must fit its context window.
+"""
+
+import re
+from typing import Dict, List, Sequence
+
+
+PACK_VERDICTS = ("true", "mostly_true", "partially_true", "mixed", "misleading",
+                 "mostly_false", "false", "unverifiable")
+
+# Search-backed "providers" that take the claim as a query, not a prompt
+PACK_UNSUPPORTED = ("you", "jina")
+
+# Hard ceiling on claims per request, whatever the budgets allow
+PACK_MAX = 12
+
+# Token budgets per provider: context window and the max_tokens its call requests
+DEFAULT_PACK_LIMITS = {"context": 8192, "output": 500}
+PACK_LIMITS = {
+    "groq": {"context": 131072, "output": 500},
+    "google": {"context": 1048576, "output": 500},
+    "openai": {"context": 128000, "output": 500},
+    "anthropic": {"context": 200000, "output": 500},
+    "mistral": {"context": 32768, "output": 500},
+    "cohere": {"context": 128000, "output": 500},
+    "cerebras": {"context": 8192, "output": 500},
+    "sambanova": {"context": 8192, "output": 500},
+    "deepseek": {"context": 65536, "output": 500},
+    "perplexity": {"context": 127072, "output": 1000},
+    "huggingface": {"context": 4096, "output": 500},
+}
+
+PROMPT_OVERHEAD_TOKENS = 150   # instructions around the numbered list
+ITEM_OUTPUT_TOKENS = 40        # one answer line
+ITEM_INPUT_OVERHEAD = 6        # numbering and newline per claim
+
+_LINE_RE = re.compile(
+    r"^\s*\[?(\d{1,3})[\].):]?\s*\|\s*([a-z_ ]+?)\s*\|\s*([01](?:\.\d+)?|\d{1,3}%)\s*\|\s*(.+?)\s*$",
+    re.IGNORECASE
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def pack_limits(provider: str) -> Dict[str, int]:
+    return PACK_LIMITS.get(provider, DEFAULT_PACK_LIMITS)
+
+
+def supports_packing(provider: str) -> bool:
+    return provider not in PACK_UNSUPPORTED
+
+
+def max_items(provider: str) -> int:
+    """Most answer lines that fit in the provider's output budget."""
+    if not supports_packing(provider):
+        return 1
+    output = pack_limits(provider)["output"]
+    return max(1, min(PACK_MAX, (output - 20) // ITEM_OUTPUT_TOKENS))
+
+
+def plan_packs(provider: str, claims: Sequence[str]) -> List[List[int]]:
+    """Split claim indices into consecutive groups sized for this provider."""
+    limits = pack_limits(provider)
+    k = max_items(provider)
+    input_budget = limits["context"] - limits["output"] - PROMPT_OVERHEAD_TOKENS
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for i, claim in enumerate(claims):
+        cost = estimate_tokens(claim) + ITEM_INPUT_OVERHEAD
+        if current and (len(current) >= k or used + cost > input_budget):
+            groups.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_packed_prompt(claims: Sequence[str]) -> str:
+    """Numbered claim list with the strict per-item answer format."""
+    numbered = "\n".join(f"{i + 1}. {' '.join(c.split())}" for i, c in enumerate(claims))
+    return (
+        f"Fact-check each of the {len(claims)} numbered claims below independently.\n"
+        f"Reply with exactly {len(claims)} lines and nothing else, one per claim, in this format:\n"
+        f"<number> | <verdict> | <confidence from 0 to 1> | <one-sentence reason>\n"
+        f"<verdict> must be one of: {', '.join(PACK_VERDICTS)}.\n\n"
+        f"Claims:\n{numbered}"
+    )
+
+
+def parse_packed_response(text: str, count: int) -> Dict[int, Dict]:
+    """
+    Parse answer lines into {index (0-based): {"verdict", "confidence", "explanation"}}.
+
+    Lines that do not match the format, use an unknown verdict, repeat a number
+    or fall outside 1..count are ignored, so those items fall back to
+    single-claim calls.
+    """
+    parsed: Dict[int, Dict] = {}
+    duplicates = set()
+    for line in (text or "").splitlines():
+        m = _LINE_RE.match(line.strip().strip("*`"))
+        if not m:
+            continue
+        number = int(m.group(1))
+        verdict = m.group(2).strip().lower().replace(" ", "_")
+        if not 1 <= number <= count or verdict not in PACK_VERDICTS:
+            continue
+        raw_conf = m.group(3)
+        confidence = float(raw_conf[:-1]) / 100 if raw_conf.endswith("%") else float(raw_conf)
+        if confidence > 1:
+            continue
+        index = number - 1
+        if index in parsed:
+            duplicates.add(index)
+            continue
+        parsed[index] = {"verdict": verdict, "confidence": confidence, "explanation": m.group(4)}
+    for index in duplicates:
+        parsed.pop(index, None)
+    return parsed
+
+
+__all__ = [
+    'PACK_VERDICTS',
+    'PACK_LIMITS',
+    'PACK_MAX',
+    'PACK_UNSUPPORTED',
+    'supports_packing',
+    'max_items',
+    'plan_packs',
+    'build_packed_prompt',
+    'parse_packed_response'
+]
@@ -0,0 +1,357 @@
+"""
+Verity API - Domain Reputation Index
+====================================
+One index for every domain rating the API uses: credibility scores, authority
+tiers and known bias.
+
+- Domains are stored in a trie keyed by reversed labels
+  (``news.bbc.co.uk`` -> ``uk``, ``co``, ``bbc``, ``news``). A lookup walks
+  the host's labels from the right and keeps the deepest rated node, so it
+  costs one dict step per label. A rating applies to the domain and all of its
+  subdomains, and never to look-alikes: ``notnature.com`` does not match
+  ``nature.com``.
+- Public-suffix aware: ``registrable_domain`` uses the public suffix rules
+  (a built-in set of common suffixes, or the full list loaded with
+  ``load_public_suffix_list``). It is used for reporting and for looking up
+  sources by bare name ("reuters").
+- Ratings load from tab-separated files (optionally gzipped) with one domain
+  per line::
+
+      # domain      credibility  tier   bias
+      reuters.com   0.98         tier2  -
+      cell.com      -            tier1  -
+
+  ``-`` leaves a field unset. Later files override earlier ones field by
+  field, so external lists of hundreds of thousands of domains can be layered
+  over the bundled ``domain_reputation.tsv`` (see ``DOMAIN_REPUTATION_FILES``).
+"""
+
+import gzip
+import os
+import re
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+BUNDLED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "domain_reputation.tsv")
+
+# Authority tiers: (authority score, bias risk)
+AUTHORITY_TIERS = {
+    "tier1": (0.95, "very_low"),
+    "tier2": (0.90, "low"),
+    "tier3": (0.80, "medium"),
+    "tier4": (0.55, "high"),
+}
+
+# Public suffixes used when the full list is not loaded
+DEFAULT_PUBLIC_SUFFIXES = """
+com org net edu gov mil int info biz io co ai app dev news eu uk us ca au de fr jp cn in ru br it es nl
+co.uk org.uk ac.uk gov.uk ltd.uk plc.uk me.uk nhs.uk police.uk sch.uk
+com.au net.au org.au edu.au gov.au co.nz org.nz govt.nz ac.nz co.jp ac.jp go.jp or.jp ne.jp
+com.br gov.br com.cn gov.cn edu.cn co.in gov.in ac.in nic.in co.za gov.za ac.za com.mx gob.mx
+com.sg gov.sg edu.sg com.hk gov.hk co.kr go.kr ac.kr com.tr gov.tr co.il ac.il gov.il
+github.io gitlab.io blogspot.com wordpress.com substack.com medium.com herokuapp.com netlify.app vercel.app
+""".split()
+
+_HOST_RE = re.compile(r"(?:https?://)?((?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+[a-z][a-z0-9-]*[a-z0-9])", re.IGNORECASE)
+_NAME_RE = re.compile(r"[a-z0-9][a-z0-9-]{2,62}")
+
+# Source names that are everyday words: in free text they only count as domains
+AMBIGUOUS_NAMES = frozenset({"who", "time", "cell", "medium", "fortune", "vice", "today", "mirror", "sun"})
+
+
+class Rating(NamedTuple):
+    domain: str                     # the rated domain that matched
+    credibility: Optional[float]
+    tier: Optional[str]
+    bias: Optional[str]
+
+    @property
+    def authority_score(self) -> Optional[float]:
+        return AUTHORITY_TIERS[self.tier][0] if self.tier in AUTHORITY_TIERS else None
+
+    @property
+    def bias_risk(self) -> Optional[str]:
+        return AUTHORITY_TIERS[self.tier][1] if self.tier in AUTHORITY_TIERS else None
+
+
+def host_of(url: str) -> str:
+    """Lowercased host of a URL (or bare domain), without port, trailing dot or leading ``www.``."""
+    if not url:
+        return ""
+    if "/" in url or ":" in url or "@" in url:
+        try:
+            host = urlsplit(url if "//" in url else "//" + url).hostname or ""
+        except ValueError:
+            return ""
+    else:
+        host = url.strip().lower()
+    host = host.rstrip(".")
+    return host[4:] if host.startswith("www.") else host
+
+
+class PublicSuffixList:
+    """Public suffix rules (including ``*.`` wildcards and ``!`` exceptions) in a reversed-label trie."""
+
+    _RULE, _WILDCARD, _EXCEPTION = "\x00rule", "\x00wild", "\x00except"
+
+    def __init__(self, rules: Iterable[str] = DEFAULT_PUBLIC_SUFFIXES):
+        self.root: Dict = {}
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule: str):
+        rule = rule.strip().lower()
+        if not rule or rule.startswith("//"):
+            return
+        flag = self._RULE
+        if rule.startswith("!"):
+            flag, rule = self._EXCEPTION, rule[1:]
+        elif rule.startswith("*."):
+            flag, rule = self._WILDCARD, rule[2:]
+        node = self.root
+        for label in reversed(rule.split(".")):
+            node = node.setdefault(label, {})
+        node[flag] = True
+
+    def suffix_length(self, labels: Sequence[str]) -> int:
+        """Number of trailing labels (of ``labels``, in host order) that form the public suffix."""
+        node, length, depth = self.root, 1, 0  # an unlisted TLD is still a suffix
+        for label in reversed(labels):
+            child = node.get(label)
+            depth += 1
+            if child is None:
+                if self._WILDCARD in node:
+                    length = depth
+                break
+            if self._EXCEPTION in child:
+                return depth - 1
+            if self._RULE in child:
+                length = depth
+            node = child
+        return length
+
+    def registrable_domain(self, host: str) -> str:
+        """The public suffix plus one label (``news.bbc.co.uk`` -> ``bbc.co.uk``); the host if it is a suffix."""
+        labels = host.split(".")
+        n = self.suffix_length(labels) + 1
+        return ".".join(labels[-n:]) if len(labels) >= n else host
+
+
+def load_public_suffix_list(path: str) -> PublicSuffixList:
+    """Read the Mozilla public suffix list (``public_suffix_list.dat``)."""
+    with _open(path) as f:
+        return PublicSuffixList(line.split()[0] for line in f if line.strip() and not line.startswith("//"))
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+class DomainReputationIndex:
+    """
+    Reversed-label trie of domain ratings.
+
+    Internal nodes are dicts of label -> child; a node's own rating sits under
+    the ``_RATING`` key. A rated domain with no rated subdomains is stored as
+    its bare ``(credibility, tier, bias)`` tuple instead of a dict, and equal
+    tuples are shared, which keeps large lists (mostly leaves with a handful
+    of distinct scores) compact.
+    """
+
+    _RATING = "\x00"  # node key holding the node's rating (labels never contain NUL)
+
+    def __init__(self, suffixes: Optional[PublicSuffixList] = None):
+        self.root: Dict = {}
+        self.suffixes = suffixes or PublicSuffixList()
+        self.size = 0
+        self._values: Dict[tuple, tuple] = {}
+        self._names: Optional[Dict[str, Rating]] = None
+
+    def add(self, domain: str, credibility: Optional[float] = None, tier: Optional[str] = None,
+            bias: Optional[str] = None):
+        """Rate ``domain`` (and its subdomains). Unset fields keep an earlier rating's value."""
+        domain = host_of(domain)
+        if not domain:
+            return
+        labels = domain.split(".")
+        node = self.root
+        for label in reversed(labels[1:]):
+            child = node.get(label)
+            if child is None:
+                child = node[label] = {}
+            elif type(child) is tuple:
+                child = node[label] = {self._RATING: child}
+            node = child
+        leaf = node.get(labels[0])
+        old = leaf.get(self._RATING) if type(leaf) is dict else leaf
+        if old is None:
+            self.size += 1
+        else:
+            credibility = old[0] if credibility is None else credibility
+            tier = tier or old[1]
+            bias = bias or old[2]
+        value = (credibility, tier, bias)
+        value = self._values.setdefault(value, value)
+        if type(leaf) is dict:
+            leaf[self._RATING] = value
+        else:
+            node[labels[0]] = value
+        self._names = None
+
+    def load(self, lines: Iterable[str]) -> int:
+        """Add ratings from TSV lines (``domain credibility tier bias``); returns the number of lines read."""
+        count = 0
+        scores: Dict[str, Optional[float]] = {"-": None}
+        for line in lines:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            fields += ["-"] * (4 - len(fields))
+            domain, credibility, tier, bias = fields[:4]
+            score = scores.get(credibility, False)
+            if score is False:
+                try:
+                    score = scores[credibility] = float(credibility)
+                except ValueError:
+                    logger.warning(f"[REPUTATION] Skipping malformed line: {line.strip()[:80]}")
+                    continue
+            self.add(domain, score, None if tier == "-" else tier, None if bias == "-" else bias)
+            count += 1
+        return count
+
+    def load_file(self, path: str) -> int:
+        with _open(path) as f:
+            count = self.load(f)
+        logger.info(f"[REPUTATION] Loaded {count} domain ratings from {os.path.basename(path)}")
+        return count
+
+    def lookup_host(self, host: str) -> Optional[Rating]:
+        """
+        Rating for ``host`` from the rated domains on its label path: each
+        field comes from the most specific domain that sets it, ``domain`` is
+        the most specific rated domain.
+        """
+        labels = host.split(".")
+        node, found, depth = self.root, None, 0
+        for i in range(len(labels) - 1, -1, -1):
+            child = node.get(labels[i])
+            if child is None:
+                break
+            if type(child) is tuple:
+                value, node = child, None
+            else:
+                value, node = child.get(self._RATING), child
+            if value is not None:
+                if found is not None:
+                    value = (found[0] if value[0] is None else value[0], value[1] or found[1], value[2] or found[2])
+                found, depth = value, len(labels) - i
+            if node is None:
+                break
+        if found is None:
+            return None
+        return Rating(".".join(labels[-depth:]), *found)
+
+    def lookup(self, url: str) -> Optional[Rating]:
+        return self.lookup_host(host_of(url))
+
+    def lookup_many(self, urls: Iterable[str]) -> List[Optional[Rating]]:
+        """``lookup`` for a batch of URLs (each distinct host is resolved once)."""
+        seen: Dict[str, Optional[Rating]] = {}
+        out = []
+        for url in urls:
+            host = host_of(url)
+            if host not in seen:
+                seen[host] = self.lookup_host(host)
+            out.append(seen[host])
+        return out
+
+    def credibility(self, url: str, default: float = 0.5) -> float:
+        rating = self.lookup(url)
+        return default if rating is None or rating.credibility is None else rating.credibility
+
+    def credibilities(self, urls: Iterable[str], default: float = 0.5) -> List[float]:
+        cache: Dict[str, float] = {}
+        out = []
+        for url in urls:
+            host = host_of(url)
+            if host not in cache:
+                rating = self.lookup_host(host)
+                cache[host] = default if rating is None or rating.credibility is None else rating.credibility
+            out.append(cache[host])
+        return out
+
+    def registrable_domain(self, url: str) -> str:
+        return self.suffixes.registrable_domain(host_of(url))
+
+    def by_name(self, name: str) -> Optional[Rating]:
+        """Rating of a registrable domain by its bare name ("reuters" -> reuters.com)."""
+        if self._names is None:
+            names: Dict[str, Rating] = {}
+            stack = [(self.root, "")]
+            while stack:
+                node, suffix = stack.pop()
+                for label, child in node.items():
+                    if label == self._RATING:
+                        continue
+                    domain = f"{label}.{suffix}" if suffix else label
+                    if type(child) is dict:
+                        stack.append((child, domain))
+                        if self._RATING not in child:
+                            continue
+                    if self.suffixes.registrable_domain(domain) != domain:
+                        continue
+                    rating = self.lookup_host(domain)
+                    best = names.get(label)
+                    if best is None or (rating.credibility or 0) > (best.credibility or 0):
+                        names[label] = rating
+            self._names = names
+        return self._names.get(name.lower())
+
+    def find_in_text(self, text: str) -> List[Tuple[str, Rating]]:
+        """Rated sources mentioned in free text: hosts first, then bare names ("reuters")."""
+        found: Dict[str, Tuple[str, Rating]] = {}
+        hosts = set()
+        for match in _HOST_RE.finditer(text):
+            host = host_of(match.group(1))
+            hosts.update(host.split("."))
+            rating = self.lookup_host(host)
+            if rating is not None and rating.domain not in found:
+                found[rating.domain] = (host, rating)
+        for word in _NAME_RE.findall(text.lower()):
+            if word in hosts or word in AMBIGUOUS_NAMES:
+                continue
+            rating = self.by_name(word)
+            if rating is not None and rating.domain not in found:
+                found[rating.domain] = (word, rating)
+        return list(found.values())
+
+
+def build_index(paths: Sequence[str] = (), suffix_list: Optional[str] = None) -> DomainReputationIndex:
+    """The bundled ratings plus ``paths`` (in order), with the public suffix list from ``suffix_list`` if given."""
+    suffixes = load_public_suffix_list(suffix_list) if suffix_list else None
+    index = DomainReputationIndex(suffixes)
+    for path in (BUNDLED_FILE, *paths):
+        index.load_file(path)
+    return index
+
+
+def default_index() -> DomainReputationIndex:
+    """Index configured by ``DOMAIN_REPUTATION_FILES`` (comma-separated) and ``PUBLIC_SUFFIX_LIST``."""
+    global _default
+    if _default is None:
+        extra = [p.strip() for p in os.getenv("DOMAIN_REPUTATION_FILES", "").split(",") if p.strip()]
+        _default = build_index(extra, os.getenv("PUBLIC_SUFFIX_LIST") or None)
+    return _default
+
+
+_default: Optional[DomainReputationIndex] = None
+
+
+__all__ = ['AUTHORITY_TIERS', 'Rating', 'host_of', 'PublicSuffixList', 'load_public_suffix_list',
+           'DomainReputationIndex', 'build_index', 'default_index']
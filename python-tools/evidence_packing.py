@@ -0,0 +1,275 @@
+"""
+Verity API - Evidence Packing
+=============================
+Turns extracted content and search results into the evidence context that
+AI providers see.
+
+- Collected text is split into passages (paragraphs of extracted pages,
+  sentences of search snippets). Tavily, Brave, Serper and Exa often return
+  the same article, so near-identical passages are dropped. Two passages are
+  duplicates when most of the shorter one's word shingles also appear in the
+  longer one.
+- Passages are ranked by relevance to the claim (share of the claim's content
+  words they mention) and by source credibility.
+- Each provider gets the best passages that fit its token budget
+  (``CONTEXT_BUDGETS``). Passages keep their rank number in every context, so
+  an evidence ID cited by one provider means the same passage for all.
+- One ``PackedEvidence`` serves a whole verification: contexts are packed
+  once per budget and reused by the second pass.
+- Evidence that arrives late (references fetched after the first pass) is
+  numbered after the first-pass passages, so their IDs stay stable, and gets
+  up to ``LATE_EVIDENCE_SHARE`` of each budget so it is not cut behind them.
+
+Token counts are estimates (``CHARS_PER_TOKEN``); they are only used for
+budgeting and for ``verity_evidence_context_tokens``.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence
+
+import prometheus_metrics as metrics
+from claim_dedup import STOPWORDS, canonical_claim
+
+
+CHARS_PER_TOKEN = 4
+
+# Evidence tokens per provider call. Providers with tight per-minute token
+# limits or small context windows get less.
+DEFAULT_CONTEXT_BUDGET = 900
+CONTEXT_BUDGETS = {
+    "openai": 1400, "anthropic": 1400, "google": 1400, "perplexity": 1000,
+    "groq": 700, "cerebras": 700, "sambanova": 700, "cloudflare": 500,
+}
+
+PASSAGE_MAX_CHARS = 700       # extracted pages are split into passages of about this size
+MIN_PASSAGE_CHARS = 40        # shorter fragments carry no evidence
+MIN_TRUNCATED_TOKENS = 60     # a passage is cut to fit only if this much budget is left
+DUPLICATE_CONTAINMENT = 0.8   # shingle overlap (relative to the shorter passage) that marks a duplicate
+SHINGLE_SIZE = 3
+
+LATE_EVIDENCE_SHARE = 0.35    # of a context budget, kept for passages added by a later packing
+
+RELEVANCE_WEIGHT = 0.6
+CREDIBILITY_WEIGHT = 0.4
+
+EVIDENCE_TOKENS = metrics.registry.histogram(
+    "verity_evidence_context_tokens", "Estimated evidence tokens per verification (collected) and per provider call (sent)",
+    ("stage",), allowed={"stage": ("collected", "sent")},
+    buckets=(50, 100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 8000))
+EVIDENCE_PASSAGES = metrics.registry.counter(
+    "verity_evidence_passages_total", "Collected evidence passages by packing outcome",
+    ("result",), allowed={"result": ("kept", "duplicate")})
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n+")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+_WORD_RE = re.compile(r"[\w%.'-]+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _words(text: str) -> List[str]:
+    return _WORD_RE.findall(canonical_claim(text))
+
+
+def _terms(words: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(w for w in words if w not in STOPWORDS and len(w) > 1)
+
+
+def _shingles(words: Sequence[str]) -> FrozenSet[tuple]:
+    if len(words) < SHINGLE_SIZE:
+        return frozenset([tuple(words)]) if words else frozenset()
+    return frozenset(tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1))
+
+
+def _cut_point(text: str, max_chars: int) -> int:
+    """Where to cut ``text`` to at most ``max_chars``: after a sentence end, else at a word boundary."""
+    if len(text) <= max_chars:
+        return len(text)
+    cut = text[:max_chars]
+    end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if end >= max_chars // 2:
+        return end + 1
+    space = cut.rfind(" ")
+    return space if space > 0 else max_chars
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    head = text[:_cut_point(text, max_chars)].rstrip()
+    return head if len(head) == len(text) or head.endswith((".", "!", "?")) else head + "..."
+
+
+def split_passages(text: str, max_chars: int = PASSAGE_MAX_CHARS) -> List[str]:
+    """Split text into passages of at most ``max_chars``, merging short paragraphs and sentences."""
+    pieces = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        paragraph = " ".join(paragraph.split())
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+        else:
+            pieces.extend(_SENTENCE_RE.split(paragraph))
+
+    passages, current = [], ""
+    for piece in pieces:
+        if not piece:
+            continue
+        if current and len(current) + 1 + len(piece) > max_chars:
+            passages.append(current)
+            current = ""
+        current = f"{current} {piece}" if current else piece
+        while len(current) > max_chars:
+            cut = _cut_point(current, max_chars)
+            passages.append(current[:cut].strip())
+            current = current[cut:].strip()
+    if current:
+        passages.append(current)
+    return [p for p in passages if len(p) >= MIN_PASSAGE_CHARS]
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of a search snippet; fragments too short to stand alone join the next sentence."""
+    sentences, pending = [], ""
+    for sentence in _SENTENCE_RE.split(" ".join(text.split())):
+        pending = f"{pending} {sentence}" if pending else sentence
+        if len(pending) >= MIN_PASSAGE_CHARS:
+            sentences.append(_truncate(pending, PASSAGE_MAX_CHARS))
+            pending = ""
+    if pending and sentences:
+        sentences[-1] = _truncate(f"{sentences[-1]} {pending}", PASSAGE_MAX_CHARS)
+    return sentences
+
+
+class Passage:
+    """One ranked piece of evidence."""
+    __slots__ = ("label", "text", "credibility", "relevance", "score", "tokens", "rank", "_shingles")
+
+    def __init__(self, label: str, text: str, credibility: float):
+        self.label = label
+        self.text = text
+        self.credibility = credibility
+        self.relevance = 0.0
+        self.score = 0.0
+        self.tokens = estimate_tokens(text)
+        self.rank = 0
+        self._shingles: FrozenSet[tuple] = frozenset()
+
+    def render(self, text: Optional[str] = None) -> str:
+        return f"\n\n[{self.rank}] [{self.label}]: {text or self.text}"
+
+
+class EvidenceCollector:
+    """Accumulates evidence for one claim, then ``pack()`` ranks and deduplicates it."""
+
+    def __init__(self, claim: str):
+        self.claim = claim
+        self.passages: List[Passage] = []
+
+    def add_text(self, label: str, text: str, credibility: float = 0.5):
+        """Extracted page content: split into passages."""
+        for passage in split_passages(text or ""):
+            self.passages.append(Passage(label, passage, credibility))
+
+    def add_document(self, label: str, text: str, credibility: float = 0.5):
+        """A self-contained item (paper title and abstract, fact-check rating): kept whole up to the passage size."""
+        text = " ".join((text or "").split())
+        if text:
+            self.passages.append(Passage(label, _truncate(text, PASSAGE_MAX_CHARS * 2), credibility))
+
+    def add_search_result(self, result: Dict):
+        """A search provider result: its snippet text, credited with its best source."""
+        sources = result.get("sources") or []
+        credibility = max((s.get("credibility", 0.5) for s in sources if s.get("url")), default=0.5)
+        label = f"{result.get('provider', 'search')} evidence"
+        text = result.get("response") or ""
+        if result.get("provider") == "google_factcheck":
+            if sources:  # "No existing fact-checks found" is not evidence
+                self.add_document(label, text, credibility)
+        else:
+            for sentence in split_sentences(text):
+                self.passages.append(Passage(label, sentence, credibility))
+
+    def pack(self, after: Optional["PackedEvidence"] = None) -> "PackedEvidence":
+        """
+        Rank and deduplicate the passages. With ``after``, passages added since
+        that packing are ranked after its passages, which keep their numbers
+        (evidence that arrived late for a second pass), and get a share of
+        every context budget.
+        """
+        claim_words = _words(self.claim)
+        claim_terms = _terms(claim_words)
+        kept: List[Passage] = list(after.passages) if after is not None else []
+        new = self.passages[after.considered:] if after is not None else self.passages
+        for passage in new:
+            words = _words(passage.text)
+            passage._shingles = _shingles(words)
+            if claim_terms:
+                passage.relevance = len(claim_terms & _terms(words)) / len(claim_terms)
+            passage.score = RELEVANCE_WEIGHT * passage.relevance + CREDIBILITY_WEIGHT * passage.credibility
+
+        ranked = sorted(new, key=lambda p: p.score, reverse=True)
+        previously_kept = len(kept)
+        for passage in ranked:
+            if any(_is_duplicate(passage, other) for other in kept):
+                continue
+            kept.append(passage)
+            passage.rank = len(kept)
+
+        EVIDENCE_PASSAGES.inc(len(kept) - previously_kept, result="kept")
+        EVIDENCE_PASSAGES.inc(len(ranked) - len(kept) + previously_kept, result="duplicate")
+        EVIDENCE_TOKENS.observe(sum(p.tokens for p in new), stage="collected")
+        return PackedEvidence(kept, considered=len(self.passages),
+                              earlier=previously_kept if after is not None else None)
+
+
+def _is_duplicate(passage: Passage, other: Passage) -> bool:
+    a, b = passage._shingles, other._shingles
+    if not a or not b:
+        return False
+    return len(a & b) / min(len(a), len(b)) >= DUPLICATE_CONTAINMENT
+
+
+def _fit(passages: Sequence[Passage], budget: int):
+    """Rendered passages that fit ``budget`` tokens, in rank order, and the tokens they use."""
+    parts, remaining = [], budget
+    for passage in passages:
+        if passage.tokens <= remaining:
+            parts.append(passage.render())
+            remaining -= passage.tokens
+        elif remaining >= MIN_TRUNCATED_TOKENS:
+            parts.append(passage.render(_truncate(passage.text, remaining * CHARS_PER_TOKEN - 3)))
+            remaining = 0
+    return parts, budget - remaining
+
+
+class PackedEvidence:
+    """Ranked, deduplicated passages; ``context_for(provider)`` packs them into the provider's budget."""
+
+    def __init__(self, passages: List[Passage], considered: int = 0, earlier: Optional[int] = None):
+        self.passages = passages
+        self.considered = considered  # collected passages this packing looked at
+        self.earlier = len(passages) if earlier is None else earlier  # passages kept by an earlier packing
+        self._contexts: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.passages)
+
+    def context(self, budget: int) -> str:
+        cached = self._contexts.get(budget)
+        if cached is not None:
+            return cached
+        earlier, late = self.passages[:self.earlier], self.passages[self.earlier:]
+        reserved = min(int(budget * LATE_EVIDENCE_SHARE), sum(p.tokens for p in late))
+        parts, used = _fit(earlier, budget - reserved)
+        late_parts, _ = _fit(late, budget - used)
+        context = self._contexts[budget] = "".join(parts + late_parts)
+        return context
+
+    def context_for(self, provider: str) -> str:
+        context = self.context(CONTEXT_BUDGETS.get(provider, DEFAULT_CONTEXT_BUDGET))
+        EVIDENCE_TOKENS.observe(estimate_tokens(context), stage="sent")
+        return context
+
+
+__all__ = ['CONTEXT_BUDGETS', 'DEFAULT_CONTEXT_BUDGET', 'LATE_EVIDENCE_SHARE', 'EVIDENCE_TOKENS', 'estimate_tokens',
+           'split_passages', 'split_sentences', 'Passage', 'EvidenceCollector', 'PackedEvidence']
@@ -0,0 +1,304 @@
+"""
+Verity API - Fact-Check Knowledge Base
+======================================
+A local store of already-settled claims, queried before any provider call.
+
+- Seeded from our own completed high-confidence verifications and from the
+  ClaimReview records Google Fact Check returns (professional fact-checks of
+  the claim as the publisher worded it).
+- Lookup is SQLite FTS5 full-text search (porter stemming, BM25 ranking) for
+  candidates, then ``claim_dedup.claim_similarity`` on the best few. Claims
+  whose numbers or negation differ never match.
+- ``lookup`` reports whether a match is confident enough to answer the claim
+  outright (``answer``). That takes the same claim, not just the same words:
+  ``claim_dedup.near_duplicate`` (same content words in the same order), so
+  "Trump defeated Biden" is never answered with the verdict on "Biden
+  defeated Trump". A weaker match is only a hint, which callers use to run
+  a smaller provider plan.
+- The store builds and rebuilds offline from a JSONL dump of past results::
+
+      python factcheck_kb.py build results.jsonl --db factcheck_kb.db
+
+  Each line is a verification result (``{"claim", "verdict", "confidence",
+  ...}``) or a Google Fact Check API claim (``{"text", "claimReview": [...]}``).
+  The new database is written beside the old one and swapped in atomically.
+- ``lookup``, ``add_verification`` and ``add_claim_review`` are coroutines
+  that run the SQLite work on the store's own thread, so the event loop
+  never waits on FTS5. ``add``, ``load`` and ``rebuild`` block (offline builds).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+import logging
+
+import prometheus_metrics as metrics
+from claim_dedup import NEGATIONS, STOPWORDS, canonical_claim, canonical_key, claim_similarity, near_duplicate
+
+logger = logging.getLogger(__name__)
+
+
+DECISIVE_VERDICTS = ("true", "mostly_true", "mixed", "mostly_false", "false")
+
+MIN_STORE_CONFIDENCE = 0.85   # our own results are stored at or above this confidence
+ANSWER_SIMILARITY = 0.9       # word-order overlap for the same claim, which (if confident) answers it
+ANSWER_CONFIDENCE = 0.88
+HINT_SIMILARITY = 0.7         # a weaker match only shrinks the provider plan
+CLAIMREVIEW_CONFIDENCE = 0.9
+CANDIDATES = 5
+MAX_QUERY_TERMS = 16
+
+# ClaimReview textualRating (lowercased, trailing punctuation stripped) -> verdict
+RATING_VERDICTS = {
+    "false": "false", "pants on fire": "false", "incorrect": "false", "fake": "false",
+    "fabricated": "false", "wrong": "false", "not true": "false", "hoax": "false",
+    "baseless": "false", "no evidence": "false", "four pinocchios": "false",
+    "mostly false": "mostly_false", "largely false": "mostly_false", "misleading": "mostly_false",
+    "exaggerated": "mostly_false", "distorted": "mostly_false", "missing context": "mostly_false",
+    "three pinocchios": "mostly_false",
+    "half true": "mixed", "half-true": "mixed", "mixture": "mixed", "mixed": "mixed",
+    "partly false": "mixed", "partly true": "mixed", "partially true": "mixed",
+    "mostly true": "mostly_true", "largely true": "mostly_true", "mostly accurate": "mostly_true",
+    "true": "true", "correct": "true", "accurate": "true", "verified": "true",
+}
+
+KB_LOOKUPS = metrics.registry.counter(
+    "verity_factcheck_kb_lookups_total", "Knowledge-base lookups by outcome",
+    ("result",), allowed={"result": ("answer", "hint", "miss")})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS facts (
+    id INTEGER PRIMARY KEY,
+    claim_key TEXT NOT NULL UNIQUE,
+    claim TEXT NOT NULL,
+    verdict TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    explanation TEXT NOT NULL DEFAULT '',
+    origin TEXT NOT NULL,
+    publisher TEXT,
+    url TEXT,
+    rating TEXT,
+    updated REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS facts_fts USING fts5(
+    claim, content='facts', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS facts_ai AFTER INSERT ON facts BEGIN
+    INSERT INTO facts_fts(rowid, claim) VALUES (new.id, new.claim);
+END;
+CREATE TRIGGER IF NOT EXISTS facts_ad AFTER DELETE ON facts BEGIN
+    INSERT INTO facts_fts(facts_fts, rowid, claim) VALUES ('delete', old.id, old.claim);
+END;
+CREATE TRIGGER IF NOT EXISTS facts_au AFTER UPDATE ON facts BEGIN
+    INSERT INTO facts_fts(facts_fts, rowid, claim) VALUES ('delete', old.id, old.claim);
+    INSERT INTO facts_fts(rowid, claim) VALUES (new.id, new.claim);
+END;
+"""
+
+_COLUMNS = ("claim", "verdict", "confidence", "explanation", "origin", "publisher", "url", "rating")
+
+
+def rating_verdict(rating: Optional[str]) -> Optional[str]:
+    """Verdict for a ClaimReview textualRating, or None when it is not a clear rating."""
+    if not rating:
+        return None
+    return RATING_VERDICTS.get(rating.strip().lower().rstrip(".!"))
+
+
+def _fts_query(claim: str) -> str:
+    terms = [w for w in dict.fromkeys(canonical_claim(claim).split())
+             if w not in STOPWORDS and w not in NEGATIONS and len(w) > 1]
+    return " OR ".join('"' + t.replace('"', '""') + '"' for t in terms[:MAX_QUERY_TERMS])
+
+
+class FactCheckKB:
+    """SQLite FTS5 store of settled claims (thread-safe; one connection guarded by a lock)."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = self._connect(path)
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="factcheck-kb")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.executescript(_SCHEMA)
+        return db
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM facts").fetchone()[0]
+
+    def add(self, claim: str, verdict: str, confidence: float, explanation: str = "", origin: str = "verity",
+            publisher: Optional[str] = None, url: Optional[str] = None, rating: Optional[str] = None) -> bool:
+        """
+        Store a settled claim. An existing entry for the same canonical claim
+        is replaced only by a fact-check or a more confident result of the same
+        origin. Returns True if stored.
+        """
+        if verdict not in DECISIVE_VERDICTS or not claim.strip():
+            return False
+        key = canonical_key(claim)
+        with self._lock, self._db:
+            row = self._db.execute("SELECT origin, confidence FROM facts WHERE claim_key = ?", (key,)).fetchone()
+            if row is not None:
+                old_origin, old_confidence = row
+                if old_origin == "claimreview" and origin != "claimreview":
+                    return False
+                if old_origin == origin and confidence < old_confidence:
+                    return False
+            self._db.execute(
+                "INSERT INTO facts (claim_key, claim, verdict, confidence, explanation, origin, publisher, url, rating, updated) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(claim_key) DO UPDATE SET claim = excluded.claim, verdict = excluded.verdict, "
+                "confidence = excluded.confidence, explanation = excluded.explanation, origin = excluded.origin, "
+                "publisher = excluded.publisher, url = excluded.url, rating = excluded.rating, updated = excluded.updated",
+                (key, claim.strip(), verdict, float(confidence), explanation or "", origin, publisher, url, rating, time.time()))
+        return True
+
+    async def add_verification(self, claim: str, result: Dict[str, Any],
+                               min_confidence: float = MIN_STORE_CONFIDENCE) -> bool:
+        """Store one of our own results if it is decisive and confident (KB answers are not stored again)."""
+        return await self._run(self._add_verification, claim, result, min_confidence)
+
+    def _add_verification(self, claim: str, result: Dict[str, Any], min_confidence: float) -> bool:
+        if result.get("knowledge_base") or (result.get("confidence") or 0) < min_confidence:
+            return False
+        return self.add(claim, result.get("verdict"), result["confidence"], (result.get("explanation") or "")[:1000])
+
+    async def add_claim_review(self, record: Dict[str, Any]) -> bool:
+        """Store a Google Fact Check API claim (``{"text", "claimReview": [...]}``) by its first clear rating."""
+        return await self._run(self._add_claim_review, record)
+
+    def _add_claim_review(self, record: Dict[str, Any]) -> bool:
+        text = record.get("text") or ""
+        for review in record.get("claimReview") or []:
+            verdict = rating_verdict(review.get("textualRating"))
+            if verdict:
+                return self.add(text, verdict, CLAIMREVIEW_CONFIDENCE, origin="claimreview",
+                                publisher=(review.get("publisher") or {}).get("name"),
+                                url=review.get("url"), rating=review.get("textualRating"))
+        return False
+
+    def load(self, records: Iterable[Dict[str, Any]], min_confidence: float = MIN_STORE_CONFIDENCE) -> int:
+        """Add dump records (verification results or ClaimReview claims); returns how many were stored."""
+        stored = 0
+        for record in records:
+            if "claimReview" in record:
+                stored += self._add_claim_review(record)
+            elif record.get("claim"):
+                stored += self._add_verification(record["claim"], record, min_confidence)
+        return stored
+
+    async def lookup(self, claim: str) -> Optional[Dict[str, Any]]:
+        """
+        Best stored match for ``claim`` with its provenance, or None. The
+        match carries ``similarity`` and ``answer`` (True when it is the same
+        claim and confident enough to return without asking providers).
+        """
+        return await self._run(self._lookup, claim)
+
+    def _lookup(self, claim: str) -> Optional[Dict[str, Any]]:
+        query = _fts_query(claim)
+        if not query:
+            KB_LOOKUPS.inc(result="miss")
+            return None
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT {', '.join('f.' + c for c in _COLUMNS)} FROM facts_fts JOIN facts f ON f.id = facts_fts.rowid "
+                "WHERE facts_fts MATCH ? ORDER BY bm25(facts_fts) LIMIT ?", (query, CANDIDATES)).fetchall()
+        # Rank the same claim first, then by (order-blind) word overlap
+        best, best_rank = None, (False, 0.0)
+        for row in rows:
+            rank = (near_duplicate(claim, row[0], ANSWER_SIMILARITY), claim_similarity(claim, row[0]))
+            if rank > best_rank:
+                best, best_rank = row, rank
+        same_claim, best_similarity = best_rank
+        if best is None or best_similarity < HINT_SIMILARITY:
+            KB_LOOKUPS.inc(result="miss")
+            return None
+        match = dict(zip(_COLUMNS, best))
+        match["similarity"] = round(best_similarity, 3)
+        match["answer"] = same_claim and match["confidence"] >= ANSWER_CONFIDENCE
+        KB_LOOKUPS.inc(result="answer" if match["answer"] else "hint")
+        return match
+
+    def rebuild(self, records: Iterable[Dict[str, Any]], min_confidence: float = MIN_STORE_CONFIDENCE) -> int:
+        """
+        Replace the contents with ``records``. A file-backed store is built in
+        a temporary file and swapped in with ``os.replace``.
+        """
+        if self.path == ":memory:":
+            fresh = FactCheckKB()
+            stored = fresh.load(records, min_confidence)
+            with self._lock:
+                self._db.close()
+                self._db = fresh._db
+            return stored
+        tmp = f"{self.path}.building"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        fresh = FactCheckKB(tmp)
+        stored = fresh.load(records, min_confidence)
+        fresh._db.close()
+        with self._lock:
+            self._db.close()
+            os.replace(tmp, self.path)
+            self._db = self._connect(self.path)
+        return stored
+
+
+def read_dump(path: str) -> Iterable[Dict[str, Any]]:
+    """Records of a JSONL dump (blank and malformed lines are skipped)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                yield record
+
+
+__all__ = ['RATING_VERDICTS', 'rating_verdict', 'FactCheckKB', 'read_dump']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the fact-check knowledge base from a JSONL dump")
+    parser.add_argument("command", choices=["build"])
+    parser.add_argument("dump", nargs="+", help="JSONL files of verification results or ClaimReview claims")
+    parser.add_argument("--db", default=os.getenv("FACTCHECK_KB_PATH", "factcheck_kb.db"))
+    parser.add_argument("--min-confidence", type=float, default=MIN_STORE_CONFIDENCE)
+    args = parser.parse_args()
+
+    def records():
+        for path in args.dump:
+            yield from read_dump(path)
+
+    kb = FactCheckKB(args.db)
+    stored = kb.rebuild(records(), args.min_confidence)
+    print(f"{args.db}: {stored} claims")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Verity API - Streaming Page Extraction
+======================================
+Fetches a page as a stream and turns it into plain text as the bytes arrive.
+
+- The body is read in chunks under a hard byte cap (``MAX_FETCH_BYTES``);
+  a 20 MB page costs at most the cap, never the full download.
+- Binaries are skipped before the body is read: by Content-Type when the
+  server sends one, otherwise by the magic bytes of the first chunk (PDF,
+  images, archives, media).
+- HTML goes through an incremental parser (``TextExtractor``) that drops
+  script, style and page furniture (nav, header, footer, aside, forms) and
+  keeps block structure as blank-line separated paragraphs. Fetching stops as
+  soon as ``max_chars`` of text are collected.
+- Plain text and markdown (e.g. Jina Reader output) are decoded incrementally
+  and cut at ``max_chars`` the same way.
+- Text is decoded with the charset from the Content-Type header, or a
+  ``<meta charset>`` in the first chunk, falling back to UTF-8.
+- Only public http(s) URLs are fetched (``url_guard.stream_public``), and
+  every redirect hop is checked the same way.
+"""
+
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+import prometheus_metrics as metrics
+from url_guard import UnsafeURL, stream_public
+
+
+MAX_FETCH_BYTES = 2 * 1024 * 1024
+MAX_TEXT_CHARS = 10000
+MAX_HTML_TEXT_CHARS = 30000  # with keep_html: page text read before stopping (the article may follow other text)
+CHUNK_SIZE = 16384
+
+TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain", "text/markdown", "text/x-markdown")
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+# Leading bytes of formats that are never worth parsing as text
+BINARY_SIGNATURES = (
+    b"%PDF", b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"RIFF", b"PK\x03\x04", b"\x1f\x8b",
+    b"BM", b"II*\x00", b"MM\x00*", b"OggS", b"fLaC", b"ID3", b"\x00\x00\x00", b"7z\xbc\xaf", b"Rar!",
+)
+
+# Elements whose content is never article text
+SKIP_TAGS = frozenset("""
+script style noscript template svg canvas iframe object head nav header footer aside form button select
+""".split())
+BLOCK_TAGS = frozenset("""
+p div br hr li ul ol dl dt dd h1 h2 h3 h4 h5 h6 tr table section article main blockquote pre figure figcaption
+""".split())
+
+_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w-]+)""", re.IGNORECASE)
+
+PAGE_FETCHES = metrics.registry.counter(
+    "verity_page_fetches_total", "Streamed page fetches by outcome", ("result",),
+    allowed={"result": ("complete", "enough_text", "byte_cap", "binary", "http_error", "refused", "error")})
+PAGE_FETCH_BYTES = metrics.registry.histogram(
+    "verity_page_fetch_bytes", "Bytes read per streamed page fetch", (),
+    buckets=(4096, 16384, 65536, 262144, 1048576, 2097152, 4194304))
+
+
+class TextExtractor(HTMLParser):
+    """
+    Incremental HTML-to-text parser. ``feed`` chunks as they arrive and check
+    ``done``; ``text()`` returns paragraphs separated by blank lines.
+    """
+
+    def __init__(self, max_chars: int = MAX_TEXT_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self._title: List[str] = []
+        self._paragraphs: List[str] = []
+        self._current: List[str] = []
+        self._length = 0
+        self._skip_depth = 0
+        self._in_title = False
+
+    @property
+    def title(self) -> str:
+        return " ".join("".join(self._title).split())
+
+    @property
+    def done(self) -> bool:
+        return self._length >= self.max_chars
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and not self._title:
+            self._in_title = True
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._break()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self._title.append(data)
+        if self._skip_depth or self.done:
+            return
+        self._current.append(data)
+
+    def _break(self):
+        if not self._current:
+            return
+        paragraph = " ".join("".join(self._current).split())
+        self._current = []
+        if paragraph:
+            self._paragraphs.append(paragraph)
+            self._length += len(paragraph) + 2
+
+    def text(self) -> str:
+        self._break()
+        return "\n\n".join(self._paragraphs)[:self.max_chars]
+
+
+def is_binary(head: bytes) -> bool:
+    """True when the first bytes of a body are a known binary format (or contain NUL bytes)."""
+    return head.startswith(BINARY_SIGNATURES) or b"\x00" in head[:512]
+
+
+def _media_type(content_type: str) -> str:
+    return content_type.split(";", 1)[0].strip().lower()
+
+
+def _charset(content_type: str, head: bytes) -> str:
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            charset = value.strip().strip("\"'")
+            break
+    else:
+        match = _CHARSET_RE.search(head[:2048])
+        charset = match.group(1).decode("ascii", "ignore") if match else "utf-8"
+    try:
+        codecs.lookup(charset)
+    except LookupError:
+        charset = "utf-8"
+    return charset
+
+
+async def fetch_text(client: httpx.AsyncClient, url: str, max_chars: int = MAX_TEXT_CHARS,
+                     max_bytes: int = MAX_FETCH_BYTES, timeout: float = 10.0,
+                     headers: Optional[Dict[str, str]] = None, parse_html: Optional[bool] = None,
+                     keep_html: bool = False) -> Dict[str, Any]:
+    """
+    Stream ``url`` and return ``{"success", "content", "title", "content_type",
+    "bytes_read", "truncated"}``, or ``{"success": False, "error", ...}``.
+    ``parse_html`` forces (or disables) HTML parsing; by default it follows
+    the Content-Type, sniffing the body when there is none. With
+    ``keep_html``, HTML pages are read on past ``max_chars`` until
+    ``MAX_HTML_TEXT_CHARS`` of page text (or ``max_bytes``) and the decoded
+    markup is returned as ``html`` for main-content extraction.
+    """
+    bytes_read = 0
+    try:
+        async with stream_public(client, url, timeout, headers=headers) as response:
+            if response.status_code != 200:
+                PAGE_FETCHES.inc(result="http_error")
+                return {"success": False, "error": f"HTTP {response.status_code}", "status_code": response.status_code}
+            content_type = response.headers.get("content-type", "")
+            media_type = _media_type(content_type)
+            if media_type and media_type not in TEXT_TYPES and not media_type.startswith("text/"):
+                PAGE_FETCHES.inc(result="binary")
+                return {"success": False, "error": f"unsupported content type {media_type}", "content_type": media_type}
+
+            parser: Optional[TextExtractor] = None
+            decoder = None
+            plain: List[str] = []
+            plain_length = 0
+            markup: List[str] = []
+            outcome = "complete"
+            async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                if decoder is None:
+                    if not media_type and is_binary(chunk):
+                        PAGE_FETCHES.inc(result="binary")
+                        return {"success": False, "error": "binary content", "content_type": media_type}
+                    decoder = codecs.getincrementaldecoder(_charset(content_type, chunk))("replace")
+                    html = parse_html if parse_html is not None else (
+                        media_type in _HTML_TYPES or (not media_type and b"<" in chunk[:1024]))
+                    parser = TextExtractor(max(max_chars, MAX_HTML_TEXT_CHARS) if keep_html else max_chars) \
+                        if html else None
+                if bytes_read + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - bytes_read]
+                    outcome = "byte_cap"
+                bytes_read += len(chunk)
+                text = decoder.decode(chunk)
+                if parser is not None:
+                    if keep_html:
+                        markup.append(text)
+                    parser.feed(text)
+                    if parser.done:
+                        outcome = "enough_text"
+                else:
+                    plain.append(text)
+                    plain_length += len(text)
+                    if plain_length >= max_chars:
+                        outcome = "enough_text"
+                if outcome != "complete":
+                    break
+    except UnsafeURL as e:
+        PAGE_FETCHES.inc(result="refused")
+        return {"success": False, "error": f"refusing to fetch page: {e}", "bytes_read": bytes_read}
+    except Exception as e:
+        PAGE_FETCHES.inc(result="error")
+        return {"success": False, "error": str(e) or type(e).__name__, "bytes_read": bytes_read}
+
+    PAGE_FETCHES.inc(result=outcome)
+    PAGE_FETCH_BYTES.observe(bytes_read)
+    if parser is not None:
+        parser.close()
+        content, title = parser.text()[:max_chars], parser.title
+    else:
+        content, title = "".join(plain)[:max_chars].strip(), ""
+    page = {
+        "success": True,
+        "content": content,
+        "title": title,
+        "content_type": media_type,
+        "bytes_read": bytes_read,
+        "truncated": outcome != "complete",
+    }
+    if markup:
+        page["html"] = "".join(markup)
+    return page
+
+
+__all__ = ['MAX_FETCH_BYTES', 'MAX_TEXT_CHARS', 'MAX_HTML_TEXT_CHARS', 'TextExtractor', 'is_binary', 'fetch_text']
@@ -0,0 +1,641 @@
+"""
+Verity API - Image Forensics
+============================
+Metadata, error-level and perceptual-hash analysis of submitted images,
+decoded in a worker process pool so the event loop never touches pixels.
+
+- ``analyze_image`` (runs in the worker) reads EXIF (JPEG APP1, PNG eXIf,
+  WebP EXIF), XMP, PNG text chunks and Photoshop/C2PA markers, decodes a
+  grayscale thumbnail with Pillow and computes a 64-bit dHash and pHash.
+  JPEGs also get error-level analysis (ELA).
+- ``assess`` turns the report into findings and a score: AI-generator
+  markers, editing software, edits after capture, impossible capture
+  dates, dimension mismatches and localized ELA outliers.
+- ``ImageIndex`` keeps analyzed images by SHA-256 (exact resubmissions are
+  answered without decoding) and by pHash in a BK-tree, so near-identical
+  images (re-encoded, resized, stripped of metadata) are found in
+  milliseconds and inherit an earlier, worse verdict.
+- ``ImageForensics.analyze`` ties it together under a byte limit and a
+  ``worker_pool.WorkerPool`` timeout; an image that overruns it or kills
+  its worker only fails itself.
+- ``fetch_image`` downloads under the byte limit from public http(s) URLs
+  only (``url_guard.fetch_public``), every redirect included.
+"""
+
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import re
+import struct
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from math import cos, pi
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from PIL import Image, ImageChops
+
+import prometheus_metrics as metrics
+from url_guard import FetchError, UnsafeURL, fetch_public
+from worker_pool import BrokenWorker, WorkerPool
+
+
+MAX_IMAGE_BYTES = 15 * 1024 * 1024
+IMAGE_TIMEOUT = 20.0
+IMAGE_WORKERS = 2
+INDEX_MAX_ENTRIES = 20000
+NEAR_DUPLICATE_DISTANCE = 8       # of 64 pHash bits
+NEAR_DUPLICATE_DHASH = 12         # second opinion, to keep false matches out
+
+IMAGE_ANALYSES = metrics.registry.counter(
+    "verity_image_analyses_total", "Image forensics requests by outcome", ("result",),
+    allowed={"result": ("analyzed", "exact_repeat", "near_repeat", "too_large", "unsupported", "timeout",
+                        "failed")})
+
+
+class ImageError(ValueError):
+    """The image cannot be analyzed (unknown format, too large, unreadable)."""
+
+
+def image_format(data: bytes) -> Optional[str]:
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:4] == b"GIF8":
+        return "gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+# =============================================================================
+# METADATA (runs in the worker)
+# =============================================================================
+
+_TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 7: 1, 9: 4, 10: 8}
+_IFD0_TAGS = {0x010F: "make", 0x0110: "model", 0x0131: "software", 0x0132: "modified"}
+_EXIF_TAGS = {0x9003: "captured", 0x9004: "digitized", 0xA002: "exif_width", 0xA003: "exif_height"}
+_EXIF_IFD, _GPS_IFD = 0x8769, 0x8825
+
+
+def read_exif(tiff: bytes) -> Dict[str, Any]:
+    """The tags in ``_IFD0_TAGS``/``_EXIF_TAGS`` from a TIFF-structured EXIF block."""
+    if tiff[:2] not in (b"II", b"MM"):
+        return {}
+    order = "<" if tiff[:2] == b"II" else ">"
+    exif: Dict[str, Any] = {}
+
+    def read_ifd(offset: int, tags: Dict[int, str]) -> Dict[int, int]:
+        pointers = {}
+        if offset + 2 > len(tiff):
+            return pointers
+        (count,) = struct.unpack_from(order + "H", tiff, offset)
+        for i in range(min(count, 512)):
+            entry = offset + 2 + 12 * i
+            if entry + 12 > len(tiff):
+                break
+            tag, kind, n = struct.unpack_from(order + "HHI", tiff, entry)
+            size = _TIFF_TYPE_SIZES.get(kind, 0) * n
+            start = entry + 8 if size <= 4 else struct.unpack_from(order + "I", tiff, entry + 8)[0]
+            raw = tiff[start:start + size]
+            if len(raw) < size or not size:
+                continue
+            if kind == 2:
+                value: Any = raw.split(b"\x00", 1)[0].decode("latin-1").strip()
+            elif kind == 3:
+                value = struct.unpack_from(order + "H", raw)[0]
+            elif kind == 4:
+                value = struct.unpack_from(order + "I", raw)[0]
+            else:
+                continue
+            if tag in (_EXIF_IFD, _GPS_IFD):
+                pointers[tag] = value
+            elif tag in tags and value != "":
+                exif[tags[tag]] = value
+        return pointers
+
+    pointers = read_ifd(struct.unpack_from(order + "I", tiff, 4)[0] if len(tiff) >= 8 else len(tiff), _IFD0_TAGS)
+    if _EXIF_IFD in pointers:
+        read_ifd(pointers[_EXIF_IFD], _EXIF_TAGS)
+    exif["gps"] = _GPS_IFD in pointers
+    return exif
+
+
+def _jpeg_segments(data: bytes):
+    """(marker, payload) for the header segments of a JPEG, up to and including SOS."""
+    pos = 2
+    while pos + 4 <= len(data):
+        if data[pos] != 0xFF:
+            return
+        marker = data[pos + 1]
+        if marker == 0xFF:  # fill byte
+            pos += 1
+            continue
+        if 0xD0 <= marker <= 0xD9 or marker == 0x01:
+            pos += 2
+            continue
+        (length,) = struct.unpack_from(">H", data, pos + 2)
+        yield marker, data[pos + 4:pos + 2 + length], pos + 2 + length
+        if marker == 0xDA:
+            return
+        pos += 2 + length
+
+
+def _png_chunks(data: bytes):
+    pos = 8
+    while pos + 8 <= len(data):
+        length, kind = struct.unpack_from(">I4s", data, pos)
+        yield kind, data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IEND":
+            return
+
+
+def _png_text(kind: bytes, body: bytes) -> Tuple[str, str]:
+    key, _, rest = body.partition(b"\x00")
+    if kind == b"zTXt":
+        rest = zlib.decompressobj().decompress(rest[1:], 1 << 20)
+    elif kind == b"iTXt":
+        compressed, rest = rest[:1] == b"\x01", rest[2:]
+        rest = rest.split(b"\x00", 2)[-1]  # after language tag and translated keyword
+        if compressed:
+            rest = zlib.decompressobj().decompress(rest, 1 << 20)
+        return key.decode("latin-1"), rest.decode("utf-8", "replace")
+    return key.decode("latin-1"), rest.decode("latin-1")
+
+
+def read_metadata(data: bytes, fmt: str) -> Dict[str, Any]:
+    """EXIF fields, XMP packet, PNG text chunks and editor/credential markers."""
+    meta: Dict[str, Any] = {"exif": {}, "xmp": "", "text": {}, "photoshop": False, "c2pa": False, "comment": ""}
+    if fmt == "jpeg":
+        for marker, payload, _ in _jpeg_segments(data):
+            if marker == 0xE1 and payload.startswith(b"Exif\x00\x00"):
+                meta["exif"] = read_exif(payload[6:])
+            elif marker == 0xE1 and payload.startswith(b"http://ns.adobe.com/xap/1.0/\x00"):
+                meta["xmp"] += payload[29:].decode("utf-8", "replace")
+            elif marker == 0xED and payload.startswith(b"Photoshop 3.0"):
+                meta["photoshop"] = True
+            elif marker == 0xEB and b"c2pa" in payload[:64]:
+                meta["c2pa"] = True
+            elif marker == 0xFE:
+                meta["comment"] = payload[:2000].decode("utf-8", "replace")
+    elif fmt == "png":
+        for kind, body in _png_chunks(data):
+            if kind in (b"tEXt", b"zTXt", b"iTXt"):
+                try:
+                    key, value = _png_text(kind, body)
+                except (zlib.error, IndexError):
+                    continue
+                if key == "XML:com.adobe.xmp":
+                    meta["xmp"] += value
+                else:
+                    meta["text"][key] = value[:2000]
+            elif kind == b"eXIf":
+                meta["exif"] = read_exif(body)
+            elif kind == b"caBX":
+                meta["c2pa"] = True
+    elif fmt == "webp":
+        pos = 12
+        while pos + 8 <= len(data):
+            kind, length = struct.unpack_from("<4sI", data, pos)
+            body = data[pos + 8:pos + 8 + length]
+            if kind == b"EXIF":
+                meta["exif"] = read_exif(body[6:] if body.startswith(b"Exif\x00\x00") else body)
+            elif kind == b"XMP ":
+                meta["xmp"] += body.decode("utf-8", "replace")
+            pos += 8 + length + (length & 1)
+    if "c2pa" in meta["xmp"].lower():
+        meta["c2pa"] = True
+    meta["xmp"] = meta["xmp"][:20000]
+    return meta
+
+
+# =============================================================================
+# DECODING TO GRAYSCALE (runs in the worker)
+# =============================================================================
+
+def decode_gray(data: bytes) -> Tuple[int, int, List[float]]:
+    """(width, height, grayscale samples) of a thumbnail no larger than 256x256."""
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("L", (256, 256))  # JPEG: decode at reduced scale
+        small = img.convert("L")
+    small.thumbnail((256, 256))
+    return small.width, small.height, list(small.getdata())
+
+
+def image_size(data: bytes, fmt: str) -> Optional[Tuple[int, int]]:
+    """Pixel dimensions from the header, without decoding."""
+    if fmt == "png" and len(data) >= 24:
+        return struct.unpack_from(">II", data, 16)
+    if fmt == "gif" and len(data) >= 10:
+        return struct.unpack_from("<HH", data, 6)
+    if fmt == "jpeg":
+        for marker, payload, _ in _jpeg_segments(data):
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC) and len(payload) >= 5:
+                height, width = struct.unpack_from(">HH", payload, 1)
+                return width, height
+    if fmt == "webp" and len(data) >= 30:
+        if data[12:16] == b"VP8X":
+            return 1 + int.from_bytes(data[24:27], "little"), 1 + int.from_bytes(data[27:30], "little")
+        if data[12:16] == b"VP8 ":
+            width, height = struct.unpack_from("<HH", data, 26)
+            return width & 0x3FFF, height & 0x3FFF
+        if data[12:16] == b"VP8L":
+            bits = int.from_bytes(data[21:25], "little")
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    return None
+
+
+# =============================================================================
+# PERCEPTUAL HASHES AND ERROR-LEVEL ANALYSIS (run in the worker)
+# =============================================================================
+
+def resize(gray: List[float], width: int, height: int, w: int, h: int) -> List[float]:
+    """Box-filter downscale to ``w`` x ``h`` (row-major)."""
+    out = []
+    for j in range(h):
+        y0, y1 = j * height // h, max(j * height // h + 1, (j + 1) * height // h)
+        for i in range(w):
+            x0, x1 = i * width // w, max(i * width // w + 1, (i + 1) * width // w)
+            total = 0.0
+            for y in range(y0, y1):
+                base = y * width
+                total += sum(gray[base + x0:base + x1])
+            out.append(total / ((y1 - y0) * (x1 - x0)))
+    return out
+
+
+def dhash(gray: List[float], width: int, height: int) -> int:
+    """Difference hash: is each of 8x8 cells brighter than its right neighbour."""
+    cells = resize(gray, width, height, 9, 8)
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = value << 1 | (cells[row * 9 + col] > cells[row * 9 + col + 1])
+    return value
+
+
+_DCT = [[cos((2 * x + 1) * u * pi / 64) for x in range(32)] for u in range(8)]
+
+
+def phash(gray: List[float], width: int, height: int) -> int:
+    """DCT hash: the 8x8 lowest frequencies of a 32x32 thumbnail against their median."""
+    cells = resize(gray, width, height, 32, 32)
+    rows = [[sum(c * p for c, p in zip(basis, cells[r * 32:r * 32 + 32])) for basis in _DCT] for r in range(32)]
+    low = [sum(_DCT[u][r] * rows[r][v] for r in range(32)) for u in range(8) for v in range(8)]
+    median = sorted(low)[32]
+    value = 0
+    for coefficient in low:
+        value = value << 1 | (coefficient > median)
+    return value
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def error_levels(data: bytes, quality: int = 90, block: int = 16) -> Dict[str, float]:
+    """
+    Error-level analysis: re-save at ``quality`` and compare per-block
+    error. Regions pasted from another source or edited after the last save
+    recompress differently from the rest; ``outlier_share`` is the share of
+    blocks far above the median error.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        original = img.convert("RGB")
+    original.thumbnail((1024, 1024))
+    buffer = io.BytesIO()
+    original.save(buffer, "JPEG", quality=quality)
+    resaved = Image.open(buffer).convert("RGB")
+    diff = ImageChops.difference(original, resaved).convert("L")
+    blocks = diff.resize((max(1, diff.width // block), max(1, diff.height // block)), Image.BOX)
+    levels = sorted(blocks.getdata())
+    median = levels[len(levels) // 2]
+    threshold = max(3 * median, median + 8)
+    return {
+        "mean": round(sum(levels) / len(levels), 2),
+        "median": median,
+        "max": levels[-1],
+        "outlier_share": round(sum(1 for level in levels if level > threshold) / len(levels), 4),
+    }
+
+
+def analyze_image(data: bytes) -> Dict[str, Any]:
+    """Everything that needs the image bytes; run in a worker process."""
+    fmt = image_format(data)
+    report: Dict[str, Any] = {"format": fmt, "metadata": read_metadata(data, fmt), "dhash": None, "phash": None,
+                              "ela": None, "engine": None, "decode_error": None}
+    size = image_size(data, fmt)
+    report["width"], report["height"] = size or (None, None)
+    try:
+        width, height, gray = decode_gray(data)
+        report["dhash"], report["phash"] = dhash(gray, width, height), phash(gray, width, height)
+        report["engine"] = "pillow"
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        report["decode_error"] = str(e) or type(e).__name__
+    if fmt == "jpeg" and report["dhash"] is not None:
+        report["ela"] = error_levels(data)
+    return report
+
+
+# =============================================================================
+# ASSESSMENT
+# =============================================================================
+
+AI_GENERATOR_RE = re.compile(
+    r"midjourney|dall[\s·-]?e|stable[\s_-]?diffusion|novelai|firefly|leonardo\.ai|comfyui|automatic1111|"
+    r"invokeai|trainedAlgorithmicMedia", re.IGNORECASE)
+EDITOR_RE = re.compile(
+    r"photoshop|gimp|affinity photo|pixelmator|paint\.net|snapseed|picsart|facetune|faceapp|canva|"
+    r"lightroom|photopea|fotor|meitu|remini", re.IGNORECASE)
+XMP_TOOL_RE = re.compile(r'(?:CreatorTool|softwareAgent)(?:>|=")([^<"]+)')
+AI_PNG_KEYS = ("parameters", "prompt", "workflow", "Dream", "sd-metadata", "invokeai_metadata")
+
+_EXIF_DATE = "%Y:%m:%d %H:%M:%S"
+
+
+def _exif_date(value: Any) -> Optional[datetime]:
+    try:
+        return datetime.strptime(str(value)[:19], _EXIF_DATE)
+    except ValueError:
+        return None
+
+
+def assess(report: Dict[str, Any], now: Optional[datetime] = None) -> Tuple[List[Dict[str, str]], int]:
+    """(findings, score 0-100) for an ``analyze_image`` report."""
+    meta = report["metadata"]
+    exif = meta["exif"]
+    findings: List[Dict[str, str]] = []
+    score = 75
+
+    def add(kind: str, severity: str, detail: str, penalty: int = 0):
+        nonlocal score
+        findings.append({"type": kind, "severity": severity, "detail": detail})
+        score -= penalty
+
+    # names are only matched in tool fields (free-text XMP descriptions would misfire);
+    # the IPTC digital source type is matched anywhere in the XMP
+    tools = " ".join([str(exif.get("software", ""))] + XMP_TOOL_RE.findall(meta["xmp"]))
+    generator = (AI_GENERATOR_RE.search(" ".join([tools, meta["comment"], " ".join(meta["text"].values())]))
+                 or re.search("trainedAlgorithmicMedia", meta["xmp"], re.IGNORECASE))
+    ai_keys = [key for key in AI_PNG_KEYS if key in meta["text"]]
+    if generator or ai_keys:
+        marker = generator.group(0) if generator else f"PNG '{ai_keys[0]}' text chunk"
+        add("ai_generated_marker", "high", f"Metadata names an image generator ({marker})", 45)
+
+    editor = EDITOR_RE.search(tools)
+    if editor:
+        add("editing_software", "medium", f"Saved by editing software ({editor.group(0)})", 15)
+    elif meta["photoshop"]:
+        add("editing_software", "medium", "Contains Photoshop image resources", 15)
+
+    captured, modified = _exif_date(exif.get("captured")), _exif_date(exif.get("modified"))
+    if captured and modified and modified - captured > timedelta(minutes=1):
+        add("modified_after_capture", "medium",
+            f"Modified {exif['modified']}, captured {exif['captured']}", 10)
+    if captured and captured > (now or datetime.now()) + timedelta(days=1):
+        add("future_capture_date", "high", f"Capture date {exif['captured']} is in the future", 25)
+
+    stated = (exif.get("exif_width"), exif.get("exif_height"))
+    actual = (report.get("width"), report.get("height"))
+    if all(stated) and all(actual) and stated != actual and stated != actual[::-1]:
+        add("dimension_mismatch", "low",
+            f"EXIF says {stated[0]}x{stated[1]}, image is {actual[0]}x{actual[1]} (resized or cropped)", 5)
+
+    ela = report.get("ela")
+    if ela and 0.005 <= ela["outlier_share"] <= 0.3 and ela["max"] >= 20:
+        add("error_level_outliers", "medium",
+            f"{ela['outlier_share']:.1%} of regions recompress unlike the rest (ELA); check for pasted areas", 20)
+
+    if meta["c2pa"]:
+        add("content_credentials", "low", "Carries C2PA content credentials (not validated here)")
+    if not exif.get("make") and not exif.get("model") and not (generator or ai_keys):
+        add("metadata_stripped", "low",
+            "No camera metadata (common for images re-shared on social media); recommend reverse image search")
+    if report.get("decode_error"):
+        add("not_decoded", "low", f"Pixels not analyzed: {report['decode_error']}")
+    return findings, max(0, min(100, score))
+
+
+def verdict_for(score: int) -> Tuple[str, str]:
+    if score >= 70:
+        return "likely_authentic", "🟢 No obvious manipulation detected"
+    if score >= 40:
+        return "needs_review", "🟡 Image requires further analysis"
+    return "likely_manipulated", "🔴 Signs of potential manipulation"
+
+
+# =============================================================================
+# INDEX OF ANALYZED IMAGES
+# =============================================================================
+
+class BKTree:
+    """Metric tree over 64-bit hashes under Hamming distance."""
+
+    def __init__(self):
+        self.root: Optional[list] = None  # [hash, key, {distance: child}]
+        self.size = 0
+
+    def add(self, value: int, key: str):
+        self.size += 1
+        if self.root is None:
+            self.root = [value, key, {}]
+            return
+        node = self.root
+        while True:
+            distance = hamming(value, node[0])
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [value, key, {}]
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, str]]:
+        """(distance, key) within ``radius``, nearest first."""
+        found, stack = [], [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if distance <= radius:
+                found.append((distance, node[1]))
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        return sorted(found)
+
+
+class ImageIndex:
+    """
+    Analyzed images by SHA-256, with their pHash in a BK-tree. When full,
+    the oldest tenth is dropped and the tree rebuilt (BK-trees have no delete).
+    """
+
+    def __init__(self, max_entries: int = INDEX_MAX_ENTRIES, radius: int = NEAR_DUPLICATE_DISTANCE):
+        self.max_entries = max_entries
+        self.radius = radius
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.tree = BKTree()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def exact(self, sha256: str) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(sha256)
+        if entry:
+            entry["times_seen"] += 1
+        return entry
+
+    def similar(self, phash_value: int, dhash_value: int, limit: int = 5) -> List[Dict[str, Any]]:
+        matches = []
+        for distance, key in self.tree.search(phash_value, self.radius):
+            entry = self.entries.get(key)
+            if entry and hamming(dhash_value, entry["dhash"]) <= NEAR_DUPLICATE_DHASH:
+                matches.append({"distance": distance, **entry})
+                if len(matches) == limit:
+                    break
+        return matches
+
+    def add(self, sha256: str, phash_value: Optional[int], dhash_value: Optional[int], result: Dict[str, Any]):
+        self.entries[sha256] = {"sha256": sha256, "phash": phash_value, "dhash": dhash_value, "result": result,
+                                "first_seen": datetime.utcnow().isoformat(), "times_seen": 1}
+        if phash_value is not None:
+            self.tree.add(phash_value, sha256)
+        if len(self.entries) > self.max_entries:
+            for _ in range(max(1, self.max_entries // 10)):
+                self.entries.popitem(last=False)
+            self.tree = BKTree()
+            for key, entry in self.entries.items():
+                if entry["phash"] is not None:
+                    self.tree.add(entry["phash"], key)
+
+
+# =============================================================================
+# ENGINE
+# =============================================================================
+
+class ImageForensics:
+    """Worker processes for image analysis (started on first use) plus the repeat index."""
+
+    def __init__(self, workers: int = IMAGE_WORKERS, timeout: float = IMAGE_TIMEOUT,
+                 max_bytes: int = MAX_IMAGE_BYTES, index: Optional[ImageIndex] = None):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.index = index if index is not None else ImageIndex()
+        self._pool = WorkerPool(self.workers, timeout)
+
+    async def analyze(self, data: bytes) -> Dict[str, Any]:
+        """
+        ``{"sha256", "format", "width", "height", "dhash", "phash", "ela",
+        "metadata", "findings", "score", "verdict", "summary", "repeat",
+        "engine"}``; raises ``ImageError`` for images that cannot be analyzed.
+        """
+        if len(data) > self.max_bytes:
+            IMAGE_ANALYSES.inc(result="too_large")
+            raise ImageError(f"image exceeds {self.max_bytes} bytes")
+        if image_format(data) is None:
+            IMAGE_ANALYSES.inc(result="unsupported")
+            raise ImageError("not a JPEG, PNG, GIF or WebP image")
+        digest = hashlib.sha256(data).hexdigest()
+        known = self.index.exact(digest)
+        if known:
+            IMAGE_ANALYSES.inc(result="exact_repeat")
+            return {**known["result"], "repeat": {"match": "exact", "first_seen": known["first_seen"],
+                                                  "times_seen": known["times_seen"]}}
+
+        try:
+            report = await self._pool.run(analyze_image, data, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            IMAGE_ANALYSES.inc(result="timeout")
+            raise ImageError("image analysis timed out")
+        except BrokenWorker:
+            IMAGE_ANALYSES.inc(result="failed")
+            raise ImageError("image analysis failed")
+        except Exception as e:
+            IMAGE_ANALYSES.inc(result="failed")
+            raise ImageError(f"unreadable image: {e}")
+
+        findings, score = assess(report)
+        matches = self.index.similar(report["phash"], report["dhash"]) if report["phash"] is not None else []
+        repeat = None
+        if matches:
+            nearest = matches[0]
+            previous = nearest["result"]
+            repeat = {"match": "near", "distance": nearest["distance"], "first_seen": nearest["first_seen"],
+                      "previous_verdict": previous["verdict"], "previous_sha256": nearest["sha256"]}
+            if previous["score"] < score:  # a re-encoded copy keeps the original's red flags
+                findings.append({"type": "matches_flagged_image", "severity": "high" if previous["score"] < 40
+                                 else "medium", "detail": f"Near-identical to an image analyzed on "
+                                 f"{nearest['first_seen'][:10]} that was {previous['verdict']}"})
+                score = previous["score"]
+        verdict, summary = verdict_for(score)
+        meta = report["metadata"]
+        result = {
+            "sha256": digest,
+            "format": report["format"],
+            "width": report["width"],
+            "height": report["height"],
+            "dhash": f"{report['dhash']:016x}" if report["dhash"] is not None else None,
+            "phash": f"{report['phash']:016x}" if report["phash"] is not None else None,
+            "ela": report["ela"],
+            "metadata": {**meta["exif"], "xmp": bool(meta["xmp"]), "text_keys": sorted(meta["text"]),
+                         "photoshop": meta["photoshop"], "c2pa": meta["c2pa"]},
+            "findings": findings,
+            "score": score,
+            "verdict": verdict,
+            "summary": summary,
+            "engine": report["engine"],
+        }
+        self.index.add(digest, report["phash"], report["dhash"], result)
+        IMAGE_ANALYSES.inc(result="near_repeat" if repeat else "analyzed")
+        return {**result, "repeat": repeat}
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+# =============================================================================
+# INPUT
+# =============================================================================
+
+_DATA_URL_RE = re.compile(r"^data:image/[\w.+-]+;base64,", re.IGNORECASE)
+_BASE64_RE = re.compile(r"^[A-Za-z0-9+/=\s]{100,}$")
+
+
+def decode_image_input(content: str) -> Optional[bytes]:
+    """Image bytes from a ``data:image/...;base64,`` URL or bare base64; None for anything else."""
+    content = content.strip()
+    match = _DATA_URL_RE.match(content)
+    if match:
+        content = content[match.end():]
+    elif not _BASE64_RE.match(content[:4096]):
+        return None
+    try:
+        data = base64.b64decode("".join(content.split()), validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return data if image_format(data) else None
+
+
+async def fetch_image(client: httpx.AsyncClient, url: str, max_bytes: int = MAX_IMAGE_BYTES,
+                      timeout: float = 15.0) -> bytes:
+    """
+    Download an image from a public http(s) URL (``url_guard.fetch_public``);
+    raises ``ImageError`` for other URLs, past ``max_bytes`` or on HTTP errors.
+    """
+    try:
+        return await fetch_public(client, url, max_bytes, timeout)
+    except UnsafeURL as e:
+        raise ImageError(f"refusing to fetch image: {e}")
+    except FetchError as e:
+        raise ImageError(f"could not fetch image: {e}")
+
+
+__all__ = ['MAX_IMAGE_BYTES', 'ImageError', 'image_format', 'read_exif', 'read_metadata', 'decode_gray',
+           'dhash', 'phash', 'hamming', 'error_levels', 'analyze_image', 'assess', 'verdict_for', 'BKTree',
+           'ImageIndex', 'ImageForensics', 'decode_image_input', 'fetch_image']
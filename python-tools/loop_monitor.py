@@ -0,0 +1,236 @@
+"""
+Verity API - Event Loop Lag Monitor
+===================================
+Finds code that blocks the asyncio event loop.
+
+Two cooperating parts:
+
+- A heartbeat coroutine sleeps ``interval`` seconds and measures how late it
+  wakes up. That scheduling delay is the loop lag every other request sees,
+  and is recorded into a Prometheus histogram.
+- A watchdog thread watches the heartbeat. When the loop misses a beat by more
+  than ``stall_threshold`` it captures the loop thread's Python stack, so the
+  slow callback is caught red-handed (without running asyncio in debug mode).
+  The stack is attributed to the route whose endpoint is on it, and to the
+  innermost application frame ("site") - e.g. ``UserAuth.hash_password``.
+
+Stalls are aggregated per (route, site) into a top-offenders table served by
+the debug endpoint and summarised in ``/metrics``.
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import prometheus_metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LOOP_LAG = metrics.registry.histogram(
+    "verity_event_loop_lag_seconds", "Event loop scheduling delay measured by the heartbeat",
+    buckets=LAG_BUCKETS)
+LOOP_STALLS = metrics.registry.counter(
+    "verity_event_loop_stalls_total", "Event loop stalls above the threshold by route",
+    ("route",), max_series=100)
+LOOP_BLOCKED_SECONDS = metrics.registry.counter(
+    "verity_event_loop_blocked_seconds_total", "Seconds the event loop was blocked by route",
+    ("route",), max_series=100)
+
+_APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _is_app_frame(filename: str) -> bool:
+    return os.path.abspath(filename).startswith(_APP_DIR) and not filename.endswith("loop_monitor.py")
+
+
+class LoopLagMonitor:
+    """
+    Args:
+        interval: Heartbeat period in seconds
+        stall_threshold: Extra delay (seconds) after which the loop counts as stalled
+        max_offenders: Size of the top-offenders table
+    """
+
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.1, max_offenders: int = 50):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.max_offenders = max_offenders
+        self.route_codes: Dict[object, str] = {}
+        self.offenders: Dict[Tuple[str, str], Dict] = {}
+        self.recent_lags: deque = deque(maxlen=600)
+        self.recent_stalls: deque = deque(maxlen=20)
+        self.max_lag = 0.0
+        self.beats = 0
+
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = 0.0
+        self._captured_beat = 0.0
+        self._pending: Optional[Dict] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Setup
+    # ------------------------------------------------------------------
+
+    def register_routes(self, app):
+        """Map endpoint code objects to route templates for stack attribution."""
+        for route in getattr(app, "routes", []):
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(endpoint, "__code__", None)
+            if code is not None and getattr(route, "path", None):
+                self.route_codes[code] = route.path
+
+    def start(self):
+        """Start heartbeat and watchdog. Must be called from the running loop."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watchdog, name="loop-lag-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # ------------------------------------------------------------------
+    # Heartbeat (event loop thread)
+    # ------------------------------------------------------------------
+
+    async def _heartbeat(self):
+        while True:
+            before = time.monotonic()
+            self._last_beat = before
+            await asyncio.sleep(self.interval)
+            self.observe_lag(max(0.0, time.monotonic() - before - self.interval), beat=before)
+
+    def observe_lag(self, lag: float, beat: Optional[float] = None):
+        self.beats += 1
+        LOOP_LAG.observe(lag)
+        self.recent_lags.append(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+        pending = self._pending
+        if pending is not None and (beat is None or pending["beat"] == beat):
+            self._pending = None
+            self.record_stall(pending["route"], pending["site"], pending["stack"], lag)
+
+    def record_stall(self, route: str, site: str, stack: str, seconds: float):
+        LOOP_STALLS.inc(route=route)
+        LOOP_BLOCKED_SECONDS.inc(seconds, route=route)
+        key = (route, site)
+        entry = self.offenders.get(key)
+        if entry is None:
+            if len(self.offenders) >= self.max_offenders:
+                # Evict the offender with the least total blocking
+                smallest = min(self.offenders, key=lambda k: self.offenders[k]["total_seconds"])
+                del self.offenders[smallest]
+            entry = self.offenders[key] = {"route": route, "site": site, "count": 0,
+                                           "total_seconds": 0.0, "max_seconds": 0.0, "stack": stack}
+        entry["count"] += 1
+        entry["total_seconds"] += seconds
+        if seconds >= entry["max_seconds"]:
+            entry["max_seconds"] = seconds
+            entry["stack"] = stack
+        entry["last_seen"] = time.time()
+        self.recent_stalls.append({"route": route, "site": site, "seconds": round(seconds, 4),
+                                   "at": time.time()})
+        logger.warning(f"[LOOP] Event loop blocked {seconds * 1000:.0f}ms in {site} (route {route})")
+
+    # ------------------------------------------------------------------
+    # Watchdog (separate thread)
+    # ------------------------------------------------------------------
+
+    def _watchdog(self):
+        check = min(self.interval, self.stall_threshold) / 2
+        while not self._stopping.wait(check):
+            beat = self._last_beat
+            if beat == self._captured_beat:
+                continue
+            if time.monotonic() - beat > self.interval + self.stall_threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is None:
+                    continue
+                self._captured_beat = beat
+                route, site, stack = self.attribute(frame)
+                # The heartbeat that started at `beat` finalizes this stall with the measured lag
+                self._pending = {"beat": beat, "route": route, "site": site, "stack": stack}
+
+    def attribute(self, frame) -> Tuple[str, str, str]:
+        """(route, site, formatted stack) for a captured loop-thread frame."""
+        frames = []
+        f = frame
+        while f is not None:
+            frames.append(f)
+            f = f.f_back
+        route = "background"
+        for f in frames:
+            path = self.route_codes.get(f.f_code)
+            if path:
+                route = path
+                break
+        site_frame = next((f for f in frames if _is_app_frame(f.f_code.co_filename)), frames[0])
+        site = f"{os.path.basename(site_frame.f_code.co_filename)}:{site_frame.f_lineno} {site_frame.f_code.co_name}"
+        stack = "".join(traceback.format_stack(frame, limit=25))
+        return route, site, stack[-4000:]
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    def _quantile(self, ordered: List[float], q: float) -> float:
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def snapshot(self, include_stacks: bool = True, top: int = 10) -> Dict:
+        ordered = sorted(self.recent_lags)
+        offenders = sorted(self.offenders.values(), key=lambda e: e["total_seconds"], reverse=True)[:top]
+        return {
+            "running": self._task is not None,
+            "interval_seconds": self.interval,
+            "stall_threshold_seconds": self.stall_threshold,
+            "beats": self.beats,
+            "lag_ms": {
+                "p50": round(self._quantile(ordered, 0.5) * 1000, 3),
+                "p99": round(self._quantile(ordered, 0.99) * 1000, 3),
+                "max_recent": round((ordered[-1] if ordered else 0.0) * 1000, 3),
+                "max_since_start": round(self.max_lag * 1000, 3)
+            },
+            "top_offenders": [
+                {
+                    "route": e["route"],
+                    "site": e["site"],
+                    "count": e["count"],
+                    "total_ms": round(e["total_seconds"] * 1000, 1),
+                    "max_ms": round(e["max_seconds"] * 1000, 1),
+                    **({"stack": e["stack"]} if include_stacks else {})
+                }
+                for e in offenders
+            ],
+            "recent_stalls": list(self.recent_stalls)
+        }
+
+
+loop_monitor = LoopLagMonitor(
+    interval=float(os.getenv("LOOP_MONITOR_INTERVAL", 0.1)),
+    stall_threshold=float(os.getenv("LOOP_STALL_THRESHOLD", 0.1))
+)
+
+
+__all__ = ['LoopLagMonitor', 'loop_monitor', 'LOOP_LAG', 'LOOP_STALLS', 'LOOP_BLOCKED_SECONDS']
@@ -0,0 +1,134 @@
+"""
+Verity API - PDF Text Extraction
+================================
+Page-by-page text extraction for uploaded or linked PDF documents, done in
+a worker process pool so the event loop never parses a PDF.
+
+- ``PdfPool.extract`` checks the byte limit and the ``%PDF`` header, then
+  runs ``extract_pages`` in a ``worker_pool.WorkerPool`` with a timeout. A
+  document that overruns it or kills its worker (a pathological file) only
+  fails itself; extractions running in other workers carry on.
+- At most ``MAX_PDF_PAGES`` pages and ``MAX_PDF_CHARS`` characters of text
+  are extracted.
+- ``extract_pages`` reads the text of each page with pypdf.
+- ``fetch_pdf`` downloads a document under the same byte cap, from public
+  http(s) URLs only (``url_guard.fetch_public``), every redirect included.
+"""
+
+import asyncio
+import hashlib
+import io
+from typing import Any, Dict
+
+import httpx
+from pypdf import PdfReader
+
+import prometheus_metrics as metrics
+from url_guard import FetchError, UnsafeURL, fetch_public
+from worker_pool import BrokenWorker, WorkerPool
+
+
+MAX_PDF_BYTES = 20 * 1024 * 1024
+MAX_PDF_PAGES = 50
+MAX_PDF_CHARS = 200000
+PDF_TIMEOUT = 30.0
+PDF_WORKERS = 2
+
+PDF_EXTRACTIONS = metrics.registry.counter(
+    "verity_pdf_extractions_total", "PDF text extractions by outcome", ("result",),
+    allowed={"result": ("success", "too_large", "not_pdf", "timeout", "failed")})
+
+
+class PdfError(ValueError):
+    """The document cannot be extracted (not a PDF, too large, unreadable)."""
+
+
+# =============================================================================
+# EXTRACTION (runs in the worker)
+# =============================================================================
+
+def extract_pages(data: bytes, max_pages: int = MAX_PDF_PAGES, max_chars: int = MAX_PDF_CHARS) -> Dict[str, Any]:
+    """Text of each page (runs in a worker). Stops at ``max_pages`` pages or ``max_chars`` characters."""
+    reader = PdfReader(io.BytesIO(data))
+    pages = [(page.extract_text() or "") for page in reader.pages[:max_pages]]
+    kept, total = [], 0
+    for text in pages:
+        if total >= max_chars:
+            break
+        text = text[:max_chars - total]
+        kept.append(text)
+        total += len(text)
+    return {"pages": kept, "truncated": len(kept) < len(pages) or total >= max_chars, "engine": "pypdf"}
+
+
+# =============================================================================
+# POOL AND DOWNLOAD (event loop side)
+# =============================================================================
+
+def document_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class PdfPool:
+    """Worker processes for PDF extraction, started on first use."""
+
+    def __init__(self, workers: int = PDF_WORKERS, timeout: float = PDF_TIMEOUT,
+                 max_bytes: int = MAX_PDF_BYTES, max_pages: int = MAX_PDF_PAGES):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self._pool = WorkerPool(self.workers, timeout)
+
+    async def extract(self, data: bytes) -> Dict[str, Any]:
+        """
+        ``{"sha256", "pages", "text", "page_count", "truncated", "engine"}``;
+        raises ``PdfError`` for documents that cannot be extracted.
+        """
+        if len(data) > self.max_bytes:
+            PDF_EXTRACTIONS.inc(result="too_large")
+            raise PdfError(f"document exceeds {self.max_bytes} bytes")
+        if not data.lstrip()[:5].startswith(b"%PDF"):
+            PDF_EXTRACTIONS.inc(result="not_pdf")
+            raise PdfError("not a PDF document")
+        try:
+            result = await self._pool.run(extract_pages, data, self.max_pages, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            PDF_EXTRACTIONS.inc(result="timeout")
+            raise PdfError("PDF extraction timed out")
+        except BrokenWorker:
+            PDF_EXTRACTIONS.inc(result="failed")
+            raise PdfError("PDF extraction failed")
+        except Exception as e:
+            PDF_EXTRACTIONS.inc(result="failed")
+            raise PdfError(f"unreadable PDF: {e}")
+        PDF_EXTRACTIONS.inc(result="success")
+        pages = result["pages"]
+        return {
+            "sha256": document_hash(data),
+            "pages": pages,
+            "text": "\n\n".join(p for p in pages if p),
+            "page_count": len(pages),
+            "truncated": result["truncated"],
+            "engine": result["engine"],
+        }
+
+    def shutdown(self):
+        self._pool.shutdown()
+
+
+async def fetch_pdf(client: httpx.AsyncClient, url: str, max_bytes: int = MAX_PDF_BYTES,
+                    timeout: float = 20.0) -> bytes:
+    """
+    Download a PDF from a public http(s) URL (``url_guard.fetch_public``);
+    raises ``PdfError`` for other URLs, past ``max_bytes`` or on HTTP errors.
+    """
+    try:
+        return await fetch_public(client, url, max_bytes, timeout)
+    except UnsafeURL as e:
+        raise PdfError(f"refusing to fetch document: {e}")
+    except FetchError as e:
+        raise PdfError(f"could not fetch document: {e}")
+
+
+__all__ = ['MAX_PDF_BYTES', 'MAX_PDF_PAGES', 'PdfError', 'extract_pages', 'document_hash', 'PdfPool', 'fetch_pdf']
@@ -0,0 +1,448 @@
+"""
+Verity API - Prometheus Metrics
+===============================
+Dependency-free Prometheus instrumentation for the API servers.
+
+Design notes:
+- Lock-free: every metric is updated from the single event-loop thread, so
+  samples are plain floats in dicts keyed by label tuples (no locks, no
+  per-sample allocation beyond the first time a label set is seen).
+- Cardinality-safe: each metric caps its number of label sets and label
+  values can be restricted to a known set; anything else is folded into
+  ``"other"``. Routes are recorded by their template (``/verify``), never
+  the raw path.
+- Scrape-time values (cache sizes, quota remaining, breaker state) come from
+  collector callbacks, so nothing is computed on the request path.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import logging
+
+import tracing
+
+logger = logging.getLogger(__name__)
+
+
+# Default latency buckets (seconds) - covers cache hits through slow multi-provider passes
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+OVERFLOW_LABEL = "other"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class: label handling and cardinality limits."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 allowed: Optional[Dict[str, Iterable[str]]] = None, max_series: int = 500):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.allowed = {k: frozenset(v) for k, v in (allowed or {}).items()}
+        self.max_series = max_series
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        key = []
+        for name in self.labelnames:
+            value = str(labels.get(name, ""))
+            allowed = self.allowed.get(name)
+            if allowed is not None and value not in allowed:
+                value = OVERFLOW_LABEL
+            key.append(value)
+        key = tuple(key)
+        if key not in self._series and len(self._series) >= self.max_series:
+            # Series budget exhausted: fold every new label set into one overflow series
+            key = tuple(OVERFLOW_LABEL for _ in self.labelnames)
+        return key
+
+    def clear(self):
+        self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._render_samples())
+        return lines
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}"
+                for k, v in self._series.items()]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._series[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        self._series[key] = self._series.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(name, documentation, labelnames, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            # [per-bucket counts..., +Inf count, sum]
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        bounds = list(self.buckets) + [float("inf")]
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, n in zip(bounds, series[:-1]):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds metrics and scrape-time collectors and renders the text exposition format."""
+
+    def __init__(self):
+        self.metrics: Dict[str, _Metric] = {}
+        self.collectors: Dict[Tuple[Optional[str], str], Callable[[], None]] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Counter:
+        return self.metrics.get(name) or self.register(Counter(name, documentation, labelnames, **kwargs))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Gauge:
+        return self.metrics.get(name) or self.register(Gauge(name, documentation, labelnames, **kwargs))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), **kwargs) -> Histogram:
+        return self.metrics.get(name) or self.register(Histogram(name, documentation, labelnames, **kwargs))
+
+    def add_collector(self, fn: Callable[[], None], owner: Optional[str] = None):
+        """
+        Run ``fn`` before every scrape (used to set gauges from live state).
+        A collector belongs to ``owner`` (the server module that reads its own
+        state) and is keyed by its name there, so importing a module again
+        replaces its collectors instead of adding more.
+        """
+        self.collectors[(owner, fn.__qualname__)] = fn
+
+    def render(self, owner: Optional[str] = None) -> str:
+        """
+        Exposition text. With ``owner``, only that owner's collectors (and
+        unowned ones) run, so a server's scrape reports its own state even
+        when another server shares the process.
+        """
+        for (fn_owner, _), fn in list(self.collectors.items()):
+            if owner is not None and fn_owner not in (None, owner):
+                continue
+            try:
+                fn()
+            except Exception as e:
+                logger.debug(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Text exposition content type expected by Prometheus
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = MetricsRegistry()
+
+
+# ============================================================================
+# VERITY METRICS
+# ============================================================================
+
+TIERS = ("free", "pro", "enterprise", "none")
+PHASES = ("extraction", "search", "ai_pass1", "ai_pass2", "fallback", "consensus")
+CACHE_RESULTS = ("hit", "miss")
+PROVIDER_OUTCOMES = ("success", "rate_limited", "client_error", "server_error",
+                     "timeout", "error", "empty", "skipped")
+
+HTTP_REQUESTS = registry.counter(
+    "verity_http_requests_total", "HTTP requests by route template, method and status class",
+    ("route", "method", "status"), max_series=400)
+HTTP_DURATION = registry.histogram(
+    "verity_http_request_duration_seconds", "HTTP request latency by route template and pricing tier",
+    ("route", "tier"), allowed={"tier": TIERS}, max_series=300)
+HTTP_IN_FLIGHT = registry.gauge(
+    "verity_http_requests_in_flight", "HTTP requests currently being served")
+VERIFY_PHASE_DURATION = registry.histogram(
+    "verity_verify_phase_duration_seconds", "Time spent in each verification phase",
+    ("phase",), allowed={"phase": PHASES})
+VERIFICATIONS_IN_FLIGHT = registry.gauge(
+    "verity_verifications_in_flight", "Claim verifications currently running")
+PROVIDER_CALL_DURATION = registry.histogram(
+    "verity_provider_call_duration_seconds", "Outbound provider call latency",
+    ("provider",), max_series=100)
+PROVIDER_CALLS = registry.counter(
+    "verity_provider_calls_total", "Outbound provider calls by outcome",
+    ("provider", "outcome"), allowed={"outcome": PROVIDER_OUTCOMES}, max_series=600)
+PROVIDER_IN_FLIGHT = registry.gauge(
+    "verity_provider_calls_in_flight", "Outbound provider calls currently waiting on a response",
+    ("provider",), max_series=100)
+CACHE_REQUESTS = registry.counter(
+    "verity_cache_requests_total", "Cache lookups by layer and result",
+    ("layer", "result"), allowed={"result": CACHE_RESULTS}, max_series=50)
+CACHE_HIT_RATIO = registry.gauge(
+    "verity_cache_hit_ratio", "Cache hit ratio since start by layer", ("layer",), max_series=25)
+RATE_LIMIT_REJECTIONS = registry.counter(
+    "verity_rate_limit_rejections_total", "Requests or provider calls rejected by a rate limiter",
+    ("limiter",), max_series=20)
+PROVIDER_QUOTA_REMAINING = registry.gauge(
+    "verity_provider_quota_remaining", "Remaining provider request quota by window",
+    ("provider", "window"), allowed={"window": ("minute", "day")}, max_series=200)
+PROVIDER_CIRCUIT_STATE = registry.gauge(
+    "verity_provider_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)",
+    ("provider",), max_series=100)
+# Kept for dashboards built on the original /metrics output
+PROVIDER_IN_COOLDOWN = registry.gauge(
+    "verity_provider_in_cooldown", "1 if the provider circuit is open", ("provider",), max_series=100)
+PROVIDER_FAILURES = registry.gauge(
+    "verity_provider_failures", "Provider failures inside the breaker window", ("provider",), max_series=100)
+CACHE_HITS = registry.gauge("verity_cache_hits", "Claim cache hits since start")
+CACHE_MISSES = registry.gauge("verity_cache_misses", "Claim cache misses since start")
+
+
+# Per-request labels that handlers fill in (e.g. tier) and the middleware reads back.
+# The middleware installs a fresh dict; handlers run in a copied context that shares it.
+_request_labels: ContextVar[Optional[dict]] = ContextVar("verity_request_labels", default=None)
+
+
+def begin_request() -> dict:
+    labels = {}
+    _request_labels.set(labels)
+    return labels
+
+
+def tag_request(**labels):
+    """Attach labels (currently ``tier``) to the in-flight HTTP request's metrics."""
+    current = _request_labels.get()
+    if current is not None:
+        current.update(labels)
+
+
+def route_template(scope: dict) -> str:
+    """Route path template for a served request's ASGI scope ("unmatched" for 404s)."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path or "unmatched"
+
+
+def observe_request(scope: dict, status_code: int, duration: float, labels: Optional[dict] = None):
+    route = route_template(scope)
+    HTTP_REQUESTS.inc(route=route, method=scope["method"], status=f"{status_code // 100}xx")
+    HTTP_DURATION.observe(duration, route=route, tier=(labels or {}).get("tier", "none"))
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (outermost): request latency/count per route template
+    and tier. Unlike ``@app.middleware("http")`` it does not re-route the
+    request body or the response through a middleware task, so endpoints that
+    read the body while streaming their response work unchanged.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        labels = begin_request()
+        status = {"code": 500}
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            observe_request(scope, status["code"], time.perf_counter() - start, labels)
+
+
+def record_cache(layer: str, hit: bool):
+    CACHE_REQUESTS.inc(layer=layer, result="hit" if hit else "miss")
+
+
+def record_rate_limited(limiter: str):
+    RATE_LIMIT_REJECTIONS.inc(limiter=limiter)
+
+
+class phase_timer:
+    """
+    ``with phase_timer("search"):`` records the block into the phase histogram
+    and, when the request is traced, as a span of the same name.
+    """
+    __slots__ = ("phase", "started", "span")
+
+    def __init__(self, phase: str):
+        self.phase = phase
+
+    def __enter__(self):
+        self.span = tracing.span(self.phase).__enter__()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        VERIFY_PHASE_DURATION.observe(time.perf_counter() - self.started, phase=self.phase)
+        self.span.__exit__(*exc)
+        return False
+
+
+def provider_outcome(result=None, exc: Optional[BaseException] = None) -> str:
+    """Classify a provider call for verity_provider_calls_total."""
+    if exc is not None:
+        return "timeout" if "Timeout" in type(exc).__name__ else "error"
+    if not result:
+        return "empty"
+    if result.get("success"):
+        return "success"
+    code = result.get("status_code") or 0
+    if code == 429:
+        return "rate_limited"
+    if 400 <= code < 500:
+        return "client_error"
+    if code >= 500:
+        return "server_error"
+    return "error"
+
+
+async def track_provider_call(provider: str, coro):
+    """
+    Await a provider coroutine while recording latency, outcome and in-flight
+    count (plus a ``provider.<name>`` span when the request is traced).
+    """
+    PROVIDER_IN_FLIGHT.inc(provider=provider)
+    started = time.perf_counter()
+    with tracing.span(f"provider.{provider}", provider=provider) as span:
+        try:
+            result = await coro
+        except BaseException as e:
+            outcome = provider_outcome(exc=e)
+            PROVIDER_CALL_DURATION.observe(time.perf_counter() - started, provider=provider)
+            PROVIDER_CALLS.inc(provider=provider, outcome=outcome)
+            span.set_outcome(outcome, ok=False)
+            raise
+        finally:
+            PROVIDER_IN_FLIGHT.dec(provider=provider)
+        outcome = provider_outcome(result)
+        PROVIDER_CALL_DURATION.observe(time.perf_counter() - started, provider=provider)
+        PROVIDER_CALLS.inc(provider=provider, outcome=outcome)
+        span.set_outcome(outcome, ok=outcome == "success")
+        return result
+
+
+def record_provider_skipped(provider: str):
+    PROVIDER_CALLS.inc(provider=provider, outcome="skipped")
+
+
+# ============================================================================
+# SCRAPE-TIME COLLECTORS
+# ============================================================================
+
+_CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def collect_breakers(breakers):
+    """Collector factory: breaker state/failures from a CircuitBreakerRegistry."""
+    def collect():
+        for name, status in breakers.get_status().items():
+            state = _CIRCUIT_STATE_VALUES.get(status["state"], 0)
+            PROVIDER_CIRCUIT_STATE.set(state, provider=name)
+            PROVIDER_IN_COOLDOWN.set(1 if state == 2 else 0, provider=name)
+            PROVIDER_FAILURES.set(status["failures"], provider=name)
+    return collect
+
+
+def collect_claim_cache(cache, layer: str = "claim"):
+    """Collector factory: hit ratio and legacy hit/miss gauges from a ClaimCache."""
+    def collect():
+        total = cache.hits + cache.misses
+        CACHE_HIT_RATIO.set(cache.hits / total if total else 0.0, layer=layer)
+        CACHE_HITS.set(cache.hits)
+        CACHE_MISSES.set(cache.misses)
+    return collect
+
+
+def collect_provider_quota(limiter):
+    """Collector factory: remaining quota from a ProviderRateLimiter-style object."""
+    def collect():
+        for provider, remaining in limiter.get_remaining().items():
+            PROVIDER_QUOTA_REMAINING.set(remaining["minute"], provider=provider, window="minute")
+            PROVIDER_QUOTA_REMAINING.set(remaining["day"], provider=provider, window="day")
+    return collect
+
+
+__all__ = [
+    'Counter', 'Gauge', 'Histogram', 'MetricsRegistry', 'registry', 'CONTENT_TYPE_LATEST',
+    'begin_request', 'tag_request', 'observe_request', 'MetricsMiddleware', 'record_cache', 'record_rate_limited',
+    'phase_timer', 'track_provider_call', 'record_provider_skipped', 'provider_outcome',
+    'collect_breakers', 'collect_claim_cache', 'collect_provider_quota'
+]
@@ -0,0 +1,372 @@
+"""
+Verity API - Synthetic Provider Prober
+======================================
+Background health probing for AI providers.
+
+Instead of firing a real verification at every provider whenever
+``/health/deep`` is requested, the prober pings each provider on its own
+jittered schedule. A probe is the provider's authenticated model listing
+(``MODEL_LIST_ENDPOINTS``): it exercises DNS, TLS, auth and the API front
+end without generating a single token. Providers without such an endpoint
+are not probed; their breakers learn from real traffic. Probes count
+against the provider rate limiter like any other call. Every probe is timed
+on its own clock, classified and folded into a snapshot that health
+endpoints can return without doing any work.
+
+A listing answering is no proof that completions work, so the circuit
+breaker only hears about failed probes: a probe never takes a half-open
+probe slot and never closes a circuit (only a real call can). Open circuits
+are not probed.
+"""
+
+import asyncio
+import os
+import random
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+# Free, authenticated model listings: provider -> (url, API key env var, auth style)
+MODEL_LIST_ENDPOINTS = {
+    "groq": ("https://api.groq.com/openai/v1/models", "GROQ_API_KEY", "bearer"),
+    "openai": ("https://api.openai.com/v1/models", "OPENAI_API_KEY", "bearer"),
+    "anthropic": ("https://api.anthropic.com/v1/models", "ANTHROPIC_API_KEY", "anthropic"),
+    "google": ("https://generativelanguage.googleapis.com/v1beta/models", "GOOGLE_AI_API_KEY", "query"),
+    "mistral": ("https://api.mistral.ai/v1/models", "MISTRAL_API_KEY", "bearer"),
+    "cohere": ("https://api.cohere.ai/v1/models", "COHERE_API_KEY", "bearer"),
+    "cerebras": ("https://api.cerebras.ai/v1/models", "CEREBRAS_API_KEY", "bearer"),
+    "sambanova": ("https://api.sambanova.ai/v1/models", "SAMBANOVA_API_KEY", "bearer"),
+    "fireworks": ("https://api.fireworks.ai/inference/v1/models", "FIREWORKS_API_KEY", "bearer"),
+    "deepseek": ("https://api.deepseek.com/models", "DEEPSEEK_API_KEY", "bearer"),
+    "openrouter": ("https://openrouter.ai/api/v1/models", "OPENROUTER_API_KEY", "bearer"),
+    "together": ("https://api.together.xyz/v1/models", "TOGETHER_API_KEY", "bearer"),
+    "xai": ("https://api.x.ai/v1/models", "XAI_API_KEY", "bearer"),
+    "nvidia": ("https://integrate.api.nvidia.com/v1/models", "NVIDIA_NIM_API_KEY", "bearer"),
+    "novita": ("https://api.novita.ai/v3/openai/models", "NOVITA_API_KEY", "bearer"),
+    "siliconflow": ("https://api.siliconflow.cn/v1/models", "SILICONFLOW_API_KEY", "bearer"),
+    "hyperbolic": ("https://api.hyperbolic.xyz/v1/models", "HYPERBOLIC_API_KEY", "bearer"),
+    "lambdalabs": ("https://api.lambdalabs.com/v1/models", "LAMBDA_API_KEY", "bearer"),
+    "moonshot": ("https://api.moonshot.cn/v1/models", "MOONSHOT_API_KEY", "bearer"),
+}
+
+# Latency histogram bucket upper bounds (milliseconds); the last bucket is +Inf
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000)
+
+# Error classes reported by the prober
+ERROR_CLASSES = ("timeout", "rate_limited", "auth", "client_error", "server_error",
+                 "network", "empty_response", "circuit_open", "exception")
+
+
+def classify_error(result: Any = None, exc: Optional[BaseException] = None) -> str:
+    """Map a failed probe (result dict or exception) to one of ERROR_CLASSES."""
+    if exc is not None:
+        if isinstance(exc, asyncio.TimeoutError):
+            return "timeout"
+        name = type(exc).__name__
+        if "Timeout" in name:
+            return "timeout"
+        if name in ("ConnectError", "ReadError", "WriteError", "RemoteProtocolError", "NetworkError"):
+            return "network"
+        return "exception"
+    if not result:
+        return "empty_response"
+    code = result.get("status_code") or 0
+    if code == 429:
+        return "rate_limited"
+    if code in (401, 403):
+        return "auth"
+    if 400 <= code < 500:
+        return "client_error"
+    if code >= 500:
+        return "server_error"
+    return "empty_response"
+
+
+def model_list_probe(client, name: str, api_key: str) -> Callable[[], Awaitable[Dict]]:
+    """A probe that GETs ``name``'s model listing with ``client`` (an httpx.AsyncClient)."""
+    url, _, auth = MODEL_LIST_ENDPOINTS[name]
+    headers, params = {}, {}
+    if auth == "bearer":
+        headers["Authorization"] = f"Bearer {api_key}"
+    elif auth == "anthropic":
+        headers.update({"x-api-key": api_key, "anthropic-version": "2023-06-01"})
+    else:
+        params["key"] = api_key
+
+    async def probe() -> Dict:
+        response = await client.get(url, headers=headers, params=params)
+        if response.status_code == 200:
+            return {"success": True}
+        return {"success": False, "status_code": response.status_code}
+    return probe
+
+
+def build_model_list_probes(client, names, env=None) -> Dict[str, Callable[[], Awaitable[Dict]]]:
+    """Probes for every provider in ``names`` that has a model listing and a configured key."""
+    env = os.environ if env is None else env
+    probes = {}
+    for name in names:
+        if name in MODEL_LIST_ENDPOINTS and env.get(MODEL_LIST_ENDPOINTS[name][1]):
+            probes[name] = model_list_probe(client, name, env[MODEL_LIST_ENDPOINTS[name][1]])
+    return probes
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram plus a short ring of recent samples."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS, recent: int = 50):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total_ms = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=recent)
+
+    def observe(self, ms: float):
+        self.counts[bisect_left(self.buckets, ms)] += 1
+        self.total_ms += ms
+        self.count += 1
+        self.recent.append(ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Quantile over the recent samples"""
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_dict(self) -> Dict:
+        cumulative = 0
+        buckets = {}
+        for bound, n in zip(list(self.buckets) + ["+Inf"], self.counts):
+            cumulative += n
+            buckets[str(bound)] = cumulative
+        p50 = self.quantile(0.5)
+        p95 = self.quantile(0.95)
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else None,
+            "p50_ms": round(p50, 2) if p50 is not None else None,
+            "p95_ms": round(p95, 2) if p95 is not None else None,
+            "buckets": buckets
+        }
+
+
+class ProviderProber:
+    """
+    Schedules synthetic probes against each provider and keeps a ready-made
+    health snapshot.
+
+    Args:
+        breakers: CircuitBreakerRegistry (or compatible) fed with probe outcomes
+        interval: Mean seconds between probes of the same provider
+        jitter: Fractional +/- jitter applied to every interval
+        timeout: Fallback probe timeout when the breaker has no per-provider value
+        rate_limiter: Optional provider rate limiter (``can_request``/``record``);
+            a probe is skipped when the provider has no quota left
+    """
+
+    def __init__(self, breakers=None, interval: float = 300, jitter: float = 0.2,
+                 timeout: float = 15, rate_limiter=None):
+        self.breakers = breakers
+        self.rate_limiter = rate_limiter
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.probes: Dict[str, Callable[[], Awaitable[Optional[Dict]]]] = {}
+        self.models: Dict[str, str] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.error_counts: Dict[str, Dict[str, int]] = {}
+        self.last_results: Dict[str, Dict] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._snapshot: Dict = self._build_snapshot()
+
+    # ------------------------------------------------------------------
+    # Scheduling
+    # ------------------------------------------------------------------
+
+    def start(self, probes: Dict[str, Callable[[], Awaitable[Optional[Dict]]]],
+              models: Optional[Dict[str, str]] = None):
+        """Start one probe loop per provider. Must be called from a running loop."""
+        self.stop()
+        self.probes = dict(probes)
+        self.models = dict(models or {})
+        for name in self.probes:
+            self.histograms.setdefault(name, LatencyHistogram())
+            self.error_counts.setdefault(name, {})
+            self._tasks.append(asyncio.create_task(self._probe_loop(name)))
+        self._snapshot = self._build_snapshot()
+        logger.info(f"[PROBER] Probing {len(self.probes)} providers every ~{self.interval}s")
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        self._snapshot = self._build_snapshot()
+
+    def _next_delay(self) -> float:
+        return max(1.0, self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    async def _probe_loop(self, name: str):
+        # Stagger the first round so providers are not probed in lock-step
+        await asyncio.sleep(random.uniform(0, min(self.interval, 10)))
+        while True:
+            try:
+                await self.probe_once(name)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug(f"[PROBER] {name} probe crashed: {e}")
+            await asyncio.sleep(self._next_delay())
+
+    # ------------------------------------------------------------------
+    # Probing
+    # ------------------------------------------------------------------
+
+    def _timeout_for(self, name: str) -> float:
+        if self.breakers is not None and hasattr(self.breakers, "get_timeout"):
+            return self.breakers.get_timeout(name)
+        return self.timeout
+
+    async def probe_once(self, name: str) -> Dict:
+        """Run a single probe for ``name`` and update breaker + snapshot."""
+        probe = self.probes[name]
+
+        # User traffic has the provider's quota first
+        if self.rate_limiter is not None and not self.rate_limiter.can_request(name):
+            return self.last_results.get(name) or {}
+
+        # Open circuits are not probed; no half-open probe slot is taken (see module docstring)
+        if self.breakers is not None and self.breakers.is_open(name):
+            return self._record(name, ok=False, latency_ms=None, error="circuit_open")
+        if self.rate_limiter is not None:
+            self.rate_limiter.record(name)
+
+        started = time.perf_counter()
+        result, exc = None, None
+        try:
+            result = await asyncio.wait_for(probe(), timeout=self._timeout_for(name))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            exc = e
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        if exc is None and result and result.get("success"):
+            if result.get("model"):
+                self.models[name] = result["model"]
+            return self._record(name, ok=True, latency_ms=latency_ms)
+
+        error = classify_error(result, exc)
+        if self.breakers is not None:
+            self.breakers.record_failure(
+                name,
+                status_code=(result or {}).get("status_code", 0) if exc is None else 0,
+                error_type=error
+            )
+        return self._record(name, ok=False, latency_ms=latency_ms, error=error,
+                            status_code=(result or {}).get("status_code") if exc is None else None)
+
+    def _record(self, name: str, ok: bool, latency_ms: Optional[float],
+                error: Optional[str] = None, status_code: Optional[int] = None) -> Dict:
+        if latency_ms is not None:
+            self.histograms.setdefault(name, LatencyHistogram()).observe(latency_ms)
+        if error:
+            counts = self.error_counts.setdefault(name, {})
+            counts[error] = counts.get(error, 0) + 1
+
+        if ok:
+            status = "healthy"
+        elif error == "circuit_open":
+            status = "cooldown"
+        elif error in ("timeout", "network", "exception"):
+            status = "error"
+        else:
+            status = "degraded"
+
+        entry = {
+            "status": status,
+            "model": self.models.get(name, "unknown"),
+            "latency_ms": round(latency_ms, 2) if latency_ms is not None else None,
+            "checked_at": time.time()
+        }
+        if error:
+            entry["error"] = error
+        if status_code:
+            entry["status_code"] = status_code
+        self.last_results[name] = entry
+        self._snapshot = self._build_snapshot()
+        return entry
+
+    # ------------------------------------------------------------------
+    # Snapshot
+    # ------------------------------------------------------------------
+
+    def _build_snapshot(self) -> Dict:
+        providers = {}
+        for name, last in self.last_results.items():
+            entry = dict(last)
+            entry["latency"] = self.histograms[name].to_dict() if name in self.histograms else None
+            entry["errors"] = dict(self.error_counts.get(name, {}))
+            providers[name] = entry
+
+        healthy_count = sum(1 for r in providers.values() if r["status"] == "healthy")
+        total_count = len(providers)
+        if total_count == 0:
+            overall = "unknown"
+        elif healthy_count >= total_count * 0.7:
+            overall = "healthy"
+        elif healthy_count >= total_count * 0.3:
+            overall = "degraded"
+        else:
+            overall = "critical"
+
+        snapshot = {
+            "overall_status": overall,
+            "healthy_providers": healthy_count,
+            "total_providers": total_count,
+            "health_percentage": round(healthy_count / total_count * 100, 1) if total_count > 0 else 0,
+            "providers": providers,
+            "probed_providers": len(self.probes),
+            "probe_interval_seconds": self.interval,
+            "updated_at": max((r["checked_at"] for r in providers.values()), default=None),
+            "probing": bool(self._tasks)
+        }
+        if not self._tasks:
+            snapshot["detail"] = "Background provider probing is not running (see PROBE_ENABLED)."
+        return snapshot
+
+    def snapshot(self) -> Dict:
+        """Latest health snapshot (prebuilt; do not mutate)."""
+        return self._snapshot
+
+    def provider_summary(self, name: str) -> Optional[Dict]:
+        """Compact probe view of one provider for listing endpoints."""
+        entry = self._snapshot["providers"].get(name)
+        if not entry:
+            return None
+        latency = entry.get("latency") or {}
+        return {
+            "status": entry["status"],
+            "latency_ms": entry["latency_ms"],
+            "p50_ms": latency.get("p50_ms"),
+            "p95_ms": latency.get("p95_ms"),
+            "checked_at": entry["checked_at"],
+            "error": entry.get("error")
+        }
+
+
+__all__ = [
+    'ProviderProber',
+    'LatencyHistogram',
+    'build_model_list_probes',
+    'model_list_probe',
+    'MODEL_LIST_ENDPOINTS',
+    'classify_error',
+    'LATENCY_BUCKETS_MS',
+    'ERROR_CLASSES'
+]
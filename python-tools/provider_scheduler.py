@@ -0,0 +1,326 @@
+"""
+Verity API - Provider Call Scheduler
+====================================
+Every outbound provider call waits here for a slot.
+
+- Each provider has a concurrency limit (a semaphore-like slot count).
+- Waiting calls are ordered by priority class first: interactive work
+  (``/verify``) is always served before batch work (jobs, bulk endpoints).
+- Within a class, slots are shared by weighted fair queuing across tenants:
+  each call gets a virtual finish tag ``max(V, last_tag[tenant]) + 1/weight``
+  and the smallest tag goes next. The weight comes from the tenant's tier, so
+  an enterprise tenant gets a larger share but can never starve a free
+  tenant, and a tenant with many queued calls cannot push a newcomer back.
+
+``ProviderRateLimiter`` tracks calls against each provider's known rpm/rpd
+quota (shared by the servers and the background prober); its limits also
+size the slot counts (``concurrency_from_limits``).
+
+Who is calling is carried in a context variable: the HTTP middleware starts
+each request as interactive work for its tenant, handlers add the tier, and
+the batch engine re-labels its tasks as batch work.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+import logging
+
+import prometheus_metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITIES = (INTERACTIVE, BATCH)
+
+DEFAULT_TIER_WEIGHTS = {"free": 1.0, "pro": 2.0, "enterprise": 4.0}
+
+QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+QUEUE_WAIT = metrics.registry.histogram(
+    "verity_provider_queue_wait_seconds", "Time outbound provider calls waited for a scheduler slot",
+    ("priority", "tier"), allowed={"priority": PRIORITIES, "tier": metrics.TIERS},
+    buckets=QUEUE_WAIT_BUCKETS)
+QUEUE_DEPTH = metrics.registry.gauge(
+    "verity_provider_queue_depth", "Provider calls waiting for a scheduler slot",
+    ("provider", "priority"), allowed={"priority": PRIORITIES}, max_series=200)
+SLOTS_IN_USE = metrics.registry.gauge(
+    "verity_provider_slots_in_use", "Scheduler slots held by running provider calls",
+    ("provider",), max_series=100)
+
+
+# ============================================================================
+# WORK CONTEXT
+# ============================================================================
+
+_DEFAULT_WORK = {"tenant": "anonymous", "tier": "free", "priority": INTERACTIVE}
+
+_work: ContextVar[Optional[dict]] = ContextVar("verity_scheduler_work", default=None)
+
+
+def begin_work(tenant: str = "anonymous", tier: str = "free", priority: str = INTERACTIVE) -> dict:
+    """Label the current task (and tasks it spawns) for scheduling."""
+    work = {"tenant": tenant, "tier": tier, "priority": priority}
+    _work.set(work)
+    return work
+
+
+def tag_work(**fields):
+    """Update the current work labels in place (e.g. ``tier`` once the handler knows it)."""
+    current = _work.get()
+    if current is not None:
+        current.update(fields)
+
+
+def current_work() -> dict:
+    return _work.get() or _DEFAULT_WORK
+
+
+def concurrency_from_limits(limits: Dict[str, Dict[str, int]], per_rpm: int = 5,
+                            floor: int = 2, cap: int = 8) -> Dict[str, int]:
+    """Per-provider slot counts from rpm limits (``ProviderRateLimiter.LIMITS``)."""
+    return {name: max(floor, min(cap, l.get("rpm", 10) // per_rpm)) for name, l in limits.items()}
+
+
+# ============================================================================
+# SCHEDULER
+# ============================================================================
+
+class _ProviderQueue:
+    __slots__ = ("capacity", "in_use", "heaps", "virtual", "finish")
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self.heaps: Dict[str, List] = {p: [] for p in PRIORITIES}
+        self.virtual: Dict[str, float] = {p: 0.0 for p in PRIORITIES}
+        self.finish: Dict[tuple, float] = {}
+
+    def waiting(self, priority: str) -> int:
+        return sum(1 for entry in self.heaps[priority] if not entry[2].done())
+
+
+class ProviderScheduler:
+    """
+    Args:
+        default_concurrency: Slots for providers without an explicit limit
+        concurrency: Per-provider slot counts
+        tier_weights: Fair-share weight by tier
+    """
+
+    def __init__(self, default_concurrency: int = 4, concurrency: Optional[Dict[str, int]] = None,
+                 tier_weights: Optional[Dict[str, float]] = None):
+        self.default_concurrency = default_concurrency
+        self.concurrency = dict(concurrency or {})
+        self.tier_weights = dict(tier_weights or DEFAULT_TIER_WEIGHTS)
+        self.queues: Dict[str, _ProviderQueue] = {}
+        self._seq = itertools.count()
+
+    def _queue(self, provider: str) -> _ProviderQueue:
+        q = self.queues.get(provider)
+        if q is None:
+            q = self.queues[provider] = _ProviderQueue(self.concurrency.get(provider, self.default_concurrency))
+        return q
+
+    async def acquire(self, provider: str):
+        """Wait for a slot on ``provider`` according to the current work labels."""
+        work = current_work()
+        priority = work.get("priority") if work.get("priority") in PRIORITIES else INTERACTIVE
+        tier = work.get("tier", "free")
+        tenant = work.get("tenant", "anonymous")
+        q = self._queue(provider)
+
+        flow = (priority, tenant)
+        tag = max(q.virtual[priority], q.finish.get(flow, 0.0)) + 1.0 / self.tier_weights.get(tier, 1.0)
+        q.finish[flow] = tag
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(q.heaps[priority], (tag, next(self._seq), future))
+        self._dispatch(provider, q)
+
+        started = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as we were cancelled - hand the slot on
+                self.release(provider)
+            else:
+                future.cancel()
+            raise
+        QUEUE_WAIT.observe(time.perf_counter() - started, priority=priority, tier=tier)
+
+    def release(self, provider: str):
+        q = self._queue(provider)
+        q.in_use -= 1
+        self._dispatch(provider, q)
+
+    def _dispatch(self, provider: str, q: _ProviderQueue):
+        """Grant free slots: interactive first, then batch, smallest finish tag first."""
+        while q.in_use < q.capacity:
+            granted = False
+            for priority in PRIORITIES:
+                heap = q.heaps[priority]
+                while heap:
+                    tag, _, future = heapq.heappop(heap)
+                    if future.done():
+                        continue
+                    q.virtual[priority] = tag
+                    future.set_result(None)
+                    q.in_use += 1
+                    granted = True
+                    break
+                if granted:
+                    break
+            if not granted:
+                break
+        if not any(q.heaps.values()):
+            # Idle: restart virtual time so finish tags do not accumulate per tenant
+            q.finish.clear()
+            for priority in PRIORITIES:
+                q.virtual[priority] = 0.0
+        SLOTS_IN_USE.set(q.in_use, provider=provider)
+
+    async def call(self, provider: str, coro):
+        """Run a provider coroutine inside a slot (latency/outcome recorded by metrics)."""
+        try:
+            await self.acquire(provider)
+        except BaseException:
+            coro.close()
+            raise
+        try:
+            return await metrics.track_provider_call(provider, coro)
+        finally:
+            self.release(provider)
+
+    def get_status(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "capacity": q.capacity,
+                "in_use": q.in_use,
+                "waiting": {p: q.waiting(p) for p in PRIORITIES}
+            }
+            for name, q in self.queues.items()
+        }
+
+    def collector(self):
+        """Scrape-time queue depth per provider and priority class."""
+        def collect():
+            for name, q in self.queues.items():
+                for priority in PRIORITIES:
+                    QUEUE_DEPTH.set(q.waiting(priority), provider=name, priority=priority)
+        return collect
+
+
+# ============================================================================
+# PROVIDER QUOTAS
+# ============================================================================
+
+class ProviderRateLimiter:
+    """Per-provider rate limiting based on known API limits"""
+
+    # Requests per minute (rpm) and per day (rpd) for each provider
+    LIMITS = {
+        # Free tier limits (be conservative)
+        "groq": {"rpm": 30, "rpd": 14400},
+        "perplexity": {"rpm": 20, "rpd": 1000},
+        "openai": {"rpm": 3, "rpd": 200},
+        "google": {"rpm": 15, "rpd": 1500},
+        "anthropic": {"rpm": 5, "rpd": 100},
+        "mistral": {"rpm": 5, "rpd": 500},
+        "cohere": {"rpm": 20, "rpd": 1000},
+        "cerebras": {"rpm": 30, "rpd": 10000},
+        "sambanova": {"rpm": 30, "rpd": 5000},
+        "fireworks": {"rpm": 10, "rpd": 500},
+        "deepseek": {"rpm": 10, "rpd": 500},
+        "openrouter": {"rpm": 20, "rpd": 1000},
+        "huggingface": {"rpm": 30, "rpd": 10000},
+        "together": {"rpm": 10, "rpd": 1000},
+        "xai": {"rpm": 10, "rpd": 500},
+        "ai21": {"rpm": 10, "rpd": 500},
+        "you": {"rpm": 20, "rpd": 1000},
+        "jina": {"rpm": 20, "rpd": 5000},
+        "tavily": {"rpm": 20, "rpd": 1000},
+        "brave": {"rpm": 20, "rpd": 2000},
+        "serper": {"rpm": 100, "rpd": 2500},
+        "exa": {"rpm": 10, "rpd": 1000},
+    }
+
+    def __init__(self):
+        self.requests: Dict[str, List[float]] = defaultdict(list)
+
+    def can_request(self, provider: str) -> bool:
+        """Check if we can make a request to this provider"""
+        now = time.time()
+        limits = self.LIMITS.get(provider, {"rpm": 10, "rpd": 500})
+
+        # Clean old entries (older than 24 hours)
+        day_ago = now - 86400
+        self.requests[provider] = [t for t in self.requests[provider] if t > day_ago]
+
+        minute_ago = now - 60
+        minute_count = sum(1 for t in self.requests[provider] if t > minute_ago)
+        day_count = len(self.requests[provider])
+
+        if minute_count >= limits["rpm"]:
+            logger.debug(f"[RATE] {provider} at minute limit ({minute_count}/{limits['rpm']})")
+            metrics.record_rate_limited("provider")
+            return False
+
+        if day_count >= limits["rpd"]:
+            logger.debug(f"[RATE] {provider} at daily limit ({day_count}/{limits['rpd']})")
+            metrics.record_rate_limited("provider")
+            return False
+
+        return True
+
+    def record(self, provider: str):
+        """Record a request to a provider"""
+        self.requests[provider].append(time.time())
+
+    def get_stats(self) -> Dict:
+        """Get rate limit stats for all providers"""
+        now = time.time()
+        minute_ago = now - 60
+        stats = {}
+        for provider, requests in self.requests.items():
+            limits = self.LIMITS.get(provider, {"rpm": 10, "rpd": 500})
+            minute_count = sum(1 for t in requests if t > minute_ago)
+            stats[provider] = {
+                "minute_usage": f"{minute_count}/{limits['rpm']}",
+                "day_usage": f"{len(requests)}/{limits['rpd']}"
+            }
+        return stats
+
+    def get_remaining(self) -> Dict:
+        """Remaining requests per provider in the current minute and day"""
+        now = time.time()
+        minute_ago = now - 60
+        day_ago = now - 86400
+        remaining = {}
+        for provider, requests in self.requests.items():
+            limits = self.LIMITS.get(provider, {"rpm": 10, "rpd": 500})
+            remaining[provider] = {
+                "minute": max(0, limits["rpm"] - sum(1 for t in requests if t > minute_ago)),
+                "day": max(0, limits["rpd"] - sum(1 for t in requests if t > day_ago))
+            }
+        return remaining
+
+
+__all__ = [
+    'ProviderScheduler',
+    'ProviderRateLimiter',
+    'begin_work',
+    'tag_work',
+    'current_work',
+    'concurrency_from_limits',
+    'INTERACTIVE',
+    'BATCH',
+    'QUEUE_WAIT',
+    'QUEUE_DEPTH'
+]
@@ -0,0 +1,154 @@
+"""
+Verity API - Concurrent Reference Extraction
+============================================
+Fetches the references a claim cites (URLs, DOIs, arXiv IDs) concurrently.
+
+- Every reference starts at once. ``HostLimiter`` caps concurrent fetches per
+  host across all requests, so three DOIs resolved through Semantic Scholar
+  share its slots instead of opening three connections.
+- ``ReferenceBatch.wait`` returns whatever has arrived by the extraction
+  deadline. Slower fetches keep running; ``collect`` picks up the ones that
+  finished in the meantime (before the second provider pass) and ``cancel``
+  stops the rest.
+- ``report`` gives per-reference timing: time spent waiting for a host slot,
+  fetch time, outcome and the stage the result was used in.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import prometheus_metrics as metrics
+import tracing
+
+
+REFERENCE_DEADLINE = 4.0  # seconds the verification waits for references before searching
+PER_HOST_LIMIT = 2
+
+REFERENCE_FETCH_SECONDS = metrics.registry.histogram(
+    "verity_reference_fetch_seconds", "Reference fetch latency by kind", ("kind",),
+    allowed={"kind": ("url", "doi", "arxiv", "pubmed")})
+
+
+class HostLimiter:
+    """Per-host concurrency limit; semaphores exist only while a host has fetches."""
+
+    def __init__(self, limit: int = PER_HOST_LIMIT):
+        self.limit = max(1, limit)
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._users: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def slot(self, host: str):
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(self.limit)
+        self._users[host] = self._users.get(host, 0) + 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            self._users[host] -= 1
+            if not self._users[host]:
+                del self._users[host]
+                del self._semaphores[host]
+
+
+class ReferenceFetch:
+    """One reference being fetched."""
+
+    __slots__ = ("kind", "ref", "host", "task", "queued", "started", "finished", "result", "stage", "cancelled")
+
+    def __init__(self, kind: str, ref: str, host: str):
+        self.kind = kind
+        self.ref = ref
+        self.host = host
+        self.task: Optional[asyncio.Task] = None
+        self.queued = time.monotonic()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.stage: Optional[str] = None  # stage the result was used in
+        self.cancelled = False
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.result and self.result.get("success"))
+
+    @property
+    def outcome(self) -> str:
+        if self.result is not None:
+            return "success" if self.ok else "failed"
+        return "cancelled" if self.cancelled else "pending"
+
+    def report(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        started = self.started or now
+        return {
+            "kind": self.kind,
+            "ref": self.ref,
+            "host": self.host,
+            "outcome": self.outcome,
+            "queued_ms": round((started - self.queued) * 1000, 1),
+            "fetch_ms": round(((self.finished or now) - started) * 1000, 1) if self.started else None,
+            "used_in": self.stage if self.ok else None,
+        }
+
+
+class ReferenceBatch:
+    """The references of one verification, fetched concurrently under a ``HostLimiter``."""
+
+    def __init__(self, limiter: HostLimiter):
+        self.limiter = limiter
+        self.fetches: List[ReferenceFetch] = []
+
+    def __len__(self) -> int:
+        return len(self.fetches)
+
+    def add(self, kind: str, ref: str, host: str, fetch: Callable[[], Awaitable[Dict[str, Any]]]) -> ReferenceFetch:
+        """Start fetching a reference now; ``fetch`` returns a ``{"success", ...}`` dict."""
+        item = ReferenceFetch(kind, ref, host)
+        item.task = asyncio.ensure_future(self._run(item, fetch))
+        self.fetches.append(item)
+        return item
+
+    async def _run(self, item: ReferenceFetch, fetch: Callable[[], Awaitable[Dict[str, Any]]]):
+        async with self.limiter.slot(item.host):
+            item.started = time.monotonic()
+            with tracing.span(f"extract.{item.kind}", host=item.host) as ref_span:
+                try:
+                    result = await fetch()
+                except Exception as e:
+                    result = {"success": False, "error": str(e) or type(e).__name__}
+                item.finished = time.monotonic()
+                item.result = result or {"success": False}
+                ref_span.set_outcome(item.outcome, ok=item.ok)
+        REFERENCE_FETCH_SECONDS.observe(item.finished - item.started, kind=item.kind)
+
+    async def wait(self, timeout: float = REFERENCE_DEADLINE, stage: str = "pass1") -> List[ReferenceFetch]:
+        """Wait until every reference is in or ``timeout`` passes; returns the finished ones."""
+        pending = [f.task for f in self.fetches if not f.task.done()]
+        if pending:
+            await asyncio.wait(pending, timeout=timeout)
+        return self.collect(stage)
+
+    def collect(self, stage: str = "pass2") -> List[ReferenceFetch]:
+        """References that finished since the last ``wait``/``collect``, without waiting."""
+        ready = [f for f in self.fetches if f.result is not None and f.stage is None]
+        for item in ready:
+            item.stage = stage
+        return ready
+
+    def cancel(self):
+        """Stop fetches that are still running."""
+        for item in self.fetches:
+            if not item.task.done():
+                item.task.cancel()
+                item.cancelled = True
+
+    def report(self) -> List[Dict[str, Any]]:
+        return [f.report() for f in self.fetches]
+
+
+__all__ = ['REFERENCE_DEADLINE', 'PER_HOST_LIMIT', 'HostLimiter', 'ReferenceFetch', 'ReferenceBatch']
@@ -0,0 +1,286 @@
+"""
+Verity API - Stripe Webhook Queue
+=================================
+Stripe webhooks are verified, written to a durable queue and acknowledged
+at once; a background worker applies them.
+
+- ``StripeEventQueue`` is a SQLite table keyed by the Stripe event ID, so a
+  redelivered event (Stripe retries anything not acknowledged quickly) is
+  recognised and dropped at the door. It is reached through a single
+  writer thread; WAL mode lets several worker processes share the file.
+- Workers claim a batch under a lease (a worker that dies mid-batch has
+  its events picked up again once the lease runs out), mark events done,
+  or put them back with exponential backoff. After ``max_attempts`` an
+  event is parked as ``failed`` for inspection.
+- ``StripeEventProcessor`` maps events to account changes: price IDs to
+  tiers through a reverse index, customers to emails through a TTL cache
+  (filled from ``customer.*`` events too). The one Stripe API call left,
+  ``Customer.retrieve`` on a cache miss, runs in a thread.
+- Applying an event is idempotent (it sets the tier; it never adds to it),
+  so the rare double delivery that slips past the ID check is harmless.
+- Stripe does not deliver in order, and a retried event can come back after
+  a newer one. The queue keeps, per customer, the Stripe ``created`` time of
+  the newest subscription event applied; older events are skipped, so a
+  late ``subscription.created`` cannot undo a ``subscription.deleted``.
+  Events from the same second apply in arrival order.
+"""
+
+import asyncio
+import json
+import logging
+import secrets
+import sqlite3
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import prometheus_metrics as metrics
+
+logger = logging.getLogger(__name__)
+
+
+MAX_ATTEMPTS = 8
+LEASE_SECONDS = 300.0
+BATCH_SIZE = 20
+POLL_INTERVAL = 5.0          # also how soon events queued by other workers are seen
+MAX_BACKOFF = 3600.0
+CUSTOMER_CACHE_SIZE = 10000
+CUSTOMER_CACHE_TTL = 3600.0
+
+# Subscription states that no longer grant the paid tier
+INACTIVE_STATUSES = ("canceled", "unpaid", "incomplete_expired")
+
+STRIPE_EVENTS = metrics.registry.counter(
+    "verity_stripe_events_total", "Stripe webhook events by outcome", ("result",),
+    allowed={"result": ("queued", "duplicate", "processed", "retry", "failed", "stale")})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS stripe_events (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    received REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL,
+    last_error TEXT,
+    processed_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_stripe_events_ready ON stripe_events(status, available_at);
+CREATE TABLE IF NOT EXISTS stripe_applied (
+    customer TEXT PRIMARY KEY,
+    created INTEGER NOT NULL,
+    event_id TEXT NOT NULL
+);
+"""
+
+
+class StripeEventQueue:
+    """Durable, deduplicating event queue in SQLite."""
+
+    def __init__(self, path: str, max_attempts: int = MAX_ATTEMPTS, lease: float = LEASE_SECONDS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lease = lease
+        self.worker_id = secrets.token_hex(6)
+        self.arrived = asyncio.Event()
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="stripe-queue")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def append(self, event_id: str, event_type: str, payload: str) -> bool:
+        """Store an event; False if this event ID was already received."""
+        added = await self._run(self._append, event_id, event_type, payload)
+        STRIPE_EVENTS.inc(result="queued" if added else "duplicate")
+        if added:
+            self.arrived.set()
+        return added
+
+    def _append(self, event_id: str, event_type: str, payload: str) -> bool:
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO stripe_events (id, type, payload, received, available_at) VALUES (?, ?, ?, ?, ?)",
+            (event_id, event_type, payload, now, now))
+        return cursor.rowcount == 1
+
+    async def claim(self, limit: int = BATCH_SIZE) -> List[Dict[str, Any]]:
+        """Up to ``limit`` ready events, oldest first, leased to this worker."""
+        return await self._run(self._claim, limit)
+
+    def _claim(self, limit: int) -> List[Dict[str, Any]]:
+        db, now = self._connection(), time.time()
+        token = f"{self.worker_id}:{secrets.token_hex(4)}"
+        db.execute(
+            "UPDATE stripe_events SET status = 'processing', claimed_by = ?, claimed_at = ? WHERE id IN ("
+            " SELECT id FROM stripe_events WHERE (status = 'pending' AND available_at <= ?)"
+            " OR (status = 'processing' AND claimed_at < ?) ORDER BY received LIMIT ?)",
+            (token, now, now, now - self.lease, limit))
+        rows = db.execute("SELECT id, type, payload, attempts FROM stripe_events WHERE claimed_by = ? "
+                          "AND status = 'processing' ORDER BY received", (token,)).fetchall()
+        return [{"id": row[0], "type": row[1], "event": json.loads(row[2]), "attempts": row[3]} for row in rows]
+
+    async def complete(self, event_id: str):
+        await self._run(self._finish, event_id, "done", None)
+        STRIPE_EVENTS.inc(result="processed")
+
+    async def retry(self, event_id: str, error: str):
+        """Back off and retry later, or park as ``failed`` after ``max_attempts``."""
+        parked = await self._run(self._retry, event_id, error)
+        STRIPE_EVENTS.inc(result="failed" if parked else "retry")
+
+    def _finish(self, event_id: str, status: str, error: Optional[str]):
+        self._connection().execute(
+            "UPDATE stripe_events SET status = ?, last_error = ?, processed_at = ?, claimed_by = NULL WHERE id = ?",
+            (status, error, time.time(), event_id))
+
+    def _retry(self, event_id: str, error: str) -> bool:
+        db = self._connection()
+        row = db.execute("SELECT attempts FROM stripe_events WHERE id = ?", (event_id,)).fetchone()
+        attempts = (row[0] if row else 0) + 1
+        if attempts >= self.max_attempts:
+            db.execute("UPDATE stripe_events SET status = 'failed', attempts = ?, last_error = ?, "
+                       "claimed_by = NULL WHERE id = ?", (attempts, error[:1000], event_id))
+            return True
+        delay = min(MAX_BACKOFF, 2.0 ** attempts)
+        db.execute("UPDATE stripe_events SET status = 'pending', attempts = ?, last_error = ?, available_at = ?, "
+                   "claimed_by = NULL WHERE id = ?", (attempts, error[:1000], time.time() + delay, event_id))
+        return False
+
+    async def advance(self, customer_id: str, created: int, event_id: str) -> bool:
+        """
+        Record ``event_id`` (Stripe ``created`` time) as the newest event
+        applied for ``customer_id``; False if a newer one was applied already.
+        """
+        return await self._run(self._advance, customer_id, created, event_id)
+
+    def _advance(self, customer_id: str, created: int, event_id: str) -> bool:
+        cursor = self._connection().execute(
+            "INSERT INTO stripe_applied (customer, created, event_id) VALUES (?, ?, ?) "
+            "ON CONFLICT(customer) DO UPDATE SET created = excluded.created, event_id = excluded.event_id "
+            "WHERE excluded.created >= stripe_applied.created", (customer_id, created, event_id))
+        return cursor.rowcount == 1
+
+    async def counts(self) -> Dict[str, int]:
+        """Events by status."""
+        rows = await self._run(lambda: self._connection().execute(
+            "SELECT status, COUNT(*) FROM stripe_events GROUP BY status").fetchall())
+        return dict(rows)
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def price_tiers(prices: Dict[str, Optional[str]]) -> Dict[str, str]:
+    """Reverse index of ``{tier: price_id}``: price ID -> tier."""
+    return {price_id: tier for tier, price_id in prices.items() if price_id}
+
+
+class StripeEventProcessor:
+    """
+    Applies queued events to accounts in ``store`` (a ``user_store.UserStore``).
+    ``retrieve_email(customer_id)`` is a blocking Stripe call returning the
+    customer's email (or None); it is run in a thread.
+    """
+
+    def __init__(self, queue: StripeEventQueue, store, prices: Dict[str, Optional[str]],
+                 retrieve_email: Callable[[str], Optional[str]], cache_ttl: float = CUSTOMER_CACHE_TTL,
+                 cache_size: int = CUSTOMER_CACHE_SIZE):
+        self.queue = queue
+        self.store = store
+        self.tiers = price_tiers(prices)
+        self.retrieve_email = retrieve_email
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._emails: "OrderedDict[str, Tuple[Optional[str], float]]" = OrderedDict()
+
+    def remember_customer(self, customer_id: str, email: Optional[str]):
+        self._emails[customer_id] = (email, time.monotonic() + self.cache_ttl)
+        self._emails.move_to_end(customer_id)
+        while len(self._emails) > self.cache_size:
+            self._emails.popitem(last=False)
+
+    async def customer_email(self, customer_id: str) -> Optional[str]:
+        entry = self._emails.get(customer_id)
+        if entry and entry[1] > time.monotonic():
+            metrics.record_cache("stripe_customer", True)
+            return entry[0]
+        metrics.record_cache("stripe_customer", False)
+        email = await asyncio.to_thread(self.retrieve_email, customer_id)
+        self.remember_customer(customer_id, email)
+        return email
+
+    async def handle(self, event: Dict[str, Any]) -> Optional[str]:
+        """Apply one event; returns what changed (for logs) or None."""
+        kind, obj = event["type"], event["data"]["object"]
+        if kind in ("customer.created", "customer.updated"):
+            self.remember_customer(obj["id"], obj.get("email"))
+            return None
+        if not kind.startswith("customer.subscription."):
+            return None
+        email = await self.customer_email(obj["customer"])
+        if not email or not await self.store.get(email):
+            return None
+        if not await self.queue.advance(obj["customer"], int(event.get("created") or 0), event["id"]):
+            STRIPE_EVENTS.inc(result="stale")
+            return f"{email} unchanged (a newer event was applied)"
+        if kind == "customer.subscription.deleted" or obj.get("status") in INACTIVE_STATUSES:
+            await self.store.set_subscription(email, "free")
+            return f"{email} -> free"
+        items = obj.get("items", {}).get("data", [])
+        tier = self.tiers.get(items[0]["price"]["id"]) if items else None
+        if tier is None:
+            return None
+        await self.store.set_subscription(email, tier, obj["customer"], obj["id"])
+        return f"{email} -> {tier}"
+
+    async def process_ready(self, limit: int = BATCH_SIZE) -> int:
+        """Process one claimed batch; returns how many events were claimed."""
+        batch = await self.queue.claim(limit)
+        for item in batch:
+            try:
+                change = await self.handle(item["event"])
+            except Exception as e:
+                logger.warning(f"[STRIPE] {item['type']} {item['id']} failed (attempt {item['attempts'] + 1}): {e}")
+                await self.queue.retry(item["id"], str(e) or type(e).__name__)
+                continue
+            await self.queue.complete(item["id"])
+            if change:
+                logger.info(f"[STRIPE] {item['type']} {item['id']}: {change}")
+        return len(batch)
+
+    async def run(self, poll_interval: float = POLL_INTERVAL):
+        """Background loop: drain ready events, then wait for a new one or the poll interval."""
+        while True:
+            try:
+                if await self.process_ready() == BATCH_SIZE:
+                    continue
+            except Exception:
+                logger.exception("[STRIPE] Event queue worker error")
+            self.queue.arrived.clear()
+            try:
+                await asyncio.wait_for(self.queue.arrived.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+
+__all__ = ['StripeEventQueue', 'StripeEventProcessor', 'price_tiers', 'INACTIVE_STATUSES']
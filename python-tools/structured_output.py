@@ -0,0 +1,136 @@
+"""
+Verity API - Structured Provider Output
+=======================================
+Compact JSON verdicts from AI providers and a strict parser for them.
+
+Providers are asked for a single JSON object::
+
+    {"verdict": "mostly_true", "confidence": 0.82, "rationale": "...", "evidence": [1, 3]}
+
+``evidence`` lists the numbered evidence blocks ([1], [2], ...) in the prompt
+that the verdict rests on.
+
+- Providers with a JSON mode get it through ``response_format``. OpenAI gets
+  the schema itself. The others get the format from the prompt alone.
+- Output budgets are per tier (``OUTPUT_BUDGETS``). The compact object needs a
+  fraction of the 500-600 tokens that free-text answers were given.
+- ``parse_verdict`` accepts only a well-formed object with a known verdict.
+  Anything else returns None, and the caller falls back to its free-text
+  heuristic. ``read_reply`` counts both outcomes per provider
+  (``verity_provider_output_parse_total``), so parse-failure rates show up in
+  the metrics.
+"""
+
+import json
+from typing import Any, Dict, Optional, Sequence
+
+import prometheus_metrics as metrics
+
+
+VERDICTS = ("true", "mostly_true", "mixed", "mostly_false", "false", "unverifiable")
+EXTENDED_VERDICTS = VERDICTS + ("partially_true", "misleading")
+
+# Output tokens per tier: verdict + confidence + ~40-word rationale + evidence IDs
+OUTPUT_BUDGETS = {"free": 160, "pro": 220, "enterprise": 300}
+DEFAULT_OUTPUT_BUDGET = OUTPUT_BUDGETS["free"]
+
+RATIONALE_MAX_CHARS = 600
+
+# OpenAI-compatible APIs that accept response_format={"type": "json_object"}
+JSON_OBJECT_PROVIDERS = frozenset({"groq", "mistral", "deepseek", "together", "fireworks", "cerebras", "xai"})
+# APIs that enforce a JSON schema
+JSON_SCHEMA_PROVIDERS = frozenset({"openai"})
+
+FORMAT_INSTRUCTIONS = """Respond with ONLY a JSON object, no other text:
+{"verdict": "<one verdict option>", "confidence": <0.0-1.0>, "rationale": "<at most 40 words>", "evidence": [<numbers of the evidence blocks you relied on>]}"""
+
+PARSE_RESULTS = ("structured", "fallback")
+OUTPUT_PARSE = metrics.registry.counter(
+    "verity_provider_output_parse_total", "Provider replies by how their verdict was read",
+    ("provider", "result"), allowed={"result": PARSE_RESULTS}, max_series=200)
+
+
+def output_budget(tier: Optional[str]) -> int:
+    return OUTPUT_BUDGETS.get(tier or "free", DEFAULT_OUTPUT_BUDGET)
+
+
+def output_schema(verdicts: Sequence[str] = VERDICTS) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {
+            "verdict": {"type": "string", "enum": list(verdicts)},
+            "confidence": {"type": "number"},
+            "rationale": {"type": "string"},
+            "evidence": {"type": "array", "items": {"type": "integer"}},
+        },
+        "required": ["verdict", "confidence", "rationale", "evidence"],
+        "additionalProperties": False,
+    }
+
+
+def response_format(provider: str, verdicts: Sequence[str] = VERDICTS) -> Dict[str, Any]:
+    """Extra chat-completions payload fields that turn on the provider's JSON mode ({} if it has none)."""
+    if provider in JSON_SCHEMA_PROVIDERS:
+        return {"response_format": {"type": "json_schema", "json_schema": {
+            "name": "verdict", "strict": True, "schema": output_schema(verdicts)}}}
+    if provider in JSON_OBJECT_PROVIDERS:
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+def parse_verdict(text: Optional[str], verdicts: Sequence[str] = VERDICTS) -> Optional[Dict[str, Any]]:
+    """
+    Strictly parse a structured reply. Returns None unless the text is one
+    JSON object (a Markdown code fence around it is tolerated) with a known
+    verdict, a confidence in 0-1 (or 0-100), a string rationale and a list of
+    integer evidence IDs.
+    """
+    if not text:
+        return None
+    start = text.find("{")
+    end = text.rfind("}")
+    if start < 0 or end < start:
+        return None
+    if text[:start].strip() not in ("", "```", "```json") or text[end + 1:].strip() not in ("", "```"):
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+
+    verdict = data.get("verdict")
+    if not isinstance(verdict, str) or verdict.strip().lower() not in verdicts:
+        return None
+    confidence = data.get("confidence")
+    if isinstance(confidence, bool) or not isinstance(confidence, (int, float)):
+        return None
+    if 1 < confidence <= 100:
+        confidence = confidence / 100
+    if not 0 <= confidence <= 1:
+        return None
+    rationale = data.get("rationale", "")
+    evidence = data.get("evidence", [])
+    if not isinstance(rationale, str) or not isinstance(evidence, list):
+        return None
+    if any(isinstance(e, bool) or not isinstance(e, int) for e in evidence):
+        return None
+
+    return {
+        "verdict": verdict.strip().lower(),
+        "confidence": float(confidence),
+        "rationale": rationale.strip()[:RATIONALE_MAX_CHARS],
+        "evidence": evidence,
+    }
+
+
+def read_reply(provider: str, text: Optional[str], verdicts: Sequence[str] = VERDICTS) -> Optional[Dict[str, Any]]:
+    """``parse_verdict`` plus per-provider accounting; None means "use the fallback heuristic"."""
+    parsed = parse_verdict(text, verdicts)
+    OUTPUT_PARSE.inc(provider=provider, result="structured" if parsed else "fallback")
+    return parsed
+
+
+__all__ = ['VERDICTS', 'EXTENDED_VERDICTS', 'OUTPUT_BUDGETS', 'FORMAT_INSTRUCTIONS', 'output_budget',
+           'output_schema', 'response_format', 'parse_verdict', 'read_reply']
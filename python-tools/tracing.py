@@ -0,0 +1,293 @@
+"""
+Verity API - Request Tracing
+============================
+Lightweight span tracing for the verification pipeline.
+
+- ``start_trace()`` opens a root span for a request. Traces are recorded only
+  when head-sampled for export (``TRACE_SAMPLE_RATE``) or when the caller asks
+  for a timing breakdown; otherwise every ``span()`` call returns a shared
+  no-op object, so unsampled requests pay almost nothing.
+- ``span()`` opens a child of the current span (tracked with a ContextVar, so
+  spans started inside ``asyncio.gather`` tasks get the right parent).
+- Finished sampled traces are exported as OTLP/JSON (the OpenTelemetry
+  ``ExportTraceServiceRequest`` shape), either appended to a local file or
+  POSTed to a collector's ``/v1/traces`` endpoint, from a background task.
+
+Configuration (environment):
+    TRACE_SAMPLE_RATE               fraction of requests exported (default 0.01)
+    TRACE_EXPORT_FILE               append OTLP/JSON lines to this file
+    OTEL_EXPORTER_OTLP_ENDPOINT     collector base URL (e.g. http://otel:4318)
+    OTEL_SERVICE_NAME               resource service.name (default verity-api)
+"""
+
+import asyncio
+import json
+import os
+import random
+import secrets
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Any
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("verity_current_span", default=None)
+
+
+class _NoopSpan:
+    """Returned whenever the current request is not being traced."""
+    __slots__ = ()
+    trace = None
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_outcome(self, outcome: str, ok: bool = True):
+        pass
+
+    def timings(self) -> Optional[Dict]:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns",
+                 "attributes", "status", "_token")
+    recording = True
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict] = None):
+        self.trace = trace
+        self.name = name
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = 0
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.status = STATUS_UNSET
+        self._token = None
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        if exc_type is not None:
+            self.status = STATUS_ERROR
+            self.attributes.setdefault("outcome", "error")
+            self.attributes["error.type"] = exc_type.__name__
+        elif self.status == STATUS_UNSET:
+            self.status = STATUS_OK
+        _current_span.reset(self._token)
+        self.trace.spans.append(self)
+        if self is self.trace.root:
+            self.trace.finish()
+        return False
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_outcome(self, outcome: str, ok: bool = True):
+        self.attributes["outcome"] = outcome
+        self.status = STATUS_OK if ok else STATUS_ERROR
+
+    def timings(self) -> Optional[Dict]:
+        return self.trace.timings()
+
+
+class Trace:
+    """All spans of one request."""
+
+    def __init__(self, tracer: "Tracer", sampled: bool):
+        self.tracer = tracer
+        self.trace_id = secrets.token_hex(16)
+        self.sampled = sampled
+        self.spans: List[Span] = []
+        self.root: Optional[Span] = None
+
+    def finish(self):
+        if self.sampled:
+            self.tracer.enqueue(self)
+
+    def timings(self) -> Dict:
+        """Per-span breakdown relative to the root span start (open spans end 'now')."""
+        root = self.root
+        now = time.time_ns()
+        origin = root.start_ns
+        finished = list(self.spans)
+        if root not in finished:
+            finished.append(root)
+        spans = []
+        for s in sorted(finished, key=lambda s: s.start_ns):
+            end = s.end_ns or now
+            entry = {
+                "name": s.name,
+                "start_ms": round((s.start_ns - origin) / 1e6, 2),
+                "duration_ms": round((end - s.start_ns) / 1e6, 2),
+                "outcome": s.attributes.get("outcome", "error" if s.status == STATUS_ERROR else "ok")
+            }
+            extra = {k: v for k, v in s.attributes.items() if k != "outcome"}
+            if extra:
+                entry["attributes"] = extra
+            if s.parent_id and s is not root:
+                entry["parent"] = next((p.name for p in finished if p.span_id == s.parent_id), None)
+            spans.append(entry)
+        return {
+            "trace_id": self.trace_id,
+            "total_ms": round(((root.end_ns or now) - origin) / 1e6, 2),
+            "spans": spans
+        }
+
+    def to_otlp(self, service_name: str) -> Dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attr("service.name", service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "verity.tracing"},
+                    "spans": [_otlp_span(self.trace_id, s) for s in self.spans]
+                }]
+            }]
+        }
+
+
+def _otlp_value(value: Any) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attr(key: str, value: Any) -> Dict:
+    return {"key": key, "value": _otlp_value(value)}
+
+
+def _otlp_span(trace_id: str, span: Span) -> Dict:
+    out = {
+        "traceId": trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 2 if span.parent_id is None else 1,  # SERVER for the root, INTERNAL otherwise
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [_otlp_attr(k, v) for k, v in span.attributes.items()],
+        "status": {"code": span.status}
+    }
+    if span.parent_id:
+        out["parentSpanId"] = span.parent_id
+    return out
+
+
+class Tracer:
+    """Creates traces, applies sampling and exports finished traces in batches."""
+
+    def __init__(self, sample_rate: float = 0.01, export_file: Optional[str] = None,
+                 otlp_endpoint: Optional[str] = None, service_name: str = "verity-api",
+                 max_queue: int = 1000):
+        self.sample_rate = sample_rate
+        self.export_file = export_file
+        self.otlp_endpoint = otlp_endpoint.rstrip("/") if otlp_endpoint else None
+        self.service_name = service_name
+        self.queue: deque = deque(maxlen=max_queue)
+        self.exported = 0
+        self.dropped = 0
+
+    @property
+    def exporting(self) -> bool:
+        return bool(self.export_file or self.otlp_endpoint)
+
+    def start_trace(self, name: str, record: bool = False, **attributes):
+        """Root span for a request; a no-op unless sampled for export or ``record`` is set."""
+        sampled = self.exporting and self.sample_rate > 0 and random.random() < self.sample_rate
+        if not (sampled or record):
+            return NOOP_SPAN
+        trace = Trace(self, sampled)
+        trace.root = Span(trace, name, None, attributes)
+        return trace.root
+
+    def enqueue(self, trace: Trace):
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(trace)
+
+    async def flush(self, http_client=None):
+        """Export everything queued so far."""
+        if not self.queue:
+            return
+        batch = [self.queue.popleft() for _ in range(len(self.queue))]
+        payloads = [t.to_otlp(self.service_name) for t in batch]
+        if self.export_file:
+            await asyncio.to_thread(self._write_file, payloads)
+        if self.otlp_endpoint and http_client is not None:
+            merged = {"resourceSpans": [rs for p in payloads for rs in p["resourceSpans"]]}
+            try:
+                await http_client.post(f"{self.otlp_endpoint}/v1/traces", json=merged)
+            except Exception as e:
+                logger.debug(f"Trace export to collector failed: {e}")
+        self.exported += len(batch)
+
+    def _write_file(self, payloads: List[Dict]):
+        with open(self.export_file, "a", encoding="utf-8") as f:
+            for payload in payloads:
+                f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+    async def run_export_loop(self, interval: float = 5.0):
+        """Background task: flush queued traces every ``interval`` seconds."""
+        import httpx
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            try:
+                while True:
+                    await asyncio.sleep(interval)
+                    try:
+                        await self.flush(client)
+                    except Exception as e:
+                        logger.debug(f"Trace flush failed: {e}")
+            finally:
+                await self.flush(client)
+
+
+def span(name: str, **attributes):
+    """Child span of the current span (no-op when the request is not traced)."""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent.span_id, attributes)
+
+
+def current_span():
+    return _current_span.get() or NOOP_SPAN
+
+
+tracer = Tracer(
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", 0.01)),
+    export_file=os.getenv("TRACE_EXPORT_FILE") or None,
+    otlp_endpoint=os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT") or None,
+    service_name=os.getenv("OTEL_SERVICE_NAME", "verity-api")
+)
+
+
+def start_trace(name: str, record: bool = False, **attributes):
+    return tracer.start_trace(name, record=record, **attributes)
+
+
+__all__ = ['Tracer', 'Trace', 'Span', 'NOOP_SPAN', 'tracer', 'start_trace', 'span', 'current_span']
@@ -0,0 +1,108 @@
+"""
+Verity API - Outbound URL Guard
+===============================
+Checks URLs taken from request bodies before the server fetches them, so
+a caller cannot make it read internal services (cloud metadata endpoints,
+localhost admin ports, the private network).
+
+- ``check_public_url`` accepts http(s) URLs whose host resolves only to
+  public addresses; loopback, private, link-local, reserved and multicast
+  addresses are refused, including IPv4 addresses mapped into IPv6.
+- ``stream_public`` opens a streamed GET and follows redirects itself,
+  checking every hop, since a public URL may redirect inward.
+- ``fetch_public`` downloads a whole body through ``stream_public`` under a
+  byte cap, checked against Content-Length first and then while reading.
+"""
+
+import asyncio
+import ipaddress
+import socket
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+MAX_REDIRECTS = 5
+
+
+class FetchError(ValueError):
+    """A guarded download failed (HTTP error status, over the byte cap, transport error)."""
+
+
+class UnsafeURL(FetchError):
+    """The URL is not an http(s) URL on the public internet."""
+
+
+def _public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_public_url(url: str):
+    """Raise ``UnsafeURL`` unless ``url`` is http(s) and its host resolves only to public addresses."""
+    try:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise UnsafeURL("malformed URL")
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise UnsafeURL("only http(s) URLs can be fetched")
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(parts.hostname, port, type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError):
+        raise UnsafeURL(f"cannot resolve {parts.hostname}")
+    if not infos or not all(_public(info[4][0]) for info in infos):
+        raise UnsafeURL(f"{parts.hostname} is not a public address")
+
+
+@asynccontextmanager
+async def stream_public(client: httpx.AsyncClient, url: str, timeout: float, max_redirects: int = MAX_REDIRECTS,
+                        headers: Optional[Dict[str, str]] = None) -> AsyncIterator[httpx.Response]:
+    """
+    Streamed GET of a public URL, following up to ``max_redirects`` checked
+    redirects. Each hop is the request httpx builds for the redirect, so
+    ``headers`` such as Authorization are dropped when the origin changes.
+    """
+    request = client.build_request("GET", url, headers=headers, timeout=timeout)
+    for _ in range(max_redirects + 1):
+        await check_public_url(str(request.url))
+        response = await client.send(request, stream=True, follow_redirects=False)
+        if response.next_request is None:
+            try:
+                yield response
+            finally:
+                await response.aclose()
+            return
+        request = response.next_request
+        await response.aclose()
+    raise UnsafeURL("too many redirects")
+
+
+async def fetch_public(client: httpx.AsyncClient, url: str, max_bytes: int, timeout: float) -> bytes:
+    """
+    Body of a public URL, at most ``max_bytes`` long; raises ``UnsafeURL``
+    for URLs (or redirects) off the public internet and ``FetchError`` for
+    anything else that goes wrong.
+    """
+    chunks, size = [], 0
+    try:
+        async with stream_public(client, url, timeout) as response:
+            if response.status_code != 200:
+                raise FetchError(f"HTTP {response.status_code}")
+            declared = response.headers.get("content-length", "")
+            if declared.isdigit() and int(declared) > max_bytes:
+                raise FetchError(f"exceeds {max_bytes} bytes")
+            async for chunk in response.aiter_bytes():
+                size += len(chunk)
+                if size > max_bytes:
+                    raise FetchError(f"exceeds {max_bytes} bytes")
+                chunks.append(chunk)
+    except httpx.HTTPError as e:
+        raise FetchError(str(e) or type(e).__name__)
+    return b"".join(chunks)
+
+
+__all__ = ['FetchError', 'UnsafeURL', 'check_public_url', 'stream_public', 'fetch_public', 'MAX_REDIRECTS']
@@ -0,0 +1,300 @@
+"""
+Verity API - User Store
+=======================
+Persistent accounts behind ``UserAuth``, shared by every worker process.
+
+- One schema for both backends: the ``api_users`` table mirrors the
+  ``profiles`` columns of database/supabase-schema.sql, plus the password
+  hash and last login the API's own sign-in needs. Queries are written
+  once with ``$n`` placeholders (Postgres); SQLite runs them as ``?n``.
+- ``SQLiteUserStore`` (the default, ``USER_DB_URL=sqlite:///path``) keeps
+  one connection per thread of a small executor, so the event loop never
+  waits on disk. WAL mode and a busy timeout let several worker processes
+  share the file. Statements are prepared once per connection (the
+  sqlite3 statement cache); the same holds per connection for asyncpg.
+- ``PostgresUserStore`` (``USER_DB_URL=postgresql://...``) uses an asyncpg
+  connection pool; asyncpg is only needed when it is configured.
+- Profile and tier lookups are read through a small TTL cache; writes on
+  this worker update it immediately, other workers see changes within
+  ``cache_ttl`` seconds.
+- ``increment_verifications`` is a single ``UPDATE ... RETURNING``, so
+  concurrent requests on any worker never lose a count.
+"""
+
+import abc
+import asyncio
+import re
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+try:
+    import asyncpg
+except ImportError:  # pragma: no cover - optional dependency
+    asyncpg = None
+
+import prometheus_metrics as metrics
+
+
+USER_CACHE_SIZE = 10000
+USER_CACHE_TTL = 30.0
+SQLITE_POOL_SIZE = 4
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS api_users (
+        id TEXT PRIMARY KEY,
+        email TEXT UNIQUE NOT NULL,
+        full_name TEXT,
+        password_hash TEXT NOT NULL,
+        tier TEXT NOT NULL DEFAULT 'free',
+        verifications_used INTEGER NOT NULL DEFAULT 0,
+        stripe_customer_id TEXT,
+        stripe_subscription_id TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        last_login TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_api_users_stripe_customer ON api_users(stripe_customer_id)",
+]
+
+_COLUMNS = ("id, email, full_name, password_hash, tier, verifications_used, stripe_customer_id, "
+            "stripe_subscription_id, created_at, last_login")
+SQL = {
+    "insert": "INSERT INTO api_users (id, email, full_name, password_hash, created_at, updated_at) "
+              "VALUES ($1, $2, $3, $4, $5, $5)",
+    "by_email": f"SELECT {_COLUMNS} FROM api_users WHERE email = $1",
+    "by_customer": f"SELECT {_COLUMNS} FROM api_users WHERE stripe_customer_id = $1",
+    "login": "UPDATE api_users SET last_login = $2 WHERE email = $1",
+    "subscription": "UPDATE api_users SET tier = $2, stripe_customer_id = COALESCE($3, stripe_customer_id), "
+                    "stripe_subscription_id = $4, updated_at = $5 WHERE email = $1",
+    "increment": "UPDATE api_users SET verifications_used = verifications_used + $2, updated_at = $3 "
+                 "WHERE id = $1 RETURNING email, verifications_used",
+}
+
+USER_CACHE = "user_profile"
+
+
+class UserExists(ValueError):
+    """An account with this email already exists."""
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat()
+
+
+def _user(row: Optional[Sequence]) -> Optional[Dict[str, Any]]:
+    """A row in the shape ``UserAuth`` and the endpoints use."""
+    if row is None:
+        return None
+    (user_id, email, name, password_hash, tier, used, customer, subscription, created, last_login) = tuple(row)
+    return {"user_id": user_id, "email": email, "name": name or "", "password_hash": password_hash, "tier": tier,
+            "verifications_used": used, "stripe_customer_id": customer, "stripe_subscription_id": subscription,
+            "created_at": created, "last_login": last_login}
+
+
+class UserStore(abc.ABC):
+    """Account operations over a backend's ``_fetchrow`` / ``_execute`` (``$n`` placeholders)."""
+
+    def __init__(self, cache_size: int = USER_CACHE_SIZE, cache_ttl: float = USER_CACHE_TTL):
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self._cache: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+
+    @abc.abstractmethod
+    async def _fetchrow(self, sql: str, args: Tuple) -> Optional[Sequence]:
+        """Run a query; returns its first row or None."""
+
+    @abc.abstractmethod
+    async def _execute(self, sql: str, args: Tuple) -> int:
+        """Run a write; returns the number of rows changed."""
+
+    def _cached(self, email: str) -> Optional[Dict]:
+        entry = self._cache.get(email)
+        if entry and entry[1] > time.monotonic():
+            self._cache.move_to_end(email)
+            metrics.record_cache(USER_CACHE, True)
+            return entry[0]
+        metrics.record_cache(USER_CACHE, False)
+        return None
+
+    def _remember(self, user: Dict):
+        self._cache[user["email"]] = (user, time.monotonic() + self.cache_ttl)
+        self._cache.move_to_end(user["email"])
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def forget(self, email: str):
+        self._cache.pop(email, None)
+
+    async def create(self, email: str, password_hash: str, name: str = "") -> Dict:
+        """Insert an account; raises ``UserExists`` (the unique email index decides races)."""
+        user_id = secrets.token_hex(16)
+        try:
+            await self._execute(SQL["insert"], (user_id, email, name, password_hash, _now()))
+        except Exception as e:
+            if self._is_duplicate(e):
+                raise UserExists("Email already registered")
+            raise
+        self.forget(email)
+        return {"user_id": user_id, "email": email}
+
+    async def get(self, email: str) -> Optional[Dict]:
+        """The account for ``email`` (read through the cache)."""
+        user = self._cached(email)
+        if user is None:
+            user = _user(await self._fetchrow(SQL["by_email"], (email,)))
+            if user:
+                self._remember(user)
+        return user
+
+    async def get_by_customer(self, customer_id: str) -> Optional[Dict]:
+        return _user(await self._fetchrow(SQL["by_customer"], (customer_id,)))
+
+    async def record_login(self, email: str):
+        await self._execute(SQL["login"], (email, _now()))
+        self.forget(email)
+
+    async def set_subscription(self, email: str, tier: str, customer_id: Optional[str] = None,
+                               subscription_id: Optional[str] = None) -> bool:
+        changed = await self._execute(SQL["subscription"], (email, tier, customer_id, subscription_id, _now()))
+        self.forget(email)
+        return changed > 0
+
+    async def increment_verifications(self, user_id: str, count: int = 1) -> Optional[int]:
+        """Atomically add ``count``; returns the new total (None for an unknown user)."""
+        row = await self._fetchrow(SQL["increment"], (user_id, count, _now()))
+        if row is None:
+            return None
+        email, used = row
+        cached = self._cache.get(email)
+        if cached:
+            cached[0]["verifications_used"] = used
+        return used
+
+    @staticmethod
+    def _is_duplicate(error: Exception) -> bool:
+        return isinstance(error, sqlite3.IntegrityError) or type(error).__name__ == "UniqueViolationError"
+
+    async def close(self):
+        pass
+
+
+class SQLiteUserStore(UserStore):
+    """SQLite file shared by worker processes; one connection per executor thread."""
+
+    _PLACEHOLDER = re.compile(r"\$(\d+)")
+
+    def __init__(self, path: str, pool_size: int = SQLITE_POOL_SIZE, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.pool_size = max(1, pool_size)
+        self._local = threading.local()
+        self._connections = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._sql: Dict[str, str] = {}
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, cached_statements=64,
+                                 check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            with self._init_lock:
+                if not self._initialized:
+                    for statement in SCHEMA:
+                        db.execute(statement)
+                    self._initialized = True
+                self._connections.append(db)
+            self._local.db = db
+        return db
+
+    def _translate(self, sql: str) -> str:
+        translated = self._sql.get(sql)
+        if translated is None:
+            translated = self._sql[sql] = self._PLACEHOLDER.sub(r"?\1", sql)
+        return translated
+
+    async def _run(self, fn, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.pool_size, thread_name_prefix="user-db")
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def _fetchrow_sync(self, sql: str, args: Tuple):
+        db = self._connection()
+        cursor = db.execute(self._translate(sql), args)
+        try:
+            return cursor.fetchone()
+        finally:
+            cursor.close()  # finishes an UPDATE ... RETURNING statement (autocommit)
+
+    def _execute_sync(self, sql: str, args: Tuple) -> int:
+        return self._connection().execute(self._translate(sql), args).rowcount
+
+    async def _fetchrow(self, sql: str, args: Tuple):
+        return await self._run(self._fetchrow_sync, sql, args)
+
+    async def _execute(self, sql: str, args: Tuple) -> int:
+        return await self._run(self._execute_sync, sql, args)
+
+    async def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for db in self._connections:
+            db.close()
+        self._connections.clear()
+        self._local = threading.local()
+
+
+class PostgresUserStore(UserStore):
+    """Postgres through an asyncpg pool (statements are prepared and cached per connection)."""
+
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10, **kwargs):
+        if asyncpg is None:
+            raise RuntimeError("USER_DB_URL points at Postgres but asyncpg is not installed")
+        super().__init__(**kwargs)
+        self.dsn = dsn
+        self.min_size, self.max_size = min_size, max_size
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def _acquire_pool(self):
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await asyncpg.create_pool(self.dsn, min_size=self.min_size, max_size=self.max_size)
+                async with self._pool.acquire() as connection:
+                    for statement in SCHEMA:
+                        await connection.execute(statement)
+        return self._pool
+
+    async def _fetchrow(self, sql: str, args: Tuple):
+        pool = self._pool or await self._acquire_pool()
+        return await pool.fetchrow(sql, *args)
+
+    async def _execute(self, sql: str, args: Tuple) -> int:
+        pool = self._pool or await self._acquire_pool()
+        status = await pool.execute(sql, *args)  # e.g. "UPDATE 1"
+        return int(status.rsplit(" ", 1)[-1]) if status[-1:].isdigit() else 0
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+def create_user_store(url: str, **kwargs) -> UserStore:
+    """``postgresql://...`` -> Postgres; ``sqlite:///path`` or a plain path -> SQLite."""
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresUserStore(url, **kwargs)
+    return SQLiteUserStore(url[len("sqlite:///"):] if url.startswith("sqlite:///") else url, **kwargs)
+
+
+__all__ = ['UserExists', 'UserStore', 'SQLiteUserStore', 'PostgresUserStore', 'create_user_store', 'SCHEMA']
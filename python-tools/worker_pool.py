@@ -0,0 +1,94 @@
+"""
+Verity API - Worker Process Pool
+================================
+Runs CPU-bound parsing (PDFs, images, article HTML) in worker processes so
+the event loop never blocks on it, with a timeout that costs only the task
+that overran it.
+
+- ``WorkerPool`` keeps ``workers`` slots, each a single-process executor
+  started on first use (spawn context: forking a process that runs an event
+  loop and threads is not safe). A task borrows an idle slot for its whole
+  run, so each worker process runs one task at a time.
+- On timeout (or when the caller gives up) only the task's own worker is
+  terminated; its slot starts a fresh process on next use. Tasks running
+  in other slots are untouched.
+- A worker that dies (a crash in a native parser) fails only the task it
+  was running. Its slot is rebuilt only if it still holds the executor
+  that broke, so late failures never tear down a healthy replacement.
+- Waiting for a free slot does not count against the timeout.
+"""
+
+import asyncio
+import concurrent.futures
+import multiprocessing
+from concurrent.futures.process import BrokenProcessPool as BrokenWorker
+from typing import Any, Callable, List, Optional
+
+
+class _Slot:
+    """One worker process, replaced when it is killed or dies."""
+
+    def __init__(self):
+        self.executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    def start(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                1, mp_context=multiprocessing.get_context("spawn"))
+        return self.executor
+
+    def discard(self, executor: concurrent.futures.ProcessPoolExecutor, kill: bool = False):
+        """Drop ``executor`` (terminating its process if ``kill``) if it is still this slot's."""
+        if self.executor is not executor:
+            return
+        self.executor = None
+        if kill:
+            for process in list(getattr(executor, "_processes", {}).values()):
+                process.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+class WorkerPool:
+    """``workers`` worker processes; ``run`` raises ``asyncio.TimeoutError`` or ``BrokenWorker``."""
+
+    def __init__(self, workers: int, timeout: float):
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self._slots: List[_Slot] = [_Slot() for _ in range(self.workers)]
+        self._idle: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _idle_slots(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._idle is None or self._loop is not loop:
+            # Queues belong to one event loop; a new loop starts with every slot idle
+            self._idle, self._loop = asyncio.Queue(), loop
+            for slot in self._slots:
+                self._idle.put_nowait(slot)
+        return self._idle
+
+    async def run(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """``fn(*args)`` in a worker process, within ``timeout`` (default: the pool's)."""
+        idle = self._idle_slots()
+        slot = await idle.get()
+        try:
+            executor = slot.start()
+            try:
+                return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(executor, fn, *args),
+                                              timeout or self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                slot.discard(executor, kill=True)  # the worker is still busy with it
+                raise
+            except BrokenWorker:
+                slot.discard(executor)
+                raise
+        finally:
+            idle.put_nowait(slot)
+
+    def shutdown(self):
+        for slot in self._slots:
+            if slot.executor is not None:
+                slot.discard(slot.executor)
+
+
+__all__ = ['WorkerPool', 'BrokenWorker']
@@ -0,0 +1,65 @@
+import asyncio
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import httpx
+import article_extract as ae
+
+BODY = [
+    "The city council approved the transit budget on Tuesday, after a six-hour debate that ran past midnight.",
+    "Officials said the new line would open in 2027, two years later than planned, at a cost of 4.2 billion dollars.",
+    "Critics argued that the estimates still ignored land acquisition, which an audit flagged last year.",
+]
+PAGE = (
+    '<html><head><title>Council approves transit budget | Example News</title>'
+    '<script type="application/ld+json">{"@type": "NewsArticle", "datePublished": "2026-03-03T10:00:00Z",'
+    ' "author": {"@type": "Person", "name": "Jane Reporter"}}</script></head><body>'
+    '<div class="cookie-banner"><p>We use cookies to improve your experience, by continuing you accept them.</p></div>'
+    '<div id="top-nav"><ul>' + "".join(f'<li><a href="/s/{i}">Section {i}</a></li>' for i in range(20)) + '</ul></div>'
+    '<div class="main-column"><article><h1>Council approves transit budget</h1>'
+    '<p class="byline">By Jane Reporter</p>' + "".join(f"<p>{p}" for p in BODY) +  # unclosed <p> on purpose
+    '</article><div class="share-bar"><a href="#">Share this story on social media or by email</a></div>'
+    '<div class="related">' + "".join(f'<p><a href="/r/{i}">Related story number {i} you may like</a></p>' for i in range(5)) +
+    '</div></div><footer><p>Copyright 2026 Example News, all rights reserved, terms and privacy.</p></footer></body></html>'
+)
+
+
+def test_extracts_article_body_and_metadata_without_boilerplate():
+    article = ae.extract_article(PAGE)
+    assert article == {
+        "title": "Council approves transit budget",
+        "byline": "Jane Reporter",
+        "published": "2026-03-03T10:00:00Z",
+        "text": "\n\n".join(BODY),
+    }
+    assert ae.extract_article('<html><body><nav><a href="/">Home</a></nav><p>Short.</p></body></html>') is None
+
+
+def test_v10_uses_the_article_and_falls_back_to_streamed_text(monkeypatch):
+    import api_server_v10 as v10
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=PAGE.encode())
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            extractor = v10.ContentExtractor(client)
+            article = await extractor.extract_url_content("https://93.184.216.34/transit")
+            monkeypatch.setattr(v10.article_pool, "extract", _no_article)
+            fallback = await extractor.extract_url_content("https://93.184.216.34/transit")
+            return article, fallback
+
+    monkeypatch.setattr(v10.Config, "JINA_API_KEY", None)
+    monkeypatch.setattr(v10, "article_pool", ae.ArticlePool(workers=1))
+    try:
+        article, fallback = asyncio.run(run())
+    finally:
+        v10.article_pool.shutdown()
+    assert article["source"] == "article" and article["byline"] == "Jane Reporter"
+    assert article["content"].startswith("Council approves transit budget (by Jane Reporter, 2026-03-03T10:00:00Z)\n\n")
+    assert "cookies" not in article["content"] and "Related story" not in article["content"]
+    assert fallback["source"] == "direct_fetch" and BODY[0] in fallback["content"]
+
+
+async def _no_article(html):
+    return None
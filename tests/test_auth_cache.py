@@ -0,0 +1,106 @@
+import asyncio
+import time
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import auth_cache as ac
+
+
+def test_bcrypt_runs_off_the_loop_with_admission_control():
+    hasher = ac.PasswordHasher(workers=2, max_pending=3, rounds=12)
+
+    async def run():
+        lags = []
+
+        async def ticker():
+            while True:
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - start - 0.005)
+
+        tick = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(hasher.hash("s3cret!") for _ in range(4)), return_exceptions=True)
+        tick.cancel()
+        hashed = next(r for r in results if isinstance(r, str))
+        return results, lags, await hasher.verify("s3cret!", hashed), await hasher.verify("wrong", hashed)
+
+    try:
+        results, lags, good, bad = asyncio.run(run())
+    finally:
+        hasher.shutdown()
+    assert sum(isinstance(r, ac.AuthBusy) for r in results) == 1 and hasher.pending == 0
+    assert good and not bad
+    assert max(lags) < 0.1  # each hash takes ~250 ms at 12 rounds; the loop never waited for one
+
+
+def test_api_key_records_come_from_l1_then_l2_then_the_source():
+    loads = []
+
+    async def load(key):
+        loads.append(key)
+        return {"key_id": key[:4]} if key.startswith("vk_") else None
+
+    class Shared:
+        def __init__(self):
+            self.data = {}
+
+        async def get_cached_api_key(self, key_hash):
+            return self.data.get(key_hash)
+
+        async def cache_api_key(self, key_hash, record, ttl=300):
+            self.data[key_hash] = record
+
+        async def invalidate_api_key(self, key_hash):
+            self.data.pop(key_hash, None)
+
+    shared = Shared()
+    first, second = ac.ApiKeyCache(load, shared=shared), ac.ApiKeyCache(load, shared=shared)
+
+    async def run():
+        return [await first.lookup("vk_live_1"), await first.lookup("vk_live_1"), await second.lookup("vk_live_1"),
+                await first.lookup("bogus"), await first.lookup("bogus")]
+
+    assert asyncio.run(run()) == [{"key_id": "vk_l"}] * 3 + [None, None]
+    assert loads == ["vk_live_1", "bogus"]  # worker two was served from L2; the unknown key negative-cached
+
+
+def test_v9_resolves_the_caller_once_per_token(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+    import api_server_v9 as server
+    from user_store import SQLiteUserStore
+    monkeypatch.setattr(server, "user_store", SQLiteUserStore(str(tmp_path / "users.db")))
+    monkeypatch.setattr(server, "password_hasher", ac.PasswordHasher(rounds=4))
+    monkeypatch.setattr(server, "token_cache", ac.TokenCache())
+    decodes = []
+    real_decode = server.jwt.decode
+    monkeypatch.setattr(server.jwt, "decode", lambda *a, **k: decodes.append(1) or real_decode(*a, **k))
+    client = TestClient(server.app)
+    email = f"cache_{time.time_ns()}@example.test"
+
+    assert client.post("/auth/register", json={"email": email, "password": "pw-123456"}).status_code == 200
+    login = client.post("/auth/login", json={"email": email, "password": "pw-123456"}).json()
+    assert client.post("/auth/login", json={"email": email, "password": "nope"}).status_code == 401
+    headers = {"Authorization": f"Bearer {login['token']}"}
+    me = [client.get("/auth/me", headers=headers).json() for _ in range(3)]
+    assert me[0]["email"] == email and me[0] == me[2] and len(decodes) == 1
+    assert client.get("/stripe/subscription", headers=headers).json()["status"] == "free" and len(decodes) == 1
+    assert client.get("/auth/me", headers={"Authorization": "Bearer junk"}).status_code == 401
+    assert client.get("/auth/me").json()["detail"] == "Missing or invalid authorization header"
+
+    monkeypatch.setattr(server.password_hasher, "max_pending", 0)
+    busy = client.post("/auth/login", json={"email": email, "password": "pw-123456"})
+    assert busy.status_code == 503 and busy.headers["retry-after"] == "1"
+
+
+def test_v9_accepts_api_keys_in_every_header_form():
+    from starlette.requests import Request
+    import api_server_v9 as server
+
+    def principal(headers):
+        scope = {"type": "http", "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()]}
+        return asyncio.run(server.resolve_principal(Request(scope)))
+
+    key = next(iter(server.Config.API_KEYS))
+    for headers in ({"X-API-Key": key}, {"Authorization": f"Bearer {key}"}, {"Authorization": key}):
+        assert principal(headers)["kind"] == "api_key"
+    assert principal({"Authorization": "not-a-key"}) is None and principal({}) is None
@@ -0,0 +1,253 @@
+import asyncio
+import json
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+from batch_jobs import BatchJobEngine, format_sse
+
+
+class _FakeSession:
+    in_flight = 0
+    peak = 0
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def verify_claim(self, claim, tier="free"):
+        _FakeSession.in_flight += 1
+        _FakeSession.peak = max(_FakeSession.peak, _FakeSession.in_flight)
+        try:
+            # "slow" claims take much longer; a chunked batch would stall on them
+            await asyncio.sleep(0.2 if claim.startswith("slow") else 0.01)
+            if claim == "boom":
+                raise RuntimeError("provider exploded")
+            return {"verdict": "true", "confidence": 90, "providers_used": ["fake"]}
+        finally:
+            _FakeSession.in_flight -= 1
+
+
+class _Cache:
+    def __init__(self):
+        self.data = {"cached claim": {"verdict": "false", "confidence": 80}}
+
+    def get(self, claim, tier):
+        return self.data.get(claim)
+
+    def set(self, claim, tier, result):
+        self.data[claim] = result
+
+
+def test_job_returns_immediately_and_streams_partial_results():
+    _FakeSession.peak = 0
+    engine = BatchJobEngine(session_factory=_FakeSession, cache=_Cache(), concurrency=3)
+    claims = ["slow one", "cached claim", "boom"] + [f"claim {i}" for i in range(6)]
+
+    async def run():
+        job = engine.submit(claims, tier="pro")
+        assert job.status == "queued" and job.completed == 0
+        events = []
+        async for event, data in engine.events(job):
+            events.append((event, data))
+            if event == "result" and data["claim"] == "claim 5":
+                # partial results are visible while the slow claim is still running
+                partial, cursor = job.results_after(0)
+                assert job.results[0] is None and cursor == len(partial) < len(claims)
+        return job, events
+
+    job, events = asyncio.run(run())
+    assert job.status == "completed"
+    assert _FakeSession.peak == 3
+    summary = job.summary()
+    assert [r["claim"] for r in summary["results"]] == claims
+    assert summary["cached"] == 1
+    assert summary["results"][2]["result"]["verdict"] == "error"
+    assert summary["successful"] == len(claims) - 1
+    assert events[-1][0] == "done"
+    assert sum(1 for e, _ in events if e == "result") == len(claims)
+    assert format_sse("progress", {"completed": 1}).startswith("event: progress\ndata: ")
+    assert engine.get(job.job_id) is job
+
+
+def test_cancel_keeps_completed_results_and_expired_jobs_are_dropped():
+    engine = BatchJobEngine(session_factory=_FakeSession, concurrency=1, ttl=0)
+
+    async def run():
+        job = engine.submit(["claim a", "slow b", "claim c"])
+        while job.completed < 1:
+            await asyncio.sleep(0.005)
+        assert engine.cancel(job.job_id)
+        await job.wait()
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == "cancelled"
+    results = job.summary()["results"]
+    assert results[0]["result"]["verdict"] == "true"
+    assert results[2]["result"]["explanation"] == "not processed"
+    assert engine.get(job.job_id) is None
+
+
+def test_ndjson_stream_dedups_and_applies_backpressure():
+    gate = asyncio.Event()
+    pulled = []
+
+    class _GatedSession(_FakeSession):
+        async def verify_claim(self, claim, tier="free"):
+            await gate.wait()
+            return await super().verify_claim(claim, tier)
+
+    async def body():
+        lines = ['{"claim": "first claim"}', '"Second claim"', 'not json', '{"claim": "FIRST  claim."}']
+        lines += [f'{{"claim": "claim {i}"}}' for i in range(200)]
+        payload = ("\n".join(lines) + "\n").encode()
+        for start in range(0, len(payload), 64):  # lines split across chunks
+            pulled.append(start)
+            yield payload[start:start + 64]
+
+    engine = BatchJobEngine(session_factory=_GatedSession, concurrency=2)
+
+    async def run():
+        items = []
+
+        async def consume():
+            async for item in engine.stream_ndjson(body(), tier="pro"):
+                items.append(item)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        stalled_at = len(pulled)
+        gate.set()
+        await consumer
+        return items, stalled_at
+
+    items, stalled_at = asyncio.run(run())
+    total_chunks = len(pulled)
+    assert stalled_at < total_chunks / 2  # reading stopped while the workers were blocked
+    summary = items[-1]["summary"]
+    assert summary["total"] == 204 and summary["unique"] == 202
+    assert summary["duplicates"] == 1 and summary["invalid"] == 1
+    by_index = {i["index"]: i for i in items[:-1]}
+    assert sorted(by_index) == list(range(204))
+    assert by_index[2]["error"] == "invalid JSON"
+    assert by_index[3]["duplicate_of"] == 0
+    assert by_index[3]["result"] == by_index[0]["result"]
+
+
+def test_duplicates_are_verified_once_and_reported():
+    calls = []
+
+    class _CountingSession(_FakeSession):
+        async def verify_claim(self, claim, tier="free"):
+            calls.append(claim)
+            return await super().verify_claim(claim, tier)
+
+    engine = BatchJobEngine(session_factory=_CountingSession, concurrency=4)
+    claims = ["The Earth is flat.", "earth is FLAT!!", "The Earth is not flat", "claim two", "Claim two"]
+
+    async def run():
+        job = engine.submit(claims)
+        await job.wait()
+        return job
+
+    job = asyncio.run(run())
+    assert sorted(calls) == ["The Earth is flat.", "The Earth is not flat", "claim two"]
+    summary = job.summary()
+    assert summary["unique_claims"] == 3
+    assert summary["duplicate_groups"] == [
+        {"representative": 0, "members": [0, 1], "match": "near"},
+        {"representative": 3, "members": [3, 4], "match": "exact"},
+    ]
+    assert summary["results"][1]["duplicate_of"] == 0
+    assert summary["results"][4]["result"] == summary["results"][3]["result"]
+
+
+def test_ndjson_stream_caps_duplicates_parked_on_a_claim_in_flight():
+    gate = asyncio.Event()
+    pulled = []
+
+    class _GatedSession(_FakeSession):
+        async def verify_claim(self, claim, tier="free"):
+            await gate.wait()
+            return await super().verify_claim(claim, tier)
+
+    async def body():
+        for i in range(200):
+            pulled.append(i)
+            yield b'{"claim": "the same claim"}\n'
+
+    engine = BatchJobEngine(session_factory=_GatedSession, concurrency=1)
+
+    async def run():
+        items = []
+
+        async def consume():
+            async for item in engine.stream_ndjson(body()):
+                items.append(item)
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        stalled_at = len(pulled)
+        gate.set()
+        await consumer
+        return items, stalled_at
+
+    items, stalled_at = asyncio.run(run())
+    assert stalled_at <= 1 + 16 + 1  # the claim, 16 parked duplicates, the one waiting for room
+    assert items[-1]["summary"]["duplicates"] == 199
+    assert all(item["duplicate_of"] == 0 for item in items[:-1] if item["index"] != 0)
+
+
+def _bulk_lines(client, url, lines, headers):
+    payload = "".join(f'{{"claim": "{line}"}}\n' for line in lines)
+    response = client.post(url, content=payload, headers={"Content-Type": "application/x-ndjson", **headers})
+    return response, [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_bulk_verify_route_streams_lines_for_authenticated_callers(monkeypatch):
+    from fastapi.testclient import TestClient
+    import api_server_v9 as server
+    monkeypatch.setattr(server, "batch_engine", BatchJobEngine(session_factory=_FakeSession, concurrency=2))
+    monkeypatch.setattr(server, "rate_limiter", server.RateLimiter())
+    client = TestClient(server.app)
+    claims = [f"bulk claim {i}" for i in range(300)]
+
+    anonymous, _ = _bulk_lines(client, "/v3/bulk-verify?tier=enterprise", claims[:2], {})
+    response, items = _bulk_lines(client, "/v3/bulk-verify", claims, {"X-API-Key": "demo-key-12345"})
+    _, lowered = _bulk_lines(client, "/v3/bulk-verify?tier=free", claims[:2], {"X-API-Key": "demo-key-12345"})
+
+    assert anonymous.status_code == 401
+    assert response.status_code == 200 and response.headers["content-type"] == "application/x-ndjson"
+    assert sorted(item["index"] for item in items[:-1]) == list(range(300))
+    assert items[-1]["summary"]["total"] == 300 and items[-1]["summary"]["tier"] == "enterprise"
+    assert lowered[-1]["summary"]["tier"] == "free"
+
+    class _Users:
+        async def get(self, email):
+            return {"email": email, "tier": "starter"}
+
+    monkeypatch.setattr(server, "user_store", _Users())
+    assert asyncio.run(server.caller_tier({"kind": "user", "email": "pat@example.com", "tier": "free"})) == "pro"
+
+
+def test_batch_routes_take_the_tier_from_the_caller(monkeypatch):
+    from fastapi.testclient import TestClient
+    import api_server_v9 as v9
+    import api_server_v10 as v10
+    tiers = {}
+    for name, server in (("v9", v9), ("v10", v10)):
+        monkeypatch.setattr(server, "batch_engine", BatchJobEngine(session_factory=_FakeSession, concurrency=2))
+        monkeypatch.setattr(server, "rate_limiter", server.RateLimiter())
+        client = TestClient(server.app)
+        key = {"X-API-Key": "demo-key-12345"}
+        tiers[name] = [
+            client.post("/v3/batch-verify", json={"claims": ["a claim"], "tier": "enterprise"}).json()["tier"],
+            client.post("/v3/batch-verify", json={"claims": ["a claim"]}, headers=key).json()["tier"],
+            client.post("/v3/batch-verify", json={"claims": ["a claim"], "tier": "PRO"}, headers=key).json()["tier"],
+            client.post("/v3/batch-verify", json={"claims": ["a claim"], "tier": "gold"}, headers=key).json()["tier"],
+        ]
+        job = client.post("/v3/jobs", json={"claims": ["a claim"], "tier": "enterprise"}).json()
+        tiers[name].append(client.get(f"/v3/jobs/{job['job_id']}").json()["tier"])
+    assert tiers["v9"] == tiers["v10"] == ["free", "enterprise", "pro", "enterprise", "free"]
@@ -0,0 +1,163 @@
+import asyncio
+import time
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+from circuit_breaker import CircuitBreakerRegistry, CircuitState
+
+
+def _open_then_expire(registry, name):
+    for _ in range(registry.min_requests):
+        registry.record_failure(name, status_code=500)
+    cb = registry.get(name)
+    assert cb.state == CircuitState.OPEN
+    cb.open_until = time.time() - 1  # skip the open period
+    return cb
+
+
+def test_trips_on_error_rate_not_raw_count():
+    registry = CircuitBreakerRegistry(min_requests=4, error_rate_threshold=0.5)
+    for _ in range(6):
+        registry.record_success("p")
+    for _ in range(5):
+        registry.record_failure("p")
+    # 5/11 failures is below the 50% threshold
+    assert not registry.is_open("p")
+    registry.record_failure("p")
+    assert registry.is_open("p")
+
+
+def test_half_open_admits_exactly_k_probes():
+    registry = CircuitBreakerRegistry(min_requests=2, half_open_max_calls=2)
+    _open_then_expire(registry, "p")
+
+    admitted = [registry.allow_request("p") for _ in range(10)]
+    assert admitted.count(True) == 2
+    assert registry.get("p").state == CircuitState.HALF_OPEN
+
+    registry.record_success("p")
+    assert registry.get("p").state == CircuitState.HALF_OPEN
+    registry.record_success("p")
+    assert registry.get("p").state == CircuitState.CLOSED
+
+
+def test_half_open_probe_failure_reopens():
+    registry = CircuitBreakerRegistry(min_requests=2, half_open_max_calls=1)
+    _open_then_expire(registry, "p")
+    assert asyncio.run(registry.acquire("p"))
+    assert not asyncio.run(registry.acquire("p"))
+    registry.record_failure("p", error_type="timeout")
+    assert registry.get("p").state == CircuitState.OPEN
+
+
+def test_rate_limit_opens_immediately():
+    registry = CircuitBreakerRegistry(min_requests=5, rate_limit_timeout=120)
+    registry.record_failure("p", status_code=429)
+    cb = registry.get("p")
+    assert cb.state == CircuitState.OPEN
+    assert cb.open_until - time.time() > 100
+
+
+class FakeRedis:
+    """The few Upstash commands the breaker store uses, in memory (expiry ignored)."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def command(self, op, *args):
+        if op == "SET":
+            self.data[args[0]] = args[1]
+        elif op == "MGET":
+            return [self.data.get(k) for k in args]
+        elif op == "INCR":
+            self.data[args[0]] = int(self.data.get(args[0], 0)) + 1
+            return self.data[args[0]]
+
+
+def test_shared_probe_limit_spans_workers_that_tripped_separately():
+    from circuit_breaker import RedisBreakerStateStore
+    redis = FakeRedis()
+    workers = [CircuitBreakerRegistry(min_requests=2, half_open_max_calls=1,
+                                       state_store=RedisBreakerStateStore(redis)) for _ in range(3)]
+
+    async def scenario():
+        for offset, registry in enumerate(workers):
+            _open_then_expire(registry, "p")
+            registry.get("p").opened_at += offset  # each worker opened at its own time
+            await registry.state_store.publish_open("p", registry.get("p").opened_at, time.time() + 60)
+        return [await registry.acquire("p") for registry in workers]
+
+    assert asyncio.run(scenario()).count(True) == 1
+
+
+def test_v9_unsuccessful_answer_without_status_frees_the_probe(monkeypatch):
+    import api_server_v9 as server
+    health = server.provider_health
+    _open_then_expire(health, "probe_test")
+
+    async def unsuccessful(claim):
+        return {"success": False}
+
+    async def scenario():
+        engine = server.AIProviders()
+        engine.available_providers = ["probe_test"]
+        monkeypatch.setattr(engine, "get_provider_functions", lambda: {"probe_test": unsuccessful})
+        async def no_evidence(claim):
+            return {}
+        monkeypatch.setattr(engine, "_gather_evidence", no_evidence)
+        await engine._run_verification("The sky is green.")
+
+    try:
+        asyncio.run(scenario())
+        cb = health.get("probe_test")
+        assert cb.state == CircuitState.OPEN and cb.half_open_admitted == 0
+    finally:
+        health.get("probe_test").reset()
+
+
+def test_v10_half_open_probe_is_freed_by_no_result_and_reopened_by_a_failed_one():
+    import api_server_v10 as v10
+    breakers = v10.circuit_breaker
+    cb = _open_then_expire(breakers, "probe_test")
+
+    async def answer(result):
+        return result
+
+    async def call(result):
+        return await v10.AIProviders()._call_provider_with_timeout("probe_test", answer(result))
+
+    try:
+        assert asyncio.run(call(None)) is None  # provider not configured
+        assert cb.state == CircuitState.HALF_OPEN and cb.half_open_admitted == 0
+        assert asyncio.run(call({"success": False, "status_code": 0})) is None
+        assert cb.state == CircuitState.OPEN
+    finally:
+        cb.reset()
+
+
+def test_v10_probe_stuck_in_the_scheduler_queue_times_out(monkeypatch):
+    import api_server_v10 as v10
+    from provider_scheduler import ProviderScheduler
+    breakers = v10.circuit_breaker
+    cb = _open_then_expire(breakers, "queue_test")
+    monkeypatch.setattr(v10, "call_scheduler", ProviderScheduler(default_concurrency=1))
+    monkeypatch.setattr(breakers, "get_timeout", lambda provider: 0.05)
+    started = []
+
+    async def answer():
+        started.append(True)
+        return {"success": True}
+
+    async def run():
+        await v10.call_scheduler.acquire("queue_test")  # another caller holds the only slot
+        try:
+            call = v10.AIProviders()._call_provider_with_timeout("queue_test", answer())
+            return await asyncio.wait_for(call, timeout=2)
+        finally:
+            v10.call_scheduler.release("queue_test")
+
+    try:
+        assert asyncio.run(run()) is None and not started
+        assert cb.state == CircuitState.OPEN  # the probe's slot was given back as a timeout
+    finally:
+        cb.reset()
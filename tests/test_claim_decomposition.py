@@ -0,0 +1,118 @@
+import asyncio
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import claim_decomposition as cd
+
+ARTICLE = ("The Eiffel Tower was completed in 1889 for the World's Fair. It is 330 metres tall. "
+           "Dr. Smith of the U.S. Census Bureau said the city has 2.1 million residents; the metro area has 12 million. "
+           "Isn't that amazing? I think Paris is lovely. "
+           "Paris is the capital of France.")
+
+
+def test_decompose_splits_sentences_and_clauses_and_skips_non_claims():
+    assert cd.decompose(ARTICLE) == [
+        "The Eiffel Tower was completed in 1889 for the World's Fair; It is 330 metres tall.",
+        "Dr. Smith of the U.S. Census Bureau said the city has 2.1 million residents",
+        "the metro area has 12 million.",
+        "Paris is the capital of France.",
+    ]
+    assert cd.decompose("Vaccines cause autism") == ["Vaccines cause autism"]
+    assert len(cd.decompose(" ".join(f"Claim number {i} is a fact." for i in range(30)))) == cd.MAX_SUBCLAIMS
+
+
+def test_aggregate_verdicts():
+    assert cd.aggregate([{"verdict": "true", "confidence": 0.9}] * 3) == {"verdict": "true", "confidence": 0.9}
+    one_false = [{"verdict": "true", "confidence": 0.9}] * 5 + [{"verdict": "false", "confidence": 0.2}]
+    assert cd.aggregate(one_false)["verdict"] == "mostly_true"
+    assert cd.aggregate([{"verdict": "true", "confidence": 0.8}, {"verdict": "false", "confidence": 0.8}])["verdict"] == "mixed"
+    partly = cd.aggregate([{"verdict": "false", "confidence": 0.8}, {"verdict": "unverifiable", "confidence": 0.5}])
+    assert partly == {"verdict": "false", "confidence": 0.4}
+    assert cd.aggregate([{"verdict": "unverifiable", "confidence": 0.5}])["verdict"] == "unverifiable"
+
+
+class _Cache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, claim, tier):
+        return self.entries.get((claim.lower().strip(), tier))
+
+    def set(self, claim, tier, result):
+        self.entries[(claim.lower().strip(), tier)] = result
+
+
+class _Session:
+    def __init__(self):
+        self.calls = []
+        self.active = self.peak = 0
+
+    async def verify_claim(self, claim, tier="free"):
+        self.calls.append(claim)
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+        verdict = "false" if "flat" in claim else "true"
+        return {"verdict": verdict, "confidence": 0.9, "explanation": f"checked: {claim}",
+                "sources": [{"url": "https://nasa.gov", "credibility": 0.95}], "providers_used": ["groq"]}
+
+
+def test_edited_text_only_verifies_changed_subclaims():
+    cache, session = _Cache(), _Session()
+    first = cd.decompose("The Moon orbits the Earth. Water boils at 100 C at sea level. "
+                         "Mount Everest is the tallest mountain. Water boils at 100 C at sea level.")
+    entries = asyncio.run(cd.verify_subclaims(session, first, "free", cache=cache, concurrency=2))
+    assert len(session.calls) == 3 and session.peak == 2  # the repeated sentence is verified once
+
+    edited = cd.decompose("The Moon orbits the Earth. The Earth is flat. Mount Everest is the tallest mountain.")
+    entries = asyncio.run(cd.verify_subclaims(session, edited, "free", cache=cache))
+    assert session.calls[3:] == ["The Earth is flat."]
+    assert [e["cached"] for e in entries] == [True, False, True]
+
+    summary = cd.summarize(entries)
+    assert summary["verdict"] == "mostly_true"
+    assert [s["verdict"] for s in summary["subclaims"]] == ["true", "false", "true"]
+    assert summary["subclaims_cached"] == 2
+    assert "Inaccurate: The Earth is flat." in summary["explanation"]
+    assert summary["sources"] == [{"url": "https://nasa.gov", "credibility": 0.95}]
+    assert summary["providers_used"] == ["groq"]
+
+
+class _FailingSession(_Session):
+    async def verify_claim(self, claim, tier="free"):
+        if "Everest" in claim:
+            raise RuntimeError("all providers failed")
+        return await super().verify_claim(claim, tier)
+
+
+def test_a_failing_subclaim_does_not_sink_the_others():
+    cache, session = _Cache(), _FailingSession()
+    claims = cd.decompose("The Moon orbits the Earth. Mount Everest is the tallest mountain. The Earth is flat.")
+    entries = asyncio.run(cd.verify_subclaims(session, claims, "free", cache=cache))
+    assert [e["result"]["verdict"] for e in entries] == ["true", "error", "false"]
+    assert entries[1]["result"]["explanation"] == "all providers failed"
+    assert len(cache.entries) == 2  # the error is not cached
+    assert cd.summarize(entries)["verdict"] == "mixed"
+
+
+def test_v10_verify_decomposes_on_request(monkeypatch):
+    import api_server_v10 as v10
+    session = _Session()
+    monkeypatch.setattr(v10.AIProviders, "verify_claim", lambda self, claim, tier="free": session.verify_claim(claim, tier))
+    text = "Decomposition check: the Sahara is a desert. Decomposition check: the Earth is flat."
+
+    first = asyncio.run(v10._verify_claim(v10.ClaimRequest(claim=text, decompose=True)))
+    again = asyncio.run(v10._verify_claim(v10.ClaimRequest(claim=text, decompose=True)))
+    assert [s["verdict"] for s in first["subclaims"]] == ["true", "false"]
+    assert first["verdict"] == "mixed" and not first["cached"]
+    assert again["cached"] and len(session.calls) == 2
+    assert v10.claim_cache.get("Decomposition check: the Earth is flat.", "free")["verdict"] == "false"
+
+    monkeypatch.setattr(v10.Config, "MAX_SUBCLAIMS", 2)
+    longer = text + " Decomposition check: the Moon orbits the Earth."
+    capped = asyncio.run(v10._verify_claim(v10.ClaimRequest(claim=longer, decompose=True)))
+    assert len(capped["subclaims"]) == 2 and len(session.calls) == 2
+    assert capped["subclaims_total"] == 3 and capped["subclaims_truncated"]
+    assert "Only the first 2 of 3 sub-claims were checked." in capped["explanation"]
+    assert not first["subclaims_truncated"]
@@ -0,0 +1,31 @@
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+from claim_dedup import canonical_claim, claim_similarity, group_claims, near_duplicate
+
+
+def test_paraphrases_group_but_numbers_and_negation_do_not():
+    assert canonical_claim("  Earth’s   FLAT!! ") == "earth's flat"
+    claims = [
+        "Vaccines cause autism.",
+        "vaccines cause autism",
+        "Vaccines do not cause autism",
+        "Sea level rose 3mm in 2020",
+        "Sea level rose 30mm in 2020",
+        "Sea levels rose 3mm in 2020!",
+    ]
+    groups = {g["representative"]: g["members"] for g in group_claims(claims)}
+    assert groups == {0: [0, 1], 2: [2], 3: [3, 5], 4: [4]}
+
+
+def test_role_reversals_and_swapped_predicates_stay_apart():
+    reversal = ["Biden defeated Trump in the 2020 election", "Trump defeated Biden in the 2020 election"]
+    predicate = ["The FDA approved the new Alzheimer drug lecanemab for elderly patients in 2023",
+                 "The FDA rejected the new Alzheimer drug lecanemab for elderly patients in 2023"]
+    # Bags of words cannot tell these apart
+    assert claim_similarity(*reversal) == 1.0 and claim_similarity(*predicate) >= 0.8
+    assert not near_duplicate(*reversal) and not near_duplicate(*predicate)
+    claims = reversal + predicate + ["biden DEFEATED trump in the 2020 election!"]
+    groups = {g["representative"]: g["members"] for g in group_claims(claims)}
+    assert groups == {0: [0, 4], 1: [1], 2: [2], 3: [3]}
+    assert near_duplicate("The Earth is flat", "Earth's flat, the")
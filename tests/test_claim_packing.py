@@ -0,0 +1,51 @@
+import asyncio
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import api_server_v9 as server
+from claim_packing import plan_packs, build_packed_prompt, parse_packed_response, max_items
+
+
+def test_pack_size_follows_provider_budgets():
+    claims = [f"claim number {i}" for i in range(30)]
+    groups = plan_packs("groq", claims)
+    assert [len(g) for g in groups] == [12, 12, 6]
+    assert sum(groups, []) == list(range(30))
+    assert max_items("jina") == 1
+    # A small context window splits long claims earlier than the output budget would
+    long_claims = ["x" * 8000] * 4
+    assert all(len(g) == 1 for g in plan_packs("huggingface", long_claims))
+
+
+def test_parser_keeps_only_well_formed_items():
+    text = "\n".join([
+        "1 | true | 0.9 | Water boils at 100C at sea level.",
+        "2. | Mostly False | 70% | Only in some regions.",
+        "3 | banana | 0.5 | not a verdict",
+        "4 | false | 0.8 | first answer",
+        "4 | true | 0.8 | contradictory repeat",
+        "9 | true | 0.9 | out of range",
+    ])
+    parsed = parse_packed_response(text, 5)
+    assert set(parsed) == {0, 1}
+    assert parsed[1] == {"verdict": "mostly_false", "confidence": 0.7, "explanation": "Only in some regions."}
+    assert "3. claim c" in build_packed_prompt(["claim a", "claim b", "claim c"])
+
+
+def test_unparsed_items_fall_back_to_single_claim_calls():
+    calls = []
+
+    async def fake_provider(text, packed=False):
+        calls.append(text)
+        assert packed == text.startswith("Fact-check each")
+        if packed:
+            return {"provider": "pack_test", "model": "m", "success": True,
+                    "response": "1 | true | 0.9 | fine\n2 | ???"}
+        return {"provider": "pack_test", "model": "m", "success": True, "response": "This is false."}
+
+    session = server.AIProviders()
+    answers = asyncio.run(session._call_packed("pack_test", fake_provider, ["claim a", "claim b"], [5, 6]))
+    by_index = dict(answers)
+    assert len(calls) == 2 and calls[1] == "claim b"
+    assert by_index[5]["verdict"] == "true" and by_index[5]["confidence"] == 0.9 and by_index[5]["packed"]
+    assert by_index[6]["response"] == "This is false."
@@ -0,0 +1,68 @@
+import gzip
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import domain_reputation as dr
+
+
+def test_trie_matches_labels_not_substrings():
+    index = dr.DomainReputationIndex()
+    index.add("nih.gov", 0.97, "tier1")
+    index.add("pubmed.ncbi.nlm.nih.gov", 0.96)
+    index.add("x.com", None, "tier4")
+
+    assert index.lookup("https://www.pubmed.ncbi.nlm.nih.gov/123") == dr.Rating("pubmed.ncbi.nlm.nih.gov", 0.96, "tier1", None)
+    assert index.lookup("HTTP://Sub.NIH.gov:8080/x").domain == "nih.gov"
+    assert index.lookup("https://netflix.com") is None             # "x.com" in "netflix.com"
+    assert index.lookup("https://nih.gov.evil.example") is None
+    assert index.credibility("https://x.com/post") == 0.5          # tier only
+    assert index.lookup("x.com").authority_score == dr.AUTHORITY_TIERS["tier4"][0]
+
+    # a leaf that gains a rated subdomain keeps its own rating
+    index.add("status.x.com", 0.7)
+    assert index.lookup("x.com") == dr.Rating("x.com", None, "tier4", None)
+    assert index.lookup("a.status.x.com") == dr.Rating("status.x.com", 0.7, "tier4", None)
+    assert index.size == 4
+    assert index.lookup_many(["https://nih.gov/a", "", "nih.gov"]) == [index.lookup("nih.gov"), None, index.lookup("nih.gov")]
+
+
+def test_files_layer_field_by_field(tmp_path):
+    base = tmp_path / "base.tsv"
+    base.write_text("# comment\nexample.org\t0.4\ttier3\t-\nbad.example\tnot-a-score\n")
+    extra = tmp_path / "extra.tsv.gz"
+    with gzip.open(extra, "wt") as f:
+        f.write("example.org\t-\t-\tsatire\nnews.example.org 0.9\n")
+    index = dr.DomainReputationIndex()
+    assert index.load_file(str(base)) == 1
+    assert index.load_file(str(extra)) == 2
+    assert index.lookup("example.org") == dr.Rating("example.org", 0.4, "tier3", "satire")
+    assert index.lookup("a.news.example.org") == dr.Rating("news.example.org", 0.9, "tier3", "satire")
+
+
+def test_public_suffixes_and_names():
+    psl = dr.PublicSuffixList(["com", "uk", "co.uk", "*.ck", "!www.ck", "blogspot.com"])
+    assert psl.registrable_domain("news.bbc.co.uk") == "bbc.co.uk"
+    assert psl.registrable_domain("a.b.foo.ck") == "b.foo.ck"
+    assert psl.registrable_domain("www.ck") == "www.ck"
+    assert psl.registrable_domain("me.blogspot.com") == "me.blogspot.com"
+    assert psl.registrable_domain("localhost") == "localhost"
+
+    index = dr.default_index()
+    assert index.by_name("reuters").domain == "reuters.com"
+    assert index.by_name("nih").domain == "nih.gov"
+    assert index.by_name("pubmed") is None  # pubmed.ncbi.nlm.nih.gov is a subdomain, not a site name
+    found = {name: rating.domain for name, rating in
+             index.find_in_text("Reported by Reuters, see https://www.nature.com/x and who.int; no time to check")}
+    assert found == {"nature.com": "nature.com", "who.int": "who.int", "reuters": "reuters.com"}
+
+
+def test_servers_use_the_index():
+    import api_server_v10 as v10
+    assert v10.SourceAuthorityScorer.score_source("https://netflix.com/title")["authority_tier"] == "unknown"
+    assert v10.SourceAuthorityScorer.score_source("https://notnature.com")["authority_tier"] == "unknown"
+    fox = v10.SourceAuthorityScorer.score_source("https://www.foxnews.com/politics")
+    assert (fox["authority_tier"], fox["detected_bias"], fox["domain"]) == ("tier3", "right_leaning", "foxnews.com")
+    scored = v10.SourceAuthorityScorer.score_sources([{"url": "https://nature.com/a"}, {"url": "https://medium.com/b"}])
+    assert scored["primary_sources"] == 1 and scored["total_sources"] == 2
+    assert v10.rate_sources([{"link": "https://apnews.com/x", "title": "AP"}], url_key="link") == \
+        [{"url": "https://apnews.com/x", "title": "AP", "credibility": 0.98}]
@@ -0,0 +1,118 @@
+import asyncio
+import json
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import evidence_packing as ep
+
+CLAIM = "The Great Wall of China is visible from the Moon with the naked eye"
+NASA = ("The Great Wall of China is not visible from the Moon with the naked eye, according to NASA astronauts. "
+        "It is far too narrow to be seen from that distance.")
+BLOG = ("The Great Wall of China is not visible from the Moon with the naked eye, according to NASA astronauts! "
+        "Chinese tourism sites still repeat the myth about the wall.")
+
+
+def _search(provider, text, credibility):
+    return {"provider": provider, "success": True, "response": text,
+            "sources": [{"url": f"https://{provider}.example/a", "credibility": credibility}]}
+
+
+def test_duplicates_dropped_and_ranked_by_relevance_and_credibility():
+    collector = ep.EvidenceCollector(CLAIM)
+    collector.add_search_result(_search("tavily", NASA, 0.95))
+    collector.add_search_result(_search("brave", BLOG, 0.5))
+    collector.add_search_result(_search("serper", NASA.upper(), 0.6))
+    collector.add_search_result({"provider": "google_factcheck", "success": True,
+                                 "response": "No existing fact-checks found", "sources": []})
+    packed = collector.pack()
+
+    texts = [p.text for p in packed.passages]
+    assert texts == [
+        "The Great Wall of China is not visible from the Moon with the naked eye, according to NASA astronauts.",
+        "It is far too narrow to be seen from that distance.",
+        "Chinese tourism sites still repeat the myth about the wall.",
+    ]
+    assert [p.label for p in packed.passages] == ["tavily evidence"] * 2 + ["brave evidence"]
+    assert [p.rank for p in packed.passages] == [1, 2, 3]
+
+
+def test_contexts_fit_budgets_and_keep_evidence_numbers():
+    page = "\n\n".join(
+        f"Paragraph {i}: observers in orbit reported on the wall of China and other structures seen from space. "
+        + " ".join(f"visitor{i}x{j}" for j in range(50)) + "."
+        for i in range(12))
+    collector = ep.EvidenceCollector(CLAIM)
+    collector.add_text("Content from https://example.org/wall", page, 0.7)
+    collector.add_document("Research Paper", "Title: Visibility of the Great Wall from the Moon. Abstract: "
+                           "The naked eye cannot resolve the wall from lunar distance.", 0.9)
+    collector.add_search_result(_search("tavily", NASA, 0.95))
+    packed = collector.pack()
+    assert all(len(p.text) <= ep.PASSAGE_MAX_CHARS for p in packed.passages)
+
+    small, large = packed.context(200), packed.context(1500)
+    assert ep.estimate_tokens(small) <= 200 + 40  # rank labels are not budgeted
+    assert len(small) < len(large) < len(page)
+    assert small.startswith("\n\n[1] [tavily evidence]: The Great Wall of China is not visible")
+    assert "\n\n[2] [Research Paper]: Title: Visibility of the Great Wall" in small
+    # a passage has the same number in every context it appears in
+    for line in small.strip().split("\n\n"):
+        assert line.rstrip(".") in large or line.endswith("...")
+    assert packed.context(200) is small  # packed once per budget
+
+    before = ep.EVIDENCE_TOKENS.count(stage="sent")
+    assert packed.context_for("cloudflare") == packed.context(ep.CONTEXT_BUDGETS["cloudflare"])
+    assert ep.EVIDENCE_TOKENS.count(stage="sent") == before + 1
+
+
+def test_late_evidence_gets_a_share_of_a_full_budget():
+    page = "\n\n".join(
+        f"Paragraph {i}: observers in orbit reported on the wall of China and other structures seen from space. "
+        + " ".join(f"visitor{i}x{j}" for j in range(50)) + "."
+        for i in range(12))
+    collector = ep.EvidenceCollector(CLAIM)
+    collector.add_text("Content from https://example.org/wall", page, 0.7)
+    first = collector.pack()
+    assert ep.estimate_tokens(first.context(500)) >= 500  # pass-1 evidence alone fills the budget
+
+    collector.add_document("arXiv Paper", "Title: Lunar visibility of the Great Wall. Abstract: "
+                           "Not visible with the naked eye.", 0.9)
+    second = collector.pack(after=first)
+    late = second.passages[-1]
+    assert [p.rank for p in second.passages[:len(first)]] == [p.rank for p in first.passages]
+    assert late.label == "arXiv Paper" and late.rank == len(first) + 1
+    context = second.context(500)
+    assert context.endswith(late.render())
+    assert context.startswith(first.context(500)[:200])  # pass-1 numbering and order unchanged
+    assert ep.estimate_tokens(context) <= 500 + 40
+
+
+def test_v10_sends_packed_evidence_to_both_passes(monkeypatch):
+    import api_server_v10 as v10
+    engine = v10.AIProviders()
+    sent = []
+
+    async def tavily(claim):
+        return _search("tavily", NASA, 0.95)
+
+    async def brave(claim):
+        return _search("brave", BLOG, 0.5)
+
+    def provider(name):
+        async def verify(claim, context):
+            sent.append((name, context))
+            reply = {"verdict": "false", "confidence": 0.9, "rationale": "Astronauts say no.", "evidence": [1]}
+            return {"provider": name, "model": "m", "success": True, "response": json.dumps(reply)}
+        return verify
+
+    monkeypatch.setattr(v10, "get_available_search_apis", lambda: ["tavily", "brave"])
+    monkeypatch.setattr(engine, "search_with_tavily", tavily)
+    monkeypatch.setattr(engine, "search_with_brave", brave)
+    monkeypatch.setattr(engine, "get_provider_functions", lambda: {p: provider(p) for p in ("groq", "openai")})
+    monkeypatch.setattr(engine, "available_providers", ["groq", "openai"])
+
+    result = asyncio.run(engine._run_verification(CLAIM))
+    assert result["verdict"] == "false"
+    assert [name for name, _ in sent] == ["groq", "openai", "groq", "openai"]
+    first_pass = sent[0][1]
+    assert first_pass.count("according to NASA astronauts") == 1
+    assert sent[2][1].startswith("IMPORTANT: Consider nuance carefully.") and sent[2][1].endswith(first_pass)
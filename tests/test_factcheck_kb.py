@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import factcheck_kb as fkb
+
+run = asyncio.run
+
+REVIEW = {"text": "The Great Wall of China is visible from space with the naked eye",
+          "claimReview": [{"publisher": {"name": "Snopes"}, "url": "https://snopes.com/gw", "textualRating": "False."}]}
+
+
+def test_lookup_matches_paraphrases_but_not_changed_numbers_or_negation():
+    kb = fkb.FactCheckKB()
+    assert run(kb.add_claim_review(REVIEW))
+    assert run(kb.add_verification("Water boils at 100 degrees Celsius at sea level",
+                                   {"verdict": "true", "confidence": 0.95, "explanation": "Standard pressure."}))
+    assert not run(kb.add_verification("Bananas are berries", {"verdict": "true", "confidence": 0.6}))
+    assert not run(kb.add_verification("Aliens built it", {"verdict": "unverifiable", "confidence": 0.95}))
+
+    hit = run(kb.lookup("the great wall of china is visible from space with the naked eye!"))
+    assert hit["answer"] and hit["verdict"] == "false" and hit["origin"] == "claimreview"
+    assert (hit["publisher"], hit["url"], hit["rating"]) == ("Snopes", "https://snopes.com/gw", "False.")
+
+    hint = run(kb.lookup("Great Wall of China visible from space"))
+    assert hint is not None and not hint["answer"] and hint["similarity"] >= fkb.HINT_SIMILARITY
+
+    assert run(kb.lookup("Water boils at 90 degrees Celsius at sea level")) is None
+    assert run(kb.lookup("Water does not boil at 100 degrees Celsius at sea level")) is None
+    assert run(kb.lookup("Stock prices rose yesterday")) is None
+    assert run(kb.lookup("the of and")) is None
+
+    # a fact-check is not overwritten by our own result
+    assert not run(kb.add_verification(REVIEW["text"], {"verdict": "true", "confidence": 0.99}))
+    assert fkb.rating_verdict("Half True") == "mixed" and fkb.rating_verdict("Needs context") is None
+
+
+def test_lookups_run_off_the_event_loop_thread(monkeypatch):
+    kb = fkb.FactCheckKB()
+    threads = []
+    lookup = kb._lookup
+
+    def recording(claim):
+        threads.append(threading.current_thread())
+        return lookup(claim)
+
+    monkeypatch.setattr(kb, "_lookup", recording)
+    run(kb.add_claim_review(REVIEW))
+    assert run(kb.lookup(REVIEW["text"]))["answer"]
+    kb.close()
+    assert threads and threads[0] is not threading.main_thread()
+
+
+def test_role_reversal_is_only_a_hint():
+    kb = fkb.FactCheckKB()
+    assert run(kb.add_verification("Biden defeated Trump in the 2020 presidential election",
+                                   {"verdict": "true", "confidence": 0.97, "explanation": "Certified results."}))
+    reversed_roles = run(kb.lookup("Trump defeated Biden in the 2020 presidential election"))
+    assert reversed_roles is not None and reversed_roles["similarity"] == 1.0 and not reversed_roles["answer"]
+    assert run(kb.lookup("biden defeated TRUMP in the 2020 presidential election."))["answer"]
+
+
+def test_rebuild_from_dump_swaps_the_file(tmp_path):
+    dump = tmp_path / "dump.jsonl"
+    dump.write_text("\n".join([
+        json.dumps(REVIEW),
+        json.dumps({"claim": "The Moon orbits the Earth", "verdict": "true", "confidence": 0.97}),
+        json.dumps({"claim": "Low confidence", "verdict": "false", "confidence": 0.3}),
+        "not json",
+    ]) + "\n")
+    db = str(tmp_path / "kb.db")
+    kb = fkb.FactCheckKB(db)
+    kb.add("Something stale was said", "false", 0.99)
+    assert kb.rebuild(fkb.read_dump(str(dump))) == 2
+    assert len(kb) == 2 and run(kb.lookup("Something stale was said")) is None
+    assert run(fkb.FactCheckKB(db).lookup("The Moon orbits the Earth"))["answer"]
+    assert not os.path.exists(db + ".building")
+
+
+def test_v10_answers_known_claims_without_providers(monkeypatch):
+    import api_server_v10 as v10
+    engine = v10.AIProviders()
+    runs = []
+
+    async def run(claim, tier="free", max_loops=None):
+        runs.append(max_loops)
+        return {"verdict": "false", "confidence": 0.92, "explanation": "Checked.", "providers_used": ["groq"]}
+
+    monkeypatch.setattr(engine, "_run_verification", run)
+    asyncio.run(v10.factcheck_kb.add_claim_review(REVIEW))
+
+    known = asyncio.run(engine.verify_claim("The Great Wall of China is visible from space with the naked eye"))
+    assert runs == [] and known["verdict"] == "false" and known["providers_used"] == []
+    assert known["knowledge_base"]["origin"] == "claimreview" and known["sources"][0]["url"] == "https://snopes.com/gw"
+
+    asyncio.run(engine.verify_claim("Great Wall of China visible from space"))
+    assert runs == [v10.KB_HINT_LOOPS]
+
+    asyncio.run(engine.verify_claim("Lightning never strikes the same place twice"))
+    again = asyncio.run(engine.verify_claim("Lightning never strikes the same place twice."))
+    assert runs == [v10.KB_HINT_LOOPS, None] and again["knowledge_base"]["origin"] == "verity"
@@ -0,0 +1,94 @@
+import asyncio
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import httpx
+import html_extract as he
+
+PAGE = ("<html><head><title>Moon facts</title><style>p { color: red }</style></head><body>"
+        "<nav>Home | About</nav><article><h1>The Moon</h1>"
+        "<p>The Moon orbits the Earth &amp; is its only natural satellite.</p>"
+        "<script>var x = '<p>not text</p>';</script><p>It is about 384,400 km away.</p></article>"
+        "<footer>Copyright</footer></body></html>")
+
+
+def _client(handler):
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _fetch(handler, url="https://93.184.216.34/page", **kwargs):
+    async def run():
+        async with _client(handler) as client:
+            return await he.fetch_text(client, url, **kwargs)
+    return asyncio.run(run())
+
+
+def test_parser_keeps_paragraphs_and_drops_furniture_across_chunk_boundaries():
+    parser = he.TextExtractor()
+    for i in range(0, len(PAGE), 7):
+        parser.feed(PAGE[i:i + 7])
+    parser.close()
+    assert parser.title == "Moon facts"
+    assert parser.text() == ("The Moon\n\nThe Moon orbits the Earth & is its only natural satellite.\n\n"
+                             "It is about 384,400 km away.")
+
+
+def test_stream_stops_at_text_limit_and_byte_cap():
+    sent = []
+
+    async def body():
+        yield b"<html><body>"
+        for i in range(10000):
+            sent.append(i)
+            yield f"<p>Paragraph {i} of a very long page about nothing much.</p>".encode()
+
+    def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=body())
+
+    page = _fetch(handler, max_chars=500)
+    assert page["success"] and page["truncated"] and len(page["content"]) <= 500
+    assert page["content"].startswith("Paragraph 0 of") and len(sent) < 1000
+
+    sent.clear()
+    page = _fetch(handler, max_chars=10 ** 9, max_bytes=20000)
+    assert page["bytes_read"] == 20000 and page["truncated"] and len(sent) < 1000
+
+    # Markup kept for article extraction: read past max_chars, but only to the page-text budget
+    sent.clear()
+    page = _fetch(handler, max_chars=500, keep_html=True, max_bytes=10 ** 7)
+    assert page["truncated"] and len(page["content"]) <= 500 and "Paragraph 200 " in page["html"]
+    assert he.MAX_HTML_TEXT_CHARS / 60 < len(sent) < 2 * he.MAX_HTML_TEXT_CHARS / 50
+
+
+def test_binaries_and_encodings():
+    png = httpx.Response(200, headers={"content-type": "image/png"}, content=b"\x89PNG" + b"\x00" * 100)
+    assert _fetch(lambda r: png)["error"] == "unsupported content type image/png"
+    pdf = httpx.Response(200, content=b"%PDF-1.7\n...")
+    assert _fetch(lambda r: pdf)["error"] == "binary content"
+    assert _fetch(lambda r: httpx.Response(404))["status_code"] == 404
+
+    latin = "<meta charset='iso-8859-1'><p>Café au lait</p>".encode("latin-1")
+    assert _fetch(lambda r: httpx.Response(200, content=latin))["content"] == "Café au lait"
+    markdown = httpx.Response(200, headers={"content-type": "text/plain"}, content=b"# Title\n\n<b>raw</b> " * 50)
+    page = _fetch(lambda r: markdown, max_chars=30)
+    assert page["content"] == "# Title\n\n<b>raw</b> # Title\n\n<b"[:30]
+
+
+def test_redirects_are_checked_at_every_hop():
+    fetched = []
+
+    def handler(request):
+        fetched.append((str(request.url), request.headers.get("authorization")))
+        if request.url.path == "/internal":
+            return httpx.Response(302, headers={"location": "http://169.254.169.254/latest/meta-data/"})
+        if request.url.path == "/moved":
+            return httpx.Response(301, headers={"location": "https://93.184.216.35/page"})
+        return httpx.Response(200, headers={"content-type": "text/plain"}, content=b"Public page")
+
+    refused = _fetch(handler, url="https://93.184.216.34/internal")
+    assert not refused["success"] and "not a public address" in refused["error"]
+    assert not _fetch(handler, url="http://127.0.0.1:8000/admin")["success"]
+    moved = _fetch(handler, url="https://93.184.216.34/moved", headers={"Authorization": "Bearer key"})
+    assert moved["success"] and moved["content"] == "Public page"
+    assert fetched == [("https://93.184.216.34/internal", None), ("https://93.184.216.34/moved", "Bearer key"),
+                       ("https://93.184.216.35/page", None)]  # never the internal hop, no key to another host
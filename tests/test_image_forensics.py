@@ -0,0 +1,159 @@
+import base64
+import io
+import random
+import struct
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+import image_forensics as imf
+
+
+def picture(seed, size=192):
+    """A grayscale scene: gradient background with a few bright and dark squares."""
+    rng = random.Random(seed)
+    pixels = [[(x + y) * 255 // (2 * size) for x in range(size)] for y in range(size)]
+    side = size // 4
+    for _ in range(4):
+        x0, y0, level = rng.randrange(size - side), rng.randrange(size - side), rng.choice((10, 245))
+        for y in range(y0, y0 + side):
+            pixels[y][x0:x0 + side] = [level] * side
+    return pixels
+
+
+def grayscale(pixels):
+    image = Image.new("L", (len(pixels[0]), len(pixels)))
+    image.putdata([p for row in pixels for p in row])
+    return image
+
+
+def make_png(pixels, text=None):
+    """RGB PNG with optional tEXt chunks."""
+    info = PngInfo()
+    for key, value in (text or {}).items():
+        info.add_text(key, value)
+    out = io.BytesIO()
+    grayscale(pixels).convert("RGB").save(out, "PNG", pnginfo=info)
+    return out.getvalue()
+
+
+def make_exif(software, modified, captured):
+    """Little-endian TIFF: IFD0 (Software, DateTime, ExifIFD pointer) -> Exif IFD (DateTimeOriginal)."""
+    strings = software.encode() + b"\x00", modified.encode() + b"\x00", captured.encode() + b"\x00"
+    ifd0_size, exif_size = 2 + 3 * 12 + 4, 2 + 12 + 4
+    data_at = 8 + ifd0_size + exif_size
+    offsets = [data_at, data_at + len(strings[0]), data_at + len(strings[0]) + len(strings[1])]
+    ifd0 = struct.pack("<H", 3) + struct.pack("<HHII", 0x0131, 2, len(strings[0]), offsets[0]) \
+        + struct.pack("<HHII", 0x0132, 2, len(strings[1]), offsets[1]) \
+        + struct.pack("<HHII", 0x8769, 4, 1, 8 + ifd0_size) + b"\x00" * 4
+    exif = struct.pack("<H", 1) + struct.pack("<HHII", 0x9003, 2, len(strings[2]), offsets[2]) + b"\x00" * 4
+    return b"II*\x00" + struct.pack("<I", 8) + ifd0 + exif + b"".join(strings)
+
+
+def make_jpeg(pixels, exif=None):
+    """Grayscale JPEG with an optional EXIF (TIFF) block."""
+    out = io.BytesIO()
+    grayscale(pixels).save(out, "JPEG", quality=90, exif=b"Exif\x00\x00" + exif if exif else b"")
+    return out.getvalue()
+
+
+def test_png_and_jpeg_copies_hash_alike_and_metadata_is_assessed():
+    scene, other = picture(1), picture(2)
+    png = imf.analyze_image(make_png(scene, text={"parameters": "a city at night, Steps: 30"}))
+    jpeg = imf.analyze_image(make_jpeg(scene, exif=make_exif("Adobe Photoshop 25.0", "2026:05:01 10:00:00",
+                                                             "2024:01:01 09:00:00")))
+    different = imf.analyze_image(make_png(other))
+    assert (png["width"], png["height"], png["engine"]) == (192, 192, "pillow") and jpeg["width"] == 192
+    assert imf.hamming(png["phash"], jpeg["phash"]) <= imf.NEAR_DUPLICATE_DISTANCE
+    assert imf.hamming(png["phash"], different["phash"]) > imf.NEAR_DUPLICATE_DISTANCE
+
+    kinds = lambda report: {f["type"] for f in imf.assess(report)[0]}
+    assert "ai_generated_marker" in kinds(png)
+    assert {"editing_software", "modified_after_capture"} <= kinds(jpeg)
+    assert jpeg["metadata"]["exif"]["software"] == "Adobe Photoshop 25.0"
+    assert "metadata_stripped" in kinds(different) and imf.assess(different)[1] == 75
+
+
+def test_bk_tree_matches_a_linear_scan():
+    rng = random.Random(7)
+    hashes = [rng.getrandbits(64) for _ in range(500)]
+    hashes += [h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for h in hashes[:50]]
+    tree = imf.BKTree()
+    for i, value in enumerate(hashes):
+        tree.add(value, str(i))
+    for probe in hashes[:60]:
+        expected = sorted((imf.hamming(probe, h), str(i)) for i, h in enumerate(hashes) if imf.hamming(probe, h) <= 8)
+        assert tree.search(probe, 8) == expected
+
+
+def test_v9_endpoint_answers_repeats_from_the_index(monkeypatch):
+    from fastapi.testclient import TestClient
+    import api_server_v9 as server
+    scene = picture(3)
+    generated = make_png(scene, text={"parameters": "portrait, Steps: 20"})
+    reshared = make_jpeg(scene)  # re-encoded copy, generator metadata gone
+
+    engine = imf.ImageForensics(workers=1, index=imf.ImageIndex(max_entries=10))
+    monkeypatch.setattr(server, "image_forensics", engine)
+    client = TestClient(server.app)
+    try:
+        first = client.post("/tools/image-forensics", content=generated, headers={"content-type": "image/png"}).json()
+        exact = client.post("/tools/image-forensics",
+                            json={"content": "data:image/png;base64," + base64.b64encode(generated).decode()}).json()
+        near = client.post("/tools/image-forensics", content=reshared, headers={"content-type": "image/jpeg"}).json()
+        bad = client.post("/tools/image-forensics", content=b"GIF8 nope", headers={"content-type": "image/gif"})
+        text = client.post("/tools/image-forensics", json={"content": "is this photo a deepfake?"}).json()
+        not_object = client.post("/tools/image-forensics", json=["not", "an", "object"])
+        internal = client.post("/tools/image-forensics", json={"content": "http://169.254.169.254/latest/x.png"})
+    finally:
+        engine.shutdown()
+    assert first["verdict"] == "likely_manipulated" and first["repeat"] is None
+    assert exact["repeat"]["match"] == "exact" and exact["findings"] == first["findings"]
+    assert near["repeat"]["match"] == "near" and near["repeat"]["previous_sha256"] == first["sha256"]
+    assert near["score"] == first["score"] and "matches_flagged_image" in {f["type"] for f in near["findings"]}
+    assert bad.status_code == 200 and bad.json()["findings"][-1]["type"] == "not_decoded"
+    assert text["verdict"] == "no_image"
+    assert not_object.status_code == 422
+    assert internal.status_code == 422 and "not a public address" in internal.json()["detail"]
+
+
+def test_fetch_image_refuses_internal_addresses_and_redirects():
+    import asyncio
+    import httpx
+    png = make_png(picture(5))
+    fetched = []
+
+    def handler(request):
+        fetched.append(str(request.url))
+        if request.url.path == "/moved.png":
+            return httpx.Response(302, headers={"location": "http://127.0.0.1:8080/admin.png"})
+        return httpx.Response(200, content=png)
+
+    async def fetch(url):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            try:
+                return await imf.fetch_image(client, url)
+            except imf.ImageError as e:
+                return str(e)
+
+    results = [asyncio.run(fetch(url)) for url in (
+        "http://93.184.216.34/photo.png", "http://93.184.216.34/moved.png", "http://localhost/x.png",
+        "http://[::ffff:10.0.0.1]/x.png", "file:///etc/passwd")]
+    assert results[0] == png
+    assert all(isinstance(r, str) and r.startswith("refusing to fetch image") for r in results[1:])
+    assert fetched == ["http://93.184.216.34/photo.png", "http://93.184.216.34/moved.png"]  # never the internal hop
+
+
+def test_v10_sends_image_claims_to_forensics(monkeypatch):
+    import asyncio
+    import api_server_v10 as v10
+    engine = imf.ImageForensics(workers=1)
+    monkeypatch.setattr(v10, "image_forensics", engine)
+    claim = "data:image/png;base64," + base64.b64encode(make_png(picture(4), text={"prompt": "{}"})).decode()
+    try:
+        result = asyncio.run(v10.AIProviders().verify_claim(claim))
+    finally:
+        engine.shutdown()
+    assert result["verdict"] == "misleading" and result["providers_used"] == []
+    assert result["image_forensics"]["findings"][0]["type"] == "ai_generated_marker"
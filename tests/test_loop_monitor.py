@@ -0,0 +1,40 @@
+import asyncio
+import time
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+from loop_monitor import LoopLagMonitor
+
+
+async def blocking_endpoint():
+    time.sleep(0.3)  # simulates bcrypt / sync HTTP inside a handler
+
+
+class _Route:
+    path = "/auth/login"
+    endpoint = staticmethod(blocking_endpoint)
+
+
+class _App:
+    routes = [_Route()]
+
+
+def test_blocking_call_is_measured_and_attributed_to_route():
+    monitor = LoopLagMonitor(interval=0.02, stall_threshold=0.05)
+    monitor.register_routes(_App())
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.1)
+        await blocking_endpoint()
+        await asyncio.sleep(0.1)
+        monitor.stop()
+
+    asyncio.run(run())
+
+    snap = monitor.snapshot()
+    assert snap["lag_ms"]["max_since_start"] >= 200
+    offenders = snap["top_offenders"]
+    assert offenders and offenders[0]["route"] == "/auth/login"
+    assert "blocking_endpoint" in offenders[0]["stack"]
+    assert offenders[0]["max_ms"] >= 200
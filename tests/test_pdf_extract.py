@@ -0,0 +1,129 @@
+import asyncio
+import zlib
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import pytest
+import pdf_extract as pe
+
+CMAP = b"""/CIDInit /ProcSet findresource begin 12 dict begin begincmap
+2 beginbfchar <0001> <0057> <0002> <0061> endbfchar
+1 beginbfrange <0003> <0005> <0074> endbfrange
+endcmap CMapName currentdict /CMap defineresource pop end end"""
+
+
+def make_pdf(pages, compress=True):
+    """A minimal PDF: one content stream per page, fonts /F1 (Helvetica) and /F2 (with a ToUnicode map)."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Custom /ToUnicode 5 0 R >>",
+               b"<< /Length %d >>\nstream\n%s\nendstream" % (len(CMAP), CMAP)]
+    kids = []
+    for content in pages:
+        data = zlib.compress(content) if compress else content
+        flate = b" /Filter /FlateDecode" if compress else b""
+        objects.append(b"<< /Length %d%s >>\nstream\n%s\nendstream" % (len(data), flate, data))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R >>" % len(objects))
+        kids.append(len(objects))
+    objects[1] = (b"<< /Type /Pages /Kids [%s] /Count %d /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>"
+                  % (b" ".join(b"%d 0 R" % k for k in kids), len(kids)))
+    out, offsets = b"%PDF-1.4\n", []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    return out + b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+
+
+REPORT = make_pdf([
+    b"BT /F1 12 Tf 72 720 Td (Annual report \\(2024\\)) Tj 0 -14 Td (The plant emitted 4.2 million tonnes of CO2.) Tj ET",
+    b"BT /F1 12 Tf 72 720 Td (Output rose by 12 percent in the second half.) Tj ET "
+    b"BT /F2 12 Tf 72 700 Td <01020305> Tj ET",
+], compress=True)
+
+
+def test_pages_are_read_in_order_and_capped():
+    result = pe.extract_pages(REPORT)
+    assert result["pages"] == [
+        "Annual report (2024)\nThe plant emitted 4.2 million tonnes of CO2.",
+        "Output rose by 12 percent in the second half.\nWatv",
+    ]
+    assert not result["truncated"] and result["engine"] == "pypdf"
+    assert pe.extract_pages(REPORT, max_pages=1)["pages"] == result["pages"][:1]
+    assert pe.extract_pages(make_pdf([b"BT /F1 12 Tf (Plain) Tj ET"], compress=False))["pages"] == ["Plain"]
+    capped = pe.extract_pages(REPORT, max_chars=10)
+    assert capped["truncated"] and capped["pages"] == [result["pages"][0][:10]]
+
+
+def test_pool_limits_and_extracts_in_a_worker():
+    pool = pe.PdfPool(workers=1, max_bytes=len(REPORT))
+
+    async def run():
+        with pytest.raises(pe.PdfError, match="exceeds"):
+            await pool.extract(REPORT + b" ")
+        with pytest.raises(pe.PdfError, match="not a PDF"):
+            await pool.extract(b"<html>")
+        return await pool.extract(REPORT)
+
+    try:
+        document = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert document["page_count"] == 2 and document["sha256"] == pe.document_hash(REPORT)
+    assert document["text"].startswith("Annual report (2024)\nThe plant emitted")
+
+
+def test_v10_verifies_documents_once_per_hash(monkeypatch):
+    from fastapi.testclient import TestClient
+    import api_server_v10 as v10
+    calls = []
+
+    async def verify_claim(self, claim, tier="free"):
+        calls.append(claim)
+        return {"verdict": "true", "confidence": 0.9, "explanation": "ok", "sources": [], "providers_used": ["groq"]}
+
+    monkeypatch.setattr(v10.AIProviders, "verify_claim", verify_claim)
+    monkeypatch.setattr(v10, "pdf_pool", pe.PdfPool(workers=1))
+    client = TestClient(v10.app)
+    try:
+        first = client.post("/v3/verify-document?tier=pro", content=REPORT,
+                            headers={"content-type": "application/pdf"}).json()
+        again = client.post("/v3/verify-document?tier=pro", content=REPORT,
+                            headers={"content-type": "application/pdf"}).json()
+        bad = client.post("/v3/verify-document", content=b"not a pdf", headers={"content-type": "application/pdf"})
+        not_object = client.post("/v3/verify-document", json="http://example.com/report.pdf")
+        internal = client.post("/v3/verify-document", json={"url": "http://127.0.0.1:8000/report.pdf"})
+    finally:
+        v10.pdf_pool.shutdown()
+    assert first["document"]["pages"] == 2 and not first["cached"] and first["tier"] == "pro"
+    assert [s["claim"] for s in first["subclaims"]] == calls
+    assert "Output rose by 12 percent in the second half." in calls
+    assert again["cached"] and again["subclaims"] == first["subclaims"] and len(calls) == len(first["subclaims"])
+    assert bad.status_code == 422 and not_object.status_code == 422
+    assert internal.status_code == 422 and "not a public address" in internal.json()["detail"]
+
+
+def test_fetch_pdf_caps_the_download_and_reports_http_errors():
+    import httpx
+
+    def handler(request):
+        if request.url.path == "/missing.pdf":
+            return httpx.Response(404)
+        if request.url.path == "/declared.pdf":
+            return httpx.Response(200, headers={"content-length": str(len(REPORT) + 1)}, content=REPORT + b" ")
+        return httpx.Response(200, content=REPORT)
+
+    async def fetch(url):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            try:
+                return await pe.fetch_pdf(client, url, max_bytes=len(REPORT))
+            except pe.PdfError as e:
+                return str(e)
+
+    results = [asyncio.run(fetch(f"http://93.184.216.34/{name}.pdf")) for name in ("report", "declared", "missing")]
+    assert results[0] == REPORT
+    assert results[1] == f"could not fetch document: exceeds {len(REPORT)} bytes"
+    assert results[2] == "could not fetch document: HTTP 404"
+    assert asyncio.run(fetch("http://10.0.0.7/report.pdf")).startswith("refusing to fetch document")
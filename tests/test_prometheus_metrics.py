@@ -0,0 +1,63 @@
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+from fastapi.testclient import TestClient
+import prometheus_metrics as metrics
+import api_server_v9 as server
+
+client = TestClient(server.app)
+
+
+def test_histogram_renders_cumulative_buckets():
+    reg = metrics.MetricsRegistry()
+    h = reg.histogram("t_latency_seconds", "test", ("route",), buckets=(0.1, 1.0))
+    h.observe(0.05, route="/a")
+    h.observe(0.5, route="/a")
+    h.observe(5, route="/a")
+    text = reg.render()
+    assert 't_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 't_latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 't_latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 't_latency_seconds_count{route="/a"} 3' in text
+
+
+def test_label_cardinality_is_capped():
+    c = metrics.Counter("t_calls_total", "test", ("provider", "outcome"),
+                        allowed={"outcome": ("success",)}, max_series=3)
+    for i in range(10):
+        c.inc(provider=f"p{i}", outcome="success")
+    c.inc(provider="p0", outcome="bogus")
+    assert len(c._series) <= 4
+    assert c.value(provider="other", outcome="other") >= 7
+
+
+def test_metrics_endpoint_reports_cache_hits():
+    server.rate_limiter.requests.clear()
+    server.claim_cache.set("metrics test claim", "free", {"verdict": "true"})
+    assert server.claim_cache.get("metrics test claim", "free") is not None
+    client.get('/health')  # a completed request, so the latency histogram has a series
+
+    resp = client.get('/metrics')
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    hits = [l for l in resp.text.splitlines() if l.startswith("verity_cache_hits ")]
+    assert hits and int(hits[0].split()[1]) >= 1
+    assert 'verity_cache_requests_total{layer="claim",result="hit"}' in resp.text
+    assert 'verity_http_request_duration_seconds_bucket' in resp.text
+
+
+def test_each_server_scrapes_its_own_state_when_both_are_imported():
+    import api_server_v10 as v10
+    server.rate_limiter.requests.clear()
+    server.claim_cache.set("scoped metrics claim", "free", {"verdict": "true"})
+    server.claim_cache.get("scoped metrics claim", "free")
+    collectors = len(metrics.registry.collectors)
+    metrics.registry.add_collector(metrics.collect_claim_cache(v10.claim_cache), owner="api_server_v10")
+    assert len(metrics.registry.collectors) == collectors  # re-registering replaces
+
+    def hits(app):
+        text = TestClient(app).get('/metrics').text
+        return int(next(l for l in text.splitlines() if l.startswith("verity_cache_hits ")).split()[1])
+
+    assert hits(server.app) == server.claim_cache.hits >= 1
+    assert hits(v10.app) == v10.claim_cache.hits
@@ -0,0 +1,98 @@
+import asyncio
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import time
+from circuit_breaker import CircuitBreakerRegistry, CircuitState
+import httpx
+from provider_prober import ProviderProber, build_model_list_probes
+
+
+def _prober():
+    breakers = CircuitBreakerRegistry(min_requests=2, default_timeout=1)
+
+    async def fast():
+        return {"provider": "fast", "model": "m1", "success": True}
+
+    async def slow():
+        await asyncio.sleep(0.05)
+        return {"provider": "slow", "model": "m2", "success": True}
+
+    async def limited():
+        return {"provider": "limited", "success": False, "status_code": 429}
+
+    prober = ProviderProber(breakers)
+    prober.probes = {"fast": fast, "slow": slow, "limited": limited}
+    return prober, breakers
+
+
+def test_probe_latency_is_per_provider():
+    prober, _ = _prober()
+
+    async def run():
+        await asyncio.gather(*(prober.probe_once(n) for n in prober.probes))
+    asyncio.run(run())
+
+    snap = prober.snapshot()
+    assert snap["providers"]["fast"]["status"] == "healthy"
+    assert snap["providers"]["fast"]["latency_ms"] < snap["providers"]["slow"]["latency_ms"]
+    assert snap["providers"]["slow"]["model"] == "m2"
+    assert snap["providers"]["limited"]["errors"] == {"rate_limited": 1}
+
+
+def test_probe_failures_feed_breaker_and_skip_open_circuit():
+    prober, breakers = _prober()
+    asyncio.run(prober.probe_once("limited"))
+    assert breakers.is_open("limited")
+
+    entry = asyncio.run(prober.probe_once("limited"))
+    assert entry["status"] == "cooldown"
+    assert entry["error"] == "circuit_open"
+    assert prober.snapshot()["providers"]["limited"]["latency"]["count"] == 1
+
+
+def test_model_list_probes_spend_no_tokens_and_respect_quota():
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, str(request.url), request.headers.get("authorization")))
+        return httpx.Response(200, json={"data": []})
+
+    class Quota:
+        def __init__(self, left):
+            self.left = left
+
+        def can_request(self, name):
+            return self.left > 0
+
+        def record(self, name):
+            self.left -= 1
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            probes = build_model_list_probes(client, ["groq", "jina", "mistral"],
+                                             env={"GROQ_API_KEY": "gk", "JINA_API_KEY": "jk"})
+            assert list(probes) == ["groq"]  # jina has no model listing, mistral no key
+            prober = ProviderProber(CircuitBreakerRegistry(), rate_limiter=Quota(1))
+            prober.probes = probes
+            first = await prober.probe_once("groq")
+            await prober.probe_once("groq")  # quota spent: skipped, not sent
+            return first, prober.rate_limiter.left
+
+    first, left = asyncio.run(run())
+    assert first["status"] == "healthy" and left == 0
+    assert seen == [("GET", "https://api.groq.com/openai/v1/models", "Bearer gk")]
+
+
+def test_successful_probe_neither_takes_nor_closes_a_half_open_circuit():
+    prober, breakers = _prober()
+    for _ in range(breakers.min_requests):
+        breakers.record_failure("fast", status_code=500)
+    breakers.get("fast").open_until = time.time() - 1
+    assert asyncio.run(prober.probe_once("fast"))["status"] == "healthy"
+    cb = breakers.get("fast")
+    assert cb.state != CircuitState.CLOSED and cb.half_open_admitted == 0
+    assert breakers.allow_request("fast")  # the slot is still there for a real call
+
+    snap = prober.snapshot()
+    assert snap["probing"] is False and "PROBE_ENABLED" in snap["detail"]
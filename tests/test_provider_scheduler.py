@@ -0,0 +1,52 @@
+import asyncio
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import provider_scheduler
+from provider_scheduler import ProviderScheduler, BATCH, INTERACTIVE
+
+
+def test_interactive_first_then_fair_share_across_tenants():
+    scheduler = ProviderScheduler(default_concurrency=1)
+    order = []
+
+    async def call(tenant, tier, priority):
+        provider_scheduler.begin_work(tenant=tenant, tier=tier, priority=priority)
+
+        async def work():
+            order.append(tenant)
+            await asyncio.sleep(0)
+        await scheduler.call("groq", work())
+
+    async def run():
+        await scheduler.acquire("groq")  # hold the only slot while work queues up
+        tasks = [asyncio.create_task(call("bulk", "enterprise", BATCH)) for _ in range(8)]
+        tasks += [asyncio.create_task(call("small", "free", BATCH)) for _ in range(2)]
+        tasks.append(asyncio.create_task(call("web", "free", INTERACTIVE)))
+        await asyncio.sleep(0.01)
+        assert scheduler.get_status()["groq"]["waiting"] == {"interactive": 1, "batch": 10}
+        scheduler.release("groq")
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert order[0] == "web"
+    batch = order[1:]
+    # enterprise weighs 4x free: the free tenant gets a slot after every 4 bulk calls, not after all 8
+    assert batch == ["bulk"] * 4 + ["small"] + ["bulk"] * 4 + ["small"]
+    assert scheduler.get_status()["groq"]["in_use"] == 0
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    scheduler = ProviderScheduler(default_concurrency=1)
+
+    async def run():
+        await scheduler.acquire("openai")
+        waiter = asyncio.create_task(scheduler.acquire("openai"))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        scheduler.release("openai")
+        await asyncio.wait_for(scheduler.acquire("openai"), timeout=1)
+        scheduler.release("openai")
+
+    asyncio.run(run())
+    assert scheduler.get_status()["openai"]["in_use"] == 0
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import reference_fetch as rf
+
+
+def test_batch_limits_hosts_and_returns_what_arrived_by_the_deadline():
+    active = {}
+    peak = {}
+
+    def fetcher(host, delay):
+        async def fetch():
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+            await asyncio.sleep(delay)
+            active[host] -= 1
+            return {"success": True, "content": host}
+        return fetch
+
+    async def run():
+        limiter = rf.HostLimiter(limit=2)
+        batch = rf.ReferenceBatch(limiter)
+        for i in range(4):
+            batch.add("doi", f"10.1/{i}", "api.semanticscholar.org", fetcher("api.semanticscholar.org", 0.05))
+        batch.add("url", "https://a.example", "a.example", fetcher("a.example", 0.01))
+        batch.add("url", "https://slow.example", "slow.example", fetcher("slow.example", 0.5))
+        batch.add("url", "https://never.example", "never.example", fetcher("never.example", 10))
+        batch.add("arxiv", "2101.1", "export.arxiv.org", lambda: _raise())
+
+        first = await batch.wait(0.2)
+        assert {f.ref for f in first} == {"10.1/0", "10.1/1", "10.1/2", "10.1/3", "https://a.example", "2101.1"}
+        assert batch.collect() == []
+        await asyncio.sleep(0.4)
+        assert [f.ref for f in batch.collect()] == ["https://slow.example"]
+        batch.cancel()
+        await asyncio.sleep(0)
+        assert not limiter._semaphores  # no per-host state left behind
+        return batch.report()
+
+    report = {r["ref"]: r for r in asyncio.run(run())}
+    assert peak["api.semanticscholar.org"] == 2
+    assert report["10.1/3"]["queued_ms"] >= 40  # waited for a slot
+    assert report["https://slow.example"]["used_in"] == "pass2"
+    assert report["https://never.example"]["outcome"] == "cancelled"
+    assert report["2101.1"]["outcome"] == "failed" and report["2101.1"]["used_in"] is None
+
+
+async def _raise():
+    raise ValueError("boom")
+
+
+def test_v10_fetches_references_concurrently_and_uses_late_ones_in_pass_two(monkeypatch):
+    import api_server_v10 as v10
+    engine = v10.AIProviders()
+    sent = []
+
+    async def extract_url_content(url):
+        await asyncio.sleep(0.3 if "slow" in url else 0.01)
+        return {"success": True, "content": f"The reservoir on {url} reported record levels of water this spring.", "url": url}
+
+    async def extract_research_paper(identifier, id_type):
+        await asyncio.sleep(0.01)
+        return {"success": True, "title": "Reservoir study", "abstract": "Record water levels were measured in spring."}
+
+    def provider(name):
+        async def verify(claim, context):
+            await asyncio.sleep(0.35)
+            sent.append(context)
+            reply = {"verdict": "true", "confidence": 0.9, "rationale": "Reported.", "evidence": [1]}
+            return {"provider": name, "model": "m", "success": True, "response": json.dumps(reply)}
+        return verify
+
+    monkeypatch.setattr(v10, "REFERENCE_DEADLINE", 0.1)
+    monkeypatch.setattr(v10, "get_available_search_apis", lambda: [])
+    monkeypatch.setattr(engine, "content_extractor", v10.ContentExtractor(None))
+    monkeypatch.setattr(engine.content_extractor, "extract_url_content", extract_url_content)
+    monkeypatch.setattr(engine.content_extractor, "extract_research_paper", extract_research_paper)
+    monkeypatch.setattr(engine, "get_provider_functions", lambda: {"groq": provider("groq")})
+    monkeypatch.setattr(engine, "available_providers", ["groq"])
+
+    claim = ("The reservoir hit record levels this spring, see https://fast.example/a and https://slow.example/b "
+             "and doi:10.1234/abcd.5678")
+    result = asyncio.run(engine._run_verification(claim, max_loops=2))
+    assert "fast.example" in sent[0] and "slow.example" not in sent[0]
+    assert "slow.example" in sent[1] and sent[0] in sent[1]  # pass-1 evidence keeps its numbers
+    stages = {r["ref"]: r["used_in"] for r in result["reference_extraction"]}
+    assert stages["https://fast.example/a"] == "pass1" and stages["https://slow.example/b"] == "pass2"
@@ -0,0 +1,192 @@
+import asyncio
+import hashlib
+import hmac
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import pytest
+import stripe
+import stripe_events
+from user_store import SQLiteUserStore
+
+SECRET = "whsec_test_secret"
+PRICES = {"starter": "price_starter", "pro": "price_pro", "enterprise": None}
+
+
+class StripeStandIn:
+    """Local stand-in for the Stripe API: answers GET /v1/customers/<id> and counts calls.
+
+    A customer mapped to None is answered as deleted.
+    """
+
+    def __init__(self, customers):
+        self.customers, self.calls, self.fail = customers, [], False
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.calls.append(self.path)
+                customer_id = self.path.rsplit("/", 1)[-1]
+                if stand_in.fail or customer_id not in stand_in.customers:
+                    status, body = 500, {"error": {"type": "api_error", "message": "stand-in failure"}}
+                elif stand_in.customers[customer_id] is None:
+                    status, body = 200, {"id": customer_id, "object": "customer", "deleted": True}
+                else:
+                    status, body = 200, {"id": customer_id, "object": "customer",
+                                         "email": stand_in.customers[customer_id]}
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+
+@pytest.fixture
+def stripe_api(monkeypatch):
+    api = StripeStandIn({"cus_1": "pat@example.com", "cus_2": "sam@example.com"})
+    monkeypatch.setattr(stripe, "api_base", api.url)
+    monkeypatch.setattr(stripe, "api_key", "sk_test_stand_in")
+    monkeypatch.setattr(stripe, "max_network_retries", 0)
+    yield api
+    api.server.shutdown()
+
+
+def retrieve_email(customer_id):
+    return stripe.Customer.retrieve(customer_id).email
+
+
+def event(event_id, kind, obj, created=0):
+    return {"id": event_id, "object": "event", "type": kind, "created": created, "data": {"object": obj}}
+
+
+def subscription(sub_id, customer, price, status="active"):
+    return {"id": sub_id, "object": "subscription", "customer": customer, "status": status,
+            "items": {"data": [{"price": {"id": price}}]}}
+
+
+def signed(body):
+    timestamp = int(time.time())
+    signature = hmac.new(SECRET.encode(), f"{timestamp}.{body}".encode(), hashlib.sha256).hexdigest()
+    return {"stripe-signature": f"t={timestamp},v1={signature}", "content-type": "application/json"}
+
+
+def test_queue_deduplicates_retries_and_caches_customers(tmp_path, stripe_api):
+    async def scenario():
+        store = SQLiteUserStore(str(tmp_path / "users.db"))
+        queue = stripe_events.StripeEventQueue(str(tmp_path / "events.db"), max_attempts=2)
+        processor = stripe_events.StripeEventProcessor(queue, store, PRICES, retrieve_email)
+        await store.create("pat@example.com", "x")
+        created = event("evt_1", "customer.subscription.created", subscription("sub_1", "cus_1", "price_pro"))
+        assert await queue.append("evt_1", created["type"], json.dumps(created))
+        assert not await queue.append("evt_1", created["type"], json.dumps(created))
+        assert await processor.process_ready() == 1
+        user = await store.get("pat@example.com")
+        assert (user["tier"], user["stripe_customer_id"], user["stripe_subscription_id"]) == ("pro", "cus_1", "sub_1")
+
+        # Same customer again: answered from the email cache, no second API call
+        updated = event("evt_2", "customer.subscription.updated", subscription("sub_1", "cus_1", "price_starter"))
+        await queue.append("evt_2", updated["type"], json.dumps(updated))
+        await processor.process_ready()
+        assert (await store.get("pat@example.com"))["tier"] == "starter" and len(stripe_api.calls) == 1
+
+        # Stripe failing: the event backs off, then is parked after max_attempts
+        stripe_api.fail = True
+        failing = event("evt_3", "customer.subscription.deleted", subscription("sub_2", "cus_2", "price_pro"))
+        await queue.append("evt_3", failing["type"], json.dumps(failing))
+        await processor.process_ready()
+        assert await queue.counts() == {"done": 2, "pending": 1}
+        assert await processor.process_ready() == 0  # still backing off
+        queue._db.execute("UPDATE stripe_events SET available_at = 0")
+        await processor.process_ready()
+        assert await queue.counts() == {"done": 2, "failed": 1}
+        await queue.close()
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_events_older_than_the_last_applied_one_are_skipped(tmp_path, stripe_api):
+    async def scenario():
+        store = SQLiteUserStore(str(tmp_path / "users.db"))
+        queue = stripe_events.StripeEventQueue(str(tmp_path / "events.db"))
+        processor = stripe_events.StripeEventProcessor(queue, store, PRICES, retrieve_email)
+        await store.create("pat@example.com", "x")
+        sub = subscription("sub_1", "cus_1", "price_pro")
+        created = event("evt_1", "customer.subscription.created", sub, created=1000)
+        deleted = event("evt_2", "customer.subscription.deleted", sub, created=1060)
+        # The created event failed once and its retry lands after the deletion
+        for item in (deleted, created):
+            await queue.append(item["id"], item["type"], json.dumps(item))
+            await processor.process_ready()
+        assert (await store.get("pat@example.com"))["tier"] == "free"
+        assert await queue.counts() == {"done": 2}
+
+        renewed = event("evt_3", "customer.subscription.created", subscription("sub_2", "cus_1", "price_pro"), created=1200)
+        await queue.append(renewed["id"], renewed["type"], json.dumps(renewed))
+        await processor.process_ready()
+        assert (await store.get("pat@example.com"))["tier"] == "pro"
+        await queue.close()
+        await store.close()
+
+    asyncio.run(scenario())
+
+
+def test_v9_webhook_acknowledges_then_applies_in_background(tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    import api_server_v9 as server  # sets stripe.api_key, so configure the stand-in after it
+    stripe_api = StripeStandIn({"cus_2": "sam@example.com"})
+    monkeypatch.setattr(stripe, "api_base", stripe_api.url)
+    monkeypatch.setattr(stripe, "api_key", "sk_test_stand_in")
+    monkeypatch.setattr(stripe, "max_network_retries", 0)
+    store = SQLiteUserStore(str(tmp_path / "users.db"))
+    queue = stripe_events.StripeEventQueue(str(tmp_path / "events.db"))
+    processor = stripe_events.StripeEventProcessor(queue, store, PRICES, retrieve_email)
+    monkeypatch.setenv("STRIPE_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(server, "user_store", store)
+    monkeypatch.setattr(server, "stripe_queue", queue)
+    monkeypatch.setattr(server, "stripe_processor", processor)
+    monkeypatch.setattr(server.Config, "PROBE_ENABLED", False)
+
+    created = json.dumps(event("evt_10", "customer.subscription.created", subscription("sub_9", "cus_2", "price_pro")))
+    deleted = json.dumps(event("evt_11", "customer.subscription.deleted", subscription("sub_9", "cus_2", "price_pro")))
+    with TestClient(server.app) as client:
+        client.portal.call(store.create, "sam@example.com", "x")
+        bad = client.post("/stripe/webhook", content=created, headers={**signed(created), "stripe-signature": "t=1,v1=00"})
+        first = client.post("/stripe/webhook", content=created, headers=signed(created)).json()
+        again = client.post("/stripe/webhook", content=created, headers=signed(created)).json()
+        deadline = time.time() + 5
+        while client.portal.call(queue.counts).get("done", 0) < 1 and time.time() < deadline:
+            time.sleep(0.02)
+        tier = client.portal.call(store.get, "sam@example.com")["tier"]
+        client.post("/stripe/webhook", content=deleted, headers=signed(deleted))
+        while client.portal.call(queue.counts).get("done", 0) < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        store.forget("sam@example.com")
+        final = client.portal.call(store.get, "sam@example.com")["tier"]
+    assert bad.status_code == 400
+    assert first == {"received": True, "duplicate": False} and again == {"received": True, "duplicate": True}
+    stripe_api.server.shutdown()
+    assert (tier, final) == ("pro", "free") and stripe_api.calls == ["/v1/customers/cus_2"]
+
+
+def test_v9_customer_email_is_none_for_deleted_customers(monkeypatch):
+    import api_server_v9 as server
+    stripe_api = StripeStandIn({"cus_1": "pat@example.com", "cus_gone": None, "cus_quiet": ""})
+    monkeypatch.setattr(stripe, "api_base", stripe_api.url)
+    monkeypatch.setattr(stripe, "api_key", "sk_test_stand_in")
+    monkeypatch.setattr(stripe, "max_network_retries", 0)
+    emails = [server.stripe_customer_email(cid) for cid in ("cus_1", "cus_gone", "cus_quiet")]
+    stripe_api.server.shutdown()
+    assert emails == ["pat@example.com", None, None]
@@ -0,0 +1,97 @@
+import asyncio
+import contextvars
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import provider_scheduler
+import structured_output as so
+
+
+def test_strict_parser_accepts_only_well_formed_objects():
+    ok = so.parse_verdict('{"verdict": "Mostly_True", "confidence": 82, "rationale": " Data agrees. ", "evidence": [1, 3]}')
+    assert ok == {"verdict": "mostly_true", "confidence": 0.82, "rationale": "Data agrees.", "evidence": [1, 3]}
+    fenced = '```json\n{"verdict": "false", "confidence": 0.9, "rationale": "", "evidence": []}\n```'
+    assert so.parse_verdict(fenced)["verdict"] == "false"
+    assert so.parse_verdict('{"verdict": "true", "confidence": 0.7}')["evidence"] == []
+
+    for bad in (
+        'VERDICT: true\nCONFIDENCE: 0.9',
+        'Sure! {"verdict": "true", "confidence": 0.9}',           # prose around the object
+        '{"verdict": "probably", "confidence": 0.9}',             # unknown verdict
+        '{"verdict": "partially_true", "confidence": 0.9}',       # not a v10 verdict
+        '{"verdict": "true", "confidence": true}',
+        '{"verdict": "true", "confidence": 140}',
+        '{"verdict": "true", "confidence": 0.9, "evidence": ["1"]}',
+        '{"verdict": "true", "confidence": 0.9',
+        '', None,
+    ):
+        assert so.parse_verdict(bad) is None, bad
+    assert so.parse_verdict('{"verdict": "misleading", "confidence": 0.6}', so.EXTENDED_VERDICTS)
+
+
+def test_json_modes_and_tier_budgets():
+    assert so.response_format("groq") == {"response_format": {"type": "json_object"}}
+    schema = so.response_format("openai")["response_format"]["json_schema"]
+    assert schema["strict"] and schema["schema"]["properties"]["verdict"]["enum"] == list(so.VERDICTS)
+    assert so.response_format("anthropic") == {}
+    assert so.output_budget("enterprise") > so.output_budget("pro") > so.output_budget("free") == so.output_budget(None)
+    assert so.output_budget("free") < 600
+
+
+def test_v10_consensus_reads_structured_replies_and_counts_fallbacks():
+    import api_server_v10 as v10
+    engine = v10.AIProviders()
+    results = [
+        {"provider": "groq", "model": "m", "success": True,
+         "response": '{"verdict": "false", "confidence": 0.9, "rationale": "Records show otherwise.", "evidence": [2]}'},
+        {"provider": "mistral", "model": "m", "success": True,
+         "response": '{"verdict": "false", "confidence": 0.8, "rationale": "Contradicted.", "evidence": [1, 2]}'},
+        {"provider": "openai", "model": "m", "success": True, "response": "VERDICT: true\nCONFIDENCE: 0.6"},
+    ]
+    before = so.OUTPUT_PARSE.value(provider="openai", result="fallback")
+    claim = "The Great Wall of China is visible from the Moon with the naked eye"
+    out = engine._build_consensus_with_nuance(claim, results, [], ["groq", "mistral", "openai"],
+                                             v10.NuanceDetector.analyze_claim(claim), 5, {"content_type": "text"})
+    assert out["verdict"] == "false"
+    assert out["explanation"].startswith("Records show otherwise.")
+    breakdown = out["cross_validation"]["verdict_breakdown"]
+    assert [b["cited_evidence"] for b in breakdown] == [[2], [1, 2], []]
+    assert breakdown[2]["verdict"] == "true" and breakdown[2]["confidence"] == 0.6
+    assert so.OUTPUT_PARSE.value(provider="openai", result="fallback") == before + 1
+    assert so.OUTPUT_PARSE.value(provider="groq", result="structured") >= 1
+
+    def budget(tier):
+        provider_scheduler.begin_work(tier=tier)
+        return engine._output_budget()
+    assert contextvars.copy_context().run(budget, "enterprise") == so.OUTPUT_BUDGETS["enterprise"]
+    assert '"verdict"' in engine._get_system_prompt()
+
+
+def test_v9_asks_single_claims_for_json_and_sends_packed_lists_as_is(monkeypatch):
+    import httpx
+    import api_server_v9 as v9
+    from claim_packing import build_packed_prompt, pack_limits
+    sent = []
+
+    class Client:
+        async def post(self, url, **kwargs):
+            sent.append(kwargs["json"])
+            return httpx.Response(200, json={"choices": [{"message": {"content": "{}"}}]})
+
+    monkeypatch.setattr(v9.Config, "GROQ_API_KEY", "test-key")
+    engine = v9.AIProviders()
+    engine.http_client = Client()
+
+    async def calls():
+        provider_scheduler.begin_work(tier="pro")
+        await engine.verify_with_groq("Water boils at 100 C at sea level")
+        await engine.verify_with_groq(build_packed_prompt(["claim a", "claim b"]), packed=True)
+    asyncio.run(calls())
+
+    single, packed = sent
+    assert single["max_tokens"] == so.OUTPUT_BUDGETS["pro"] and single["response_format"] == {"type": "json_object"}
+    assert '"verdict"' in single["messages"][0]["content"]
+    assert single["messages"][1]["content"].startswith("Fact-check this claim:")
+    assert packed["max_tokens"] == pack_limits("groq")["output"] and "response_format" not in packed
+    assert packed["messages"][1]["content"].startswith("Fact-check each of the 2 numbered claims")
+    assert "JSON" not in packed["messages"][0]["content"]
@@ -0,0 +1,45 @@
+import asyncio
+import json
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import tracing
+
+
+def test_unsampled_requests_are_noops():
+    t = tracing.Tracer(sample_rate=1.0)  # no exporter configured -> never sampled
+    root = t.start_trace("verify")
+    assert root is tracing.NOOP_SPAN
+    with root:
+        assert tracing.span("search") is tracing.NOOP_SPAN
+
+
+def test_spans_nest_across_gather_and_export_otlp(tmp_path):
+    out = tmp_path / "traces.jsonl"
+    t = tracing.Tracer(sample_rate=1.0, export_file=str(out))
+
+    async def provider(name):
+        with tracing.span(f"provider.{name}") as s:
+            await asyncio.sleep(0.01)
+            s.set_outcome("success")
+
+    async def run():
+        with t.start_trace("verify", record=True) as root:
+            with tracing.span("ai_pass1"):
+                await asyncio.gather(provider("groq"), provider("google"))
+            timings = root.timings()
+        await t.flush()
+        return timings
+
+    timings = asyncio.run(run())
+    names = {s["name"]: s for s in timings["spans"]}
+    assert names["provider.groq"]["parent"] == "ai_pass1"
+    assert names["provider.groq"]["outcome"] == "success"
+    assert names["provider.groq"]["duration_ms"] >= 10
+
+    payload = json.loads(out.read_text().splitlines()[0])
+    spans = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans) == 4
+    assert len({s["traceId"] for s in spans}) == 1
+    root_span = next(s for s in spans if "parentSpanId" not in s)
+    assert root_span["name"] == "verify"
@@ -0,0 +1,102 @@
+import asyncio
+import multiprocessing
+import sqlite3
+import os, sys
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import pytest
+import user_store as us
+
+
+def _count_in_process(path, user_id, times):
+    async def run():
+        store = us.SQLiteUserStore(path)
+        await asyncio.gather(*(store.increment_verifications(user_id) for _ in range(times)))
+        await store.close()
+    asyncio.run(run())
+
+
+def test_accounts_persist_and_counts_are_atomic_across_processes(tmp_path):
+    path = str(tmp_path / "users.db")
+
+    async def register():
+        store = us.create_user_store(f"sqlite:///{path}")
+        created = await store.create("ada@example.test", "hash-1", "Ada")
+        with pytest.raises(us.UserExists):
+            await store.create("ada@example.test", "hash-2")
+        await store.close()
+        return created
+
+    created = asyncio.run(register())
+    workers = [multiprocessing.get_context("spawn").Process(target=_count_in_process,
+                                                            args=(path, created["user_id"], 25)) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert [w.exitcode for w in workers] == [0, 0, 0]
+
+    async def reopen():
+        store = us.SQLiteUserStore(path)  # a "restart": nothing cached
+        user = await store.get("ada@example.test")
+        assert await store.increment_verifications("no-such-user") is None
+        await store.close()
+        return user
+
+    user = asyncio.run(reopen())
+    assert user["user_id"] == created["user_id"] and user["name"] == "Ada" and user["tier"] == "free"
+    assert user["verifications_used"] == 75
+
+
+def test_profile_reads_go_through_the_cache_and_writes_refresh_it(tmp_path):
+    store = us.SQLiteUserStore(str(tmp_path / "users.db"), cache_ttl=60)
+    reads = []
+    fetchrow = store._fetchrow
+
+    async def counting_fetchrow(sql, args):
+        reads.append(sql.split()[0])
+        return await fetchrow(sql, args)
+
+    store._fetchrow = counting_fetchrow
+
+    async def run():
+        created = await store.create("bo@example.test", "h")
+        await store.get("bo@example.test")
+        await store.get("bo@example.test")
+        assert await store.increment_verifications(created["user_id"], 3) == 3
+        assert (await store.get("bo@example.test"))["verifications_used"] == 3  # cached copy updated in place
+        assert await store.set_subscription("bo@example.test", "pro", "cus_1", "sub_1")
+        upgraded = await store.get("bo@example.test")
+        assert await store.set_subscription("bo@example.test", "free")
+        downgraded = await store.get_by_customer("cus_1")
+        await store.close()
+        return upgraded, downgraded
+
+    upgraded, downgraded = asyncio.run(run())
+    assert (upgraded["tier"], upgraded["stripe_subscription_id"]) == ("pro", "sub_1")
+    assert (downgraded["tier"], downgraded["stripe_customer_id"], downgraded["stripe_subscription_id"]) == \
+        ("free", "cus_1", None)
+    assert reads == ["SELECT", "UPDATE", "SELECT", "SELECT"]
+
+
+def test_store_backends_must_implement_queries_and_v9_survives_a_failed_count(monkeypatch):
+    with pytest.raises(TypeError):
+        us.UserStore()
+
+    from fastapi.testclient import TestClient
+    import api_server_v9 as server
+
+    class _BrokenStore(us.SQLiteUserStore):
+        async def increment_verifications(self, user_id, count=1):
+            raise sqlite3.OperationalError("database is locked")
+
+    async def verified(request):
+        return {"verdict": "true", "confidence": 90}
+
+    monkeypatch.setattr(server, "user_store", _BrokenStore(":memory:"))
+    monkeypatch.setattr(server, "_verify_claim", verified)
+    monkeypatch.setattr(server, "rate_limiter", server.RateLimiter())
+    token = server.UserAuth.create_token("u_1", "pat@example.com", "free")
+    response = TestClient(server.app).post("/verify", json={"claim": "The sky is blue today"},
+                                           headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200 and response.json()["verdict"] == "true"
@@ -0,0 +1,29 @@
+import asyncio
+import math
+import os, sys
+import time
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'python-tools'))
+import pytest
+from worker_pool import BrokenWorker, WorkerPool
+
+
+def test_a_timeout_or_crash_only_fails_its_own_task():
+    pool = WorkerPool(workers=2, timeout=10)
+
+    async def run():
+        await asyncio.gather(pool.run(math.factorial, 5), pool.run(math.factorial, 6))  # both workers warm
+        healthy = asyncio.ensure_future(pool.run(time.sleep, 1.5))
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.run(time.sleep, 30, timeout=0.5)
+        assert await healthy is None  # the other worker was not killed with the stuck one
+        healthy = asyncio.ensure_future(pool.run(time.sleep, 1.0))
+        with pytest.raises(BrokenWorker):
+            await pool.run(os._exit, 1)
+        assert await healthy is None
+        return await asyncio.gather(pool.run(math.factorial, 10), pool.run(math.factorial, 3))
+
+    try:
+        assert asyncio.run(run()) == [3628800, 6]  # both slots started fresh workers
+    finally:
+        pool.shutdown()